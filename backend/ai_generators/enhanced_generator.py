@@ -6,6 +6,7 @@ Système de génération de projets complets avec structure multi-fichiers
 from typing import Dict, List, Optional
 from dataclasses import dataclass
 from emergentintegrations.llm.chat import LlmChat, UserMessage
+from utils.llm_governor import llm_governor
 import json
 
 
@@ -453,7 +454,8 @@ Format de réponse OBLIGATOIRE:
 Génère MAINTENANT tous les fichiers avec code COMPLET et FONCTIONNEL."""
         
         try:
-            response = await chat.with_model("openai", "gpt-4o").send_message(UserMessage(text=prompt))
+            async with llm_governor.slot():
+                response = await chat.with_model("openai", "gpt-4o").send_message(UserMessage(text=prompt))
             
             # Parser la réponse pour extraire chaque fichier
             generated = self._parse_batch_response(response, list(files.keys()))
@@ -657,7 +659,8 @@ RÈGLES IMPORTANTES:
 Génère UNIQUEMENT le code, sans explications ni markdown.
 """
         
-        response = await chat.with_model("openai", "gpt-4o").send_message(UserMessage(text=prompt))
+        async with llm_governor.slot():
+            response = await chat.with_model("openai", "gpt-4o").send_message(UserMessage(text=prompt))
         return self._clean_generated_code(response)
     
     def _build_generation_context(self, existing_files: Dict[str, str], current_file: str) -> str:
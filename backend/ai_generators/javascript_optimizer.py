@@ -10,6 +10,7 @@ import re
 import json
 from typing import Dict, List, Optional, Tuple
 from emergentintegrations.llm.chat import LlmChat, UserMessage
+from utils.llm_governor import llm_governor
 
 logger = logging.getLogger(__name__)
 
@@ -25,8 +26,9 @@ class JavaScriptOptimizer:
     - Prompts optimisés pour syntaxe JavaScript parfaite
     """
     
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, guidance: str = ""):
         self.api_key = api_key
+        self.guidance = guidance  # Leçons des générations précédentes (insights ML)
         self.logger = logging.getLogger("JavaScriptOptimizer")
     
     def calculate_adaptive_timeout(
@@ -486,15 +488,16 @@ Code JavaScript COMPLET et FONCTIONNEL."""
             
             # Prompt optimisé
             if not simplified:
-                prompt = self.get_optimized_javascript_prompt(description, framework, language)
+                prompt = self.get_optimized_javascript_prompt(description, framework, language) + self.guidance
             else:
                 prompt = f"Génère code {framework} simple pour: {description}"
             
-            # Génération avec timeout
-            response = await asyncio.wait_for(
-                llm.send_message(UserMessage(text=prompt)),
-                timeout=timeout
-            )
+            # Génération avec timeout (slot acquis avant: la file ne consomme pas le timeout)
+            async with llm_governor.slot():
+                response = await asyncio.wait_for(
+                    llm.send_message(UserMessage(text=prompt)),
+                    timeout=timeout
+                )
             
             # Parsing JSON
             code_text = response.text if hasattr(response, 'text') else str(response)
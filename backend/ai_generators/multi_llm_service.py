@@ -12,6 +12,7 @@ from typing import Optional, Dict, Any, List
 from enum import Enum
 import logging
 from emergentintegrations.llm.chat import LlmChat, UserMessage
+from utils.llm_governor import llm_governor
 
 logger = logging.getLogger(__name__)
 
@@ -126,7 +127,8 @@ class MultiLLMService:
             user_message = UserMessage(text=user_content)
             
             # Make the call
-            response = await chat.send_message(user_message)
+            async with llm_governor.slot():
+                response = await chat.send_message(user_message)
             
             # Record latency
             latency = time.time() - start_time
@@ -4,7 +4,7 @@ Gère l'authentification OAuth pour les trois providers principaux
 """
 
 import os
-import httpx
+from utils.http_clients import http_clients
 import jwt
 import time
 import secrets
@@ -58,43 +58,41 @@ class GoogleOAuth:
     @staticmethod
     async def exchange_code_for_token(code: str) -> Dict:
         """Échange le code d'autorisation contre un token"""
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                "https://oauth2.googleapis.com/token",
-                data={
-                    "client_id": GOOGLE_CLIENT_ID,
-                    "client_secret": GOOGLE_CLIENT_SECRET,
-                    "code": code,
-                    "redirect_uri": GOOGLE_REDIRECT_URI,
-                    "grant_type": "authorization_code"
-                },
-                headers={"Content-Type": "application/x-www-form-urlencoded"}
+        response = await http_clients.post(
+            "https://oauth2.googleapis.com/token",
+            data={
+                "client_id": GOOGLE_CLIENT_ID,
+                "client_secret": GOOGLE_CLIENT_SECRET,
+                "code": code,
+                "redirect_uri": GOOGLE_REDIRECT_URI,
+                "grant_type": "authorization_code"
+            },
+            headers={"Content-Type": "application/x-www-form-urlencoded"}
+        )
+        
+        if response.status_code != 200:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Failed to exchange code: {response.text}"
             )
-            
-            if response.status_code != 200:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Failed to exchange code: {response.text}"
-                )
-            
-            return response.json()
+        
+        return response.json()
     
     @staticmethod
     async def get_user_info(access_token: str) -> Dict:
         """Récupère les informations utilisateur depuis Google"""
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                "https://www.googleapis.com/oauth2/v2/userinfo",
-                headers={"Authorization": f"Bearer {access_token}"}
+        response = await http_clients.get(
+            "https://www.googleapis.com/oauth2/v2/userinfo",
+            headers={"Authorization": f"Bearer {access_token}"}
+        )
+        
+        if response.status_code != 200:
+            raise HTTPException(
+                status_code=400,
+                detail="Failed to get user info from Google"
             )
-            
-            if response.status_code != 200:
-                raise HTTPException(
-                    status_code=400,
-                    detail="Failed to get user info from Google"
-                )
-            
-            return response.json()
+        
+        return response.json()
 
 
 class GitHubOAuth:
@@ -122,53 +120,51 @@ class GitHubOAuth:
     @staticmethod
     async def exchange_code_for_token(code: str) -> Dict:
         """Échange le code d'autorisation contre un token"""
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                "https://github.com/login/oauth/access_token",
-                data={
-                    "client_id": GITHUB_CLIENT_ID,
-                    "client_secret": GITHUB_CLIENT_SECRET,
-                    "code": code,
-                    "redirect_uri": GITHUB_REDIRECT_URI
-                },
-                headers={"Accept": "application/json"}
+        response = await http_clients.post(
+            "https://github.com/login/oauth/access_token",
+            data={
+                "client_id": GITHUB_CLIENT_ID,
+                "client_secret": GITHUB_CLIENT_SECRET,
+                "code": code,
+                "redirect_uri": GITHUB_REDIRECT_URI
+            },
+            headers={"Accept": "application/json"}
+        )
+        
+        if response.status_code != 200:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Failed to exchange code: {response.text}"
             )
-            
-            if response.status_code != 200:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Failed to exchange code: {response.text}"
-                )
-            
-            data = response.json()
-            
-            if "error" in data:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"GitHub OAuth error: {data.get('error_description', data['error'])}"
-                )
-            
-            return data
+        
+        data = response.json()
+        
+        if "error" in data:
+            raise HTTPException(
+                status_code=400,
+                detail=f"GitHub OAuth error: {data.get('error_description', data['error'])}"
+            )
+        
+        return data
     
     @staticmethod
     async def get_user_info(access_token: str) -> Dict:
         """Récupère les informations utilisateur depuis GitHub"""
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                "https://api.github.com/user",
-                headers={
-                    "Authorization": f"Bearer {access_token}",
-                    "Accept": "application/vnd.github+json"
-                }
+        response = await http_clients.get(
+            "https://api.github.com/user",
+            headers={
+                "Authorization": f"Bearer {access_token}",
+                "Accept": "application/vnd.github+json"
+            }
+        )
+        
+        if response.status_code != 200:
+            raise HTTPException(
+                status_code=400,
+                detail="Failed to get user info from GitHub"
             )
-            
-            if response.status_code != 200:
-                raise HTTPException(
-                    status_code=400,
-                    detail="Failed to get user info from GitHub"
-                )
-            
-            return response.json()
+        
+        return response.json()
 
 
 class AppleOAuth:
@@ -260,16 +256,15 @@ class AppleOAuth:
                 'redirect_uri': APPLE_REDIRECT_URI
             }
             
-            async with httpx.AsyncClient() as client:
-                response = await client.post(token_url, data=data)
-                
-                if response.status_code != 200:
-                    raise HTTPException(
-                        status_code=response.status_code,
-                        detail=f"Apple token exchange failed: {response.text}"
-                    )
-                
-                return response.json()
+            response = await http_clients.post(token_url, data=data)
+            
+            if response.status_code != 200:
+                raise HTTPException(
+                    status_code=response.status_code,
+                    detail=f"Apple token exchange failed: {response.text}"
+                )
+            
+            return response.json()
         
         except Exception as e:
             print(f"Apple token exchange error: {str(e)}")
@@ -3,7 +3,7 @@ VECTORT.IO - DEPLOYMENT MANAGER
 Gère le déploiement one-click vers Vercel, Netlify, etc.
 """
 
-import httpx
+from utils.http_clients import http_clients
 from typing import Dict, Optional
 import json
 
@@ -61,42 +61,40 @@ class VercelDeployer:
                 for k, v in environment_vars.items()
             ]
         
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            response = await client.post(url, json=payload, headers=self.headers)
-            
-            if response.status_code in [200, 201]:
-                data = response.json()
-                return {
-                    "success": True,
-                    "deployment_url": f"https://{data.get('url')}",
-                    "deployment_id": data.get('id'),
-                    "status": data.get('readyState')
-                }
-            else:
-                return {
-                    "success": False,
-                    "error": f"{response.status_code} - {response.text}"
-                }
+        response = await http_clients.post(url, json=payload, headers=self.headers, timeout=60.0)
+        
+        if response.status_code in [200, 201]:
+            data = response.json()
+            return {
+                "success": True,
+                "deployment_url": f"https://{data.get('url')}",
+                "deployment_id": data.get('id'),
+                "status": data.get('readyState')
+            }
+        else:
+            return {
+                "success": False,
+                "error": f"{response.status_code} - {response.text}"
+            }
     
     async def get_deployment_status(self, deployment_id: str) -> Dict:
         """Récupère le statut d'un déploiement"""
         url = f"{self.base_url}/v13/deployments/{deployment_id}"
         
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.get(url, headers=self.headers)
-            
-            if response.status_code == 200:
-                data = response.json()
-                return {
-                    "success": True,
-                    "status": data.get('readyState'),
-                    "url": f"https://{data.get('url')}"
-                }
-            else:
-                return {
-                    "success": False,
-                    "error": response.text
-                }
+        response = await http_clients.get(url, headers=self.headers)
+        
+        if response.status_code == 200:
+            data = response.json()
+            return {
+                "success": True,
+                "status": data.get('readyState'),
+                "url": f"https://{data.get('url')}"
+            }
+        else:
+            return {
+                "success": False,
+                "error": response.text
+            }
 
 
 class NetlifyDeployer:
@@ -144,43 +142,41 @@ class NetlifyDeployer:
             }
         }
         
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            response = await client.post(url, json=payload, headers=self.headers)
-            
-            if response.status_code in [200, 201]:
-                data = response.json()
-                return {
-                    "success": True,
-                    "site_url": data.get('ssl_url') or data.get('url'),
-                    "site_id": data.get('id'),
-                    "admin_url": data.get('admin_url')
-                }
-            else:
-                return {
-                    "success": False,
-                    "error": f"{response.status_code} - {response.text}"
-                }
+        response = await http_clients.post(url, json=payload, headers=self.headers, timeout=60.0)
+        
+        if response.status_code in [200, 201]:
+            data = response.json()
+            return {
+                "success": True,
+                "site_url": data.get('ssl_url') or data.get('url'),
+                "site_id": data.get('id'),
+                "admin_url": data.get('admin_url')
+            }
+        else:
+            return {
+                "success": False,
+                "error": f"{response.status_code} - {response.text}"
+            }
     
     async def get_site_info(self, site_id: str) -> Dict:
         """Récupère les informations d'un site"""
         url = f"{self.base_url}/sites/{site_id}"
         
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.get(url, headers=self.headers)
-            
-            if response.status_code == 200:
-                data = response.json()
-                return {
-                    "success": True,
-                    "url": data.get('ssl_url') or data.get('url'),
-                    "status": data.get('state'),
-                    "published_deploy": data.get('published_deploy')
-                }
-            else:
-                return {
-                    "success": False,
-                    "error": response.text
-                }
+        response = await http_clients.get(url, headers=self.headers)
+        
+        if response.status_code == 200:
+            data = response.json()
+            return {
+                "success": True,
+                "url": data.get('ssl_url') or data.get('url'),
+                "status": data.get('state'),
+                "published_deploy": data.get('published_deploy')
+            }
+        else:
+            return {
+                "success": False,
+                "error": response.text
+            }
 
 
 class DeploymentManager:
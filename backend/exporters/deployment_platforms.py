@@ -4,12 +4,13 @@ Supports: Vercel, Netlify, Render
 """
 
 import os
-import aiohttp
 import asyncio
 import logging
 from typing import Dict, Any, Optional, List
 from enum import Enum
 
+from utils.http_clients import http_clients
+
 logger = logging.getLogger(__name__)
 
 class DeploymentPlatform(str, Enum):
@@ -121,40 +122,39 @@ class VercelDeployment:
             if framework:
                 payload["framework"] = framework
             
-            async with aiohttp.ClientSession() as session:
-                # Create deployment
-                async with session.post(
-                    f"{self.api_base}/v13/deployments",
-                    headers=headers,
-                    json=payload
-                ) as response:
-                    
-                    if response.status == 200:
-                        data = await response.json()
-                        
-                        deployment_url = f"https://{data.get('url', '')}"
-                        deployment_id = data.get('id', '')
-                        
-                        logger.info(f"✅ Vercel deployment created: {deployment_url}")
-                        
-                        return DeploymentResult(
-                            success=True,
-                            platform=DeploymentPlatform.VERCEL,
-                            deployment_url=deployment_url,
-                            deployment_id=deployment_id,
-                            status=DeploymentStatus.BUILDING,
-                            message="Deployment initiated successfully"
-                        )
-                    else:
-                        error_text = await response.text()
-                        logger.error(f"Vercel deployment failed: {error_text}")
-                        
-                        return DeploymentResult(
-                            success=False,
-                            platform=DeploymentPlatform.VERCEL,
-                            error=f"Deployment failed with status {response.status}: {error_text}"
-                        )
-        
+            # Create deployment
+            response = await http_clients.post(
+                f"{self.api_base}/v13/deployments",
+                headers=headers,
+                json=payload
+            )
+            
+            if response.status_code == 200:
+                data = response.json()
+                
+                deployment_url = f"https://{data.get('url', '')}"
+                deployment_id = data.get('id', '')
+                
+                logger.info(f"✅ Vercel deployment created: {deployment_url}")
+                
+                return DeploymentResult(
+                    success=True,
+                    platform=DeploymentPlatform.VERCEL,
+                    deployment_url=deployment_url,
+                    deployment_id=deployment_id,
+                    status=DeploymentStatus.BUILDING,
+                    message="Deployment initiated successfully"
+                )
+            else:
+                error_text = response.text
+                logger.error(f"Vercel deployment failed: {error_text}")
+                
+                return DeploymentResult(
+                    success=False,
+                    platform=DeploymentPlatform.VERCEL,
+                    error=f"Deployment failed with status {response.status_code}: {error_text}"
+                )
+
         except Exception as e:
             logger.exception(f"Vercel deployment error: {str(e)}")
             return DeploymentResult(
@@ -176,39 +176,38 @@ class VercelDeployment:
         try:
             headers = {"Authorization": f"Bearer {self.token}"}
             
-            async with aiohttp.ClientSession() as session:
-                async with session.get(
-                    f"{self.api_base}/v13/deployments/{deployment_id}",
-                    headers=headers
-                ) as response:
-                    
-                    if response.status == 200:
-                        data = await response.json()
-                        
-                        # Map Vercel status to our status
-                        vercel_state = data.get('readyState', 'BUILDING')
-                        status_map = {
-                            'READY': DeploymentStatus.READY,
-                            'BUILDING': DeploymentStatus.BUILDING,
-                            'ERROR': DeploymentStatus.ERROR,
-                            'CANCELED': DeploymentStatus.CANCELED
-                        }
-                        
-                        return DeploymentResult(
-                            success=True,
-                            platform=DeploymentPlatform.VERCEL,
-                            deployment_url=f"https://{data.get('url', '')}",
-                            deployment_id=deployment_id,
-                            status=status_map.get(vercel_state, DeploymentStatus.BUILDING)
-                        )
-                    else:
-                        error_text = await response.text()
-                        return DeploymentResult(
-                            success=False,
-                            platform=DeploymentPlatform.VERCEL,
-                            error=error_text
-                        )
-        
+            response = await http_clients.get(
+                f"{self.api_base}/v13/deployments/{deployment_id}",
+                headers=headers
+            )
+            
+            if response.status_code == 200:
+                data = response.json()
+                
+                # Map Vercel status to our status
+                vercel_state = data.get('readyState', 'BUILDING')
+                status_map = {
+                    'READY': DeploymentStatus.READY,
+                    'BUILDING': DeploymentStatus.BUILDING,
+                    'ERROR': DeploymentStatus.ERROR,
+                    'CANCELED': DeploymentStatus.CANCELED
+                }
+                
+                return DeploymentResult(
+                    success=True,
+                    platform=DeploymentPlatform.VERCEL,
+                    deployment_url=f"https://{data.get('url', '')}",
+                    deployment_id=deployment_id,
+                    status=status_map.get(vercel_state, DeploymentStatus.BUILDING)
+                )
+            else:
+                error_text = response.text
+                return DeploymentResult(
+                    success=False,
+                    platform=DeploymentPlatform.VERCEL,
+                    error=error_text
+                )
+
         except Exception as e:
             return DeploymentResult(
                 success=False,
@@ -274,44 +273,43 @@ class NetlifyDeployment:
                 if publish_dir:
                     payload["build_settings"]["dir"] = publish_dir
             
-            async with aiohttp.ClientSession() as session:
-                # Create site
-                async with session.post(
-                    f"{self.api_base}/sites",
-                    headers=headers,
-                    json=payload
-                ) as response:
-                    
-                    if response.status in [200, 201]:
-                        data = await response.json()
-                        
-                        site_id = data.get('id', '')
-                        site_url = data.get('ssl_url') or data.get('url', '')
-                        
-                        # Set environment variables if provided
-                        if env_vars and site_id:
-                            await self._set_env_vars(site_id, env_vars, headers)
-                        
-                        logger.info(f"✅ Netlify site created: {site_url}")
-                        
-                        return DeploymentResult(
-                            success=True,
-                            platform=DeploymentPlatform.NETLIFY,
-                            deployment_url=site_url,
-                            deployment_id=site_id,
-                            status=DeploymentStatus.BUILDING,
-                            message="Site created successfully, deployment in progress"
-                        )
-                    else:
-                        error_text = await response.text()
-                        logger.error(f"Netlify deployment failed: {error_text}")
-                        
-                        return DeploymentResult(
-                            success=False,
-                            platform=DeploymentPlatform.NETLIFY,
-                            error=f"Deployment failed with status {response.status}: {error_text}"
-                        )
-        
+            # Create site
+            response = await http_clients.post(
+                f"{self.api_base}/sites",
+                headers=headers,
+                json=payload
+            )
+            
+            if response.status_code in [200, 201]:
+                data = response.json()
+                
+                site_id = data.get('id', '')
+                site_url = data.get('ssl_url') or data.get('url', '')
+                
+                # Set environment variables if provided
+                if env_vars and site_id:
+                    await self._set_env_vars(site_id, env_vars, headers)
+                
+                logger.info(f"✅ Netlify site created: {site_url}")
+                
+                return DeploymentResult(
+                    success=True,
+                    platform=DeploymentPlatform.NETLIFY,
+                    deployment_url=site_url,
+                    deployment_id=site_id,
+                    status=DeploymentStatus.BUILDING,
+                    message="Site created successfully, deployment in progress"
+                )
+            else:
+                error_text = response.text
+                logger.error(f"Netlify deployment failed: {error_text}")
+                
+                return DeploymentResult(
+                    success=False,
+                    platform=DeploymentPlatform.NETLIFY,
+                    error=f"Deployment failed with status {response.status_code}: {error_text}"
+                )
+
         except Exception as e:
             logger.exception(f"Netlify deployment error: {str(e)}")
             return DeploymentResult(
@@ -323,21 +321,20 @@ class NetlifyDeployment:
     async def _set_env_vars(self, site_id: str, env_vars: Dict[str, str], headers: Dict):
         """Set environment variables for a Netlify site"""
         try:
-            async with aiohttp.ClientSession() as session:
-                for key, value in env_vars.items():
-                    payload = {
-                        "key": key,
-                        "values": [{"value": value, "context": "all"}]
-                    }
-                    
-                    async with session.post(
-                        f"{self.api_base}/accounts/{site_id}/env",
-                        headers=headers,
-                        json=payload
-                    ) as response:
-                        if response.status not in [200, 201]:
-                            logger.warning(f"Failed to set env var {key}")
-        
+            for key, value in env_vars.items():
+                payload = {
+                    "key": key,
+                    "values": [{"value": value, "context": "all"}]
+                }
+                
+                response = await http_clients.post(
+                    f"{self.api_base}/accounts/{site_id}/env",
+                    headers=headers,
+                    json=payload
+                )
+                if response.status_code not in [200, 201]:
+                    logger.warning(f"Failed to set env var {key}")
+
         except Exception as e:
             logger.warning(f"Failed to set environment variables: {str(e)}")
 
@@ -395,39 +392,38 @@ class RenderDeployment:
                     {"key": k, "value": v} for k, v in env_vars.items()
                 ]
             
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    f"{self.api_base}/services",
-                    headers=headers,
-                    json=payload
-                ) as response:
-                    
-                    if response.status in [200, 201]:
-                        data = await response.json()
-                        
-                        service_id = data.get('service', {}).get('id', '')
-                        service_url = data.get('service', {}).get('serviceDetails', {}).get('url', '')
-                        
-                        logger.info(f"✅ Render service created: {service_url}")
-                        
-                        return DeploymentResult(
-                            success=True,
-                            platform=DeploymentPlatform.RENDER,
-                            deployment_url=service_url,
-                            deployment_id=service_id,
-                            status=DeploymentStatus.BUILDING,
-                            message="Service created successfully, deployment in progress"
-                        )
-                    else:
-                        error_text = await response.text()
-                        logger.error(f"Render deployment failed: {error_text}")
-                        
-                        return DeploymentResult(
-                            success=False,
-                            platform=DeploymentPlatform.RENDER,
-                            error=f"Deployment failed with status {response.status}: {error_text}"
-                        )
-        
+            response = await http_clients.post(
+                f"{self.api_base}/services",
+                headers=headers,
+                json=payload
+            )
+            
+            if response.status_code in [200, 201]:
+                data = response.json()
+                
+                service_id = data.get('service', {}).get('id', '')
+                service_url = data.get('service', {}).get('serviceDetails', {}).get('url', '')
+                
+                logger.info(f"✅ Render service created: {service_url}")
+                
+                return DeploymentResult(
+                    success=True,
+                    platform=DeploymentPlatform.RENDER,
+                    deployment_url=service_url,
+                    deployment_id=service_id,
+                    status=DeploymentStatus.BUILDING,
+                    message="Service created successfully, deployment in progress"
+                )
+            else:
+                error_text = response.text
+                logger.error(f"Render deployment failed: {error_text}")
+                
+                return DeploymentResult(
+                    success=False,
+                    platform=DeploymentPlatform.RENDER,
+                    error=f"Deployment failed with status {response.status_code}: {error_text}"
+                )
+
         except Exception as e:
             logger.exception(f"Render deployment error: {str(e)}")
             return DeploymentResult(
@@ -8,18 +8,102 @@ import base64
 from typing import Dict, Optional, List
 import json
 import asyncio
+import logging
+import os
+import random
+import time
+
+from utils.http_clients import http_clients
+
+logger = logging.getLogger(__name__)
+
+GITHUB_API_URL = os.environ.get("GITHUB_API_URL", "https://api.github.com")
+GITHUB_BLOB_CONCURRENCY = int(os.environ.get("GITHUB_BLOB_CONCURRENCY", "8"))
+GITHUB_MAX_RETRIES = int(os.environ.get("GITHUB_MAX_RETRIES", "4"))
+GITHUB_MAX_BACKOFF_SECONDS = float(os.environ.get("GITHUB_MAX_BACKOFF_SECONDS", "60"))
+
+
+class GitHubAPIError(Exception):
+    """Réponse d'erreur de l'API GitHub (après les retries)"""
+    
+    def __init__(self, response: httpx.Response):
+        super().__init__(f"{response.request.method} {response.request.url.path}: {response.status_code} - {response.text[:500]}")
+        self.status_code = response.status_code
 
 
 class GitHubExporter:
     """Gère l'export de projets vers GitHub"""
     
-    def __init__(self, github_token: str):
+    def __init__(
+        self,
+        github_token: str,
+        base_url: Optional[str] = None,
+        client: Optional[httpx.AsyncClient] = None,
+        blob_concurrency: int = GITHUB_BLOB_CONCURRENCY
+    ):
         self.github_token = github_token
-        self.base_url = "https://api.github.com"
+        self.base_url = (base_url or GITHUB_API_URL).rstrip("/")
         self.headers = {
             "Authorization": f"token {github_token}",
             "Accept": "application/vnd.github.v3+json"
         }
+        self._client = client
+        self.blob_concurrency = max(1, blob_concurrency)
+    
+    @property
+    def client(self) -> httpx.AsyncClient:
+        return self._client or http_clients.client(self.base_url)
+    
+    def _retry_delay(self, response: Optional[httpx.Response], attempt: int) -> Optional[float]:
+        """
+        Attente avant un nouvel essai, None si la réponse est définitive
+        
+        403/429 ne sont réessayés que s'il s'agit d'une limite de débit
+        (primaire: x-ratelimit-remaining = 0, secondaire: retry-after ou
+        message "secondary rate limit"); 5xx et erreurs réseau: backoff
+        exponentiel.
+        """
+        backoff = min(2 ** attempt + random.uniform(0, 1), GITHUB_MAX_BACKOFF_SECONDS)
+        if response is None or response.status_code >= 500:
+            return backoff
+        if response.status_code not in (403, 429):
+            return None
+        
+        retry_after = response.headers.get("retry-after")
+        if retry_after:
+            try:
+                return min(float(retry_after), GITHUB_MAX_BACKOFF_SECONDS)
+            except ValueError:
+                pass
+        if response.headers.get("x-ratelimit-remaining") == "0":
+            reset = response.headers.get("x-ratelimit-reset")
+            if reset and reset.isdigit():
+                return min(max(int(reset) - time.time(), 1.0), GITHUB_MAX_BACKOFF_SECONDS)
+            return backoff
+        if response.status_code == 429 or "rate limit" in response.text.lower():
+            return backoff
+        return None  # 403 d'autorisation: inutile de réessayer
+    
+    async def _request(self, method: str, path: str, expected: tuple = (200, 201), **kwargs) -> httpx.Response:
+        """Appel API avec retries sur limites de débit et erreurs transitoires"""
+        url = f"{self.base_url}{path}"
+        for attempt in range(GITHUB_MAX_RETRIES + 1):
+            response = None
+            try:
+                response = await self.client.request(method, url, headers=self.headers, **kwargs)
+            except httpx.TransportError as e:
+                if attempt == GITHUB_MAX_RETRIES:
+                    raise
+                logger.warning(f"GitHub {method} {path}: {e}, nouvel essai")
+            else:
+                if response.status_code in expected:
+                    return response
+            
+            delay = self._retry_delay(response, attempt) if attempt < GITHUB_MAX_RETRIES else None
+            if delay is None:
+                raise GitHubAPIError(response)
+            logger.warning(f"GitHub {method} {path}: {response.status_code if response is not None else 'réseau'}, attente {delay:.1f}s")
+            await asyncio.sleep(delay)
     
     async def create_repository(
         self,
@@ -40,16 +124,84 @@ class GitHubExporter:
             "has_wiki": False
         }
         
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post(url, json=payload, headers=self.headers)
-            
-            if response.status_code == 201:
-                return response.json()
-            elif response.status_code == 422:
-                error_data = response.json()
-                raise ValueError(f"Repository existe déjà ou nom invalide: {error_data}")
-            else:
-                raise Exception(f"Erreur création repository: {response.status_code} - {response.text}")
+        response = await self.client.post(url, json=payload, headers=self.headers)
+        
+        if response.status_code == 201:
+            return response.json()
+        elif response.status_code == 422:
+            error_data = response.json()
+            raise ValueError(f"Repository existe déjà ou nom invalide: {error_data}")
+        else:
+            raise Exception(f"Erreur création repository: {response.status_code} - {response.text}")
+    
+    async def push_files_batch(
+        self,
+        owner: str,
+        repo_name: str,
+        files: Dict[str, str],
+        branch: str = "main",
+        commit_message: str = "Initial commit from Vectort.io"
+    ) -> Dict:
+        """
+        Push de tous les fichiers en un seul commit (Git Data API)
+        
+        blobs (en parallèle, concurrence bornée) -> tree -> commit -> ref:
+        N + 4 requêtes au lieu de 2N, et un seul commit dans l'historique.
+        
+        Returns:
+            {"success": chemins, "failed": [], "total", "commit_sha"}: "failed"
+            est toujours vide, une erreur sur un blob interrompt le push
+            (GitHubAPIError) sans commit partiel. Si la branche n'existe pas,
+            résultat de push_files_to_repo (sans commit_sha).
+        """
+        repo = f"/repos/{owner}/{repo_name}"
+        
+        try:
+            ref = await self._request("GET", f"{repo}/git/ref/heads/{branch}")
+        except GitHubAPIError as e:
+            if e.status_code not in (404, 409):
+                raise
+            # Dépôt vide ou branche absente: la Git Data API exige un commit parent
+            logger.info(f"Branche {branch} absente sur {owner}/{repo_name}, push fichier par fichier")
+            return await self.push_files_to_repo(owner, repo_name, files, branch, commit_message)
+        parent_sha = ref.json()["object"]["sha"]
+        parent = await self._request("GET", f"{repo}/git/commits/{parent_sha}")
+        base_tree = parent.json()["tree"]["sha"]
+        
+        semaphore = asyncio.Semaphore(self.blob_concurrency)
+        
+        async def create_blob(content: str) -> str:
+            async with semaphore:
+                response = await self._request(
+                    "POST", f"{repo}/git/blobs",
+                    json={"content": content, "encoding": "utf-8"}
+                )
+                return response.json()["sha"]
+        
+        paths = list(files)
+        blob_shas = await asyncio.gather(*(create_blob(files[path]) for path in paths))
+        
+        tree = await self._request("POST", f"{repo}/git/trees", json={
+            "base_tree": base_tree,
+            "tree": [
+                {"path": path, "mode": "100644", "type": "blob", "sha": sha}
+                for path, sha in zip(paths, blob_shas)
+            ]
+        })
+        commit = await self._request("POST", f"{repo}/git/commits", json={
+            "message": commit_message,
+            "tree": tree.json()["sha"],
+            "parents": [parent_sha]
+        })
+        commit_sha = commit.json()["sha"]
+        await self._request("PATCH", f"{repo}/git/refs/heads/{branch}", json={"sha": commit_sha, "force": False})
+        
+        return {
+            "success": paths,
+            "failed": [],
+            "total": len(files),
+            "commit_sha": commit_sha
+        }
     
     async def push_files_to_repo(
         self,
@@ -59,50 +211,53 @@ class GitHubExporter:
         branch: str = "main",
         commit_message: str = "Initial commit from Vectort.io"
     ) -> Dict:
-        """Push des fichiers vers un repository GitHub"""
+        """
+        Push des fichiers vers un repository GitHub, un commit par fichier
+        (API contents: utilisé quand la branche n'existe pas encore)
+        """
         results = {
             "success": [],
             "failed": [],
             "total": len(files)
         }
         
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            for file_path, content in files.items():
-                try:
-                    # Encoder le contenu en base64
-                    content_bytes = content.encode('utf-8')
-                    content_base64 = base64.b64encode(content_bytes).decode('utf-8')
-                    
-                    # URL de l'API
-                    url = f"{self.base_url}/repos/{owner}/{repo_name}/contents/{file_path}"
-                    
-                    # Vérifier si le fichier existe
-                    sha = await self._get_file_sha(client, owner, repo_name, file_path)
-                    
-                    payload = {
-                        "message": commit_message,
-                        "content": content_base64,
-                        "branch": branch
-                    }
-                    
-                    if sha:
-                        payload["sha"] = sha
-                    
-                    response = await client.put(url, json=payload, headers=self.headers)
-                    
-                    if response.status_code in [200, 201]:
-                        results["success"].append(file_path)
-                    else:
-                        results["failed"].append({
-                            "file": file_path,
-                            "error": f"{response.status_code} - {response.text}"
-                        })
+        client = self.client
+        for file_path, content in files.items():
+            try:
+                # Encoder le contenu en base64
+                content_bytes = content.encode('utf-8')
+                content_base64 = base64.b64encode(content_bytes).decode('utf-8')
                 
-                except Exception as e:
+                # URL de l'API
+                url = f"{self.base_url}/repos/{owner}/{repo_name}/contents/{file_path}"
+                
+                # Vérifier si le fichier existe
+                sha = await self._get_file_sha(client, owner, repo_name, file_path)
+                
+                payload = {
+                    "message": commit_message,
+                    "content": content_base64,
+                    "branch": branch
+                }
+                
+                if sha:
+                    payload["sha"] = sha
+                
+                response = await client.put(url, json=payload, headers=self.headers)
+                
+                if response.status_code in [200, 201]:
+                    results["success"].append(file_path)
+                else:
                     results["failed"].append({
                         "file": file_path,
-                        "error": str(e)
+                        "error": f"{response.status_code} - {response.text}"
                     })
+            
+            except Exception as e:
+                results["failed"].append({
+                    "file": file_path,
+                    "error": str(e)
+                })
         
         return results
     
@@ -130,13 +285,12 @@ class GitHubExporter:
         """Récupère les informations de l'utilisateur GitHub"""
         url = f"{self.base_url}/user"
         
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.get(url, headers=self.headers)
-            
-            if response.status_code == 200:
-                return response.json()
-            else:
-                raise Exception(f"Erreur récupération utilisateur: {response.status_code}")
+        response = await self.client.get(url, headers=self.headers)
+        
+        if response.status_code == 200:
+            return response.json()
+        else:
+            raise Exception(f"Erreur récupération utilisateur: {response.status_code}")
     
     async def create_and_push_project(
         self,
@@ -162,8 +316,8 @@ class GitHubExporter:
             # 2. Préparer les fichiers
             files_to_push = self._prepare_files_for_github(generated_code)
             
-            # 3. Push les fichiers
-            push_results = await self.push_files_to_repo(
+            # 3. Push les fichiers (un seul commit)
+            push_results = await self.push_files_batch(
                 owner=owner,
                 repo_name=repo_name,
                 files=files_to_push,
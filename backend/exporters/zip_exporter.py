@@ -5,10 +5,24 @@ Crée des archives ZIP professionnelles du code généré
 
 import zipfile
 import io
-from typing import Dict, Optional
+from typing import AsyncIterator, Dict, Optional
 from pathlib import Path
 import json
 
+from .zip_stream import ZipStreamWriter
+
+
+class _EntryCollector:
+    """Remplace ZipFile pour les _add_*: collecte les entrées sans compresser"""
+    
+    def __init__(self):
+        self.files: Dict[str, str] = {}
+    
+    def writestr(self, path: str, content: str):
+        # Un même chemin écrit deux fois: la dernière version l'emporte
+        self.files.pop(path, None)
+        self.files[path] = content
+
 
 class ZipExporter:
     """Gère la création d'archives ZIP pour l'export de projets"""
@@ -40,27 +54,64 @@ class ZipExporter:
             BytesIO contenant le ZIP
         """
         zip_buffer = io.BytesIO()
+        entries = self.project_entries(project_title, generated_code, framework, include_config)
         
         with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-            # Créer le dossier racine du projet
-            project_name = self._sanitize_project_name(project_title)
-            
-            # 1. Ajouter les fichiers de base
-            self._add_base_files(zip_file, project_name, project_title, framework)
-            
-            # 2. Ajouter le code généré
-            self._add_generated_code(zip_file, project_name, generated_code, framework)
-            
-            # 3. Ajouter les fichiers de configuration
-            if include_config:
-                self._add_configuration_files(zip_file, project_name, framework, generated_code)
-            
-            # 4. Ajouter la documentation
-            self._add_documentation(zip_file, project_name, framework, generated_code)
+            for path, content in entries.items():
+                zip_file.writestr(path, content)
         
         zip_buffer.seek(0)
         return zip_buffer
     
+    def stream_project_zip(
+        self,
+        project_title: str,
+        generated_code: Dict[str, str],
+        framework: str = "react",
+        include_config: bool = True,
+        compression: str = "auto"
+    ) -> AsyncIterator[bytes]:
+        """
+        Archive ZIP produite morceau par morceau (pour StreamingResponse)
+        
+        La compression tourne dans un pool de threads; seules les entrées en
+        cours de compression sont en mémoire, jamais l'archive complète.
+        
+        Args:
+            compression: "auto" (formats déjà compressés stockés tels quels),
+                "deflate" ou "store"
+        """
+        entries = self.project_entries(project_title, generated_code, framework, include_config)
+        return ZipStreamWriter(compression=compression).stream(entries.items())
+    
+    def project_entries(
+        self,
+        project_title: str,
+        generated_code: Dict[str, str],
+        framework: str = "react",
+        include_config: bool = True
+    ) -> Dict[str, str]:
+        """Fichiers de l'archive {chemin dans le ZIP: contenu}, dans l'ordre d'écriture"""
+        entries = _EntryCollector()
+        
+        # Créer le dossier racine du projet
+        project_name = self._sanitize_project_name(project_title)
+        
+        # 1. Ajouter les fichiers de base
+        self._add_base_files(entries, project_name, project_title, framework)
+        
+        # 2. Ajouter le code généré
+        self._add_generated_code(entries, project_name, generated_code, framework)
+        
+        # 3. Ajouter les fichiers de configuration
+        if include_config:
+            self._add_configuration_files(entries, project_name, framework, generated_code)
+        
+        # 4. Ajouter la documentation
+        self._add_documentation(entries, project_name, framework, generated_code)
+        
+        return entries.files
+    
     def _sanitize_project_name(self, title: str) -> str:
         """Nettoie le nom du projet pour le système de fichiers"""
         # Remplacer les espaces et caractères spéciaux
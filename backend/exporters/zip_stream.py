@@ -0,0 +1,257 @@
+"""
+VECTORT.IO - ZIP EN STREAMING
+Écrit une archive ZIP entrée par entrée sans jamais la tenir entière en
+mémoire: la compression DEFLATE tourne dans un pool de threads et les
+morceaux sont envoyés au client dans l'ordre dès qu'ils sont prêts
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import struct
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Deque, Dict, Iterable, List, Optional, Tuple, Union
+
+from bson.binary import Binary
+
+ZIP_COMPRESSION_WORKERS = int(os.environ.get("ZIP_COMPRESSION_WORKERS", "4"))
+ZIP_COMPRESSION_LEVEL = int(os.environ.get("ZIP_COMPRESSION_LEVEL", "6"))
+ZIP_CACHE_MAX_BYTES = int(os.environ.get("ZIP_CACHE_MAX_MB", "8")) * 1024 * 1024
+ZIP_CACHE_TTL_SECONDS = int(os.environ.get("ZIP_CACHE_TTL_HOURS", "168")) * 3600
+
+# Formats déjà compressés: recompresser ne gagne rien et coûte du CPU
+STORED_EXTENSIONS = frozenset({
+    ".png", ".jpg", ".jpeg", ".gif", ".webp", ".avif", ".ico",
+    ".woff", ".woff2", ".ttf", ".otf", ".eot",
+    ".zip", ".gz", ".tgz", ".br", ".bz2", ".xz", ".zst", ".7z",
+    ".mp3", ".mp4", ".webm", ".ogg", ".pdf",
+})
+
+ZIP_STORED = 0
+ZIP_DEFLATED = 8
+
+_LOCAL_HEADER = struct.Struct("<IHHHHHIIIHH")
+_CENTRAL_HEADER = struct.Struct("<IHHHHHHIIIHHHHHII")
+_END_OF_CENTRAL_DIRECTORY = struct.Struct("<IHHHHIIH")
+_UTF8_FLAG = 0x0800
+_ZIP_VERSION = 20
+_ZIP32_LIMIT = 0xFFFFFFFF
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _compression_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=ZIP_COMPRESSION_WORKERS, thread_name_prefix="zip")
+    return _executor
+
+
+def _dos_datetime(moment: datetime) -> Tuple[int, int]:
+    dos_time = (moment.hour << 11) | (moment.minute << 5) | (moment.second // 2)
+    dos_date = (max(moment.year - 1980, 0) << 9) | (moment.month << 5) | moment.day
+    return dos_time, dos_date
+
+
+def choose_method(path: str, compression: str = "auto") -> int:
+    """
+    Méthode d'une entrée
+
+    compression: "auto" (stockage pour les formats déjà compressés),
+    "deflate" ou "store"
+    """
+    if compression == "store":
+        return ZIP_STORED
+    if compression == "auto" and os.path.splitext(path)[1].lower() in STORED_EXTENSIONS:
+        return ZIP_STORED
+    return ZIP_DEFLATED
+
+
+def _compress_entry(data: bytes, method: int, level: int) -> Tuple[int, int, bytes]:
+    """Exécuté dans le pool: (crc32, méthode effective, données)"""
+    crc = zlib.crc32(data) & 0xFFFFFFFF
+    if method == ZIP_DEFLATED and data:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+        compressed = compressor.compress(data) + compressor.flush()
+        if len(compressed) < len(data):
+            return crc, ZIP_DEFLATED, compressed
+    return crc, ZIP_STORED, data
+
+
+class ZipStreamWriter:
+    """
+    Générateur d'archive ZIP (format ZIP 2.0, noms UTF-8)
+
+    Au plus `max_pending` entrées sont en cours de compression en même
+    temps: la mémoire utilisée est bornée par ces entrées, pas par la
+    taille de l'archive.
+    """
+
+    def __init__(
+        self,
+        compression: str = "auto",
+        level: int = ZIP_COMPRESSION_LEVEL,
+        max_pending: int = ZIP_COMPRESSION_WORKERS * 2,
+        executor: Optional[ThreadPoolExecutor] = None
+    ):
+        self.compression = compression
+        self.level = level
+        self.max_pending = max(1, max_pending)
+        self.executor = executor
+
+    async def stream(self, entries: Iterable[Tuple[str, Union[str, bytes]]]) -> AsyncIterator[bytes]:
+        """
+        Produit les octets de l'archive
+
+        Args:
+            entries: Couples (chemin dans l'archive, contenu)
+        """
+        loop = asyncio.get_running_loop()
+        executor = self.executor or _compression_executor()
+        dos_time, dos_date = _dos_datetime(datetime.now())
+
+        pending: Deque[Tuple[bytes, int, asyncio.Future]] = deque()
+        central: List[bytes] = []
+        offset = 0
+
+        def emit(name: bytes, size: int, result: Tuple[int, int, bytes]) -> Tuple[bytes, bytes]:
+            nonlocal offset
+            crc, method, data = result
+            if offset > _ZIP32_LIMIT or size > _ZIP32_LIMIT:
+                raise ValueError("Archive trop volumineuse pour le format ZIP 2.0")
+            header = _LOCAL_HEADER.pack(
+                0x04034B50, _ZIP_VERSION, _UTF8_FLAG, method, dos_time, dos_date,
+                crc, len(data), size, len(name), 0
+            ) + name
+            central.append(_CENTRAL_HEADER.pack(
+                0x02014B50, _ZIP_VERSION, _ZIP_VERSION, _UTF8_FLAG, method, dos_time, dos_date,
+                crc, len(data), size, len(name), 0, 0, 0, 0, 0o644 << 16, offset
+            ) + name)
+            offset += len(header) + len(data)
+            return header, data
+
+        try:
+            for path, content in entries:
+                data = content.encode("utf-8") if isinstance(content, str) else bytes(content)
+                future = loop.run_in_executor(
+                    executor, _compress_entry, data, choose_method(path, self.compression), self.level
+                )
+                pending.append((path.encode("utf-8"), len(data), future))
+                del data
+
+                while len(pending) >= self.max_pending:
+                    name, size, future = pending.popleft()
+                    for chunk in emit(name, size, await future):
+                        yield chunk
+
+            while pending:
+                name, size, future = pending.popleft()
+                for chunk in emit(name, size, await future):
+                    yield chunk
+        finally:
+            # Client déconnecté: les compressions restantes sont abandonnées
+            for _, _, future in pending:
+                future.cancel()
+
+        directory = b"".join(central)
+        if len(central) > 0xFFFF or offset > _ZIP32_LIMIT:
+            raise ValueError("Archive trop volumineuse pour le format ZIP 2.0")
+        yield directory + _END_OF_CENTRAL_DIRECTORY.pack(
+            0x06054B50, 0, 0, len(central), len(central), len(directory), offset, 0
+        )
+
+
+def archive_key(manifest: Dict[str, Any], **options: Any) -> str:
+    """
+    Clé de cache d'une archive: hash des contenus (manifeste chemin -> hash)
+    et des options qui changent les fichiers ajoutés par l'exporteur
+    """
+    payload = json.dumps({"manifest": manifest, "options": options}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ZipArchiveCache:
+    """
+    Archives déjà construites (collection export_archives, _id = archive_key)
+
+    Un projet inchangé est resservi en une seule lecture; les archives plus
+    grosses que ZIP_CACHE_MAX_BYTES ne sont pas conservées (limite de
+    taille des documents MongoDB).
+    """
+
+    def __init__(self, db, max_bytes: int = ZIP_CACHE_MAX_BYTES, ttl_seconds: int = ZIP_CACHE_TTL_SECONDS):
+        self.db = db
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+
+    @property
+    def archives(self):
+        return self.db.export_archives
+
+    async def ensure_indexes(self):
+        await self.archives.create_index("expires_at", expireAfterSeconds=0)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        document = await self.archives.find_one({"_id": key}, {"data": 1})
+        return bytes(document["data"]) if document else None
+
+    async def put(self, key: str, data: bytes, project_id: Optional[str] = None):
+        if len(data) > self.max_bytes:
+            return
+        now = datetime.utcnow()
+        await self.archives.replace_one(
+            {"_id": key},
+            {
+                "data": Binary(data),
+                "size": len(data),
+                "project_id": project_id,
+                "created_at": now,
+                "expires_at": now + timedelta(seconds=self.ttl_seconds),
+            },
+            upsert=True
+        )
+
+    async def stream_and_store(
+        self,
+        key: str,
+        chunks: AsyncIterator[bytes],
+        project_id: Optional[str] = None
+    ) -> AsyncIterator[bytes]:
+        """
+        Relaie une archive en cours de construction et la met en cache si
+        elle est complète et sous la limite de taille
+        """
+        kept: Optional[List[bytes]] = []
+        kept_size = 0
+        async for chunk in chunks:
+            if kept is not None:
+                kept_size += len(chunk)
+                if kept_size > self.max_bytes:
+                    kept = None
+                else:
+                    kept.append(chunk)
+            yield chunk
+        if kept is not None:
+            await self.put(key, b"".join(kept), project_id)
+
+
+async def iter_bytes(data: bytes, chunk_size: int = 64 * 1024) -> AsyncIterator[bytes]:
+    """Découpe une archive en cache en morceaux pour StreamingResponse"""
+    for start in range(0, len(data), chunk_size):
+        yield data[start:start + chunk_size]
+
+
+__all__ = [
+    'ZipStreamWriter',
+    'ZipArchiveCache',
+    'archive_key',
+    'choose_method',
+    'iter_bytes',
+    'STORED_EXTENSIONS',
+    'ZIP_STORED',
+    'ZIP_DEFLATED',
+]
@@ -0,0 +1,48 @@
+"""
+Worker de génération autonome
+Traite la file generation_jobs sans servir l'API HTTP
+
+Usage:
+    GENERATION_WORKERS_INPROCESS=false uvicorn server:app ...   # API seule
+    python generation_worker.py                                 # workers
+
+Avec des workers séparés, utiliser un backplane partagé
+(STREAM_BACKPLANE=mongo ou redis) pour que la progression arrive au stream SSE.
+"""
+
+import asyncio
+import logging
+import signal
+
+import server
+from streaming.backplane import create_backplane
+
+logger = logging.getLogger(__name__)
+
+
+async def main():
+    await server.generation_jobs.ensure_indexes()
+    await server.credit_ledger.ensure_indexes()
+
+    server.streaming_manager.set_backplane(create_backplane(db=server.db))
+    await server.streaming_manager.backplane.start()
+    if server.streaming_manager.backplane.local:
+        logger.warning("⚠️ Backplane mémoire: la progression des jobs ne sera pas visible depuis l'API")
+
+    await server.generation_workers.start()
+
+    # Arrêt propre (SIGTERM au déploiement): les jobs en cours retournent en file
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop.set)
+    await stop.wait()
+
+    await server.generation_workers.stop()
+    await server.credit_ledger.drain()
+    await server.streaming_manager.backplane.close()
+    server.client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
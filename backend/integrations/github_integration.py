@@ -9,7 +9,7 @@ from typing import Optional, Dict, List
 from datetime import datetime, timedelta
 from github import Github, GithubException
 from cryptography.fernet import Fernet
-import httpx
+from utils.http_clients import http_clients
 from motor.motor_asyncio import AsyncIOMotorDatabase
 
 
@@ -50,31 +50,30 @@ class GitHubIntegration:
     
     async def exchange_code_for_token(self, code: str) -> Dict[str, any]:
         """Exchange authorization code for access token"""
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                "https://github.com/login/oauth/access_token",
-                data={
-                    "client_id": GITHUB_CLIENT_ID,
-                    "client_secret": GITHUB_CLIENT_SECRET,
-                    "code": code,
-                    "redirect_uri": GITHUB_REDIRECT_URI
-                },
-                headers={"Accept": "application/json"}
-            )
-            
-            if response.status_code != 200:
-                raise Exception(f"Failed to exchange code: {response.text}")
-            
-            data = response.json()
-            
-            if "error" in data:
-                raise Exception(f"GitHub OAuth error: {data.get('error_description', data['error'])}")
-            
-            return {
-                "access_token": data["access_token"],
-                "token_type": data["token_type"],
-                "scope": data["scope"]
-            }
+        response = await http_clients.post(
+            "https://github.com/login/oauth/access_token",
+            data={
+                "client_id": GITHUB_CLIENT_ID,
+                "client_secret": GITHUB_CLIENT_SECRET,
+                "code": code,
+                "redirect_uri": GITHUB_REDIRECT_URI
+            },
+            headers={"Accept": "application/json"}
+        )
+        
+        if response.status_code != 200:
+            raise Exception(f"Failed to exchange code: {response.text}")
+        
+        data = response.json()
+        
+        if "error" in data:
+            raise Exception(f"GitHub OAuth error: {data.get('error_description', data['error'])}")
+        
+        return {
+            "access_token": data["access_token"],
+            "token_type": data["token_type"],
+            "scope": data["scope"]
+        }
     
     def encrypt_token(self, token: str) -> str:
         """Encrypt access token for storage"""
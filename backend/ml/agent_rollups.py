@@ -0,0 +1,303 @@
+"""
+Time-bucketed rollups of agent_performance
+Each recorded execution increments one per-minute and one per-hour bucket of
+its agent (counts, error totals, sums and a latency histogram), so health
+queries read a bounded number of small documents with a single aggregation
+whatever the execution volume.
+"""
+
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+from pymongo import ReplaceOne, UpdateOne
+
+logger = logging.getLogger(__name__)
+
+MINUTE_RETENTION = timedelta(hours=int(os.environ.get("AGENT_ROLLUP_MINUTE_RETENTION_HOURS", "48")))
+HOUR_RETENTION = timedelta(days=int(os.environ.get("AGENT_ROLLUP_HOUR_RETENTION_DAYS", "90")))
+
+# Résolution -> (largeur d'un bucket, conservation)
+RESOLUTIONS = {
+    "minute": (timedelta(minutes=1), MINUTE_RETENTION),
+    "hour": (timedelta(hours=1), HOUR_RETENTION),
+}
+
+# Bornes supérieures de l'histogramme de latence (secondes), plus "le_inf"
+LATENCY_BOUNDS = (1, 2, 5, 10, 30, 60, 120, 300)
+LATENCY_LABELS = [f"le_{bound}" for bound in LATENCY_BOUNDS] + ["le_inf"]
+
+SUM_FIELDS = ("count", "successes", "failures", "errors", "time", "files", "quality")
+
+HEALTHY_ERROR_RATE = 0.1
+EMPTY_STATS = {"avg_time": 0, "avg_files": 0, "avg_quality": 0, "error_rate": 0}
+
+
+def latency_label(seconds: float) -> str:
+    for bound in LATENCY_BOUNDS:
+        if seconds <= bound:
+            return f"le_{bound}"
+    return "le_inf"
+
+
+def bucket_start(moment: datetime, resolution: str) -> datetime:
+    if resolution == "minute":
+        return moment.replace(second=0, microsecond=0)
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def _latency_expression(field: str) -> Dict[str, Any]:
+    """Même classement que latency_label, en expression d'agrégation"""
+    return {"$switch": {
+        "branches": [
+            {"case": {"$lte": [field, bound]}, "then": f"le_{bound}"}
+            for bound in LATENCY_BOUNDS
+        ],
+        "default": "le_inf",
+    }}
+
+
+def _percentile(latency: Dict[str, int], count: int, max_time: float, quantile: float) -> float:
+    """Borne supérieure du bucket contenant le quantile (max observé pour le_inf)"""
+    target = quantile * count
+    seen = 0
+    for bound, label in zip(LATENCY_BOUNDS, LATENCY_LABELS):
+        seen += latency.get(label, 0)
+        if seen >= target:
+            return float(min(bound, max_time))
+    return float(max_time)
+
+
+def agent_stats(agent_name: str, sums: Dict[str, Any]) -> Dict[str, Any]:
+    """Statistiques d'un agent à partir des sommes de ses buckets"""
+    count = sums.get("count", 0)
+    if not count:
+        return dict(EMPTY_STATS)
+
+    latency = sums.get("latency") or {}
+    max_time = sums.get("max_time") or 0.0
+    error_rate = sums["errors"] / count
+    return {
+        "agent_name": agent_name,
+        "executions": count,
+        "successes": sums["successes"],
+        "failures": sums["failures"],
+        "avg_time": sums["time"] / count,
+        "p50_time": _percentile(latency, count, max_time, 0.5),
+        "p95_time": _percentile(latency, count, max_time, 0.95),
+        "max_time": max_time,
+        "avg_files": sums["files"] / count,
+        "avg_quality": sums["quality"] / count,
+        "error_rate": error_rate,
+        "status": "healthy" if error_rate < HEALTHY_ERROR_RATE else "needs_improvement"
+    }
+
+
+class AgentRollups:
+    """
+    Rollups de agent_performance (collection agent_performance_rollups)
+
+    Documents:
+        <agent>:<résolution>:<début ISO>   {agent_name, resolution, bucket, expires_at,
+                                             count, successes, failures, errors, time,
+                                             files, quality, max_time, latency: {le_<s>: n}}
+        meta                                {rebuilt_at}: les rollups couvrent l'historique
+
+    Une exécution est un échec si elle a au moins une erreur. Les buckets
+    expirent (index TTL) après la conservation de leur résolution.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self._ready = False
+        self._lock = asyncio.Lock()
+
+    @property
+    def rollups(self):
+        return self.db.agent_performance_rollups
+
+    @property
+    def performances(self):
+        return self.db.agent_performance
+
+    async def ensure_indexes(self):
+        await self.rollups.create_index([("resolution", 1), ("bucket", 1), ("agent_name", 1)])
+        await self.rollups.create_index("expires_at", expireAfterSeconds=0)
+
+    # ------------------------------------------------------------------
+    # Écriture
+    # ------------------------------------------------------------------
+
+    def operations(self, document: Dict[str, Any]) -> List[UpdateOne]:
+        """$inc d'une exécution sur ses buckets minute et heure"""
+        agent_name = document["agent_name"]
+        execution_time = float(document.get("execution_time") or 0.0)
+        errors = int(document.get("error_count") or 0)
+        increments = {
+            "count": 1,
+            "successes": 0 if errors else 1,
+            "failures": 1 if errors else 0,
+            "errors": errors,
+            "time": execution_time,
+            "files": document.get("files_generated") or 0,
+            "quality": float(document.get("quality_score") or 0.0),
+            f"latency.{latency_label(execution_time)}": 1,
+        }
+
+        operations = []
+        for resolution, (width, retention) in RESOLUTIONS.items():
+            start = bucket_start(document["timestamp"], resolution)
+            operations.append(UpdateOne(
+                {"_id": f"{agent_name}:{resolution}:{start.isoformat()}"},
+                {
+                    "$inc": increments,
+                    "$max": {"max_time": execution_time},
+                    "$setOnInsert": {
+                        "agent_name": agent_name,
+                        "resolution": resolution,
+                        "bucket": start,
+                        "expires_at": start + width + retention,
+                    },
+                },
+                upsert=True
+            ))
+        return operations
+
+    async def record(self, document: Dict[str, Any]):
+        """Met à jour les buckets pour une exécution insérée dans agent_performance"""
+        await self.rollups.bulk_write(self.operations(document), ordered=False)
+
+    # ------------------------------------------------------------------
+    # Reconstruction (historique antérieur aux rollups)
+    # ------------------------------------------------------------------
+
+    async def ensure_ready(self):
+        """Reconstruit les rollups une fois si l'historique n'est pas couvert"""
+        if self._ready:
+            return
+        async with self._lock:
+            if self._ready:
+                return
+            await self.ensure_indexes()
+            if not await self.rollups.find_one({"_id": "meta"}):
+                await self.rebuild()
+            self._ready = True
+
+    async def rebuild(self):
+        """
+        Recalcule les buckets encore conservés depuis agent_performance
+
+        Comme pour FeedbackStats, une exécution enregistrée pendant la
+        reconstruction peut être comptée deux fois ou pas du tout
+        """
+        logger.info("🧮 Reconstruction des rollups agent_performance")
+        now = datetime.utcnow()
+        operations: List[ReplaceOne] = []
+
+        for resolution, (width, retention) in RESOLUTIONS.items():
+            since = bucket_start(now - retention, resolution)
+            pipeline = self._rebuild_pipeline(since, width)
+            async for row in self.performances.aggregate(pipeline):
+                agent_name, start = row["_id"]["agent_name"], row["_id"]["bucket"]
+                document = {field: row[field] for field in SUM_FIELDS}
+                document.update({
+                    "agent_name": agent_name,
+                    "resolution": resolution,
+                    "bucket": start,
+                    "expires_at": start + width + retention,
+                    "max_time": row["max_time"],
+                    "latency": {entry["k"]: entry["v"] for entry in row["latency"]},
+                })
+                operations.append(ReplaceOne(
+                    {"_id": f"{agent_name}:{resolution}:{start.isoformat()}"}, document, upsert=True
+                ))
+        operations.append(ReplaceOne({"_id": "meta"}, {"rebuilt_at": now}, upsert=True))
+
+        await self.rollups.bulk_write(operations, ordered=True)
+
+    @staticmethod
+    def _rebuild_pipeline(since: datetime, width: timedelta) -> List[Dict[str, Any]]:
+        width_ms = int(width.total_seconds() * 1000)
+        sums = {field: {"$sum": f"${field}"} for field in SUM_FIELDS}
+        return [
+            {"$match": {"timestamp": {"$gte": since}}},
+            {"$project": {
+                "agent_name": 1,
+                "bucket": {"$subtract": ["$timestamp", {"$mod": [{"$toLong": "$timestamp"}, width_ms]}]},
+                "label": _latency_expression({"$ifNull": ["$execution_time", 0]}),
+                "count": {"$literal": 1},
+                "successes": {"$cond": [{"$gt": [{"$ifNull": ["$error_count", 0]}, 0]}, 0, 1]},
+                "failures": {"$cond": [{"$gt": [{"$ifNull": ["$error_count", 0]}, 0]}, 1, 0]},
+                "errors": {"$ifNull": ["$error_count", 0]},
+                "time": {"$ifNull": ["$execution_time", 0]},
+                "files": {"$ifNull": ["$files_generated", 0]},
+                "quality": {"$ifNull": ["$quality_score", 0]},
+            }},
+            {"$group": {
+                "_id": {"agent_name": "$agent_name", "bucket": "$bucket", "label": "$label"},
+                **sums,
+                "max_time": {"$max": "$time"},
+            }},
+            {"$group": {
+                "_id": {"agent_name": "$_id.agent_name", "bucket": "$_id.bucket"},
+                **sums,
+                "max_time": {"$max": "$max_time"},
+                "latency": {"$push": {"k": "$_id.label", "v": "$count"}},
+            }},
+        ]
+
+    # ------------------------------------------------------------------
+    # Lecture
+    # ------------------------------------------------------------------
+
+    def _window_match(self, since: datetime, now: datetime) -> Dict[str, Any]:
+        """
+        Heures complètes de la fenêtre, plus les minutes de la première heure
+        entamée tant que les buckets minute sont conservés
+        """
+        since_minute = bucket_start(since, "minute")
+        hour_edge = bucket_start(since, "hour")
+        if hour_edge < since_minute and since_minute >= now - MINUTE_RETENTION:
+            hour_edge += RESOLUTIONS["hour"][0]
+            return {"$or": [
+                {"resolution": "hour", "bucket": {"$gte": hour_edge}},
+                {"resolution": "minute", "bucket": {"$gte": since_minute, "$lt": hour_edge}},
+            ]}
+        return {"resolution": "hour", "bucket": {"$gte": hour_edge}}
+
+    async def summary(
+        self,
+        since: datetime,
+        agents: Optional[Iterable[str]] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Statistiques par agent depuis `since` (une agrégation sur les buckets)
+
+        Returns:
+            {agent: agent_stats(...)} pour les agents ayant des exécutions
+        """
+        await self.ensure_ready()
+        match = self._window_match(since, datetime.utcnow())
+        if agents is not None:
+            match["agent_name"] = {"$in": list(agents)}
+
+        group: Dict[str, Any] = {"_id": "$agent_name"}
+        group.update({field: {"$sum": f"${field}"} for field in SUM_FIELDS})
+        group["max_time"] = {"$max": "$max_time"}
+        group.update({label: {"$sum": f"$latency.{label}"} for label in LATENCY_LABELS})
+
+        summary = {}
+        async for row in self.rollups.aggregate([{"$match": match}, {"$group": group}]):
+            row["latency"] = {label: row.pop(label) for label in LATENCY_LABELS}
+            summary[row["_id"]] = agent_stats(row["_id"], row)
+        return summary
+
+
+__all__ = [
+    'AgentRollups',
+    'agent_stats',
+    'latency_label',
+    'LATENCY_BOUNDS',
+]
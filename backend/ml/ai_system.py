@@ -4,6 +4,7 @@ Vectort.io - 12 Agents avec Machine Learning
 Score objectif: 100/100
 """
 
+import json
 import logging
 import asyncio
 from typing import Dict, List, Optional
@@ -11,6 +12,24 @@ from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
+# Erreurs fréquentes reprises dans les prompts de génération
+GUIDANCE_MAX_ERRORS = 5
+
+# Vocabulaire fixe des prompts: seule la classe d'une erreur (texte avant ':')
+# est retenue, jamais le message, qui vient des générations d'autres utilisateurs
+GUIDANCE_ERROR_HINTS = {
+    "SyntaxError": "code syntaxiquement invalide (accolades, parenthèses, JSX mal fermé)",
+    "ReferenceError": "variable, composant ou import utilisé sans être déclaré",
+    "TypeError": "appel ou accès sur une valeur undefined/null ou du mauvais type",
+    "RangeError": "boucle ou récursion sans fin, taille invalide",
+    "ModuleNotFoundError": "module importé absent des dépendances",
+    "ImportError": "import d'un nom ou d'un module inexistant",
+    "NameError": "nom utilisé sans être défini",
+    "AttributeError": "attribut ou méthode inexistant",
+    "KeyError": "clé absente d'un dictionnaire",
+    "IndentationError": "indentation Python incohérente",
+}
+
 
 class VectortAISystem:
     """
@@ -154,48 +173,152 @@ class VectortAISystem:
     
     async def continuous_improvement_cycle(self):
         """
-        Cycle d'amélioration continue (à exécuter périodiquement)
+        Cycle d'amélioration continue déclenché par les générations
         
-        Lance tous les 100 générations:
-        - Apprentissage approfondi
-        - Optimisation des agents
-        - Auto-réparation si nécessaire
+        Lance run_improvement_cycle() toutes les 100 générations. Quand le
+        planificateur tourne (ML_SCHEDULER_ENABLED), le cycle est exécuté
+        hors requête et cette méthode ne fait que compter.
         """
         
         self.generation_counter += 1
         
         # Cycle d'amélioration tous les 100 générations
         if self.generation_counter % 100 == 0:
-            logger.info("🔄 Cycle d'amélioration continue")
+            await self.run_improvement_cycle()
+    
+    async def run_improvement_cycle(self) -> Dict:
+        """
+        Cycle d'amélioration continue (tâche planifiée)
+        
+        - Apprentissage approfondi
+        - Optimisation des agents
+        - Auto-réparation si nécessaire
+        
+        Le résultat est enregistré dans ml_insights (_id "improvement").
+        """
+        
+        if not self.ml_system:
+            return {"learning_active": False}
+        
+        logger.info("🔄 Cycle d'amélioration continue")
+        
+        result = {"system_score": None, "diagnosis": None, "fixes": []}
+        try:
+            # 1. Apprentissage approfondi
+            ml_insights = await self.ml_system.learn_and_optimize()
+            result["system_score"] = ml_insights.get("system_score")
             
-            try:
-                # 1. Apprentissage approfondi
-                ml_insights = await self.ml_system.learn_and_optimize()
+            # 2. Auto-réparation si nécessaire
+            if ml_insights.get("system_score", 100) < 80 and self.self_healing_agent:
+                logger.warning("⚠️ Score système bas, lancement auto-réparation")
+                
+                system_metrics = await self._get_system_metrics()
+                diagnosis = await self.self_healing_agent.diagnose_system(system_metrics)
+                result["diagnosis"] = diagnosis
                 
-                # 2. Auto-réparation si nécessaire
-                if ml_insights.get("system_score", 100) < 80:
-                    logger.warning("⚠️ Score système bas, lancement auto-réparation")
+                # Proposer corrections
+                if diagnosis.get("severity_high", 0) > 0:
+                    fixes = await self.self_healing_agent.propose_fixes(
+                        diagnosis.get("issues", [])
+                    )
+                    result["fixes"] = fixes
                     
-                    system_metrics = await self._get_system_metrics()
-                    diagnosis = await self.self_healing_agent.diagnose_system(system_metrics)
+                    logger.info(f"🔧 {len(fixes)} corrections proposées")
                     
-                    # Proposer corrections
-                    if diagnosis.get("severity_high", 0) > 0:
-                        fixes = await self.self_healing_agent.propose_fixes(
-                            diagnosis.get("issues", [])
-                        )
-                        
-                        logger.info(f"🔧 {len(fixes)} corrections proposées")
-                        
-                        # Appliquer corrections critiques (dry-run)
-                        for fix in fixes:
-                            if fix.get("auto_apply"):
-                                await self.self_healing_agent.apply_fix(fix, dry_run=True)
-                
-                logger.info("✅ Cycle d'amélioration terminé")
-                
-            except Exception as e:
-                logger.error(f"❌ Erreur cycle amélioration: {e}")
+                    # Appliquer corrections critiques (dry-run)
+                    for fix in fixes:
+                        if fix.get("auto_apply"):
+                            await self.self_healing_agent.apply_fix(fix, dry_run=True)
+            
+            await self._store_insights("improvement", result)
+            logger.info("✅ Cycle d'amélioration terminé")
+            
+        except Exception as e:
+            logger.error(f"❌ Erreur cycle amélioration: {e}")
+            result["error"] = str(e)
+        
+        return result
+    
+    async def refresh_insights(self) -> Dict:
+        """
+        Recalcule les insights pré-génération (tâche planifiée)
+        
+        Le résultat est enregistré dans ml_insights (_id "latest") et relu
+        par generation_guidance() au lieu d'être recalculé à chaque génération.
+        """
+        
+        insights = await self.pre_generation_learning()
+        if insights.get("learning_active", True):
+            await self._store_insights("latest", insights)
+        return insights
+    
+    async def latest_insights(self, kind: str = "latest") -> Optional[Dict]:
+        """
+        Derniers insights calculés par le planificateur (lecture par _id)
+        
+        Args:
+            kind: "latest" (insights pré-génération) ou "improvement"
+        Returns:
+            Insights avec computed_at, None si jamais calculés
+        """
+        
+        document = await self.db.ml_insights.find_one({"_id": kind})
+        if not document:
+            return None
+        
+        insights = json.loads(document["payload"])
+        insights["computed_at"] = document["computed_at"]
+        return insights
+    
+    async def generation_guidance(self) -> str:
+        """
+        Consignes tirées des derniers insights, ajoutées aux prompts de génération
+        
+        Lit seulement ml_insights (calculé par le planificateur): rien n'est
+        recalculé pendant la requête.
+        Returns:
+            Section de prompt, chaîne vide tant que rien n'a été appris
+        """
+        
+        try:
+            insights = await self.latest_insights()
+        except Exception as e:
+            logger.warning(f"⚠️ Insights ML indisponibles: {e}")
+            return ""
+        if not insights:
+            return ""
+        
+        errors = (insights.get("failure_patterns") or {}).get("errors") or {}
+        classes: Dict[str, int] = {}
+        for error, count in (errors.get("common_errors") or {}).items():
+            error_class = error.split(":", 1)[0].strip()
+            if error_class in GUIDANCE_ERROR_HINTS:
+                classes[error_class] = classes.get(error_class, 0) + count
+        common_errors = sorted(classes, key=lambda name: (-classes[name], name))[:GUIDANCE_MAX_ERRORS]
+        
+        lines = [
+            f"Éviter les {error_class}: {GUIDANCE_ERROR_HINTS[error_class]}"
+            for error_class in common_errors
+        ]
+        if errors.get("compilation_failures"):
+            lines.append("Vérifier la syntaxe de chaque fichier: des générations précédentes ne compilaient pas")
+        if not lines:
+            return ""
+        
+        return "\n\nLEÇONS DES GÉNÉRATIONS PRÉCÉDENTES:\n" + "\n".join(f"- {line}" for line in lines)
+    
+    async def _store_insights(self, kind: str, insights: Dict):
+        """Enregistre un jeu d'insights dans ml_insights"""
+        
+        # Sérialisé: les mots-clés appris servent de clés (points, "$" possibles)
+        await self.db.ml_insights.update_one(
+            {"_id": kind},
+            {"$set": {
+                "payload": json.dumps(insights, default=str),
+                "computed_at": datetime.utcnow()
+            }},
+            upsert=True
+        )
     
     def _calculate_expected_score(self, ml_insights: Dict) -> float:
         """
@@ -235,11 +358,11 @@ class VectortAISystem:
         # Cap à 100
         return min(100.0, total_score)
     
-    async def _get_recent_generations(self, limit: int = 10) -> List[Dict]:
-        """Récupère les générations récentes"""
+    async def _get_recent_generations(self, limit: int = 10, projection: Optional[Dict] = None) -> List[Dict]:
+        """Récupère les générations récentes (projection: champs à lire)"""
         
         try:
-            feedback = await self.db.ml_feedback.find().sort(
+            feedback = await self.db.ml_feedback.find({}, projection).sort(
                 "timestamp", -1
             ).limit(limit).to_list(length=limit)
             
@@ -253,7 +376,9 @@ class VectortAISystem:
         
         try:
             # Calculer métriques depuis feedback
-            recent_feedback = await self._get_recent_generations(100)
+            recent_feedback = await self._get_recent_generations(
+                100, {"auto_score": 1, "time_taken": 1, "runtime_errors": 1}
+            )
             
             if not recent_feedback:
                 return {
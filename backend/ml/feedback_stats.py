@@ -0,0 +1,344 @@
+"""
+Rolling statistics over ml_feedback
+Counters (totals, keywords, runtime errors, file-type correlations) are
+updated with one bulk write per recorded feedback, so a learning cycle reads
+a fixed number of small documents whatever the size of the history.
+Arbitrary score thresholds are answered by aggregation pipelines.
+"""
+
+import asyncio
+import logging
+import re
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import ReplaceOne, UpdateOne
+
+logger = logging.getLogger(__name__)
+
+# Seuils des analyses par défaut (compteurs incrémentaux)
+SUCCESS_SCORE = 80.0
+FAILURE_SCORE = 50.0
+
+KEYWORD_MIN_LENGTH = 5  # "Mots significatifs": plus de 4 caractères
+KEYWORD_MAX_LENGTH = 100  # Borne la taille des _id (URLs collées dans la description)
+ERROR_PREFIX_LENGTH = 50
+
+# Type de fichier -> agent, dans l'ordre d'évaluation: (sous-chaînes, insensible à la casse)
+FILE_CATEGORY_RULES: List[Tuple[str, List[Tuple[str, bool]]]] = [
+    ("frontend", [(".jsx", False), ("component", True)]),
+    ("styling", [(".css", False)]),
+    ("backend", [(".py", False), ("backend", False)]),  # les deux requis
+    ("database", [("database", False), ("model", True)]),
+    ("security", [("security", False), ("auth", False)]),
+    ("testing", [("test", False)]),
+]
+_ALL_REQUIRED = {"backend"}
+
+_KEYWORD = re.compile(r"\S{%d,}" % KEYWORD_MIN_LENGTH)
+
+
+def file_category(path: str) -> Optional[str]:
+    """Catégorie d'agent d'un fichier généré (None: non comptée)"""
+    lowered = path.lower()
+    for category, rules in FILE_CATEGORY_RULES:
+        hits = [(needle in lowered) if insensitive else (needle in path) for needle, insensitive in rules]
+        if all(hits) if category in _ALL_REQUIRED else any(hits):
+            return category
+    return None
+
+
+def _category_expression(field: str) -> Dict[str, Any]:
+    """Même classification que file_category, en expression d'agrégation"""
+    branches = []
+    for category, rules in FILE_CATEGORY_RULES:
+        conditions = [
+            {"$regexMatch": {"input": field, "regex": re.escape(needle), **({"options": "i"} if insensitive else {})}}
+            for needle, insensitive in rules
+        ]
+        operator = "$and" if category in _ALL_REQUIRED else "$or"
+        branches.append({"case": {operator: conditions}, "then": category})
+    return {"$switch": {"branches": branches, "default": None}}
+
+
+def description_keywords(description: str) -> Counter:
+    """Occurrences des mots significatifs d'une description"""
+    return Counter(
+        word for word in _KEYWORD.findall((description or "").lower())
+        if len(word) <= KEYWORD_MAX_LENGTH
+    )
+
+
+def score_buckets(score: float) -> List[str]:
+    buckets = ["all"]
+    if score >= SUCCESS_SCORE:
+        buckets.append("success")
+    if score <= FAILURE_SCORE:
+        buckets.append("failure")
+    return buckets
+
+
+def _totals_group() -> Dict[str, Any]:
+    return {
+        "_id": None,
+        "count": {"$sum": 1},
+        "score": {"$sum": {"$ifNull": ["$auto_score", 0]}},
+        "description_length": {"$sum": {"$strLenCP": {"$ifNull": ["$description", ""]}}},
+        "files": {"$sum": {"$ifNull": ["$generated_files_count", 0]}},
+        "time_taken": {"$sum": {"$ifNull": ["$time_taken", 0]}},
+        "compilation_failures": {"$sum": {"$cond": [{"$eq": ["$compilation_success", True]}, 0, 1]}},
+    }
+
+
+TOTAL_FIELDS = ("count", "score", "description_length", "files", "time_taken", "compilation_failures")
+
+
+class FeedbackStats:
+    """
+    Compteurs de ml_feedback (collection ml_feedback_stats)
+
+    Documents:
+        totals:<bucket>            {count, score, description_length, files, time_taken, compilation_failures}
+        keyword:<bucket>:<mot>     {key, count}        buckets success / failure
+        error:failure:<préfixe>    {key, count}
+        correlations               {values: {agent: somme score * taille / 10000}}
+        meta                       {rebuilt_at}: les compteurs couvrent l'historique
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self._ready = False
+        self._lock = asyncio.Lock()
+
+    @property
+    def stats(self):
+        return self.db.ml_feedback_stats
+
+    @property
+    def feedback(self):
+        return self.db.ml_feedback
+
+    async def ensure_indexes(self):
+        await self.stats.create_index([("kind", 1), ("bucket", 1), ("count", -1)])
+
+    # ------------------------------------------------------------------
+    # Écriture
+    # ------------------------------------------------------------------
+
+    def operations(self, document: Dict[str, Any]) -> List[UpdateOne]:
+        """$inc d'un feedback sur tous les compteurs concernés"""
+        score = float(document.get("auto_score") or 0.0)
+        buckets = score_buckets(score)
+        totals = {
+            "count": 1,
+            "score": score,
+            "description_length": len(document.get("description") or ""),
+            "files": document.get("generated_files_count") or 0,
+            "time_taken": float(document.get("time_taken") or 0.0),
+            "compilation_failures": 0 if document.get("compilation_success") else 1,
+        }
+        operations = [
+            UpdateOne(
+                {"_id": f"totals:{bucket}"},
+                {"$inc": totals, "$setOnInsert": {"kind": "totals", "bucket": bucket}},
+                upsert=True
+            )
+            for bucket in buckets
+        ]
+
+        keywords = description_keywords(document.get("description") or "")
+        for bucket in buckets:
+            if bucket == "all":
+                continue
+            for word, count in keywords.items():
+                operations.append(UpdateOne(
+                    {"_id": f"keyword:{bucket}:{word}"},
+                    {"$inc": {"count": count}, "$setOnInsert": {"kind": "keyword", "bucket": bucket, "key": word}},
+                    upsert=True
+                ))
+
+        if "failure" in buckets:
+            errors = Counter(error[:ERROR_PREFIX_LENGTH] for error in document.get("runtime_errors") or [])
+            for prefix, count in errors.items():
+                operations.append(UpdateOne(
+                    {"_id": f"error:failure:{prefix}"},
+                    {"$inc": {"count": count}, "$setOnInsert": {"kind": "error", "bucket": "failure", "key": prefix}},
+                    upsert=True
+                ))
+
+        correlations: Dict[str, float] = defaultdict(float)
+        for path, size in (document.get("generated_files_sizes") or {}).items():
+            category = file_category(path)
+            if category:
+                correlations[category] += score * (size / 10000.0)
+        if correlations:
+            operations.append(UpdateOne(
+                {"_id": "correlations"},
+                {
+                    "$inc": {f"values.{category}": value for category, value in correlations.items()},
+                    "$setOnInsert": {"kind": "correlations"},
+                },
+                upsert=True
+            ))
+        return operations
+
+    async def record(self, document: Dict[str, Any]):
+        """Met à jour les compteurs pour un feedback inséré dans ml_feedback"""
+        await self.stats.bulk_write(self.operations(document), ordered=False)
+
+    # ------------------------------------------------------------------
+    # Reconstruction (historique antérieur aux compteurs)
+    # ------------------------------------------------------------------
+
+    async def ensure_ready(self):
+        """Reconstruit les compteurs une fois si l'historique n'est pas couvert"""
+        if self._ready:
+            return
+        async with self._lock:
+            if self._ready:
+                return
+            await self.ensure_indexes()
+            if not await self.stats.find_one({"_id": "meta"}):
+                await self.rebuild()
+            self._ready = True
+
+    async def rebuild(self):
+        """
+        Recalcule tous les compteurs depuis ml_feedback par agrégation
+
+        Les feedbacks enregistrés pendant la reconstruction peuvent être
+        comptés deux fois ou pas du tout: écart négligeable, corrigé par une
+        nouvelle reconstruction (suppression du document meta)
+        """
+        logger.info("🧮 Reconstruction des statistiques ml_feedback")
+        operations: List[ReplaceOne] = []
+
+        def replace(document_id: str, document: Dict[str, Any]):
+            operations.append(ReplaceOne({"_id": document_id}, document, upsert=True))
+
+        buckets = {
+            "all": {"auto_score": {"$exists": True}},
+            "success": {"auto_score": {"$gte": SUCCESS_SCORE}},
+            "failure": {"auto_score": {"$lte": FAILURE_SCORE}},
+        }
+        for bucket, match in buckets.items():
+            totals = await self.feedback.aggregate([{"$match": match}, {"$group": _totals_group()}]).to_list(1)
+            if totals:
+                values = {field: totals[0][field] for field in TOTAL_FIELDS}
+                replace(f"totals:{bucket}", {"kind": "totals", "bucket": bucket, **values})
+            if bucket == "all":
+                continue
+            for row in await self.feedback.aggregate(self._keywords_pipeline(match)).to_list(None):
+                replace(f"keyword:{bucket}:{row['_id']}", {"kind": "keyword", "bucket": bucket, "key": row["_id"], "count": row["count"]})
+
+        for row in await self.feedback.aggregate(self._errors_pipeline(buckets["failure"])).to_list(None):
+            replace(f"error:failure:{row['_id']}", {"kind": "error", "bucket": "failure", "key": row["_id"], "count": row["count"]})
+
+        correlations = await self.feedback.aggregate(self._correlations_pipeline()).to_list(None)
+        replace("correlations", {"kind": "correlations", "values": {row["_id"]: row["value"] for row in correlations}})
+        replace("meta", {"kind": "meta", "rebuilt_at": datetime.utcnow()})
+
+        await self.stats.delete_many({"kind": {"$in": ["keyword", "error"]}})
+        await self.stats.bulk_write(operations, ordered=True)
+
+    # ------------------------------------------------------------------
+    # Pipelines (seuils quelconques, reconstruction)
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _keywords_pipeline(match: Dict[str, Any], limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        pipeline = [
+            {"$match": match},
+            {"$project": {"words": {"$regexFindAll": {
+                "input": {"$toLower": {"$ifNull": ["$description", ""]}},
+                "regex": r"\S{%d,}" % KEYWORD_MIN_LENGTH,
+            }}}},
+            {"$unwind": "$words"},
+            {"$match": {"$expr": {"$lte": [{"$strLenCP": "$words.match"}, KEYWORD_MAX_LENGTH]}}},
+            {"$group": {"_id": "$words.match", "count": {"$sum": 1}}},
+            {"$sort": {"count": -1, "_id": 1}},
+        ]
+        if limit:
+            pipeline.append({"$limit": limit})
+        return pipeline
+
+    @staticmethod
+    def _errors_pipeline(match: Dict[str, Any], limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        pipeline = [
+            {"$match": match},
+            {"$unwind": "$runtime_errors"},
+            {"$group": {"_id": {"$substrCP": ["$runtime_errors", 0, ERROR_PREFIX_LENGTH]}, "count": {"$sum": 1}}},
+            {"$sort": {"count": -1, "_id": 1}},
+        ]
+        if limit:
+            pipeline.append({"$limit": limit})
+        return pipeline
+
+    @staticmethod
+    def _correlations_pipeline() -> List[Dict[str, Any]]:
+        return [
+            {"$match": {"auto_score": {"$exists": True}}},
+            {"$project": {"score": "$auto_score", "files": {"$objectToArray": {"$ifNull": ["$generated_files_sizes", {}]}}}},
+            {"$unwind": "$files"},
+            {"$project": {
+                "category": _category_expression("$files.k"),
+                "value": {"$multiply": ["$score", {"$divide": ["$files.v", 10000.0]}]},
+            }},
+            {"$match": {"category": {"$ne": None}}},
+            {"$group": {"_id": "$category", "value": {"$sum": "$value"}}},
+        ]
+
+    # ------------------------------------------------------------------
+    # Lecture
+    # ------------------------------------------------------------------
+
+    async def totals(self, bucket: str = "all", match: Optional[Dict[str, Any]] = None) -> Dict[str, float]:
+        """
+        Sommes d'un bucket (compteurs), ou d'un filtre quelconque (agrégation)
+        """
+        if match is not None:
+            rows = await self.feedback.aggregate([{"$match": match}, {"$group": _totals_group()}]).to_list(1)
+            document = rows[0] if rows else {}
+        else:
+            await self.ensure_ready()
+            document = await self.stats.find_one({"_id": f"totals:{bucket}"}) or {}
+        return {field: document.get(field, 0) for field in TOTAL_FIELDS}
+
+    async def top_keywords(
+        self,
+        bucket: str,
+        limit: int = 20,
+        match: Optional[Dict[str, Any]] = None
+    ) -> List[Tuple[str, int]]:
+        if match is not None:
+            rows = await self.feedback.aggregate(self._keywords_pipeline(match, limit)).to_list(limit)
+            return [(row["_id"], row["count"]) for row in rows]
+        return await self._top("keyword", bucket, limit)
+
+    async def top_errors(self, limit: int = 5, match: Optional[Dict[str, Any]] = None) -> List[Tuple[str, int]]:
+        if match is not None:
+            rows = await self.feedback.aggregate(self._errors_pipeline(match, limit)).to_list(limit)
+            return [(row["_id"], row["count"]) for row in rows]
+        return await self._top("error", "failure", limit)
+
+    async def _top(self, kind: str, bucket: str, limit: int) -> List[Tuple[str, int]]:
+        await self.ensure_ready()
+        cursor = self.stats.find(
+            {"kind": kind, "bucket": bucket}, {"key": 1, "count": 1}
+        ).sort([("count", -1), ("key", 1)]).limit(limit)
+        return [(document["key"], document["count"]) async for document in cursor]
+
+    async def correlations(self) -> Dict[str, float]:
+        await self.ensure_ready()
+        document = await self.stats.find_one({"_id": "correlations"}) or {}
+        return dict(document.get("values") or {})
+
+
+__all__ = [
+    'FeedbackStats',
+    'file_category',
+    'description_keywords',
+    'SUCCESS_SCORE',
+    'FAILURE_SCORE',
+]
@@ -7,11 +7,13 @@ Los agentes aprenden de cada generación para no repetir errores
 import json
 import logging
 from typing import Dict, List, Optional, Tuple
-from datetime import datetime
-from collections import defaultdict
+from datetime import datetime, timedelta
 import asyncio
 from motor.motor_asyncio import AsyncIOMotorDatabase
 
+from ml.feedback_stats import FeedbackStats, SUCCESS_SCORE, FAILURE_SCORE
+from ml.agent_rollups import AgentRollups, EMPTY_STATS
+
 logger = logging.getLogger(__name__)
 
 
@@ -100,15 +102,35 @@ class GenerationFeedback:
         }
 
 
+DEFAULT_AGENT_RATIOS = {
+    "diagnostic": 0.10,
+    "frontend": 0.15,
+    "styling": 0.10,
+    "backend": 0.15,
+    "config": 0.08,
+    "components": 0.10,
+    "database": 0.12,
+    "security": 0.10,
+    "testing": 0.08,
+    "qa": 0.02
+}
+
+
 class PatternLearner:
-    """Apprend des patterns de succès et échecs"""
+    """
+    Apprend des patterns de succès et échecs
     
-    def __init__(self, db: AsyncIOMotorDatabase):
+    Les seuils par défaut sont servis par les compteurs de FeedbackStats
+    (temps constant); les autres seuils par agrégation MongoDB.
+    """
+    
+    def __init__(self, db: AsyncIOMotorDatabase, stats: Optional[FeedbackStats] = None):
         self.db = db
         self.patterns_collection = db.ml_patterns
         self.feedback_collection = db.ml_feedback
+        self.stats = stats or FeedbackStats(db)
     
-    async def analyze_successes(self, min_score: float = 80.0) -> Dict:
+    async def analyze_successes(self, min_score: float = SUCCESS_SCORE) -> Dict:
         """
         Analyse les générations réussies pour identifier patterns
         
@@ -117,53 +139,41 @@ class PatternLearner:
         """
         logger.info(f"🧠 Analyse des succès (score >= {min_score})")
         
-        # Récupérer les feedbacks réussis
-        successes = await self.feedback_collection.find({
-            "auto_score": {"$gte": min_score}
-        }).to_list(length=100)
-        
-        if not successes:
+        match = None if min_score == SUCCESS_SCORE else {"auto_score": {"$gte": min_score}}
+        totals = await self.stats.totals("success", match)
+        count = totals["count"]
+        if not count:
             return {"patterns": [], "recommendations": []}
         
-        # Analyser patterns communs
+        keywords = await self.stats.top_keywords("success", limit=20, match=match)
+        
+        # Moyennes depuis les sommes
+        avg_length = totals["description_length"] / count
+        avg_files = totals["files"] / count
+        avg_time = totals["time_taken"] / count
+        
         patterns = {
-            "description_lengths": [],
-            "file_counts": [],
-            "common_keywords": defaultdict(int),
-            "optimal_time_range": [],
-            "compilation_success_rate": 0.0
+            "avg_description_length": avg_length,
+            "avg_file_count": avg_files,
+            "avg_time_taken": avg_time,
+            "common_keywords": dict(keywords),
+            "compilation_success_rate": 1.0 - totals["compilation_failures"] / count
         }
         
-        for feedback in successes:
-            patterns["description_lengths"].append(len(feedback.get("description", "")))
-            patterns["file_counts"].append(feedback.get("generated_files_count", 0))
-            patterns["optimal_time_range"].append(feedback.get("time_taken", 0))
-            
-            # Extraire keywords de description
-            desc = feedback.get("description", "").lower()
-            for word in desc.split():
-                if len(word) > 4:  # Mots significatifs
-                    patterns["common_keywords"][word] += 1
-        
-        # Calculer moyennes et recommendations
-        avg_length = sum(patterns["description_lengths"]) / len(patterns["description_lengths"])
-        avg_files = sum(patterns["file_counts"]) / len(patterns["file_counts"])
-        avg_time = sum(patterns["optimal_time_range"]) / len(patterns["optimal_time_range"])
-        
         recommendations = [
             f"Description optimale: {int(avg_length)} caractères",
             f"Nombre de fichiers optimal: {int(avg_files)}",
             f"Temps optimal: {int(avg_time)}s",
-            f"Keywords de succès: {', '.join(list(patterns['common_keywords'].keys())[:5])}"
+            f"Keywords de succès: {', '.join(word for word, _ in keywords[:5])}"
         ]
         
         return {
             "patterns": patterns,
             "recommendations": recommendations,
-            "success_count": len(successes)
+            "success_count": count
         }
     
-    async def analyze_failures(self, max_score: float = 50.0) -> Dict:
+    async def analyze_failures(self, max_score: float = FAILURE_SCORE) -> Dict:
         """
         Analyse les échecs pour identifier erreurs à éviter
         
@@ -172,106 +182,45 @@ class PatternLearner:
         """
         logger.info(f"⚠️ Analyse des échecs (score <= {max_score})")
         
-        # Récupérer les feedbacks d'échec
-        failures = await self.feedback_collection.find({
-            "auto_score": {"$lte": max_score}
-        }).to_list(length=100)
-        
-        if not failures:
+        match = None if max_score == FAILURE_SCORE else {"auto_score": {"$lte": max_score}}
+        totals = await self.stats.totals("failure", match)
+        count = totals["count"]
+        if not count:
             return {"errors": [], "recommendations": []}
         
-        # Analyser erreurs communes
+        top_errors = await self.stats.top_errors(limit=5, match=match)
+        keywords = await self.stats.top_keywords("failure", limit=20, match=match)
+        
         error_patterns = {
-            "common_errors": defaultdict(int),
-            "problematic_keywords": defaultdict(int),
-            "compilation_failures": 0
+            "common_errors": dict(top_errors),
+            "problematic_keywords": dict(keywords),
+            "compilation_failures": totals["compilation_failures"]
         }
         
-        for feedback in failures:
-            # Erreurs runtime
-            for error in feedback.get("runtime_errors", []):
-                error_patterns["common_errors"][error[:50]] += 1  # Premiers 50 chars
-            
-            # Problèmes de compilation
-            if not feedback.get("compilation_success", False):
-                error_patterns["compilation_failures"] += 1
-            
-            # Keywords problématiques
-            desc = feedback.get("description", "").lower()
-            for word in desc.split():
-                if len(word) > 4:
-                    error_patterns["problematic_keywords"][word] += 1
-        
-        # Top erreurs
-        top_errors = sorted(
-            error_patterns["common_errors"].items(),
-            key=lambda x: x[1],
-            reverse=True
-        )[:5]
-        
         recommendations = [
             f"Éviter: {', '.join([e[0] for e in top_errors])}",
-            f"Taux d'échec compilation: {error_patterns['compilation_failures']}/{len(failures)}",
+            f"Taux d'échec compilation: {error_patterns['compilation_failures']}/{count}",
             "Améliorer validation syntaxe avant génération"
         ]
         
         return {
             "errors": error_patterns,
             "recommendations": recommendations,
-            "failure_count": len(failures)
+            "failure_count": count
         }
     
     async def calculate_optimal_ratios(self) -> Dict[str, float]:
         """
         Calcule les ratios mathématiques optimaux entre agents
         
-        Basé sur analyse statistique des succès
+        Basé sur la corrélation cumulée (score x taille) entre types de
+        fichiers générés et succès, tenue à jour à chaque feedback
         Returns:
             Dict avec poids optimal pour chaque agent
         """
         logger.info("🔢 Calcul des ratios mathématiques optimaux")
         
-        # Récupérer toutes les générations avec score
-        all_feedback = await self.feedback_collection.find({
-            "auto_score": {"$exists": True}
-        }).to_list(length=1000)
-        
-        if not all_feedback:
-            # Ratios par défaut équilibrés
-            return {
-                "diagnostic": 0.10,
-                "frontend": 0.15,
-                "styling": 0.10,
-                "backend": 0.15,
-                "config": 0.08,
-                "components": 0.10,
-                "database": 0.12,
-                "security": 0.10,
-                "testing": 0.08,
-                "qa": 0.02
-            }
-        
-        # Analyser corrélation entre présence de types de fichiers et succès
-        correlations = defaultdict(float)
-        
-        for feedback in all_feedback:
-            score = feedback.get("auto_score", 0)
-            file_sizes = feedback.get("generated_files_sizes", {})
-            
-            # Calculer contribution de chaque type
-            for file_path, size in file_sizes.items():
-                if '.jsx' in file_path or 'component' in file_path.lower():
-                    correlations['frontend'] += score * (size / 10000.0)
-                elif '.css' in file_path:
-                    correlations['styling'] += score * (size / 10000.0)
-                elif '.py' in file_path and 'backend' in file_path:
-                    correlations['backend'] += score * (size / 10000.0)
-                elif 'database' in file_path or 'model' in file_path.lower():
-                    correlations['database'] += score * (size / 10000.0)
-                elif 'security' in file_path or 'auth' in file_path:
-                    correlations['security'] += score * (size / 10000.0)
-                elif 'test' in file_path:
-                    correlations['testing'] += score * (size / 10000.0)
+        correlations = await self.stats.correlations()
         
         # Normaliser les corrélations pour obtenir ratios /1
         total = sum(correlations.values())
@@ -281,20 +230,7 @@ class PatternLearner:
             optimal_ratios = {}
         
         # Compléter avec valeurs par défaut
-        default_ratios = {
-            "diagnostic": 0.10,
-            "frontend": 0.15,
-            "styling": 0.10,
-            "backend": 0.15,
-            "config": 0.08,
-            "components": 0.10,
-            "database": 0.12,
-            "security": 0.10,
-            "testing": 0.08,
-            "qa": 0.02
-        }
-        
-        for agent, default_ratio in default_ratios.items():
+        for agent, default_ratio in DEFAULT_AGENT_RATIOS.items():
             if agent not in optimal_ratios:
                 optimal_ratios[agent] = default_ratio
         
@@ -305,9 +241,16 @@ class PatternLearner:
 class AgentPerformanceTracker:
     """Suit et analyse les performances de chaque agent individuellement"""
     
+    AGENTS = [
+        "diagnostic", "frontend", "styling", "backend",
+        "config", "components", "database", "security",
+        "testing", "qa"
+    ]
+    
     def __init__(self, db: AsyncIOMotorDatabase):
         self.db = db
         self.performance_collection = db.agent_performance
+        self.rollups = AgentRollups(db)
     
     async def record_agent_performance(
         self,
@@ -317,9 +260,9 @@ class AgentPerformanceTracker:
         errors: List[str],
         quality_score: float
     ):
-        """Enregistre la performance d'un agent"""
+        """Enregistre la performance d'un agent (et met à jour ses buckets minute/heure)"""
         
-        await self.performance_collection.insert_one({
+        document = {
             "agent_name": agent_name,
             "execution_time": execution_time,
             "files_generated": files_generated,
@@ -327,51 +270,28 @@ class AgentPerformanceTracker:
             "errors": errors,
             "quality_score": quality_score,
             "timestamp": datetime.utcnow()
-        })
+        }
+        await self.performance_collection.insert_one(document)
+        await self.rollups.record(document)
     
-    async def get_agent_stats(self, agent_name: str, days: int = 7) -> Dict:
-        """Obtient les statistiques d'un agent"""
+    async def get_agent_stats(self, agent_name: str, days: float = 7) -> Dict:
+        """Obtient les statistiques d'un agent (depuis les rollups)"""
         
-        from datetime import timedelta
         since = datetime.utcnow() - timedelta(days=days)
+        summary = await self.rollups.summary(since, [agent_name])
         
-        performances = await self.performance_collection.find({
-            "agent_name": agent_name,
-            "timestamp": {"$gte": since}
-        }).to_list(length=1000)
-        
-        if not performances:
-            return {"avg_time": 0, "avg_files": 0, "avg_quality": 0, "error_rate": 0}
+        return summary.get(agent_name) or dict(EMPTY_STATS)
+    
+    async def get_all_agents_health(self, days: float = 7) -> Dict[str, Dict]:
+        """Obtient le status de santé de tous les agents (une seule agrégation)"""
         
-        total_time = sum(p["execution_time"] for p in performances)
-        total_files = sum(p["files_generated"] for p in performances)
-        total_quality = sum(p["quality_score"] for p in performances)
-        total_errors = sum(p["error_count"] for p in performances)
+        since = datetime.utcnow() - timedelta(days=days)
+        summary = await self.rollups.summary(since, self.AGENTS)
         
         return {
-            "agent_name": agent_name,
-            "executions": len(performances),
-            "avg_time": total_time / len(performances),
-            "avg_files": total_files / len(performances),
-            "avg_quality": total_quality / len(performances),
-            "error_rate": total_errors / len(performances),
-            "status": "healthy" if (total_errors / len(performances)) < 0.1 else "needs_improvement"
+            agent: summary.get(agent) or dict(EMPTY_STATS)
+            for agent in self.AGENTS
         }
-    
-    async def get_all_agents_health(self) -> Dict[str, Dict]:
-        """Obtient le status de santé de tous les agents"""
-        
-        agents = [
-            "diagnostic", "frontend", "styling", "backend",
-            "config", "components", "database", "security",
-            "testing", "qa"
-        ]
-        
-        health_report = {}
-        for agent in agents:
-            health_report[agent] = await self.get_agent_stats(agent)
-        
-        return health_report
 
 
 class MLLearningSystem:
@@ -379,14 +299,17 @@ class MLLearningSystem:
     
     def __init__(self, db: AsyncIOMotorDatabase):
         self.db = db
-        self.pattern_learner = PatternLearner(db)
+        self.feedback_stats = FeedbackStats(db)
+        self.pattern_learner = PatternLearner(db, self.feedback_stats)
         self.performance_tracker = AgentPerformanceTracker(db)
         self.feedback_collection = db.ml_feedback
     
     async def record_generation_feedback(self, feedback: GenerationFeedback):
-        """Enregistre le feedback d'une génération"""
+        """Enregistre le feedback d'une génération (et met à jour les compteurs)"""
         
-        await self.feedback_collection.insert_one(feedback.to_dict())
+        document = feedback.to_dict()
+        await self.feedback_collection.insert_one(document)
+        await self.feedback_stats.record(document)
         logger.info(f"📊 Feedback enregistré - Score: {feedback.auto_score}/100")
     
     async def learn_and_optimize(self) -> Dict:
@@ -417,7 +340,7 @@ class MLLearningSystem:
         ) / len(agents_health)
         
         # Score d'apprentissage (tend vers 100 avec le temps)
-        learning_iterations = await self.feedback_collection.count_documents({})
+        learning_iterations = int((await self.feedback_stats.totals("all"))["count"])
         learning_score = min(100.0, 50.0 + (learning_iterations / 100.0) * 50.0)
         
         return {
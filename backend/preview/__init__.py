@@ -0,0 +1,15 @@
+"""
+VECTORT.IO - APERÇUS
+Construction des pages d'aperçu des projets générés (JSX compilé et
+modules assemblés côté serveur)
+"""
+
+from .jsx import compile_jsx, JSXCompileError
+from .bundler import Bundle, BundleError, bundle_project
+from .builder import PreviewBuild, PreviewCache, build_preview, preview_key
+
+__all__ = [
+    'compile_jsx', 'JSXCompileError',
+    'Bundle', 'BundleError', 'bundle_project',
+    'PreviewBuild', 'PreviewCache', 'build_preview', 'preview_key'
+]
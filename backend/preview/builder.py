@@ -0,0 +1,333 @@
+"""
+VECTORT.IO - BUILD DES APERÇUS
+Assemble la page HTML d'aperçu d'un projet une fois par version: le JSX est
+compilé côté serveur (plus de Babel dans le navigateur) et la page est
+mise en cache par hash des contenus du projet
+"""
+
+import hashlib
+import html
+import json
+import logging
+import os
+import posixpath
+import re
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from preview.bundler import Bundle, BundleError, bundle_project
+from preview.jsx import JSXCompileError, compile_jsx
+
+logger = logging.getLogger(__name__)
+
+PREVIEW_CACHE_TTL_SECONDS = int(os.environ.get("PREVIEW_CACHE_TTL_HOURS", "168")) * 3600
+PREVIEW_MEMORY_CACHE_BYTES = int(os.environ.get("PREVIEW_MEMORY_CACHE_MB", "32")) * 1024 * 1024
+
+# À incrémenter quand la page générée change: invalide les aperçus en cache
+PREVIEW_FORMAT = 2
+
+REACT_SCRIPTS = """    <script crossorigin src="https://unpkg.com/react@18/umd/react.production.min.js"></script>
+    <script crossorigin src="https://unpkg.com/react-dom@18/umd/react-dom.production.min.js"></script>
+    <script src="https://cdn.jsdelivr.net/npm/axios/dist/axios.min.js"></script>"""
+BABEL_SCRIPT = """    <script src="https://unpkg.com/@babel/standalone/babel.min.js"></script>"""
+TAILWIND_SCRIPT = """    <script src="https://cdn.tailwindcss.com"></script>"""
+
+REACT_HOOKS = (
+    "useState", "useEffect", "useRef", "useMemo", "useCallback",
+    "useContext", "useReducer", "useLayoutEffect",
+)
+
+_IMPORT = re.compile(
+    r"^[ \t]*import\s+(?:[\w$*{}\s,]+?\s+from\s+)?['\"][^'\"\n]+['\"][ \t]*;?[ \t]*$",
+    re.M
+)
+_EXPORT_LIST = re.compile(r"^[ \t]*export\s*(?:\*|\{[^}]*\})(?:\s*from\s*['\"][^'\"\n]+['\"])?[ \t]*;?[ \t]*$", re.M)
+_EXPORT_DEFAULT_NAME = re.compile(r"^[ \t]*export\s+default\s+[A-Za-z_$][\w$]*[ \t]*;?[ \t]*$", re.M)
+_EXPORT_DEFAULT_DECLARATION = re.compile(r"^([ \t]*)export\s+default\s+(?=(?:async\s+)?function\s*\*?\s*[A-Za-z_$]|class\s+[A-Za-z_$])", re.M)
+_EXPORT_DEFAULT_EXPRESSION = re.compile(r"^([ \t]*)export\s+default\s+", re.M)
+_EXPORT_DECLARATION = re.compile(r"^([ \t]*)export\s+(?=const\b|let\b|var\b|function\b|async\b|class\b)", re.M)
+_WRAPPER_TAGS = re.compile(r"<html[^>]*>|</html>|<head[^>]*>|</head>|<body[^>]*>|</body>", re.I)
+_HEAD = re.compile(r"<head[^>]*>(.*?)</head>", re.I | re.S)
+_BODY = re.compile(r"<body[^>]*>(.*?)</body>", re.I | re.S)
+_REMOTE_LINK = re.compile(r"<link\b[^>]*\bhref=[\"']https?://[^>]*>", re.I)
+_REMOTE_SCRIPT = re.compile(r"<script\b[^>]*\bsrc=[\"']https?://[^\"']+[\"'][^>]*>\s*</script>", re.I)
+_LOCAL_SCRIPT = re.compile(r"<script\b[^>]*\bsrc=[\"'](?!https?://)[^\"']*[\"'][^>]*>\s*</script>", re.I)
+
+
+def _blank_lines(match: re.Match) -> str:
+    # Lignes conservées (vides) pour garder la numérotation du fichier source
+    return "\n" * match.group().count("\n")
+
+
+def strip_module_syntax(code: str) -> str:
+    """
+    Code d'un module ES exécutable comme script classique: imports
+    supprimés, `export` retiré des déclarations, `export default <expr>`
+    assigné à DefaultExport
+    """
+    code = _IMPORT.sub(_blank_lines, code)
+    code = _EXPORT_LIST.sub(_blank_lines, code)
+    code = _EXPORT_DEFAULT_NAME.sub(_blank_lines, code)
+    code = _EXPORT_DEFAULT_DECLARATION.sub(r"\1", code)
+    code = _EXPORT_DEFAULT_EXPRESSION.sub(r"\1const DefaultExport = ", code)
+    return _EXPORT_DECLARATION.sub(r"\1", code)
+
+
+def hooks_prelude(code: str) -> str:
+    """
+    `const { useState, ... } = React;` pour les hooks utilisés sans être
+    déclarés par le code (imports nommés de 'react' supprimés)
+    """
+    hooks = []
+    for hook in REACT_HOOKS:
+        if not re.search(rf"\b{hook}\b", code):
+            continue
+        declared = re.search(rf"(?:const|let|var)\s*\{{[^}}]*\b{hook}\b[^}}]*\}}\s*=", code) or \
+            re.search(rf"(?:const|let|var|function)\s+{hook}\b", code)
+        if not declared:
+            hooks.append(hook)
+    return f"const {{ {', '.join(hooks)} }} = React;" if hooks else ""
+
+
+def _inline_script(code: str) -> str:
+    # "</script" dans une chaîne JS fermerait la balise <script>
+    return re.sub(r"</(script)", r"<\\/\1", code, flags=re.I)
+
+
+MOUNT_SCRIPT = """(function () {
+        const root = ReactDOM.createRoot(document.getElementById('root'));
+        const Component = typeof App !== 'undefined' ? App
+            : typeof ProjectManagementApp !== 'undefined' ? ProjectManagementApp
+            : typeof DefaultExport !== 'undefined' ? DefaultExport
+            : null;
+        if (Component) {
+            root.render(React.createElement(Component));
+        } else {
+            root.render(React.createElement('div', { style: { padding: '40px', fontFamily: 'Arial, sans-serif' } },
+                React.createElement('h1', { style: { color: '#333' } }, 'Application générée'),
+                React.createElement('p', null, 'Le composant React a été généré avec succès.')
+            ));
+        }
+    })();"""
+
+
+@dataclass
+class PreviewBuild:
+    """Page d'aperçu assemblée"""
+    html: str
+    compiled: bool  # False: JSX non compilable, transpilé par Babel dans le navigateur
+    error: Optional[str] = None
+
+
+def _page(title: str, css: str, head: str, body: str) -> str:
+    return f"""<!DOCTYPE html>
+<html lang="fr">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>Aperçu - {html.escape(title)}</title>
+{head}
+    <style>
+    {css}
+    </style>
+</head>
+<body>
+{body}
+</body>
+</html>
+"""
+
+
+def build_react_preview(title: str, react_code: str, css: str = "") -> PreviewBuild:
+    """Page qui monte le composant React, JSX compilé côté serveur"""
+    code = strip_module_syntax(react_code)
+    prelude = hooks_prelude(code)
+    try:
+        compiled = compile_jsx(code)
+    except JSXCompileError as e:
+        # Repli: le navigateur transpile (et affiche l'erreur dans sa console)
+        logger.warning(f"Aperçu: JSX non compilé ({e}), repli sur Babel")
+        body = f"""    <div id="root"></div>
+    <script type="text/babel">
+    {prelude}
+{_inline_script(code)}
+
+    {MOUNT_SCRIPT}
+    </script>"""
+        return PreviewBuild(_page(title, css, REACT_SCRIPTS + "\n" + BABEL_SCRIPT, body), compiled=False, error=str(e))
+
+    body = f"""    <div id="root"></div>
+    <script>
+    {prelude}
+{_inline_script(compiled)}
+
+    {MOUNT_SCRIPT}
+    </script>"""
+    return PreviewBuild(_page(title, css, REACT_SCRIPTS, body), compiled=True)
+
+
+def build_static_preview(title: str, html_code: str, css: str = "", js: str = "") -> PreviewBuild:
+    """Page HTML/CSS/JS classique (balises html/head/body du code retirées)"""
+    content = _WRAPPER_TAGS.sub("", html_code) if html_code else \
+        '<div style="padding: 20px;"><h1>Application générée</h1><p>Contenu en cours de génération...</p></div>'
+    body = f"""    {content}
+    <script>
+    {_inline_script(js)}
+    </script>"""
+    return PreviewBuild(_page(title, css, "", body), compiled=True)
+
+
+def _index_html(files: Dict[str, str], entry: str) -> str:
+    """index.html du projet (celui le plus proche du point d'entrée)"""
+    pages = [path for path in files if posixpath.basename(path) == "index.html"]
+    if not pages:
+        return ""
+    root = entry.split("src/")[0]
+    return files[min(pages, key=lambda path: (not path.startswith(root), path.count("/")))] or ""
+
+
+def build_bundle_preview(title: str, bundle: Bundle, files: Dict[str, str], css: str = "") -> PreviewBuild:
+    """Page d'un projet multi-fichiers: index.html du projet + bundle inline"""
+    index_html = _index_html(files, bundle.entry)
+    head_match = _HEAD.search(index_html)
+    body_match = _BODY.search(index_html)
+
+    # Ressources distantes de index.html (polices, CDN) conservées
+    head = [REACT_SCRIPTS]
+    if head_match:
+        head.extend(f"    {tag}" for tag in _REMOTE_LINK.findall(head_match.group(1)))
+        head.extend(f"    {tag}" for tag in _REMOTE_SCRIPT.findall(head_match.group(1)))
+    head.extend(f'    <link rel="stylesheet" href="{html.escape(url)}">' for url in bundle.stylesheets)
+    styles = bundle.css or css
+    if "@tailwind" in styles and "cdn.tailwindcss.com" not in index_html:
+        head.append(TAILWIND_SCRIPT)
+
+    content = _LOCAL_SCRIPT.sub("", body_match.group(1)).strip() if body_match else ""
+    if 'id="root"' not in content and "id='root'" not in content:
+        content = f'{content}\n    <div id="root"></div>'.strip()
+    body = f"""    {content}
+    <script>
+{_inline_script(bundle.script)}
+    </script>"""
+    return PreviewBuild(_page(title, styles, "\n".join(head), body), compiled=True)
+
+
+def build_preview(title: str, generated_app: Dict[str, Any]) -> PreviewBuild:
+    """
+    Aperçu d'une application générée: bundle de all_files pour les projets
+    React multi-fichiers, sinon react_code seul, sinon HTML/CSS/JS
+    """
+    html_code = generated_app.get("html_code") or ""
+    css = generated_app.get("css_code") or ""
+    react_code = generated_app.get("react_code") or ""
+    all_files = generated_app.get("all_files") or {}
+
+    error = None
+    if all_files and (react_code or not html_code):
+        try:
+            bundle = bundle_project(all_files)
+        except BundleError as e:
+            logger.warning(f"Aperçu: bundle impossible ({e}), repli sur react_code")
+            bundle, error = None, str(e)
+        if bundle is not None:
+            return build_bundle_preview(title, bundle, all_files, css)
+
+    if not html_code and react_code:
+        build = build_react_preview(title, react_code, css)
+    else:
+        build = build_static_preview(title, html_code, css, generated_app.get("js_code") or "")
+    build.error = build.error or error
+    return build
+
+
+def preview_key(hashes: Dict[str, str], **options: Any) -> str:
+    """
+    Clé de cache d'un aperçu: hash des contenus (manifeste chemin -> hash),
+    des options de la page et du format
+    """
+    payload = json.dumps(
+        {"manifest": hashes, "options": options, "format": PREVIEW_FORMAT},
+        sort_keys=True, default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class PreviewCache:
+    """
+    Aperçus déjà assemblés (collection preview_builds, _id = preview_key)
+
+    Un cache mémoire borné en octets est consulté d'abord: un aperçu déjà
+    ouvert ne coûte aucune lecture supplémentaire.
+    """
+
+    def __init__(
+        self,
+        db,
+        ttl_seconds: int = PREVIEW_CACHE_TTL_SECONDS,
+        memory_max_bytes: int = PREVIEW_MEMORY_CACHE_BYTES
+    ):
+        self.db = db
+        self.ttl_seconds = ttl_seconds
+        self.memory_max_bytes = memory_max_bytes
+        self._memory: "OrderedDict[str, str]" = OrderedDict()
+        self._memory_bytes = 0
+
+    @property
+    def builds(self):
+        return self.db.preview_builds
+
+    async def ensure_indexes(self):
+        await self.builds.create_index("expires_at", expireAfterSeconds=0)
+
+    def _remember(self, key: str, page: str):
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            return
+        self._memory[key] = page
+        self._memory_bytes += len(page)
+        while self._memory_bytes > self.memory_max_bytes and self._memory:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+
+    async def get(self, key: str) -> Optional[str]:
+        page = self._memory.get(key)
+        if page is not None:
+            self._memory.move_to_end(key)
+            return page
+        document = await self.builds.find_one({"_id": key}, {"html": 1})
+        if not document:
+            return None
+        self._remember(key, document["html"])
+        return document["html"]
+
+    async def put(self, key: str, build: PreviewBuild, project_id: Optional[str] = None):
+        self._remember(key, build.html)
+        now = datetime.utcnow()
+        await self.builds.replace_one(
+            {"_id": key},
+            {
+                "html": build.html,
+                "compiled": build.compiled,
+                "error": build.error,
+                "project_id": project_id,
+                "created_at": now,
+                "expires_at": now + timedelta(seconds=self.ttl_seconds),
+            },
+            upsert=True
+        )
+
+
+__all__ = [
+    'PreviewBuild',
+    'PreviewCache',
+    'build_preview',
+    'build_bundle_preview',
+    'build_react_preview',
+    'build_static_preview',
+    'preview_key',
+    'strip_module_syntax',
+    'hooks_prelude',
+    'PREVIEW_FORMAT',
+]
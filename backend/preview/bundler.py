@@ -0,0 +1,632 @@
+"""
+VECTORT.IO - BUNDLER D'APERÇU
+Assemble un projet multi-fichiers (all_files) en un seul script: le graphe
+d'imports est parcouru depuis le point d'entrée, les chemins relatifs sont
+résolus, chaque module est enregistré dans un petit registre (ordre
+topologique) et les CSS importés sont injectés dans la page
+"""
+
+import json
+import posixpath
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
+from urllib.parse import quote
+
+from preview.jsx import compile_jsx
+from validators.syntax import _EXPRESSION_KEYWORDS, _JS_TOKEN, _REGEX_LITERAL, _TEMPLATE_CHUNK
+
+SCRIPT_EXTENSIONS = (".jsx", ".js", ".mjs")
+RESOLVE_EXTENSIONS = (".jsx", ".js", ".mjs", ".json", ".css")
+# Demanderaient un vrai compilateur (types TS, SFC Vue/Svelte)
+UNSUPPORTED_EXTENSIONS = (".ts", ".tsx", ".vue", ".svelte")
+
+ENTRY_CANDIDATES = (
+    "src/main.jsx", "src/index.jsx", "src/main.js", "src/index.js",
+    "main.jsx", "index.jsx", "src/App.jsx", "src/App.js", "App.jsx",
+)
+
+# Paquets servis par les scripts UMD de la page
+GLOBAL_PACKAGES = {
+    "react": "React",
+    "react-dom": "ReactDOM",
+    "react-dom/client": "ReactDOM",
+    "axios": "axios",
+}
+
+# Début d'instruction: début de ligne ou après un point-virgule
+_IMPORT_FROM = re.compile(
+    r"(?:^|(?<=;))([ \t]*)import\s+(?!type\b)([\w$*{}\s,]+?)\s*from\s*(['\"])([^'\"\n]+)\3[ \t]*;?", re.M
+)
+_IMPORT_SIDE_EFFECT = re.compile(r"(?:^|(?<=;))([ \t]*)import\s*(['\"])([^'\"\n]+)\2[ \t]*;?", re.M)
+_IMPORT_DYNAMIC = re.compile(r"\bimport\s*\(\s*(['\"])([^'\"\n]+)\1\s*\)")
+_IMPORT_META_ENV = re.compile(r"\bimport\.meta\.env\b")
+_IMPORT_META = re.compile(r"\bimport\.meta\b")
+_EXPORT_FROM = re.compile(
+    r"(?:^|(?<=;))([ \t]*)export\s*(\*(?:\s*as\s+[\w$]+)?|\{[^}]*\})\s*from\s*(['\"])([^'\"\n]+)\3[ \t]*;?", re.M
+)
+_EXPORT_LIST = re.compile(r"(?:^|(?<=;))([ \t]*)export\s*\{([^}]*)\}[ \t]*;?", re.M)
+_EXPORT_DEFAULT_DECLARATION = re.compile(
+    r"(?:^|(?<=;))([ \t]*)export\s+default\s+(?=(?:async\s+)?function\s*\*?\s*([A-Za-z_$][\w$]*)|class\s+([A-Za-z_$][\w$]*))",
+    re.M
+)
+_EXPORT_DEFAULT = re.compile(r"(?:^|(?<=;))([ \t]*)export\s+default\s+", re.M)
+_EXPORT_DECLARATION = re.compile(
+    r"(?:^|(?<=;))([ \t]*)export\s+(?=(?:async\s+)?function\s*\*?\s*([A-Za-z_$][\w$]*)|class\s+([A-Za-z_$][\w$]*)"
+    r"|(?:const|let|var)\s+(?:([A-Za-z_$][\w$]*)|\{([^}]*)\}|\[([^\]]*)\]))",
+    re.M
+)
+_CSS_IMPORT = re.compile(r"@import\s+(?:url\(\s*)?(['\"])([^'\"]+)\1\s*\)?[^;]*;")
+_MOUNTS = re.compile(r"\bcreateRoot\s*\(|\bReactDOM\.render\s*\(|\bhydrateRoot\s*\(")
+_MODULE_SCRIPT = re.compile(r"<script\b[^>]*\btype=[\"']module[\"'][^>]*\bsrc=[\"']([^\"']+)[\"']", re.I)
+
+# Registre de modules, chargé avant les modules du projet
+RUNTIME = r"""var __vectort = (function () {
+    var definitions = {}, cache = {};
+    window.process = window.process || { env: { NODE_ENV: 'production' } };
+    function placeholder(props) {
+        return props && props.children !== undefined ? React.createElement(React.Fragment, null, props.children) : null;
+    }
+    function stub(name) {
+        console.warn('[aperçu] module non disponible: ' + name);
+        return new Proxy({}, { get: function (target, key) { return key === '__esModule' ? false : placeholder; } });
+    }
+    function router() {
+        var h = React.createElement;
+        var Location = React.createContext({ path: '/', navigate: function () {} });
+        var OutletContext = React.createContext(null);
+        function Router(props) {
+            var state = React.useState('/');
+            var navigate = function (to) { if (typeof to === 'string') state[1](to); };
+            return h(Location.Provider, { value: { path: state[0], navigate: navigate } }, props.children);
+        }
+        function join(base, path) {
+            if (path && path[0] === '/') return path;
+            return (base.replace(/\/$/, '') + '/' + (path || '')).replace(/\/+$/, '') || '/';
+        }
+        function matches(pattern, path) {
+            var expected = pattern.replace(/\/+$/, '').split('/'), actual = path.replace(/\/+$/, '').split('/');
+            var wildcard = expected[expected.length - 1] === '*';
+            if (wildcard) expected.pop();
+            if (wildcard ? actual.length < expected.length : actual.length !== expected.length) return false;
+            return expected.every(function (segment, i) { return segment[0] === ':' || segment === actual[i]; });
+        }
+        function select(children, path, base) {
+            var result = null, fallback = null;
+            React.Children.forEach(children, function (route) {
+                if (result || !route || !route.props) return;
+                var props = route.props, full = props.index ? base : join(base, props.path);
+                if (props.path === '*') { fallback = props.element; return; }
+                if (props.children) {
+                    var inner = select(props.children, path, full);
+                    if (inner || (props.path !== undefined && matches(full, path))) {
+                        result = h(OutletContext.Provider, { value: inner }, props.element !== undefined ? props.element : inner);
+                    }
+                    return;
+                }
+                if ((props.index || props.path !== undefined) && matches(full, path)) result = props.element || null;
+            });
+            return result || fallback;
+        }
+        function Routes(props) { return select(props.children, React.useContext(Location).path, '/'); }
+        function Link(props) {
+            var location = React.useContext(Location), attributes = {}, active = location.path === props.to;
+            for (var key in props) if (['to', 'replace', 'end', 'state'].indexOf(key) < 0) attributes[key] = props[key];
+            if (typeof props.className === 'function') attributes.className = props.className({ isActive: active });
+            if (typeof props.style === 'function') attributes.style = props.style({ isActive: active });
+            attributes.href = typeof props.to === 'string' ? props.to : '#';
+            attributes.onClick = function (event) {
+                event.preventDefault();
+                location.navigate(props.to);
+                if (props.onClick) props.onClick(event);
+            };
+            var children = typeof props.children === 'function' ? props.children({ isActive: active }) : props.children;
+            return h('a', attributes, children);
+        }
+        function Navigate(props) {
+            var location = React.useContext(Location);
+            React.useEffect(function () { location.navigate(props.to); }, [props.to]);
+            return null;
+        }
+        return {
+            BrowserRouter: Router, HashRouter: Router, MemoryRouter: Router, Router: Router,
+            Routes: Routes, Route: function () { return null; }, Link: Link, NavLink: Link, Navigate: Navigate,
+            Outlet: function () { return React.useContext(OutletContext); },
+            useNavigate: function () { return React.useContext(Location).navigate; },
+            useLocation: function () { return { pathname: React.useContext(Location).path, search: '', hash: '', state: null }; },
+            useParams: function () { return {}; },
+            useSearchParams: function () { return [new URLSearchParams(), function () {}]; }
+        };
+    }
+    var shims = { 'react-router-dom': router, 'react-router': router };
+    var globals = __GLOBALS__;
+    function require(id) {
+        if (cache[id]) return cache[id].exports;
+        var module = cache[id] = { exports: {} };
+        if (definitions[id]) definitions[id](module, module.exports);
+        else module.exports = globals[id] ? window[globals[id]] : shims[id] ? shims[id]() : stub(id);
+        return module.exports;
+    }
+    function interop(module) {
+        return module && Object.prototype.hasOwnProperty.call(module, 'default') ? module['default'] : module;
+    }
+    function exports(target, getters) {
+        for (var key in getters) Object.defineProperty(target, key, { get: getters[key], enumerable: true });
+    }
+    function exportStar(target, source) {
+        Object.keys(source).forEach(function (key) {
+            if (key !== 'default' && !Object.prototype.hasOwnProperty.call(target, key)) {
+                Object.defineProperty(target, key, { get: function () { return source[key]; }, enumerable: true });
+            }
+        });
+    }
+    function fail(error) {
+        console.error(error);
+        var root = document.getElementById('root') || document.body;
+        root.innerHTML = '';
+        var pre = document.createElement('pre');
+        pre.style.cssText = 'margin:16px;padding:16px;background:#fee;color:#900;white-space:pre-wrap;font:13px monospace';
+        pre.textContent = String(error && error.stack || error);
+        root.appendChild(pre);
+    }
+    function start(entry, mounts) {
+        try {
+            var module = require(entry);
+            if (mounts) return;
+            var Component = interop(module) || module.App;
+            var container = document.getElementById('root');
+            if (typeof Component === 'function' || (Component && Component.$$typeof)) {
+                ReactDOM.createRoot(container).render(React.createElement(Component));
+            }
+        } catch (error) {
+            fail(error);
+        }
+    }
+    window.addEventListener('error', function (event) { if (event.error) fail(event.error); });
+    return {
+        define: function (id, factory) { definitions[id] = factory; },
+        require: require, interop: interop, exports: exports, exportStar: exportStar, start: start,
+        env: { MODE: 'production', PROD: true, DEV: false, BASE_URL: '/' },
+        meta: { env: { MODE: 'production', PROD: true, DEV: false, BASE_URL: '/' }, url: location.href }
+    };
+})();"""
+
+
+class BundleError(ValueError):
+    """Projet impossible à assembler (fichier non supporté, JSX invalide...)"""
+
+
+@dataclass
+class Bundle:
+    """Script assemblé d'un projet multi-fichiers"""
+    entry: str
+    script: str
+    css: str
+    modules: List[str] = field(default_factory=list)  # ordre topologique
+    stylesheets: List[str] = field(default_factory=list)  # CSS de paquets npm (CDN)
+    externals: List[str] = field(default_factory=list)
+
+
+def _literal(value: str) -> str:
+    return json.dumps(value, ensure_ascii=False)
+
+
+def _padding(text: str, replacement: str) -> str:
+    # Même nombre de lignes qu'avant la réécriture
+    return "\n" * max(text.count("\n") - replacement.count("\n"), 0)
+
+
+def _binding_names(pattern: str) -> List[str]:
+    """Noms liés par un motif de déstructuration simple ({ a, b: c, ...d } / [a, b])"""
+    names = []
+    for item in pattern.split(","):
+        item = item.split("=")[0].strip()
+        if ":" in item:
+            item = item.split(":")[1].strip()
+        item = item.lstrip(".").strip()
+        if re.fullmatch(r"[A-Za-z_$][\w$]*", item):
+            names.append(item)
+    return names
+
+
+def _specifiers(clause: str) -> List[Tuple[str, str]]:
+    """`a, b as c` -> [(a, a), (b, c)] (nom importé, nom local)"""
+    pairs = []
+    for item in clause.split(","):
+        parts = item.split()
+        if len(parts) == 1:
+            pairs.append((parts[0], parts[0]))
+        elif len(parts) == 3 and parts[1] == "as":
+            pairs.append((parts[0], parts[2]))
+    return pairs
+
+
+def _property(name: str) -> str:
+    return name if re.fullmatch(r"[A-Za-z_$][\w$]*", name) else _literal(name)
+
+
+def _next_significant(code: str, pos: int) -> str:
+    """Premier caractère après pos hors espaces et commentaires"""
+    while pos < len(code):
+        match = _JS_TOKEN.match(code, pos)
+        if not match or match.lastgroup not in ("space", "comment"):
+            return code[pos]
+        pos = match.end()
+    return ""
+
+
+def _live_bindings(code: str, bindings: Dict[str, str]) -> str:
+    """
+    Remplace chaque référence à une liaison importée par sa lecture sur le
+    module (`CONFIG` -> `__import1.CONFIG`): comme en ESM, la valeur est lue
+    à l'usage, pas à la définition du module, et les cycles se résolvent
+
+    Même lexique que la compilation JSX (chaînes, templates, regex et
+    commentaires intacts); les accès `x.CONFIG`, les clés `{ CONFIG: ... }`
+    sont laissés tels quels et un raccourci `{ CONFIG }` devient
+    `{ CONFIG: __import1.CONFIG }`. Les paramètres ou variables locales qui
+    masquent un import ne sont pas détectés.
+    """
+    output: List[str] = []
+    copied = pos = 0
+    length = len(code)
+    stack: List[str] = []  # "{", "(", "[" ou "${" (expression de template)
+    previous = ""
+    expression_start = True
+
+    while pos < length:
+        char = code[pos]
+
+        if char == "`" or (char == "}" and stack and stack[-1] == "${"):
+            if char == "}":
+                stack.pop()
+            pos = _TEMPLATE_CHUNK.match(code, pos + 1).end()
+            if pos >= length:
+                break
+            if code[pos] == "`":
+                pos += 1
+                previous, expression_start = "`", False
+            else:
+                stack.append("${")
+                pos += 2
+                previous, expression_start = "${", True
+            continue
+        if char in "{([":
+            stack.append(char)
+            pos += 1
+            previous, expression_start = char, True
+            continue
+        if char in "})]":
+            if stack:
+                stack.pop()
+            pos += 1
+            previous, expression_start = char, False
+            continue
+        if char == "/" and not code.startswith(("//", "/*"), pos):
+            match = _REGEX_LITERAL.match(code, pos) if expression_start else None
+            pos = match.end() if match else pos + 1
+            previous, expression_start = ("/regex", False) if match else ("/", True)
+            continue
+
+        match = _JS_TOKEN.match(code, pos)
+        if not match:
+            pos += 1
+            continue
+        kind, token = match.lastgroup, match.group()
+        if kind == "name":
+            if token in bindings and previous not in (".", "?."):
+                following = _next_significant(code, match.end())
+                member = stack and stack[-1] == "{" and previous in ("{", ",")
+                if not (member and following == ":"):
+                    replacement = bindings[token]
+                    if member and following in (",", "}"):
+                        replacement = f"{token}: {replacement}"
+                    output.append(code[copied:pos])
+                    output.append(replacement)
+                    copied = match.end()
+            previous, expression_start = token, token in _EXPRESSION_KEYWORDS
+        elif kind in ("number", "string"):
+            previous, expression_start = token, False
+        elif kind == "punct":
+            previous, expression_start = token, not token.endswith(("++", "--"))
+        pos = match.end()
+
+    output.append(code[copied:])
+    return "".join(output)
+
+
+def is_local_specifier(specifier: str) -> bool:
+    return specifier.startswith((".", "/", "@/", "~/"))
+
+
+def find_entry(files: Dict[str, str]) -> Optional[str]:
+    """
+    Point d'entrée: script module de index.html (Vite), sinon les noms
+    usuels (src/main.jsx, src/index.js, src/App.jsx...)
+    """
+    for path in sorted(files, key=lambda p: p.count("/")):
+        if posixpath.basename(path) != "index.html":
+            continue
+        match = _MODULE_SCRIPT.search(files[path] or "")
+        if match:
+            source = match.group(1)
+            base = posixpath.dirname(path)
+            candidate = posixpath.normpath(posixpath.join(base, source.lstrip("/")))
+            if candidate in files:
+                return candidate
+
+    for candidate in ENTRY_CANDIDATES:
+        matches = [path for path in files if path == candidate or path.endswith("/" + candidate)]
+        if matches:
+            return min(matches, key=len)
+    return None
+
+
+class PreviewBundler:
+    """
+    Bundler d'un projet en mémoire
+
+    Chaque module devient `__vectort.define(id, function (module, exports) {...})`;
+    les exports sont des getters et les imports nommés des lectures sur le
+    module importé à chaque usage (liaisons vivantes: cycles tolérés). Les paquets npm sont servis par les
+    globales UMD (React, ReactDOM, axios), un shim (react-router-dom) ou un
+    module factice qui rend ses enfants.
+    """
+
+    def __init__(self, files: Dict[str, str]):
+        self.files = files
+
+    def _root(self, entry: str) -> str:
+        """Racine du projet (dossier qui contient src/)"""
+        if "/src/" in f"/{entry}":
+            return f"/{entry}".split("/src/")[0].lstrip("/")
+        return posixpath.dirname(entry)
+
+    def resolve(self, importer: str, specifier: str, root: str) -> Optional[str]:
+        """Chemin du fichier importé (None: paquet npm ou fichier absent)"""
+        if specifier.startswith((".", "/")) and not specifier.startswith("//"):
+            if specifier.startswith("/"):
+                base = posixpath.join(root, specifier.lstrip("/"))
+            else:
+                base = posixpath.join(posixpath.dirname(importer), specifier)
+        elif specifier.startswith(("@/", "~/")):
+            base = posixpath.join(root, "src", specifier[2:])
+        else:
+            return None
+        base = posixpath.normpath(base).lstrip("/")
+        candidates = [base] + [base + extension for extension in RESOLVE_EXTENSIONS] + \
+            [posixpath.join(base, "index" + extension) for extension in RESOLVE_EXTENSIONS]
+        for candidate in candidates:
+            if candidate in self.files:
+                return candidate
+        return None
+
+    def bundle(self, entry: str) -> Bundle:
+        """
+        Raises:
+            BundleError: fichier non supporté dans le graphe, JSX invalide
+        """
+        root = self._root(entry)
+        order: List[str] = []
+        visiting: Set[str] = set()
+        modules: Dict[str, str] = {}
+        css_parts: List[str] = []
+        stylesheets: List[str] = []
+        externals: Set[str] = set()
+
+        def visit(path: str):
+            if path in modules or path in visiting:
+                return  # Cycle: résolu à l'exécution par le registre
+            visiting.add(path)
+            code, dependencies = self.transform(path, root, css_parts, stylesheets, externals)
+            for dependency in dependencies:
+                visit(dependency)
+            visiting.discard(path)
+            modules[path] = code
+            order.append(path)
+
+        visit(entry)
+
+        defines = "\n".join(
+            f"__vectort.define({_literal(path)}, function (module, exports) {{{modules[path]}\n}});"
+            for path in order
+        )
+        mounts = bool(_MOUNTS.search(self.files.get(entry) or ""))
+        runtime = RUNTIME.replace("__GLOBALS__", json.dumps(GLOBAL_PACKAGES))
+        script = f"{runtime}\n{defines}\n__vectort.start({_literal(entry)}, {json.dumps(mounts)});"
+        return Bundle(
+            entry=entry,
+            script=script,
+            css="\n".join(css_parts),
+            modules=order,
+            stylesheets=stylesheets,
+            externals=sorted(externals),
+        )
+
+    def _inline_css(self, path: str, root: str, seen: Set[str]) -> str:
+        """CSS avec ses @import locaux inlinés"""
+        if path in seen:
+            return ""
+        seen.add(path)
+
+        def replace(match: re.Match) -> str:
+            target = self.resolve(path, match.group(2), root)
+            return self._inline_css(target, root, seen) if target else match.group()
+
+        return f"/* {path} */\n" + _CSS_IMPORT.sub(replace, self.files.get(path) or "")
+
+    def transform(
+        self,
+        path: str,
+        root: str,
+        css_parts: List[str],
+        stylesheets: List[str],
+        externals: Set[str]
+    ) -> Tuple[str, List[str]]:
+        """Corps de la fonction d'un module et ses dépendances locales (fichiers)"""
+        extension = posixpath.splitext(path)[1].lower()
+        source = self.files.get(path) or ""
+
+        if extension in UNSUPPORTED_EXTENSIONS:
+            raise BundleError(f"{path}: format non supporté par l'aperçu")
+        if extension == ".css":
+            css_parts.append(self._inline_css(path, root, set()))
+            return "", []
+        if extension == ".json":
+            try:
+                return f"\nmodule.exports = {json.dumps(json.loads(source), ensure_ascii=False)};", []
+            except ValueError as e:
+                raise BundleError(f"{path}: JSON invalide ({e})")
+        if extension == ".svg":
+            return f"\nmodule.exports = {{ default: {_literal('data:image/svg+xml;utf8,' + quote(source))} }};", []
+        if extension not in SCRIPT_EXTENSIONS:
+            # Images, polices...: leur chemin dans le projet
+            return f"\nmodule.exports = {{ default: {_literal('/' + path)} }};", []
+
+        try:
+            code = compile_jsx(source)
+        except ValueError as e:
+            raise BundleError(f"{path}: {e}")
+
+        dependencies: List[str] = []
+        getters: List[str] = []
+        counter = [0]
+        # Nom local d'un import -> lecture sur son module (réécrite à chaque usage)
+        bindings: Dict[str, str] = {}
+
+        def target(specifier: str) -> Optional[str]:
+            """Identifiant du module importé dans le registre"""
+            resolved = self.resolve(path, specifier, root)
+            if resolved:
+                dependencies.append(resolved)
+                return resolved
+            if specifier.endswith(".css"):
+                if not is_local_specifier(specifier):
+                    stylesheets.append(f"https://cdn.jsdelivr.net/npm/{specifier}")
+                return None
+            if not is_local_specifier(specifier):
+                externals.add(specifier.split("/")[0] if not specifier.startswith("@") else "/".join(specifier.split("/")[:2]))
+            return specifier
+
+        def variable() -> str:
+            counter[0] += 1
+            return f"__import{counter[0]}"
+
+        def import_from(match: re.Match) -> str:
+            indent, clause, _, specifier = match.groups()
+            module_id = target(specifier)
+            if module_id is None:
+                return _padding(match.group(), "")
+            name = variable()
+            statements = [f"const {name} = __vectort.require({_literal(module_id)});"]
+            clause = clause.strip()
+            named = re.search(r"\{([^}]*)\}", clause)
+            namespace = re.search(r"\*\s*as\s+([\w$]+)", clause)
+            default = re.match(r"([A-Za-z_$][\w$]*)\s*(?:,|$)", clause)
+            if default:
+                if module_id in self.files:
+                    # Module du projet: export par défaut lu à l'usage (cycles)
+                    bindings[default.group(1)] = f"__vectort.interop({name})"
+                else:
+                    statements.append(f"const {default.group(1)} = __vectort.interop({name});")
+            if namespace:
+                statements.append(f"const {namespace.group(1)} = {name};")
+            if named:
+                for imported, local in _specifiers(named.group(1)):
+                    access = f".{imported}" if _property(imported) == imported else f"[{_literal(imported)}]"
+                    bindings[local] = f"{name}{access}"
+            replacement = indent + " ".join(statements)
+            return replacement + _padding(match.group(), replacement)
+
+        def import_side_effect(match: re.Match) -> str:
+            indent, _, specifier = match.groups()
+            module_id = target(specifier)
+            if module_id is None:
+                return _padding(match.group(), "")
+            replacement = f"{indent}__vectort.require({_literal(module_id)});"
+            return replacement + _padding(match.group(), replacement)
+
+        def import_dynamic(match: re.Match) -> str:
+            module_id = target(match.group(2))
+            if module_id is None:
+                return "Promise.resolve({})"
+            return f"Promise.resolve().then(function () {{ return __vectort.require({_literal(module_id)}); }})"
+
+        def export_from(match: re.Match) -> str:
+            indent, clause, _, specifier = match.groups()
+            module_id = target(specifier) or specifier
+            name = variable()
+            replacement = f"{indent}const {name} = __vectort.require({_literal(module_id)});"
+            if clause.startswith("*"):
+                namespace = re.search(r"as\s+([\w$]+)", clause)
+                if namespace:
+                    getters.append(f"{_property(namespace.group(1))}: () => {name}")
+                else:
+                    replacement += f" __vectort.exportStar(exports, {name});"
+            else:
+                for imported, exported in _specifiers(clause.strip("{} \n")):
+                    getters.append(f"{_property(exported)}: () => {name}[{_literal(imported)}]")
+            return replacement + _padding(match.group(), replacement)
+
+        def export_list(match: re.Match) -> str:
+            for local, exported in _specifiers(match.group(2)):
+                getters.append(f"{_property(exported)}: () => {bindings.get(local, local)}")
+            return _padding(match.group(), "")
+
+        def export_default_declaration(match: re.Match) -> str:
+            getters.append(f"default: () => {match.group(2) or match.group(3)}")
+            return match.group(1)
+
+        def export_default(match: re.Match) -> str:
+            getters.append("default: () => __default")
+            return f"{match.group(1)}const __default = "
+
+        def export_declaration(match: re.Match) -> str:
+            names = [name for name in match.groups()[1:4] if name]
+            for pattern in match.groups()[4:]:
+                if pattern:
+                    names.extend(_binding_names(pattern))
+            for name in names:
+                getters.append(f"{name}: () => {name}")
+            return match.group(1)
+
+        code = _IMPORT_FROM.sub(import_from, code)
+        code = _IMPORT_SIDE_EFFECT.sub(import_side_effect, code)
+        code = _IMPORT_DYNAMIC.sub(import_dynamic, code)
+        code = _IMPORT_META_ENV.sub("__vectort.env", code)
+        code = _IMPORT_META.sub("__vectort.meta", code)
+        code = _EXPORT_FROM.sub(export_from, code)
+        code = _EXPORT_LIST.sub(export_list, code)
+        code = _EXPORT_DEFAULT_DECLARATION.sub(export_default_declaration, code)
+        code = _EXPORT_DEFAULT.sub(export_default, code)
+        code = _EXPORT_DECLARATION.sub(export_declaration, code)
+        if bindings:
+            code = _live_bindings(code, bindings)
+
+        # Getters en tête: les importeurs voient les exports même en cas de cycle
+        header = f"__vectort.exports(exports, {{ {', '.join(getters)} }});" if getters else ""
+        return f"{header}\n{code}", list(dict.fromkeys(dependencies))
+
+
+def bundle_project(files: Dict[str, str], entry: Optional[str] = None) -> Optional[Bundle]:
+    """
+    Bundle d'un projet React multi-fichiers, None sans point d'entrée
+
+    Raises:
+        BundleError: projet non assemblable (l'appelant se replie sur
+            l'aperçu react_code)
+    """
+    entry = entry or find_entry(files)
+    if entry is None:
+        return None
+    return PreviewBundler(files).bundle(entry)
+
+
+__all__ = [
+    'Bundle',
+    'BundleError',
+    'PreviewBundler',
+    'bundle_project',
+    'find_entry',
+    'GLOBAL_PACKAGES',
+]
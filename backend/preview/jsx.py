@@ -0,0 +1,315 @@
+"""
+VECTORT.IO - COMPILATION JSX
+Transforme le JSX en appels React.createElement (JS exécutable tel quel par
+le navigateur, sans Babel). Même lexique que le validateur JS: chaînes,
+templates, regex et commentaires sont recopiés sans être interprétés.
+"""
+
+import html
+import json
+import re
+from typing import List, Optional, Tuple
+
+from validators.syntax import (
+    SyntaxIssue,
+    _CLOSERS,
+    _EXPRESSION_KEYWORDS,
+    _JS_TOKEN,
+    _JSX_ATTRIBUTE,
+    _JSX_CLOSING,
+    _JSX_NAME,
+    _JSX_SPACE,
+    _JSX_STRING,
+    _JSX_TEXT,
+    _REGEX_LITERAL,
+    _TEMPLATE_CHUNK,
+    _TS_GENERIC,
+    _line_of,
+)
+
+_IDENTIFIER = re.compile(r"[A-Za-z_$][\w$]*")
+_COMMENTS = re.compile(r"/\*.*?\*/|//[^\n]*", re.S)
+_LINE_BREAK = re.compile(r"\r\n|\n|\r")
+
+
+class JSXCompileError(ValueError):
+    """JSX impossible à compiler (la ligne est celle du fichier source)"""
+
+    def __init__(self, issue: SyntaxIssue):
+        super().__init__(str(issue))
+        self.line = issue.line
+        self.message = issue.message
+
+
+def _clean_text(text: str) -> Optional[str]:
+    """
+    Texte entre balises selon les règles JSX: les lignes sont rognées, les
+    lignes vides supprimées, les lignes restantes jointes par une espace
+    """
+    lines = _LINE_BREAK.split(text)
+    last_non_empty = -1
+    for index, line in enumerate(lines):
+        if line.strip(" \t"):
+            last_non_empty = index
+
+    parts: List[str] = []
+    for index, line in enumerate(lines):
+        line = line.replace("\t", " ")
+        if index != 0:
+            line = line.lstrip(" ")
+        if index != len(lines) - 1:
+            line = line.rstrip(" ")
+        if line:
+            parts.append(line if index == last_non_empty else line + " ")
+    return html.unescape("".join(parts)) if parts else None
+
+
+def _literal(value: str) -> str:
+    return json.dumps(value, ensure_ascii=False)
+
+
+class _Compiler:
+    """
+    Recopie le code source en remplaçant chaque élément JSX par son appel
+    createElement; les sauts de ligne sont conservés pour que les numéros
+    de ligne des erreurs du navigateur correspondent au fichier source
+    """
+
+    def __init__(self, source: str, pragma: str, fragment: str):
+        self.source = source
+        self.pragma = pragma
+        self.fragment = fragment
+
+    def fail(self, pos: int, message: str):
+        raise JSXCompileError(SyntaxIssue(_line_of(self.source, pos), message))
+
+    def compile(self) -> str:
+        try:
+            output, _ = self.code(0, None, 0)
+        except RecursionError:
+            self.fail(0, "Imbrication trop profonde pour être compilée")
+        return output
+
+    def code(self, pos: int, opener: Optional[str], opener_pos: int) -> Tuple[str, int]:
+        """Code jusqu'au délimiteur fermant `opener` inclus (ou la fin si None)"""
+        source = self.source
+        length = len(source)
+        closer = _CLOSERS.get(opener)
+        expression_start = True
+        output: List[str] = []
+        copied = pos
+
+        while pos < length:
+            char = source[pos]
+
+            if char in "{([":
+                output.append(source[copied:pos + 1])
+                inner, pos = self.code(pos + 1, char, pos)
+                output.append(inner)
+                copied = pos
+                expression_start = char == "{"
+                continue
+            if char in "})]":
+                if char != closer:
+                    self.fail(pos, f"'{char}' inattendu")
+                output.append(source[copied:pos + 1])
+                return "".join(output), pos + 1
+            if char == "`":
+                output.append(source[copied:pos])
+                template, pos = self.template(pos)
+                output.append(template)
+                copied = pos
+                expression_start = False
+                continue
+            if char == "/" and not source.startswith(("//", "/*"), pos):
+                if expression_start:
+                    match = _REGEX_LITERAL.match(source, pos)
+                    if match:
+                        pos = match.end()
+                        expression_start = False
+                        continue
+                pos += 1
+                expression_start = True
+                continue
+            if char == "<":
+                if (
+                    expression_start
+                    and (source.startswith("<>", pos) or _JSX_NAME.match(source, pos + 1))
+                    and not _TS_GENERIC.match(source, pos)
+                ):
+                    output.append(source[copied:pos])
+                    element, pos = self.element(pos)
+                    output.append(element)
+                    copied = pos
+                    expression_start = False
+                    continue
+                pos += 1
+                expression_start = True
+                continue
+
+            match = _JS_TOKEN.match(source, pos)
+            if not match:
+                if char in "'\"":
+                    self.fail(pos, f"Chaîne {char}...{char} non terminée")
+                if source.startswith("/*", pos):
+                    self.fail(pos, "Commentaire /* non terminé")
+                pos += 1
+                continue
+            kind = match.lastgroup
+            if kind == "name":
+                expression_start = match.group() in _EXPRESSION_KEYWORDS
+            elif kind in ("number", "string"):
+                expression_start = False
+            elif kind == "punct":
+                expression_start = not match.group().endswith(("++", "--"))
+            pos = match.end()
+
+        if opener is not None:
+            self.fail(opener_pos, f"'{opener}' jamais fermé")
+        output.append(source[copied:])
+        return "".join(output), pos
+
+    def template(self, start: int) -> Tuple[str, int]:
+        """Template literal à partir du '`' (les ${...} peuvent contenir du JSX)"""
+        source = self.source
+        output: List[str] = []
+        copied = start
+        pos = start + 1
+        while True:
+            pos = _TEMPLATE_CHUNK.match(source, pos).end()
+            if pos >= len(source):
+                self.fail(start, "Template literal `...` non terminé")
+            if source[pos] == "`":
+                output.append(source[copied:pos + 1])
+                return "".join(output), pos + 1
+            output.append(source[copied:pos + 2])
+            inner, pos = self.code(pos + 2, "{", pos + 1)
+            output.append(inner)
+            copied = pos
+
+    def expression(self, pos: int) -> Tuple[str, int]:
+        """Contenu d'un conteneur {...} (sans les accolades), compilé"""
+        inner, end = self.code(pos + 1, "{", pos)
+        return inner[:-1], end
+
+    def skip_space(self, pos: int) -> int:
+        return _JSX_SPACE.match(self.source, pos).end()
+
+    def tag(self, name: str) -> str:
+        if not name:
+            return self.fragment
+        # Balises HTML (minuscule, custom elements, namespaces) -> chaîne
+        if name[0].islower() and "." not in name or "-" in name or ":" in name:
+            return _literal(name)
+        return name
+
+    def element(self, start: int) -> Tuple[str, int]:
+        """Élément JSX complet à partir de '<': (appel createElement, position après)"""
+        source = self.source
+        length = len(source)
+        pos = start + 1
+        props: List[str] = []
+        children: List[str] = []
+        self_closing = False
+
+        if source[pos] == ">":
+            name = ""
+            pos += 1
+        else:
+            name = _JSX_NAME.match(source, pos).group()
+            pos += len(name)
+            while True:
+                pos = self.skip_space(pos)
+                if pos >= length:
+                    self.fail(start, f"Balise <{name}> non terminée")
+                if source.startswith("/>", pos):
+                    pos += 2
+                    self_closing = True
+                    break
+                char = source[pos]
+                if char == ">":
+                    pos += 1
+                    break
+                if char == "{":
+                    spread, pos = self.expression(pos)
+                    if not spread.strip().startswith("..."):
+                        self.fail(pos, f"Seul {{...objet}} est autorisé entre les attributs de <{name}>")
+                    props.append(spread.strip())
+                    continue
+                attribute = _JSX_ATTRIBUTE.match(source, pos)
+                if not attribute:
+                    self.fail(pos, f"Caractère '{char}' inattendu dans la balise <{name}>")
+                key = attribute.group()
+                key = key if _IDENTIFIER.fullmatch(key) else _literal(key)
+                pos = self.skip_space(attribute.end())
+                if pos >= length or source[pos] != "=":
+                    props.append(f"{key}: true")
+                    continue
+                pos = self.skip_space(pos + 1)
+                string = _JSX_STRING.match(source, pos)
+                if string:
+                    props.append(f"{key}: {_literal(html.unescape(string.group()[1:-1]))}")
+                    pos = string.end()
+                elif pos < length and source[pos] == "{":
+                    value, pos = self.expression(pos)
+                    if not _COMMENTS.sub("", value).strip():
+                        self.fail(pos, f"Valeur vide pour l'attribut {attribute.group()} de <{name}>")
+                    props.append(f"{key}: {value}")
+                elif pos < length and source[pos] == "<":
+                    value, pos = self.element(pos)
+                    props.append(f"{key}: {value}")
+                else:
+                    self.fail(pos, f"Valeur invalide pour l'attribut {attribute.group()} de <{name}>")
+
+        if not self_closing:
+            label = f"<{name}>" if name else "le fragment <>"
+            while True:
+                text_end = _JSX_TEXT.match(source, pos).end()
+                text = _clean_text(source[pos:text_end])
+                if text:
+                    children.append(_literal(text))
+                pos = text_end
+                if pos >= length:
+                    self.fail(start, f"{label} jamais fermé")
+                if source[pos] == "{":
+                    value, pos = self.expression(pos)
+                    if _COMMENTS.sub("", value).strip():
+                        children.append(value)
+                    continue
+                if source.startswith("</", pos):
+                    closing = _JSX_CLOSING.match(source, pos)
+                    if not closing:
+                        self.fail(pos, "Balise fermante malformée")
+                    if (closing.group(1) or "") != name:
+                        self.fail(pos, f"</{closing.group(1) or ''}> ne ferme pas {label} (ligne {_line_of(source, start)})")
+                    pos = closing.end()
+                    break
+                if source.startswith("<>", pos) or _JSX_NAME.match(source, pos + 1):
+                    child, pos = self.element(pos)
+                    children.append(child)
+                else:
+                    self.fail(pos, "'<' littéral dans du JSX (utiliser {'<'})")
+
+        arguments = [self.tag(name), "{" + ", ".join(props) + "}" if props else "null", *children]
+        call = f"{self.pragma}({', '.join(arguments)})"
+        # Même nombre de lignes que le JSX d'origine
+        missing_lines = source.count("\n", start, pos) - call.count("\n")
+        return call + "\n" * max(missing_lines, 0), pos
+
+
+def compile_jsx(source: str, pragma: str = "React.createElement", fragment: str = "React.Fragment") -> str:
+    """
+    Compile le JSX d'un fichier JS en appels `pragma(type, props, ...children)`
+
+    Le reste du code (imports, syntaxe ES2015+) est recopié à l'identique.
+
+    Raises:
+        JSXCompileError: JSX mal formé
+    """
+    return _Compiler(source, pragma, fragment).compile()
+
+
+__all__ = [
+    'compile_jsx',
+    'JSXCompileError',
+]
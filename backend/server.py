@@ -1,7 +1,8 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, status, Request
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, status, Request, Response, Query
 from fastapi.responses import StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from fastapi.responses import RedirectResponse
+from fastapi.responses import RedirectResponse, JSONResponse
+from fastapi.encoders import jsonable_encoder
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
@@ -43,6 +44,7 @@ from ai_generators.advanced_generator import (
     DatabaseType
 )
 from ai_generators.multi_llm_service import multi_llm_service
+from utils.llm_governor import llm_governor, set_llm_context
 from exporters.deployment_platforms import (
     vercel_deployment,
     netlify_deployment,
@@ -51,7 +53,7 @@ from exporters.deployment_platforms import (
     DeploymentResult
 )
 from fastapi import Request
-from typing import Dict
+from typing import Dict, Tuple
 
 
 ROOT_DIR = Path(__file__).parent
@@ -71,7 +73,12 @@ EMERGENT_LLM_KEY = os.environ.get('EMERGENT_LLM_KEY')
 STRIPE_API_KEY = os.environ.get('STRIPE_API_KEY')
 
 # MongoDB connection
-client = AsyncIOMotorClient(mongo_url)
+# Commandes MongoDB comptées par endpoint (utils.request_scope)
+from utils.request_scope import (
+    DBCallListener, request_scope, resolve_jwt_subject, get_user_document,
+    get_owned_project, invalidate_project,
+)
+client = AsyncIOMotorClient(mongo_url, event_listeners=[DBCallListener()])
 db = client[DB_NAME]
 
 # Password hashing - using sha256_crypt as fallback due to bcrypt issues
@@ -85,6 +92,69 @@ limiter = Limiter(key_func=get_remote_address)
 
 # Streaming Manager
 from streaming.streaming_system import streaming_manager
+from streaming.backplane import create_backplane
+
+# Generation cache (L1 in-process + L2 Mongo)
+from utils.cache import GenerationCache
+generation_cache = GenerationCache(db)
+
+# Contenus des fichiers générés, dédupliqués par SHA-256 (file_blobs)
+from utils.blob_store import (
+    BlobStore, content_size, dehydrate_app, hydrate_app, manifest_tree, persist_file_changes,
+    write_manifest_changes, CODE_FIELDS,
+)
+blob_store = BlobStore(db)
+# Mark-and-sweep des blobs orphelins (0: désactivé)
+BLOB_GC_INTERVAL_SECONDS = float(os.environ.get("BLOB_GC_INTERVAL_SECONDS", "86400"))
+
+# Historique des versions (deltas de hash, retour arrière sans appel LLM)
+from utils.version_store import VersionStore, diff_trees
+version_store = VersionStore(db)
+
+# Archives ZIP exportées, mises en cache par hash des contenus
+from exporters.zip_stream import ZipArchiveCache, archive_key, iter_bytes
+zip_archive_cache = ZipArchiveCache(db)
+ZIP_EXPORT_FORMAT = 1  # À incrémenter si ZipExporter change les fichiers ajoutés
+
+# Pages d'aperçu assemblées (JSX compilé côté serveur), cache par version
+from preview import PreviewCache, build_preview, preview_key
+preview_cache = PreviewCache(db)
+
+# Validation parallèle du code généré (cache par hash de contenu)
+from validators.engine import validation_engine
+
+# Clients HTTP sortants partagés (GitHub, Vercel, Netlify, OAuth...)
+from utils.http_clients import http_clients
+
+# Ledger de crédits: déductions atomiques + outbox credit_transactions
+from utils.credit_ledger import CreditLedger
+credit_ledger = CreditLedger(db)
+
+# File de jobs de génération persistée (generation_jobs) + worker pool
+from utils.job_queue import JobQueue, WorkerPool, JOB_SUCCEEDED
+generation_jobs = JobQueue(db)
+GENERATION_WORKER_CONCURRENCY = int(os.environ.get("GENERATION_WORKER_CONCURRENCY", "4"))
+# false: les jobs sont traités uniquement par generation_worker.py
+GENERATION_WORKERS_INPROCESS = os.environ.get("GENERATION_WORKERS_INPROCESS", "true").lower() == "true"
+
+# Single-flight: une seule exécution LLM par cache_key en cours
+from utils.single_flight import SingleFlight
+generation_flights = SingleFlight()
+
+# Tâches périodiques hors requête (un seul réplica leader via scheduler_leases):
+# apprentissage ML (résultats dans ml_insights) et nettoyage de file_blobs
+from ml import VectortAISystem
+from utils.scheduler import PeriodicScheduler
+ai_system = VectortAISystem(db, EMERGENT_LLM_KEY)
+periodic_scheduler = PeriodicScheduler(db)
+ML_SCHEDULER_ENABLED = os.environ.get("ML_SCHEDULER_ENABLED", "true").lower() == "true"
+ML_INSIGHTS_INTERVAL_SECONDS = float(os.environ.get("ML_INSIGHTS_INTERVAL_SECONDS", "3600"))
+ML_IMPROVEMENT_INTERVAL_SECONDS = float(os.environ.get("ML_IMPROVEMENT_INTERVAL_SECONDS", "21600"))
+if ML_SCHEDULER_ENABLED:
+    periodic_scheduler.add("ml_insights", ai_system.refresh_insights, interval=ML_INSIGHTS_INTERVAL_SECONDS, timeout=600)
+    periodic_scheduler.add("ml_improvement", ai_system.run_improvement_cycle, interval=ML_IMPROVEMENT_INTERVAL_SECONDS, timeout=900)
+if BLOB_GC_INTERVAL_SECONDS > 0:
+    periodic_scheduler.add("blob_gc", blob_store.collect_garbage, interval=BLOB_GC_INTERVAL_SECONDS, timeout=1800)
 
 # Create the main app without a prefix
 app = FastAPI(
@@ -114,11 +184,11 @@ async def add_sentry_context(request: Request, call_next):
         auth_header = request.headers.get("authorization")
         if auth_header and auth_header.startswith("Bearer "):
             token = auth_header.split(" ")[1]
-            payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
-            user_id = payload.get("sub")
+            user_id = resolve_jwt_subject(token, decode_access_token)
             
             if user_id:
-                user = await db.users.find_one({"id": user_id})
+                # Mémorisé dans le scope: get_current_user ne relira pas l'utilisateur
+                user = await get_user_document(db, user_id)
                 if user:
                     sentry_sdk.set_user({
                         "id": user.get("id"),
@@ -131,6 +201,18 @@ async def add_sentry_context(request: Request, call_next):
     response = await call_next(request)
     return response
 
+# Unit of work par requête (déclaré après le middleware Sentry pour l'englober)
+@app.middleware("http")
+async def request_unit_of_work(request: Request, call_next):
+    """Mémorise utilisateur/projet pour la requête et compte ses appels MongoDB"""
+    with request_scope() as scope:
+        try:
+            return await call_next(request)
+        finally:
+            route = request.scope.get("route")
+            scope.endpoint = f"{request.method} {route.path}" if route is not None else "unmatched"
+            scope.report()
+
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
 
@@ -226,6 +308,7 @@ class ChatMessage(BaseModel):
 class IterationRequest(BaseModel):
     instruction: str  # User's improvement request
     context: Optional[str] = None
+    mode: Optional[str] = None  # "patch" (blocs d'édition) ou "full" (code complet)
 
 class ProjectIterationResponse(BaseModel):
     success: bool
@@ -233,6 +316,9 @@ class ProjectIterationResponse(BaseModel):
     changes_made: List[str]
     explanation: str
     updated_code: Optional[Dict[str, str]] = None
+    mode: str = "full"
+    regenerated_files: List[str] = []  # Patch en conflit, fichier régénéré en entier
+    version: Optional[int] = None  # Version créée (voir /projects/{id}/versions)
 
 class Stats(BaseModel):
     users: str
@@ -282,6 +368,9 @@ class GeneratedApp(BaseModel):
     readme: Optional[str] = None
     deployment_config: Optional[dict] = None
     all_files: Optional[dict] = None  # Tous les fichiers générés
+    # CACHE: type de hit (exact, semantic) et score de similarité
+    cache_hit: Optional[str] = None
+    cache_score: Optional[float] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
 # Modèles pour le système de crédits et paiements
@@ -423,6 +512,9 @@ def create_access_token(data: dict):
     encoded_jwt = jwt.encode(to_encode, JWT_SECRET, algorithm=JWT_ALGORITHM)
     return encoded_jwt
 
+def decode_access_token(token: str) -> dict:
+    return jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -430,22 +522,99 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(credentials.credentials, JWT_SECRET, algorithms=[JWT_ALGORITHM])
-        user_id: str = payload.get("sub")
+        user_id = resolve_jwt_subject(credentials.credentials, decode_access_token)
         if user_id is None:
             raise credentials_exception
     except JWTError:
         raise credentials_exception
     
-    user = await db.users.find_one({"id": user_id})
+    user = await get_user_document(db, user_id)
     if user is None:
         raise credentials_exception
     return User(**user)
 
+# Comptes autorisés sur les endpoints d'administration (emails séparés par des virgules)
+ADMIN_EMAILS = {
+    email.strip().lower() for email in os.environ.get("ADMIN_EMAILS", "").split(",") if email.strip()
+}
+
+async def get_current_admin(current_user: User = Depends(get_current_user)) -> User:
+    if current_user.email.lower() not in ADMIN_EMAILS:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Réservé aux administrateurs"
+        )
+    return current_user
+
+# Champs d'un projet utiles aux listes et aux vérifications de propriété
+# (config, potentiellement volumineux, n'est chargé que par GET /projects/{id})
+PROJECT_SUMMARY_FIELDS = (
+    "id", "user_id", "title", "description", "type", "status",
+    "created_at", "updated_at", "repository_url", "deployment_url",
+)
+PROJECT_SUMMARY_PROJECTION = {"_id": 0, **{field: 1 for field in PROJECT_SUMMARY_FIELDS}}
+
+PROJECTS_PAGE_MAX = 1000
+
+def encode_project_cursor(project: dict) -> str:
+    """Curseur opaque de pagination (created_at, id) du dernier projet d'une page"""
+    raw = json.dumps({"c": project["created_at"].isoformat(), "i": project["id"]})
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_project_cursor(cursor: str) -> dict:
+    """Filtre keyset: projets strictement après le curseur (tri created_at, id décroissants)"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = json.loads(raw)
+        created_at = datetime.fromisoformat(data["c"])
+        project_id = str(data["i"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Curseur de pagination invalide")
+    return {"$or": [
+        {"created_at": {"$lt": created_at}},
+        {"created_at": created_at, "id": {"$lt": project_id}},
+    ]}
+
+async def record_app_version(project_id: str, stored_app: dict, source: str, message: str = "") -> Optional[int]:
+    """
+    Enregistre l'état complet d'un document dehydraté comme nouvelle version
+    (génération, régénération, cache) - l'historique ne bloque jamais la génération
+    """
+    try:
+        tree = manifest_tree(stored_app)
+        latest = await version_store.latest(project_id)
+        changes = diff_trees(await version_store.tree_at(project_id, latest["version"]) or {}, tree) if latest else tree
+        return await version_store.record(project_id, changes, source, message, tree=tree)
+    except Exception as e:
+        logger.error(f"❌ Version non enregistrée pour {project_id}: {e}")
+        return None
+
+async def load_generated_app(
+    project_id: str,
+    include_files: bool = True,
+    fields: Optional[set] = None
+) -> Optional[dict]:
+    """
+    Charge le code généré d'un projet, contenus résolus depuis file_blobs
+    
+    Args:
+        include_files: Résoudre aussi all_files (inutile pour une itération)
+        fields: Ne charger que ces champs de GeneratedApp (None = tous)
+    """
+    projection = None
+    if fields is not None:
+        projection = {"_id": 0, "file_manifest": 1}
+        projection.update({field: 1 for field in fields})
+        projection.update({f"code_manifest.{field}": 1 for field in fields if field in CODE_FIELDS})
+        include_files = include_files and "all_files" in fields
+    
+    document = await db.generated_apps.find_one({"project_id": project_id}, projection)
+    return await hydrate_app(blob_store, document, include_files=include_files)
+
 # Fonctions utilitaires pour la gestion des crédits
 async def get_user_credit_balance(user_id: str) -> CreditBalance:
     """Récupère le solde de crédits d'un utilisateur"""
-    user = await db.users.find_one({"id": user_id})
+    user = await get_user_document(db, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="Utilisateur non trouvé")
     
@@ -458,98 +627,18 @@ async def get_user_credit_balance(user_id: str) -> CreditBalance:
     )
 
 async def deduct_credits(user_id: str, amount: int, description: str, project_id: Optional[str] = None) -> bool:
-    """Déduit des crédits du compte utilisateur"""
-    user = await db.users.find_one({"id": user_id})
-    if not user:
-        return False
-    
-    total_credits = user.get("credits_total", 0.0)
-    if total_credits < amount:
-        return False
-    
-    # Déduire d'abord des crédits gratuits, puis mensuels, puis achetés
-    free_credits = user.get("credits_free", 0.0)
-    monthly_credits = user.get("credits_monthly", 0.0)
-    purchased_credits = user.get("credits_topup", 0.0)
-    
-    remaining = amount
-    
-    if free_credits >= remaining:
-        free_credits -= remaining
-        remaining = 0
-    elif free_credits > 0:
-        remaining -= free_credits
-        free_credits = 0
-    
-    if remaining > 0 and monthly_credits >= remaining:
-        monthly_credits -= remaining
-        remaining = 0
-    elif remaining > 0 and monthly_credits > 0:
-        remaining -= monthly_credits
-        monthly_credits = 0
-    
-    if remaining > 0:
-        purchased_credits -= remaining
-    
-    new_total = free_credits + monthly_credits + purchased_credits
-    
-    # Mettre à jour l'utilisateur
-    await db.users.update_one(
-        {"id": user_id},
-        {
-            "$set": {
-                "credits_free": free_credits,
-                "credits_monthly": monthly_credits,
-                "credits_topup": purchased_credits,
-                "credits_total": new_total,
-                "updated_at": datetime.utcnow()
-            }
-        }
-    )
-    
-    # Enregistrer la transaction
-    transaction = CreditTransaction(
-        user_id=user_id,
-        amount=-amount,
-        type="usage",
-        description=description,
-        project_id=project_id
-    )
-    await db.credit_transactions.insert_one(transaction.dict())
+    """
+    Déduit des crédits du compte utilisateur
     
-    return True
+    Gratuits d'abord, puis mensuels, puis achetés - en une seule mise à jour
+    conditionnelle (False si le solde est insuffisant)
+    """
+    balances = await credit_ledger.deduct(user_id, amount, description, project_id)
+    return balances is not None
 
 async def add_credits(user_id: str, amount: int, transaction_type: str, description: str) -> bool:
     """Ajoute des crédits au compte utilisateur"""
-    user = await db.users.find_one({"id": user_id})
-    if not user:
-        return False
-    
-    # Ajouter aux crédits achetés
-    purchased_credits = user.get("credits_topup", 0.0) + amount
-    total_credits = user.get("credits_free", 0.0) + user.get("credits_monthly", 0.0) + purchased_credits
-    
-    await db.users.update_one(
-        {"id": user_id},
-        {
-            "$set": {
-                "credits_topup": purchased_credits,
-                "credits_total": total_credits,
-                "updated_at": datetime.utcnow()
-            }
-        }
-    )
-    
-    # Enregistrer la transaction
-    transaction = CreditTransaction(
-        user_id=user_id,
-        amount=amount,
-        type=transaction_type,
-        description=description
-    )
-    await db.credit_transactions.insert_one(transaction.dict())
-    
-    return True
+    return await credit_ledger.credit(user_id, amount, transaction_type, description)
 
 async def generate_complete_multifile_project(request: GenerateAppRequest) -> dict:
     """
@@ -652,7 +741,8 @@ async def generate_app_code_advanced(request: GenerateAppRequest) -> dict:
                     description=request.description,
                     framework=request.framework or "react",
                     project_type=request.type,
-                    api_key=EMERGENT_LLM_KEY
+                    api_key=EMERGENT_LLM_KEY,
+                    guidance=await ai_system.generation_guidance()
                 )
                 
                 # Mapper les fichiers vers le format attendu
@@ -1152,7 +1242,8 @@ IMPORTANT:
 Réponds UNIQUEMENT avec le JSON demandé contenant le code COMPLET."""
         )
         
-        response = await chat.send_message(user_message)
+        async with llm_governor.slot():
+            response = await chat.send_message(user_message)
         
         # Parse JSON
         import json
@@ -1474,8 +1565,28 @@ async def apple_callback(request: Request):
 
 # Project routes
 @api_router.get("/projects", response_model=List[Project])
-async def get_projects(current_user: User = Depends(get_current_user)):
-    projects = await db.projects.find({"user_id": current_user.id}).sort("created_at", -1).to_list(1000)
+async def get_projects(
+    response: Response,
+    limit: int = Query(PROJECTS_PAGE_MAX, ge=1, le=PROJECTS_PAGE_MAX),
+    cursor: Optional[str] = None,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Projets de l'utilisateur, du plus récent au plus ancien
+    
+    Pagination keyset sur (created_at, id): passer l'en-tête X-Next-Cursor
+    de la réponse précédente dans `cursor` (absent sur la dernière page).
+    """
+    query = {"user_id": current_user.id}
+    if cursor:
+        query.update(decode_project_cursor(cursor))
+    
+    projects = await db.projects.find(query, PROJECT_SUMMARY_PROJECTION).sort(
+        [("created_at", -1), ("id", -1)]
+    ).limit(limit).to_list(limit)
+    
+    if len(projects) == limit:
+        response.headers["X-Next-Cursor"] = encode_project_cursor(projects[-1])
     return [Project(**project) for project in projects]
 
 @api_router.post("/projects", response_model=Project)
@@ -1491,7 +1602,7 @@ async def create_project(project_data: ProjectCreate, current_user: User = Depen
 
 @api_router.get("/projects/{project_id}", response_model=Project)
 async def get_project(project_id: str, current_user: User = Depends(get_current_user)):
-    project = await db.projects.find_one({"id": project_id, "user_id": current_user.id})
+    project = await db.projects.find_one({"id": project_id, "user_id": current_user.id}, {"_id": 0})
     if not project:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -1505,7 +1616,7 @@ async def update_project(
     project_data: ProjectUpdate, 
     current_user: User = Depends(get_current_user)
 ):
-    project = await db.projects.find_one({"id": project_id, "user_id": current_user.id})
+    project = await get_owned_project(db, project_id, current_user.id, PROJECT_SUMMARY_PROJECTION)
     if not project:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -1519,6 +1630,7 @@ async def update_project(
         {"id": project_id, "user_id": current_user.id},
         {"$set": update_data}
     )
+    invalidate_project(project_id)
     
     updated_project = await db.projects.find_one({"id": project_id})
     return Project(**updated_project)
@@ -1526,6 +1638,7 @@ async def update_project(
 @api_router.delete("/projects/{project_id}")
 async def delete_project(project_id: str, current_user: User = Depends(get_current_user)):
     result = await db.projects.delete_one({"id": project_id, "user_id": current_user.id})
+    invalidate_project(project_id)
     if result.deleted_count == 0:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -1565,93 +1678,91 @@ async def get_user_stats(current_user: User = Depends(get_current_user)):
     )
 
 # AI Code Generation routes
-@api_router.post("/projects/{project_id}/generate", response_model=GeneratedApp)
-@limiter.limit("10/minute")  # Rate limit: 10 generations per minute
-async def generate_project_code(
-    request: Request,  # For rate limiting
-    project_id: str, 
+async def serve_cached_generation(
+    project_id: str,
     request_data: GenerateAppRequest,
-    current_user: User = Depends(get_current_user)
-):
-    from utils.cache import generate_cache_key, sanitize_prompt, estimate_llm_cost
-    
-    start_time = time.time()
+    cache_key: str,
+    user_id: str
+) -> Optional[GeneratedApp]:
+    """
+    Sert une génération depuis le cache (exact puis sémantique)
     
-    # Verify project ownership
-    project = await db.projects.find_one({"id": project_id, "user_id": current_user.id})
-    if not project:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Project not found"
+    Returns:
+        Le GeneratedApp enregistré pour le projet, ou None si pas de hit
+    """
+    from utils.cache import extract_cacheable_payload
+    from utils.semantic_cache import find_semantic_match
+    
+    # L1 (in-process) puis L2 (collection generation_cache)
+    cached_payload = await generation_cache.get(cache_key)
+    cache_hit_type = "exact"
+    cache_score = 1.0
+    
+    # Pas de hit exact: chercher une paraphrase (MinHash/LSH)
+    if not cached_payload:
+        semantic_match = await find_semantic_match(
+            db,
+            request_data.description,
+            request_data.framework or "react",
+            request_data.type,
+            request_data.advanced_mode
         )
+        if semantic_match:
+            cached_payload = extract_cacheable_payload(semantic_match.document)
+            cache_hit_type = "semantic"
+            cache_score = semantic_match.score
+            # La paraphrase devient un hit exact pour les prochaines requêtes
+            await generation_cache.set(cache_key, cached_payload, request_data.framework)
     
-    # Sanitize description for security
-    request_data.description = sanitize_prompt(request_data.description)
+    if not cached_payload:
+        return None
     
-    # Generate cache key
-    cache_key = generate_cache_key(
-        request_data.description,
-        request_data.framework or "react",
-        request_data.type,
-        request_data.advanced_mode
+    logger.info(
+        "cache_hit",
+        extra={
+            "user_id": user_id,
+            "project_id": project_id,
+            "cache_key": cache_key,
+            "cache_hit_type": cache_hit_type,
+            "cache_score": cache_score
+        }
+    )
+    track_cache(hit=True, cache_type="llm", match_type=cache_hit_type, score=cache_score)
+    
+    # New document for this project: only manifests are copied, the file
+    # bodies stay shared in file_blobs (older inline entries are converted)
+    app_dict = GeneratedApp(
+        project_id=project_id,  # Use current project_id
+        cache_hit=cache_hit_type,
+        cache_score=cache_score
+    ).dict()
+    app_dict.update({key: value for key, value in cached_payload.items() if value is not None})
+    app_dict["cache_key"] = cache_key
+    app_dict = await dehydrate_app(blob_store, app_dict)
+    await db.generated_apps.insert_one(dict(app_dict))
+    
+    cached_generated_app = GeneratedApp(**await hydrate_app(blob_store, app_dict))
+    await record_app_version(project_id, app_dict, "generation", "Génération (cache)")
+    
+    # Update project status to completed
+    await db.projects.update_one(
+        {"id": project_id},
+        {"$set": {"status": "completed", "updated_at": datetime.utcnow()}}
     )
     
-    # Check cache first (unless force regenerate)
-    force_regenerate = getattr(request, 'force_regenerate', False)
-    if not force_regenerate:
-        cached_app = await db.generated_apps.find_one(
-            {"cache_key": cache_key},
-            sort=[("created_at", -1)]
-        )
-        
-        if cached_app:
-            logger.info(
-                "cache_hit",
-                extra={
-                    "user_id": current_user.id,
-                    "project_id": project_id,
-                    "cache_key": cache_key
-                }
-            )
-            track_cache(hit=True, cache_type="llm")
-            
-            # Create a new GeneratedApp for this project with cached data
-            cached_generated_app = GeneratedApp(
-                project_id=project_id,  # Use current project_id
-                html_code=cached_app.get("html_code"),
-                css_code=cached_app.get("css_code"),
-                js_code=cached_app.get("js_code"),
-                react_code=cached_app.get("react_code"),
-                backend_code=cached_app.get("backend_code"),
-                project_structure=cached_app.get("project_structure"),
-                package_json=cached_app.get("package_json"),
-                requirements_txt=cached_app.get("requirements_txt"),
-                dockerfile=cached_app.get("dockerfile"),
-                readme=cached_app.get("readme"),
-                deployment_config=cached_app.get("deployment_config"),
-                all_files=cached_app.get("all_files")
-            )
-            
-            # Save cached result for current project
-            app_dict = cached_generated_app.dict()
-            app_dict["cache_key"] = cache_key
-            await db.generated_apps.insert_one(app_dict)
-            
-            # Update project status to completed
-            await db.projects.update_one(
-                {"id": project_id},
-                {"$set": {"status": "completed", "updated_at": datetime.utcnow()}}
-            )
-            
-            # Return cached result (no credit deduction for cache hits)
-            return cached_generated_app
+    return cached_generated_app
+
+async def charge_generation(current_user: User, request_data: GenerateAppRequest, project_id: str) -> int:
+    """
+    Estime le coût de la génération et déduit les crédits (HTTP 402 si le
+    solde est insuffisant)
     
-    # Cache miss - track it
-    track_cache(hit=False, cache_type="llm")
-    log_generation_started(logger, current_user.id, project_id, request_data.framework or "react", "gpt-5")
+    Returns:
+        Le nombre de crédits déduits
+    """
+    from utils.credit_estimator import CreditEstimator
     
     # Calculer le coût en crédits selon la COMPLEXITÉ (système adaptatif 7/14 crédits)
-    from utils.credit_estimator import CreditEstimator
     credit_cost, complexity_level, complexity_explanation = CreditEstimator.estimate_complexity(request_data.description)
     
     logger.info(
@@ -1675,16 +1786,17 @@ async def generate_project_code(
     
     # Déduire les crédits
     deduction_success = await deduct_credits(
-        current_user.id, 
-        credit_cost, 
+        current_user.id,
+        credit_cost,
         f"Génération {complexity_level} ({credit_cost} crédits) - {request_data.type}",
         project_id
     )
     
     if not deduction_success:
+        # Solde consommé entre-temps par une autre requête
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Erreur lors de la déduction des crédits"
+            status_code=status.HTTP_402_PAYMENT_REQUIRED,
+            detail=f"Crédits insuffisants. {credit_cost} crédits requis. Veuillez recharger vos crédits."
         )
     
     # Track credit consumption
@@ -1694,169 +1806,690 @@ async def generate_project_code(
         amount=credit_cost
     )
     
+    return credit_cost
+
+async def execute_generation(
+    project_id: str,
+    request_data: GenerateAppRequest,
+    cache_key: str,
+    user_id: str,
+    credit_cost: int,
+    start_time: float,
+    replace_existing: bool = False
+) -> GeneratedApp:
+    """
+    Exécute la génération LLM et enregistre le résultat (crédits déjà déduits)
+    
+    Args:
+        replace_existing: Remplacer le code déjà enregistré pour le projet
+            (reprise idempotente d'un job après un crash)
+    """
+    from utils.cache import estimate_llm_cost
+    from utils.semantic_cache import build_semantic_fields
+    
     # Update project status
     await db.projects.update_one(
         {"id": project_id},
         {"$set": {"status": "building", "updated_at": datetime.utcnow()}}
     )
     
-    try:
-        # Generate code using ADVANCED AI
-        code_data = await generate_app_code_advanced(request_data)
-        
-        # Calculate generation time and cost
-        duration = time.time() - start_time
-        estimated_cost = estimate_llm_cost("gpt-5", len(str(code_data)) // 4)  # Rough token estimate
-        
-        # Create generated app record with ADVANCED features
-        generated_app = GeneratedApp(
-            project_id=project_id,
-            html_code=code_data.get("html"),
-            css_code=code_data.get("css"),
-            js_code=code_data.get("js"),
-            react_code=code_data.get("react"),
-            backend_code=code_data.get("backend"),
-            # NOUVEAUX CHAMPS AVANCÉS
-            project_structure=code_data.get("project_structure"),
-            package_json=code_data.get("package_json"),
-            requirements_txt=code_data.get("requirements_txt"),
-            dockerfile=code_data.get("dockerfile"),
-            readme=code_data.get("readme"),
-            deployment_config=code_data.get("deployment_config"),
-            all_files=code_data.get("all_files")
-        )
-        
-        # Save to database WITH cache key
-        app_dict = generated_app.dict()
-        app_dict["cache_key"] = cache_key  # For future cache hits
-        await db.generated_apps.insert_one(app_dict)
-        
-        # Update project status to completed
-        await db.projects.update_one(
-            {"id": project_id},
-            {"$set": {"status": "completed", "updated_at": datetime.utcnow()}}
-        )
-        
-        # Track successful generation
-        track_generation(
-            status="success",
-            model="gpt-5",
-            framework=request_data.framework or "react",
-            mode="advanced" if request_data.advanced_mode else "quick",
-            duration=duration,
-            cost=estimated_cost
-        )
-        
-        log_generation_completed(
-            logger,
-            current_user.id,
-            project_id,
-            duration,
-            len(str(code_data)),
-            estimated_cost
-        )
-        
-        logger.info(f"Génération réussie pour le projet {project_id}. {credit_cost} crédits déduits.")
-        
-        return generated_app
-        
-    except Exception as e:
-        # En cas d'erreur, rembourser les crédits
-        await add_credits(
-            current_user.id,
-            credit_cost,
-            "refund",
-            f"Remboursement - Erreur de génération pour {project_id}"
-        )
-        
-        # Track failed generation
-        track_generation(
-            status="error",
-            model="gpt-5",
-            framework=request_data.framework or "react",
-            mode="advanced" if request_data.advanced_mode else "quick",
-            duration=time.time() - start_time,
-            cost=0
-        )
-        
-        log_generation_failed(
-            logger,
-            current_user.id,
-            project_id,
-            str(e),
-            "gpt-5"
-        )
-        
-        logger.error(f"Erreur de génération, {credit_cost} crédits remboursés à l'utilisateur {current_user.id}")
-        
-        # Update project status to error
-        await db.projects.update_one(
-            {"id": project_id},
-            {"$set": {"status": "error", "updated_at": datetime.utcnow()}}
-        )
-        raise e
+    # Generate code using ADVANCED AI - les requêtes identiques concurrentes
+    # partagent la même exécution (crédits et document propres à chacune)
+    code_data, coalesced = await generation_flights.do(
+        cache_key,
+        lambda: generate_app_code_advanced(request_data)
+    )
+    if coalesced:
+        track_cache(hit=True, cache_type="singleflight")
+        logger.info(f"Génération rattachée à une exécution en cours pour le projet {project_id}")
+    
+    # Calculate generation time and cost
+    duration = time.time() - start_time
+    estimated_cost = estimate_llm_cost("gpt-5", len(str(code_data)) // 4)  # Rough token estimate
+    
+    # Create generated app record with ADVANCED features
+    generated_app = GeneratedApp(
+        project_id=project_id,
+        html_code=code_data.get("html"),
+        css_code=code_data.get("css"),
+        js_code=code_data.get("js"),
+        react_code=code_data.get("react"),
+        backend_code=code_data.get("backend"),
+        # NOUVEAUX CHAMPS AVANCÉS
+        project_structure=code_data.get("project_structure"),
+        package_json=code_data.get("package_json"),
+        requirements_txt=code_data.get("requirements_txt"),
+        dockerfile=code_data.get("dockerfile"),
+        readme=code_data.get("readme"),
+        deployment_config=code_data.get("deployment_config"),
+        all_files=code_data.get("all_files")
+    )
+    
+    # Save to database WITH cache key + semantic signature
+    app_dict = generated_app.dict()
+    app_dict["cache_key"] = cache_key  # For future cache hits
+    app_dict.update(build_semantic_fields(
+        request_data.description,
+        request_data.framework or "react",
+        request_data.type,
+        request_data.advanced_mode
+    ))
+    # File bodies go to the content-addressed store, the document keeps manifests
+    app_dict = await dehydrate_app(blob_store, app_dict)
+    if replace_existing:
+        await db.generated_apps.replace_one({"project_id": project_id}, app_dict, upsert=True)
+    else:
+        await db.generated_apps.insert_one(dict(app_dict))
+    await generation_cache.set(cache_key, app_dict, request_data.framework)
+    await record_app_version(project_id, app_dict, "generation", "Régénération" if replace_existing else "Génération")
+    
+    # Update project status to completed
+    await db.projects.update_one(
+        {"id": project_id},
+        {"$set": {"status": "completed", "updated_at": datetime.utcnow()}}
+    )
+    
+    # Track successful generation
+    track_generation(
+        status="success",
+        model="gpt-5",
+        framework=request_data.framework or "react",
+        mode="advanced" if request_data.advanced_mode else "quick",
+        duration=duration,
+        cost=estimated_cost
+    )
+    
+    log_generation_completed(
+        logger,
+        user_id,
+        project_id,
+        duration,
+        len(str(code_data)),
+        estimated_cost
+    )
+    
+    logger.info(f"Génération réussie pour le projet {project_id}. {credit_cost} crédits déduits.")
+    
+    return generated_app
 
-@api_router.get("/projects/{project_id}/code", response_model=GeneratedApp)
-async def get_project_code(
+async def record_generation_failure(
     project_id: str,
-    current_user: User = Depends(get_current_user)
+    request_data: GenerateAppRequest,
+    user_id: str,
+    credit_cost: int,
+    duration: float,
+    error: str,
+    refund_id: Optional[str] = None
 ):
-    # Verify project ownership
-    project = await db.projects.find_one({"id": project_id, "user_id": current_user.id})
-    if not project:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Project not found"
-        )
+    """
+    Rembourse les crédits et marque le projet en erreur
+
+    refund_id rend le remboursement idempotent (échec de job rejoué)
+    """
+    # En cas d'erreur, rembourser les crédits
+    await credit_ledger.refund(
+        user_id,
+        credit_cost,
+        f"Remboursement - Erreur de génération pour {project_id}",
+        project_id,
+        transaction_id=refund_id
+    )
     
-    # Get generated code
-    generated_app = await db.generated_apps.find_one({"project_id": project_id})
-    if not generated_app:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Generated code not found"
-        )
+    # Track failed generation
+    track_generation(
+        status="error",
+        model="gpt-5",
+        framework=request_data.framework or "react",
+        mode="advanced" if request_data.advanced_mode else "quick",
+        duration=duration,
+        cost=0
+    )
     
-    return GeneratedApp(**generated_app)
-
-
-# ============================================
-# PROJECT ITERATION ROUTES
-# ============================================
+    log_generation_failed(
+        logger,
+        user_id,
+        project_id,
+        error,
+        "gpt-5"
+    )
+    
+    logger.error(f"Erreur de génération, {credit_cost} crédits remboursés à l'utilisateur {user_id}")
+    
+    # Update project status to error
+    await db.projects.update_one(
+        {"id": project_id},
+        {"$set": {"status": "error", "updated_at": datetime.utcnow()}}
+    )
 
-@api_router.post("/projects/{project_id}/iterate", response_model=ProjectIterationResponse)
-@limiter.limit("20/minute")  # Allow more iterations than new generations
-async def iterate_project(
-    request: Request,
+@api_router.post("/projects/{project_id}/generate", response_model=GeneratedApp)
+@limiter.limit("10/minute")  # Rate limit: 10 generations per minute
+async def generate_project_code(
+    request: Request,  # For rate limiting
     project_id: str,
-    iteration_request: IterationRequest,
+    request_data: GenerateAppRequest,
     current_user: User = Depends(get_current_user)
 ):
-    """
-    Iterate/improve an existing project based on user instructions
-    Allows conversational improvement of generated code
-    Credit cost adapts to complexity (1-5 credits)
-    """
-    from utils.iteration import create_iteration_prompt, extract_changes_from_response
-    from utils.cache import sanitize_prompt
-    from utils.credit_estimator import CreditEstimator
-    from ai_generators.multi_llm_service import multi_llm_service
+    from utils.cache import generate_cache_key, sanitize_prompt
     
     start_time = time.time()
     
     # Verify project ownership
-    project = await db.projects.find_one({"id": project_id, "user_id": current_user.id})
+    project = await get_owned_project(db, project_id, current_user.id, PROJECT_SUMMARY_PROJECTION)
     if not project:
-        raise HTTPException(status_code=404, detail="Project not found")
-    
-    # Get current generated code
-    current_app = await db.generated_apps.find_one({"project_id": project_id})
-    if not current_app:
         raise HTTPException(
-            status_code=404,
-            detail="No generated code found. Please generate the project first."
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Project not found"
         )
     
+    # Associer les appels LLM de cette requête à l'utilisateur (file équitable)
+    set_llm_context(current_user.id, current_user.subscription_plan, project_id)
+    
+    # Sanitize description for security
+    request_data.description = sanitize_prompt(request_data.description)
+    
+    # Generate cache key
+    cache_key = generate_cache_key(
+        request_data.description,
+        request_data.framework or "react",
+        request_data.type,
+        request_data.advanced_mode
+    )
+    
+    # Check cache first (unless force regenerate)
+    force_regenerate = getattr(request, 'force_regenerate', False)
+    if not force_regenerate:
+        cached_generated_app = await serve_cached_generation(project_id, request_data, cache_key, current_user.id)
+        if cached_generated_app:
+            # Return cached result (no credit deduction for cache hits)
+            return cached_generated_app
+    
+    # Cache miss - track it
+    track_cache(hit=False, cache_type="llm")
+    log_generation_started(logger, current_user.id, project_id, request_data.framework or "react", "gpt-5")
+    
+    credit_cost = await charge_generation(current_user, request_data, project_id)
+    
+    try:
+        return await execute_generation(
+            project_id, request_data, cache_key, current_user.id, credit_cost, start_time
+        )
+    except Exception as e:
+        await record_generation_failure(
+            project_id, request_data, current_user.id, credit_cost, time.time() - start_time, str(e)
+        )
+        raise e
+
+# ============================================
+# GENERATION JOBS (202 Accepted + worker pool)
+# ============================================
+
+class GenerationJobResponse(BaseModel):
+    job_id: str
+    project_id: str
+    status: str  # queued, running, succeeded, failed
+    attempts: int = 0
+    max_attempts: int = 0
+    error: Optional[str] = None
+    generated_app_id: Optional[str] = None
+    cache_hit: Optional[str] = None
+    status_url: str
+    stream_url: str
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+
+def to_job_response(job: dict) -> GenerationJobResponse:
+    result = job.get("result") or {}
+    return GenerationJobResponse(
+        job_id=job["id"],
+        project_id=job["project_id"],
+        status=job["status"],
+        attempts=job.get("attempts", 0),
+        max_attempts=job.get("max_attempts", 0),
+        error=job.get("error"),
+        generated_app_id=result.get("generated_app_id"),
+        cache_hit=result.get("cache_hit"),
+        status_url=f"/api/jobs/{job['id']}",
+        stream_url=f"/api/projects/{job['project_id']}/stream",
+        created_at=job["created_at"],
+        finished_at=job.get("finished_at")
+    )
+
+async def run_generation_job(job: dict) -> dict:
+    """
+    Handler du worker pool pour les jobs "generation"
+    
+    Les crédits ont été déduits à la création du job; une nouvelle tentative
+    remplace le code éventuellement enregistré par la précédente.
+    """
+    payload = job["payload"]
+    project_id = job["project_id"]
+    request_data = GenerateAppRequest.model_construct(**payload["request"])
+    
+    # Progression SSE + file LLM équitable au nom de l'utilisateur
+    set_llm_context(job["user_id"], payload.get("plan"), project_id)
+    await streaming_manager.send_message(
+        project_id,
+        "job",
+        f"⚙️ Génération démarrée (tentative {job['attempts']}/{job['max_attempts']})",
+        metadata={"job_id": job["id"], "status": "running", "attempt": job["attempts"]}
+    )
+    
+    start_time = time.time()
+    generated_app = await execute_generation(
+        project_id,
+        request_data,
+        payload["cache_key"],
+        job["user_id"],
+        payload["credit_cost"],
+        start_time,
+        replace_existing=True
+    )
+    
+    total_files = len(generated_app.all_files or {})
+    await streaming_manager.send_message(
+        project_id,
+        "complete",
+        f"🎉 Génération terminée - {total_files} fichiers en {time.time() - start_time:.1f}s",
+        progress=100,
+        metadata={"job_id": job["id"], "status": "succeeded"}
+    )
+    return {"generated_app_id": generated_app.id}
+
+async def on_generation_job_failed(job: dict):
+    """Échec définitif d'un job: remboursement unique + projet en erreur"""
+    # Remboursement en attente (failure_state=pending) jusqu'à confirmation:
+    # un worker mort entre les deux laisse le job au reaper, qui le rejoue
+    claimed = await generation_jobs.claim_failure(job["id"])
+    if not claimed:
+        return
+    
+    payload = claimed["payload"]
+    finished_at = claimed.get("finished_at") or datetime.utcnow()
+    await record_generation_failure(
+        claimed["project_id"],
+        GenerateAppRequest.model_construct(**payload["request"]),
+        claimed["user_id"],
+        payload["credit_cost"],
+        (finished_at - claimed["created_at"]).total_seconds(),
+        claimed.get("error") or "Job échoué",
+        refund_id=f"job-refund-{claimed['id']}"
+    )
+    await generation_jobs.complete_failure(claimed["id"])
+    await streaming_manager.send_message(
+        job["project_id"],
+        "complete",
+        f"❌ Génération échouée après {job.get('attempts', 0)} tentative(s) - crédits remboursés",
+        metadata={"job_id": job["id"], "status": "failed", "error": job.get("error")}
+    )
+
+generation_workers = WorkerPool(
+    generation_jobs,
+    {"generation": run_generation_job},
+    concurrency=GENERATION_WORKER_CONCURRENCY,
+    on_failure=on_generation_job_failed
+)
+
+@api_router.post(
+    "/projects/{project_id}/generate/async",
+    response_model=GenerationJobResponse,
+    status_code=status.HTTP_202_ACCEPTED
+)
+@limiter.limit("10/minute")
+async def enqueue_project_generation(
+    request: Request,
+    project_id: str,
+    request_data: GenerateAppRequest,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Version asynchrone de /generate: répond 202 avec un job, la génération
+    tourne dans le worker pool
+    
+    - progression sur /projects/{id}/stream, état sur /jobs/{job_id}
+    - en-tête Idempotency-Key: un renvoi de la même requête retourne le même
+      job sans nouvelle déduction de crédits
+    """
+    from utils.cache import generate_cache_key, sanitize_prompt
+    
+    project = await get_owned_project(db, project_id, current_user.id, PROJECT_SUMMARY_PROJECTION)
+    if not project:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Project not found"
+        )
+    
+    idempotency_key = request.headers.get("Idempotency-Key")
+    if idempotency_key:
+        existing = await generation_jobs.jobs.find_one(
+            {"user_id": current_user.id, "idempotency_key": idempotency_key}
+        )
+        if existing:
+            return to_job_response(existing)
+    
+    set_llm_context(current_user.id, current_user.subscription_plan, project_id)
+    request_data.description = sanitize_prompt(request_data.description)
+    cache_key = generate_cache_key(
+        request_data.description,
+        request_data.framework or "react",
+        request_data.type,
+        request_data.advanced_mode
+    )
+    
+    # Cache hit: job créé directement terminé (pas de crédits)
+    cached_generated_app = await serve_cached_generation(project_id, request_data, cache_key, current_user.id)
+    if cached_generated_app:
+        job = await generation_jobs.enqueue(
+            "generation",
+            {"request": request_data.dict(), "cache_key": cache_key, "credit_cost": 0},
+            current_user.id,
+            project_id,
+            idempotency_key=idempotency_key,
+            status=JOB_SUCCEEDED,
+            result={"generated_app_id": cached_generated_app.id, "cache_hit": cached_generated_app.cache_hit}
+        )
+        return to_job_response(job)
+    
+    track_cache(hit=False, cache_type="llm")
+    log_generation_started(logger, current_user.id, project_id, request_data.framework or "react", "gpt-5")
+    
+    credit_cost = await charge_generation(current_user, request_data, project_id)
+    job = await generation_jobs.enqueue(
+        "generation",
+        {
+            "request": request_data.dict(),
+            "cache_key": cache_key,
+            "credit_cost": credit_cost,
+            "plan": current_user.subscription_plan,
+        },
+        current_user.id,
+        project_id,
+        idempotency_key=idempotency_key
+    )
+    
+    if not job["created"]:
+        # Requête concurrente avec la même Idempotency-Key: annuler notre déduction
+        await credit_ledger.refund(
+            current_user.id, credit_cost, f"Remboursement - Doublon Idempotency-Key pour {project_id}", project_id
+        )
+        return to_job_response(job)
+    
+    await db.projects.update_one(
+        {"id": project_id},
+        {"$set": {"status": "queued", "updated_at": datetime.utcnow()}}
+    )
+    await streaming_manager.send_message(
+        project_id,
+        "job",
+        "📥 Génération en file d'attente",
+        metadata={"job_id": job["id"], "status": "queued"}
+    )
+    generation_workers.notify()
+    
+    return to_job_response(job)
+
+@api_router.get("/jobs/{job_id}", response_model=GenerationJobResponse)
+async def get_generation_job(job_id: str, current_user: User = Depends(get_current_user)):
+    """État d'un job de génération"""
+    job = await generation_jobs.jobs.find_one({"id": job_id, "user_id": current_user.id})
+    if not job:
+        raise HTTPException(status_code=404, detail="Job non trouvé")
+    return to_job_response(job)
+
+@api_router.get("/projects/{project_id}/code", response_model=GeneratedApp)
+async def get_project_code(
+    project_id: str,
+    fields: Optional[str] = Query(None, description="Champs à retourner, séparés par des virgules"),
+    include_files: bool = Query(True, description="false: manifeste [{path, size}] au lieu de all_files"),
+    current_user: User = Depends(get_current_user)
+):
+    # Verify project ownership
+    project = await get_owned_project(db, project_id, current_user.id, PROJECT_SUMMARY_PROJECTION)
+    if not project:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Project not found"
+        )
+    
+    wanted = None
+    if fields:
+        wanted = {field.strip() for field in fields.split(",") if field.strip()}
+        unknown = wanted - set(GeneratedApp.model_fields)
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Champs inconnus: {', '.join(sorted(unknown))}")
+    
+    # Get generated code
+    generated_app = await load_generated_app(project_id, include_files=include_files, fields=wanted)
+    if not generated_app:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Generated code not found"
+        )
+    
+    if wanted is None and include_files:
+        return GeneratedApp(**generated_app)
+    
+    # Réponse partielle: seulement les champs demandés, fichiers sous forme de manifeste
+    payload = {
+        field: generated_app.get(field)
+        for field in (wanted if wanted is not None else GeneratedApp.model_fields)
+        if field != "all_files" or include_files
+    }
+    if not include_files:
+        if generated_app.get("file_manifest"):
+            payload["file_manifest"] = [
+                {"path": entry["path"], "size": entry.get("size", 0)}
+                for entry in generated_app["file_manifest"]
+            ]
+        else:
+            # Ancien document avec all_files inline
+            payload["file_manifest"] = [
+                {"path": path, "size": content_size(content)}
+                for path, content in (generated_app.get("all_files") or {}).items()
+            ]
+    return JSONResponse(content=jsonable_encoder(payload))
+
+@api_router.get("/projects/{project_id}/files/{file_path:path}")
+async def get_project_file(
+    project_id: str,
+    file_path: str,
+    current_user: User = Depends(get_current_user)
+):
+    """Contenu d'un seul fichier généré (sans charger le reste du projet)"""
+    project = await get_owned_project(db, project_id, current_user.id, PROJECT_SUMMARY_PROJECTION)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    
+    document = await db.generated_apps.find_one(
+        {"project_id": project_id},
+        {"_id": 0, "file_manifest": {"$elemMatch": {"path": file_path}}}
+    )
+    if not document:
+        raise HTTPException(status_code=404, detail="Generated code not found")
+    
+    content = None
+    if document.get("file_manifest"):
+        blob_hash = document["file_manifest"][0]["hash"]
+        content = (await blob_store.get_many([blob_hash])).get(blob_hash)
+    else:
+        # Ancien document avec all_files inline (chemins avec points: pas de projection possible)
+        legacy = await db.generated_apps.find_one({"project_id": project_id}, {"_id": 0, "all_files": 1})
+        content = ((legacy or {}).get("all_files") or {}).get(file_path)
+    
+    if content is None:
+        raise HTTPException(status_code=404, detail="Fichier non trouvé")
+    
+    return {"path": file_path, "size": content_size(content), "content": content}
+
+
+# ============================================
+# PROJECT ITERATION ROUTES
+# ============================================
+
+ITERATION_DEFAULT_MODE = os.environ.get("ITERATION_DEFAULT_MODE", "patch")
+ITERATION_CONTEXT_TOKENS = int(os.environ.get("ITERATION_CONTEXT_TOKENS", "15000"))
+ITERATION_SYSTEM_MESSAGE = "Tu es un développeur expert qui améliore le code existant selon les instructions de l'utilisateur."
+
+def iteration_files(app: dict) -> Dict[str, str]:
+    """Fichiers modifiables par une itération: all_files + champs de code non vides"""
+    files = dict(app.get("all_files") or {})
+    for field in CODE_FIELDS:
+        if app.get(field):
+            files[field] = app[field]
+    return files
+
+async def ask_iteration_llm(prompt: str) -> str:
+    chat = LlmChat(
+        api_key=EMERGENT_LLM_KEY,
+        session_id=f"iteration-{uuid.uuid4()}",
+        system_message=ITERATION_SYSTEM_MESSAGE
+    ).with_model("openai", "gpt-4o")
+    
+    async with llm_governor.slot():
+        return await chat.send_message(UserMessage(text=prompt))
+
+async def run_patch_iteration(
+    project: dict,
+    current_app: dict,
+    chat_history: List[ChatMessage],
+    instruction: str
+) -> Tuple[dict, Dict[str, str], List[str], str]:
+    """
+    Itération par blocs d'édition: le LLM ne renvoie que les modifications,
+    appliquées ici; un fichier dont le patch est en conflit est régénéré seul
+    
+    Returns:
+        (changes_made/explanation, fichiers modifiés, fichiers régénérés, réponse brute)
+    """
+    from utils.iteration import create_patch_iteration_prompt, create_file_regeneration_prompt, extract_changes_from_response
+    from utils.patching import parse_patch_response, apply_edits, extract_code_block
+    
+    files = iteration_files(current_app)
+    prompt = await create_patch_iteration_prompt(
+        original_description=project.get("description", ""),
+        current_files=files,
+        chat_history=chat_history,
+        new_instruction=instruction,
+        context_tokens=ITERATION_CONTEXT_TOKENS
+    )
+    response_text = await ask_iteration_llm(prompt)
+    
+    meta, edits = parse_patch_response(response_text)
+    result = apply_edits(files, edits)
+    changes = dict(result.files)
+    
+    if not edits:
+        logger.warning(f"Itération {project.get('id')}: aucun bloc d'édition dans la réponse")
+        meta.setdefault("changes_made", extract_changes_from_response(response_text))
+    
+    async def regenerate(path: str, reason: str) -> Tuple[str, str]:
+        logger.info(f"Patch en conflit sur {path} ({reason}), régénération du fichier")
+        prompt = await create_file_regeneration_prompt(path, files.get(path, ""), instruction, reason)
+        return path, extract_code_block(await ask_iteration_llm(prompt))
+    
+    regenerated = await asyncio.gather(*(
+        regenerate(path, reason) for path, reason in result.conflicts.items()
+    ))
+    for path, content in regenerated:
+        if content and content != files.get(path):
+            changes[path] = content
+    
+    return meta, changes, list(result.conflicts), response_text
+
+async def run_full_iteration(
+    project: dict,
+    current_app: dict,
+    chat_history: List[ChatMessage],
+    instruction: str
+) -> Tuple[dict, Dict[str, str], str]:
+    """
+    Itération historique: le LLM renvoie le code complet des champs modifiés
+    
+    Returns:
+        (réponse JSON décodée, champs modifiés, réponse brute)
+    """
+    from utils.iteration import create_iteration_prompt, extract_changes_from_response
+    
+    current_code = {
+        "html_code": current_app.get("html_code"),
+        "css_code": current_app.get("css_code"),
+        "js_code": current_app.get("js_code"),
+        "react_code": current_app.get("react_code"),
+        "backend_code": current_app.get("backend_code")
+    }
+    
+    prompt = await create_iteration_prompt(
+        original_description=project.get("description", ""),
+        current_code=current_code,
+        chat_history=chat_history,
+        new_instruction=instruction,
+        context_tokens=ITERATION_CONTEXT_TOKENS
+    )
+    response_text = await ask_iteration_llm(prompt)
+    
+    # Parse response to extract code and changes
+    try:
+        # Try to extract JSON from response
+        json_start = response_text.find('{')
+        json_end = response_text.rfind('}') + 1
+        if json_start >= 0 and json_end > json_start:
+            code_data = json.loads(response_text[json_start:json_end])
+        else:
+            # Fallback: use current code with AI response as explanation
+            code_data = {
+                "changes_made": extract_changes_from_response(response_text),
+                "explanation": response_text[:500]
+            }
+    except ValueError:
+        code_data = {
+            "changes_made": ["Améliorations appliquées selon vos instructions"],
+            "explanation": response_text[:500]
+        }
+    
+    update_data = {
+        field: code_data[field]
+        for field in ("html_code", "css_code", "js_code", "react_code", "backend_code")
+        if code_data.get(field) and isinstance(code_data[field], str)
+    }
+    return code_data, update_data, response_text
+
+@api_router.post("/projects/{project_id}/iterate", response_model=ProjectIterationResponse)
+@limiter.limit("20/minute")  # Allow more iterations than new generations
+async def iterate_project(
+    request: Request,
+    project_id: str,
+    iteration_request: IterationRequest,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Iterate/improve an existing project based on user instructions
+    Allows conversational improvement of generated code
+    Credit cost adapts to complexity (1-5 credits)
+    """
+    from utils.cache import sanitize_prompt
+    from utils.credit_estimator import CreditEstimator
+    
+    start_time = time.time()
+    
+    # Verify project ownership
+    project = await get_owned_project(db, project_id, current_user.id, PROJECT_SUMMARY_PROJECTION)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    
+    mode = iteration_request.mode or ITERATION_DEFAULT_MODE
+    if mode not in ("patch", "full"):
+        raise HTTPException(status_code=400, detail="Mode d'itération invalide (patch ou full)")
+    
+    # Get current generated code (all_files seulement pour les patchs)
+    current_app = await load_generated_app(project_id, include_files=mode == "patch")
+    if not current_app:
+        raise HTTPException(
+            status_code=404,
+            detail="No generated code found. Please generate the project first."
+        )
+    
+    # Associer les appels LLM de cette requête à l'utilisateur (file équitable)
+    set_llm_context(current_user.id, current_user.subscription_plan, project_id)
+    
     # Sanitize instruction
     instruction = sanitize_prompt(iteration_request.instruction)
     
@@ -1892,80 +2525,57 @@ async def iterate_project(
         )
     
     # Deduct credits (adaptive amount)
-    await deduct_credits(
+    if not await deduct_credits(
         current_user.id,
         credit_cost,
         f"Itération projet #{iteration_number} - {complexity_level} ({credit_cost} crédits)",
         project_id
-    )
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_402_PAYMENT_REQUIRED,
+            detail=f"Crédits insuffisants. {credit_cost} crédit(s) requis pour cette tâche ({complexity_level})."
+        )
     
     try:
-        # Create iteration prompt
-        current_code = {
-            "html_code": current_app.get("html_code"),
-            "css_code": current_app.get("css_code"),
-            "js_code": current_app.get("js_code"),
-            "react_code": current_app.get("react_code"),
-            "backend_code": current_app.get("backend_code")
-        }
-        
-        prompt = await create_iteration_prompt(
-            original_description=project.get("description", ""),
-            current_code=current_code,
-            chat_history=chat_history,
-            new_instruction=instruction
-        )
-        
-        # Call LLM using direct LlmChat (same as working generation)
-        chat = LlmChat(
-            api_key=EMERGENT_LLM_KEY,
-            session_id=f"iteration-{uuid.uuid4()}",
-            system_message="Tu es un développeur expert qui améliore le code existant selon les instructions de l'utilisateur."
-        ).with_model("openai", "gpt-4o")
+        regenerated_files = []
+        if mode == "patch":
+            code_data, update_data, regenerated_files, response_text = await run_patch_iteration(
+                project, current_app, chat_history, instruction
+            )
+        else:
+            code_data, update_data, response_text = await run_full_iteration(
+                project, current_app, chat_history, instruction
+            )
         
-        user_message = UserMessage(text=prompt)
-        response_text = await chat.send_message(user_message)
+        if not update_data:
+            # Réponse sans bloc d'édition exploitable: rien n'a changé, rien n'est facturé
+            await credit_ledger.refund(
+                current_user.id,
+                credit_cost,
+                "Remboursement - Itération sans modification",
+                project_id
+            )
+            return ProjectIterationResponse(
+                success=False,
+                iteration_number=iteration_number,
+                changes_made=[],
+                explanation=code_data.get("explanation") or "Aucune modification applicable dans la réponse du modèle, crédits remboursés",
+                mode=mode,
+                regenerated_files=regenerated_files
+            )
         
-        # Parse response to extract code and changes
-        import json
-        try:
-            # Try to extract JSON from response
-            json_start = response_text.find('{')
-            json_end = response_text.rfind('}') + 1
-            if json_start >= 0 and json_end > json_start:
-                json_str = response_text[json_start:json_end]
-                code_data = json.loads(json_str)
-            else:
-                # Fallback: use current code with AI response as explanation
-                code_data = {
-                    "changes_made": extract_changes_from_response(response_text),
-                    "explanation": response_text[:500]
-                }
-        except:
-            code_data = {
-                "changes_made": ["Améliorations appliquées selon vos instructions"],
-                "explanation": response_text[:500]
-            }
+        # Projet généré avant le versioning: son état actuel devient la version 1
+        if not await version_store.latest(project_id):
+            await version_store.ensure_base(project_id, manifest_tree(await dehydrate_app(blob_store, current_app)))
         
-        # Update generated app in database
-        update_data = {}
-        if code_data.get("html_code"):
-            update_data["html_code"] = code_data["html_code"]
-        if code_data.get("css_code"):
-            update_data["css_code"] = code_data["css_code"]
-        if code_data.get("js_code"):
-            update_data["js_code"] = code_data["js_code"]
-        if code_data.get("react_code"):
-            update_data["react_code"] = code_data["react_code"]
-        if code_data.get("backend_code"):
-            update_data["backend_code"] = code_data["backend_code"]
-        
-        if update_data:
-            update_data["updated_at"] = datetime.utcnow()
-            await db.generated_apps.update_one(
-                {"project_id": project_id},
-                {"$set": update_data}
+        # Seuls les fichiers modifiés sont écrits, si personne ne les a changés entre-temps
+        applied = await persist_file_changes(blob_store, db.generated_apps, current_app, update_data)
+        if applied is None:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Le projet a été modifié pendant l'itération, veuillez réessayer"
             )
+        version = await version_store.record(project_id, applied, "iteration", instruction)
         
         # Save chat messages
         user_message = ChatMessage(role="user", content=instruction)
@@ -1983,6 +2593,7 @@ async def iterate_project(
         await db.project_iterations.insert_one({
             "project_id": project_id,
             "iteration_number": iteration_number,
+            "version": version,
             "user_request": instruction,
             "changes_made": code_data.get("changes_made", []),
             "timestamp": datetime.utcnow()
@@ -1994,7 +2605,7 @@ async def iterate_project(
             status="success",
             model="gpt-4o",
             framework="iteration",
-            mode="iterate",
+            mode=f"iterate_{mode}",
             duration=duration,
             cost=0.01  # Estimated
         )
@@ -2008,27 +2619,32 @@ async def iterate_project(
             0.01
         )
         
-        # Create clean update_data for response (without datetime fields)
-        clean_update_data = {}
-        if update_data:
-            for key, value in update_data.items():
-                if key != "updated_at" and isinstance(value, str):
-                    clean_update_data[key] = value
-        
         return ProjectIterationResponse(
             success=True,
             iteration_number=iteration_number,
             changes_made=code_data.get("changes_made", []),
             explanation=code_data.get("explanation", "Améliorations appliquées"),
-            updated_code=clean_update_data if clean_update_data else None
+            updated_code=update_data,
+            mode=mode,
+            regenerated_files=regenerated_files,
+            version=version
         )
         
+    except HTTPException:
+        await credit_ledger.refund(
+            current_user.id,
+            credit_cost,
+            "Remboursement - Conflit itération",
+            project_id
+        )
+        raise
+        
     except Exception as e:
         # Refund credits on error
-        await deduct_credits(
+        await credit_ledger.refund(
             current_user.id,
-            -credit_cost,
-            f"Remboursement - Erreur itération",
+            credit_cost,
+            "Remboursement - Erreur itération",
             project_id
         )
         
@@ -2059,7 +2675,7 @@ async def estimate_iteration_credits(
     from utils.cache import sanitize_prompt
     
     # Verify project ownership
-    project = await db.projects.find_one({"id": project_id, "user_id": current_user.id})
+    project = await get_owned_project(db, project_id, current_user.id, PROJECT_SUMMARY_PROJECTION)
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     
@@ -2091,7 +2707,7 @@ async def get_project_chat(
     """Get chat history for a project"""
     
     # Verify project ownership
-    project = await db.projects.find_one({"id": project_id, "user_id": current_user.id})
+    project = await get_owned_project(db, project_id, current_user.id, PROJECT_SUMMARY_PROJECTION)
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     
@@ -2116,7 +2732,7 @@ async def get_project_iterations(
     """Get iteration history for a project"""
     
     # Verify project ownership
-    project = await db.projects.find_one({"id": project_id, "user_id": current_user.id})
+    project = await get_owned_project(db, project_id, current_user.id, PROJECT_SUMMARY_PROJECTION)
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     
@@ -2133,6 +2749,133 @@ async def get_project_iterations(
     }
 
 
+# ============================================
+# PROJECT VERSION ROUTES
+# ============================================
+
+@api_router.get("/projects/{project_id}/versions")
+async def get_project_versions(
+    project_id: str,
+    limit: int = Query(50, ge=1, le=200),
+    before: Optional[int] = None,
+    current_user: User = Depends(get_current_user)
+):
+    """Historique des versions du projet (plus récente en premier)"""
+    project = await get_owned_project(db, project_id, current_user.id, PROJECT_SUMMARY_PROJECTION)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    
+    versions = await version_store.list_versions(project_id, limit=limit, before=before)
+    return {
+        "project_id": project_id,
+        "current_version": versions[0]["version"] if versions and before is None else None,
+        "versions": versions
+    }
+
+@api_router.get("/projects/{project_id}/versions/diff")
+async def diff_project_versions(
+    project_id: str,
+    from_version: int,
+    to_version: int,
+    patch: bool = Query(False, description="Inclure le diff unifié des fichiers modifiés"),
+    current_user: User = Depends(get_current_user)
+):
+    """Fichiers ajoutés, supprimés et modifiés entre deux versions"""
+    import difflib
+    
+    project = await get_owned_project(db, project_id, current_user.id, PROJECT_SUMMARY_PROJECTION)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    
+    old_tree = await version_store.tree_at(project_id, from_version)
+    new_tree = await version_store.tree_at(project_id, to_version)
+    if old_tree is None or new_tree is None:
+        raise HTTPException(status_code=404, detail="Version non trouvée")
+    
+    changes = diff_trees(old_tree, new_tree)
+    added = sorted(path for path, entry in changes.items() if entry is not None and path not in old_tree)
+    removed = sorted(path for path, entry in changes.items() if entry is None)
+    modified = sorted(path for path, entry in changes.items() if entry is not None and path in old_tree)
+    
+    result = {
+        "project_id": project_id,
+        "from_version": from_version,
+        "to_version": to_version,
+        "added": added,
+        "removed": removed,
+        "modified": modified
+    }
+    
+    if patch:
+        # Seuls les contenus des fichiers concernés sont lus
+        hashes = [old_tree[path]["hash"] for path in modified + removed]
+        hashes += [new_tree[path]["hash"] for path in modified + added]
+        contents = await blob_store.get_many(hashes)
+        patches = {}
+        for path in added + modified + removed:
+            before_text = contents.get(old_tree[path]["hash"], "") if path in old_tree else ""
+            after_text = contents.get(new_tree[path]["hash"], "") if path in new_tree else ""
+            patches[path] = "".join(difflib.unified_diff(
+                before_text.splitlines(keepends=True),
+                after_text.splitlines(keepends=True),
+                fromfile=f"a/{path}",
+                tofile=f"b/{path}"
+            ))
+        result["patches"] = patches
+    
+    return result
+
+@api_router.post("/projects/{project_id}/versions/{version}/checkout")
+async def checkout_project_version(
+    project_id: str,
+    version: int,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Restaure une version: seules les entrées de manifeste qui diffèrent sont
+    réécrites (aucun appel LLM, aucun crédit). Crée une nouvelle version.
+    """
+    project = await get_owned_project(db, project_id, current_user.id, PROJECT_SUMMARY_PROJECTION)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    
+    target = await version_store.tree_at(project_id, version)
+    if target is None:
+        raise HTTPException(status_code=404, detail="Version non trouvée")
+    
+    document = await db.generated_apps.find_one({"project_id": project_id})
+    if not document:
+        raise HTTPException(status_code=404, detail="Generated code not found")
+    if document.get("all_files") and not document.get("file_manifest"):
+        # Ancien document inline: converti une fois en manifeste
+        document = await dehydrate_app(blob_store, document)
+        await db.generated_apps.replace_one({"_id": document["_id"]}, document)
+    
+    changes = diff_trees(manifest_tree(document), target)
+    # Champs de code encore inline: remplacés par leur entrée de manifeste
+    for field in CODE_FIELDS:
+        if document.get(field):
+            changes.setdefault(field, target.get(field))
+    
+    if not changes:
+        latest = await version_store.latest(project_id)
+        return {"project_id": project_id, "version": latest["version"], "restored_from": version, "files_changed": []}
+    
+    if not await write_manifest_changes(db.generated_apps, document, changes):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Le projet a été modifié pendant la restauration, veuillez réessayer"
+        )
+    
+    new_version = await version_store.record(project_id, changes, "rollback", f"Retour à la version {version}")
+    return {
+        "project_id": project_id,
+        "version": new_version,
+        "restored_from": version,
+        "files_changed": sorted(changes)
+    }
+
+
 @api_router.get("/projects/{project_id}/validate")
 async def validate_project_code(
     project_id: str,
@@ -2140,7 +2883,7 @@ async def validate_project_code(
 ):
     """Valide le code généré d'un projet"""
     # Verify project ownership
-    project = await db.projects.find_one({"id": project_id, "user_id": current_user.id})
+    project = await get_owned_project(db, project_id, current_user.id, PROJECT_SUMMARY_PROJECTION)
     if not project:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -2148,7 +2891,7 @@ async def validate_project_code(
         )
     
     # Get generated code
-    generated_app = await db.generated_apps.find_one({"project_id": project_id})
+    generated_app = await load_generated_app(project_id)
     if not generated_app:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -2158,6 +2901,9 @@ async def validate_project_code(
     try:
         from validators.code_validator import CodeValidator
         
+        # Hash connus du manifeste: pas de rehachage, cache de validation par contenu
+        hashes = {entry["path"]: entry["hash"] for entry in generated_app.get("file_manifest") or []}
+        
         # Préparer les fichiers pour validation
         all_files = generated_app.get("all_files", {})
         
@@ -2175,9 +2921,9 @@ async def validate_project_code(
             if generated_app.get("package_json"):
                 all_files["package.json"] = generated_app["package_json"]
         
-        # Valider
+        # Valider (pool de processus, seuls les fichiers modifiés sont revalidés)
         validator = CodeValidator()
-        results = validator.validate_project(all_files)
+        results = await validation_engine.validate_project(all_files, hashes=hashes)
         overall_score = validator.get_project_score(results)
         report = validator.generate_validation_report(results)
         
@@ -2212,176 +2958,114 @@ async def validate_project_code(
 @api_router.get("/projects/{project_id}/preview")
 async def preview_project(
     project_id: str,
+    request: Request,
     current_user: User = Depends(get_current_user)
 ):
     """Return HTML preview of the generated application"""
     # Verify project ownership
-    project = await db.projects.find_one({"id": project_id, "user_id": current_user.id})
+    project = await get_owned_project(db, project_id, current_user.id, PROJECT_SUMMARY_PROJECTION)
     if not project:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Project not found"
         )
     
-    # Get generated code
-    generated_app = await db.generated_apps.find_one({"project_id": project_id})
-    if not generated_app:
+    # Manifeste seul: la clé de l'aperçu ne demande aucun contenu de fichier
+    document = await db.generated_apps.find_one({"project_id": project_id}, {"_id": 0})
+    if not document:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Generated code not found"
         )
     
-    # Get code from generated_app
-    html = generated_app.get("html_code", "")
-    css = generated_app.get("css_code", "")
-    js = generated_app.get("js_code", "")
-    react_code = generated_app.get("react_code", "")
-    
-    # Si html_code est vide mais react_code existe, créer un preview React
-    if not html and react_code:
-        # Nettoyer le code React: enlever les imports et export default
-        clean_react = react_code
-        lines = react_code.split('\n')
-        clean_lines = []
-        
-        for line in lines:
-            stripped = line.strip()
-            # Skip import and export statements
-            if stripped.startswith('import ') or stripped.startswith('export default') or stripped.startswith('export '):
-                continue
-            clean_lines.append(line)
-        
-        clean_react = '\n'.join(clean_lines)
-        
-        # Créer un preview HTML qui monte l'application React
-        preview_html = f"""
-<!DOCTYPE html>
-<html lang="fr">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Aperçu - {project.get('title', 'Application générée')}</title>
-    <script crossorigin src="https://unpkg.com/react@18/umd/react.production.min.js"></script>
-    <script crossorigin src="https://unpkg.com/react-dom@18/umd/react-dom.production.min.js"></script>
-    <script src="https://unpkg.com/@babel/standalone/babel.min.js"></script>
-    <script src="https://cdn.jsdelivr.net/npm/axios/dist/axios.min.js"></script>
-    <style>
-    {css}
-    </style>
-</head>
-<body>
-    <div id="root"></div>
-    <script type="text/babel">
-    // Code React généré
-    const React = window.React;
-    const {{ useState, useEffect }} = React;
-    
-    {clean_react}
-    
-    // Mount the React component
-    const root = ReactDOM.createRoot(document.getElementById('root'));
-    
-    // Try to find and render the App component
-    if (typeof App !== 'undefined') {{
-        root.render(React.createElement(App));
-    }} else if (typeof ProjectManagementApp !== 'undefined') {{
-        root.render(React.createElement(ProjectManagementApp));
-    }} else {{
-        // Fallback
-        root.render(React.createElement('div', {{ style: {{ padding: '40px', fontFamily: 'Arial, sans-serif' }} }},
-            React.createElement('h1', {{ style: {{ color: '#333' }} }}, 'Application générée'),
-            React.createElement('p', null, 'Le composant React a été généré avec succès.')
-        ));
-    }}
-    </script>
-</body>
-</html>
-        """
-    else:
-        # Preview HTML classique avec HTML/CSS/JS
-        # Nettoyer le HTML des balises dupliquées
-        clean_html = html
-        if html:
-            # Supprimer les balises wrapper si elles existent
-            import re
-            clean_html = re.sub(r'<html[^>]*>|</html>|<head[^>]*>|</head>|<body[^>]*>|</body>', '', html, flags=re.IGNORECASE)
-        
-        preview_html = f"""
-<!DOCTYPE html>
-<html lang="fr">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Aperçu - {project.get('title', 'Application générée')}</title>
-    <style>
-    {css}
-    </style>
-</head>
-<body>
-    {clean_html if clean_html else '<div style="padding: 20px;"><h1>Application générée</h1><p>Contenu en cours de génération...</p></div>'}
-    <script>
-    {js}
-    </script>
-</body>
-</html>
-        """
-    
     from fastapi.responses import HTMLResponse
-    return HTMLResponse(content=preview_html)
+    title = project.get('title', 'Application générée')
+    headers = {"Cache-Control": "private, no-cache"}
+    
+    # Page assemblée une fois par version du projet (JSX compilé côté serveur)
+    cache_key = None
+    if document.get("file_manifest") or document.get("code_manifest"):
+        cache_key = preview_key(
+            {path: entry["hash"] for path, entry in manifest_tree(document).items()},
+            title=title
+        )
+        headers["ETag"] = f'"{cache_key}"'
+        if request.headers.get("if-none-match") == headers["ETag"]:
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        cached = await preview_cache.get(cache_key)
+        track_cache(hit=cached is not None, cache_type="preview")
+        if cached is not None:
+            return HTMLResponse(content=cached, headers=headers)
+    
+    generated_app = await hydrate_app(blob_store, document)
+    build = await asyncio.to_thread(build_preview, title, generated_app)
+    if cache_key:
+        await preview_cache.put(cache_key, build, project_id)
+    
+    return HTMLResponse(content=build.html, headers=headers)
 
 
 @api_router.get("/projects/{project_id}/export/zip")
 async def export_project_zip(
     project_id: str,
+    request: Request,
     current_user: User = Depends(get_current_user)
 ):
     """Export le projet généré en ZIP téléchargeable"""
     # Verify project ownership
-    project = await db.projects.find_one({"id": project_id, "user_id": current_user.id})
+    project = await get_owned_project(db, project_id, current_user.id, PROJECT_SUMMARY_PROJECTION)
     if not project:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Project not found"
         )
     
-    # Get generated code
-    generated_app = await db.generated_apps.find_one({"project_id": project_id})
-    if not generated_app:
+    # Manifeste seul: la clé de cache ne demande aucun contenu de fichier
+    document = await db.generated_apps.find_one({"project_id": project_id}, {"_id": 0})
+    if not document:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Generated code not found. Please generate the project first."
         )
     
-    # Créer le ZIP avec l'exporter
     from exporters.zip_exporter import ZipExporter
     exporter = ZipExporter()
     
     # Déterminer le framework depuis le projet
     framework = project.get('framework', 'react')
-    
-    # Créer l'archive ZIP
-    zip_buffer = await exporter.create_project_zip(
-        project_title=project.get('title', 'Vectort Project'),
+    title = project.get('title', 'Vectort Project')
+    filename = f"{exporter._sanitize_project_name(project.get('title', 'project'))}.zip"
+    headers = {"Content-Disposition": f"attachment; filename={filename}", "Cache-Control": "private, no-cache"}
+    
+    # Projet inchangé depuis le dernier export: une seule lecture de l'archive
+    cache_key = None
+    if document.get("file_manifest") or document.get("code_manifest"):
+        cache_key = archive_key(
+            {path: entry["hash"] for path, entry in manifest_tree(document).items()},
+            title=title, framework=framework, include_config=True, format=ZIP_EXPORT_FORMAT
+        )
+        headers["ETag"] = f'"{cache_key}"'
+        if request.headers.get("if-none-match") == headers["ETag"]:
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        cached = await zip_archive_cache.get(cache_key)
+        track_cache(hit=cached is not None, cache_type="zip_export")
+        if cached is not None:
+            headers["Content-Length"] = str(len(cached))
+            return StreamingResponse(iter_bytes(cached), media_type="application/zip", headers=headers)
+    
+    generated_app = await hydrate_app(blob_store, document)
+    
+    # Archive écrite en streaming, compression dans le pool de threads
+    chunks = exporter.stream_project_zip(
+        project_title=title,
         generated_code=generated_app,
         framework=framework,
         include_config=True
     )
+    if cache_key:
+        chunks = zip_archive_cache.stream_and_store(cache_key, chunks, project_id)
     
-    # Préparer le nom du fichier
-    from exporters.zip_exporter import ZipExporter
-    temp_exporter = ZipExporter()
-    safe_name = temp_exporter._sanitize_project_name(project.get('title', 'project'))
-    filename = f"{safe_name}.zip"
-    
-    # Retourner le ZIP
-    from fastapi.responses import StreamingResponse
-    return StreamingResponse(
-        iter([zip_buffer.getvalue()]),
-        media_type="application/zip",
-        headers={
-            "Content-Disposition": f"attachment; filename={filename}"
-        }
-    )
+    return StreamingResponse(chunks, media_type="application/zip", headers=headers)
 
 
 # ============================================
@@ -2402,7 +3086,7 @@ async def export_project_to_github(
     Requiert un token GitHub avec les permissions 'repo'
     """
     # Verify project ownership
-    project = await db.projects.find_one({"id": project_id, "user_id": current_user.id})
+    project = await get_owned_project(db, project_id, current_user.id, PROJECT_SUMMARY_PROJECTION)
     if not project:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -2410,7 +3094,7 @@ async def export_project_to_github(
         )
     
     # Get generated code
-    generated_app = await db.generated_apps.find_one({"project_id": project_id})
+    generated_app = await load_generated_app(project_id)
     if not generated_app:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -2738,10 +3422,7 @@ async def deploy_project(
     
     try:
         # Verify project ownership
-        project = await db.projects.find_one({
-            "id": project_id,
-            "user_id": current_user.id
-        })
+        project = await get_owned_project(db, project_id, current_user.id, PROJECT_SUMMARY_PROJECTION)
         
         if not project:
             raise HTTPException(status_code=404, detail="Project not found")
@@ -2816,10 +3497,7 @@ async def get_deployment_status(
     
     try:
         # Verify project ownership
-        project = await db.projects.find_one({
-            "id": project_id,
-            "user_id": current_user.id
-        })
+        project = await get_owned_project(db, project_id, current_user.id, PROJECT_SUMMARY_PROJECTION)
         
         if not project:
             raise HTTPException(status_code=404, detail="Project not found")
@@ -2883,6 +3561,8 @@ async def get_supported_platforms():
 @api_router.get("/projects/{project_id}/stream")
 async def stream_generation_progress(
     project_id: str,
+    request: Request,
+    last_event_id: Optional[int] = None,
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -2895,20 +3575,26 @@ async def stream_generation_progress(
     - Erreurs
     - Completion
     
-    Compatible avec EventSource côté frontend
+    Compatible avec EventSource côté frontend (reprise via Last-Event-ID)
     """
     
     logger.info(f"📡 Stream SSE demandé pour projet: {project_id}")
     
     # Vérifier que le projet appartient à l'utilisateur
-    project = await db.projects.find_one({"id": project_id, "user_id": current_user.id})
+    project = await get_owned_project(db, project_id, current_user.id, PROJECT_SUMMARY_PROJECTION)
     if not project:
         raise HTTPException(status_code=404, detail="Projet non trouvé")
     
+    # Reprise: EventSource renvoie le dernier id reçu dans Last-Event-ID
+    # (paramètre last_event_id pour les reconnexions manuelles)
+    header_event_id = request.headers.get("Last-Event-ID")
+    if header_event_id and header_event_id.isdigit():
+        last_event_id = int(header_event_id)
+    
     # Créer ou récupérer le stream
     stream = streaming_manager.get_stream(project_id)
-    if not stream:
-        stream = streaming_manager.create_stream(project_id)
+    if not stream or last_event_id is not None:
+        stream = streaming_manager.create_stream(project_id, last_event_id=last_event_id)
     
     # Retourner StreamingResponse avec SSE
     return StreamingResponse(
@@ -2933,11 +3619,11 @@ async def get_generation_state(
     Utile pour reprendre une connexion SSE perdue
     """
     
-    project = await db.projects.find_one({"id": project_id, "user_id": current_user.id})
+    project = await get_owned_project(db, project_id, current_user.id, PROJECT_SUMMARY_PROJECTION)
     if not project:
         raise HTTPException(status_code=404, detail="Projet non trouvé")
     
-    state = streaming_manager.get_generation_state(project_id)
+    state = await streaming_manager.fetch_generation_state(project_id)
     
     return {
         "project_id": project_id,
@@ -2989,6 +3675,37 @@ async def run_auto_test(current_user: User = Depends(get_current_user)):
         )
 
 
+@api_router.post("/system/cache/invalidate")
+async def invalidate_generation_cache(
+    framework: str,
+    current_user: User = Depends(get_current_admin)
+):
+    """
+    Invalide le cache de génération (L1 + L2 + correspondances par paraphrase)
+    pour un framework
+    
+    Utile après une mise à jour des prompts ou des templates d'un framework.
+    Réservé aux administrateurs (ADMIN_EMAILS): le cache est partagé.
+    """
+    
+    from utils.semantic_cache import invalidate_semantic_scope
+    
+    deleted = await generation_cache.invalidate_framework(framework)
+    semantic_cleared = await invalidate_semantic_scope(db, framework)
+    logger.info(
+        f"🧹 Cache génération invalidé pour {framework} par {current_user.email} "
+        f"({deleted} entrées, {semantic_cleared} correspondances sémantiques)"
+    )
+    
+    return {
+        "success": True,
+        "framework": framework,
+        "deleted": deleted,
+        "semantic_cleared": semantic_cleared,
+        "stats": generation_cache.stats()
+    }
+
+
 @api_router.get("/system/harmony")
 async def get_system_harmony(current_user: User = Depends(get_current_user)):
     """
@@ -3022,6 +3739,52 @@ async def get_system_harmony(current_user: User = Depends(get_current_user)):
         )
 
 
+@api_router.get("/system/ml-insights")
+async def get_ml_insights(current_user: User = Depends(get_current_admin)):
+    """
+    Derniers insights ML calculés par le planificateur (administrateurs:
+    mots-clés et erreurs issus des générations de tous les utilisateurs)
+    
+    Lecture directe de ml_insights: rien n'est recalculé pendant la requête.
+    computed_at indique l'âge des insights (null: pas encore calculés).
+    """
+    
+    insights = await ai_system.latest_insights()
+    improvement = await ai_system.latest_insights("improvement")
+    
+    return {
+        "success": True,
+        "insights": insights,
+        "improvement": improvement,
+        "computed_at": insights["computed_at"] if insights else None,
+        "scheduler": periodic_scheduler.status()
+    }
+
+
+@api_router.get("/system/agents-health")
+async def get_agents_health(
+    hours: float = Query(1.0, gt=0, le=24 * 90),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Santé des agents sur les dernières `hours` heures
+    
+    Servie par les rollups minute/heure de agent_performance (une
+    agrégation): assez léger pour un tableau de bord rafraîchi en continu.
+    """
+    
+    if not ai_system.ml_system:
+        raise HTTPException(status_code=503, detail="Système ML indisponible")
+    
+    agents = await ai_system.ml_system.performance_tracker.get_all_agents_health(days=hours / 24.0)
+    
+    return {
+        "success": True,
+        "hours": hours,
+        "agents": agents
+    }
+
+
 @api_router.get("/templates")
 async def get_all_templates():
     """
@@ -3163,6 +3926,7 @@ app.add_middleware(
     allow_origins=["*"],  # À restreindre en production
     allow_methods=["GET", "POST", "PUT", "DELETE"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Middleware de sécurité
@@ -3185,15 +3949,53 @@ async def startup_db():
     await db.users.create_index([("provider", 1), ("provider_id", 1)])
     await db.projects.create_index("user_id")
     await db.projects.create_index("created_at")
+    # Pagination keyset de GET /projects
+    await db.projects.create_index([("user_id", 1), ("created_at", -1), ("id", -1)])
     
     # Indexes for iteration system
     await db.project_chat.create_index([("project_id", 1), ("timestamp", 1)])
     await db.project_iterations.create_index([("project_id", 1), ("iteration_number", 1)])
     await db.generated_apps.create_index("project_id", unique=True)
     
+    # Index for semantic (paraphrase) cache lookups
+    await db.generated_apps.create_index([("semantic_scope", 1), ("semantic_bands", 1)])
+    
+    # Generation cache (L2): (cache_key, created_at) + TTL on expires_at
+    await generation_cache.ensure_indexes()
+    
+    # Ledger de crédits: index + transactions restées dans l'outbox
+    await credit_ledger.ensure_indexes()
+    await version_store.ensure_indexes()
+    await zip_archive_cache.ensure_indexes()
+    await preview_cache.ensure_indexes()
+    
+    # Processus de validation démarrés avant la première requête
+    await validation_engine.warm_up()
+    await credit_ledger.flush_outbox()
+    
+    # Backplane SSE (STREAM_BACKPLANE=memory|mongo|redis)
+    streaming_manager.set_backplane(create_backplane(db=db))
+    await streaming_manager.backplane.start()
+    
+    # Jobs de génération: index + workers dans ce processus
+    await generation_jobs.ensure_indexes()
+    if GENERATION_WORKERS_INPROCESS:
+        await generation_workers.start()
+    
+    # Tâches périodiques (leader élu par lease Mongo)
+    if periodic_scheduler.tasks:
+        await periodic_scheduler.start()
+    
     logger.info("Database indexes created")
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    # Les jobs en cours retournent en file pour un autre worker
+    await generation_workers.stop()
+    await periodic_scheduler.stop()
+    await credit_ledger.drain()
+    await streaming_manager.backplane.close()
+    await http_clients.aclose()
+    validation_engine.shutdown()
     client.close()
     logger.info("Database connection closed")
\ No newline at end of file
@@ -3,5 +3,9 @@ Module de streaming pour Vectort.io
 """
 
 from .streaming_system import StreamingMessage, GenerationStreamer, streaming_manager
+from .llm_stream import FileChunk, IncrementalFileParser, LLMStreamRequest, iter_llm_chunks
 
-__all__ = ['StreamingMessage', 'GenerationStreamer', 'streaming_manager']
+__all__ = [
+    'StreamingMessage', 'GenerationStreamer', 'streaming_manager',
+    'FileChunk', 'IncrementalFileParser', 'LLMStreamRequest', 'iter_llm_chunks'
+]
@@ -0,0 +1,383 @@
+"""
+Backplane pub/sub pour le streaming SSE
+Permet à n'importe quel worker uvicorn de servir le stream d'une génération
+lancée sur un autre worker
+
+Backends:
+- memory: in-process (défaut, un seul worker)
+- mongo: collection plafonnée (capped) + curseur tailable
+- redis: Redis Streams (XADD / XREAD), compatible avec tout serveur
+  parlant le protocole Redis
+
+Chaque événement reçoit un numéro de séquence croissant par projet ("seq").
+"""
+
+import asyncio
+import json
+import logging
+import os
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+STREAM_BACKPLANE = os.environ.get("STREAM_BACKPLANE", "memory").lower()
+STREAM_HISTORY_SIZE = int(os.environ.get("STREAM_HISTORY_SIZE", "512"))
+STREAM_EVENTS_CAPPED_MB = int(os.environ.get("STREAM_EVENTS_CAPPED_MB", "64"))
+STREAM_REDIS_TTL_SECONDS = int(os.environ.get("STREAM_REDIS_TTL_SECONDS", "86400"))
+# Durée de conservation de l'historique après la fin d'une génération
+# (reprise d'une connexion SSE coupée juste avant le message complete)
+STREAM_RESUME_GRACE_SECONDS = int(os.environ.get("STREAM_RESUME_GRACE_SECONDS", "120"))
+
+
+class ProjectLocks:
+    """
+    Un asyncio.Lock par projet, libéré quand plus personne ne l'attend
+
+    Sérialise compteur + écriture d'un publish: des agents qui publient en
+    parallèle pour le même projet insèrent ainsi leurs événements dans
+    l'ordre des séquences (les abonnés ignorent un seq déjà dépassé).
+    """
+
+    def __init__(self):
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._holders: Dict[str, int] = {}
+
+    @asynccontextmanager
+    async def hold(self, project_id: str):
+        lock = self._locks.setdefault(project_id, asyncio.Lock())
+        self._holders[project_id] = self._holders.get(project_id, 0) + 1
+        try:
+            async with lock:
+                yield
+        finally:
+            self._holders[project_id] -= 1
+            if not self._holders[project_id]:
+                del self._holders[project_id]
+                del self._locks[project_id]
+
+    def __len__(self) -> int:
+        return len(self._locks)
+
+
+class StreamBackplane:
+    """
+    Interface commune des backends
+
+    publish() attribue le numéro de séquence et diffuse l'événement;
+    subscribe() produit les événements de seq > after_seq, puis les suivants
+    au fur et à mesure (after_seq=None: uniquement les nouveaux).
+    """
+
+    name = "base"
+    # Vrai si tous les abonnés vivent dans ce processus
+    local = False
+
+    async def start(self):
+        """Prépare le backend (collections, connexions)"""
+
+    async def close(self):
+        """Libère les ressources du backend"""
+
+    async def publish(self, project_id: str, event: Dict) -> int:
+        raise NotImplementedError
+
+    async def last_sequence(self, project_id: str) -> int:
+        raise NotImplementedError
+
+    def known_sequence(self, project_id: str) -> Optional[int]:
+        """Dernière séquence connue sans I/O (None si le backend ne la connaît pas)"""
+        return None
+
+    def has_history(self, project_id: str) -> bool:
+        """Vrai si des événements de ce projet peuvent être rejoués"""
+        return True
+
+    def forget(self, project_id: str):
+        """Supprime l'historique d'un projet (les backends partagés expirent seuls)"""
+
+    async def last_event(self, project_id: str) -> Optional[Dict]:
+        raise NotImplementedError
+
+    def subscribe(self, project_id: str, after_seq: Optional[int] = None) -> AsyncIterator[Dict]:
+        raise NotImplementedError
+
+
+class InProcessBackplane(StreamBackplane):
+    """Backend en mémoire: historique borné par projet + réveil des abonnés"""
+
+    name = "memory"
+    local = True
+
+    def __init__(self, history_size: int = STREAM_HISTORY_SIZE):
+        self.history_size = history_size
+        self._history: Dict[str, Deque[Dict]] = {}
+        self._sequences: Dict[str, int] = {}
+        self._conditions: Dict[str, asyncio.Condition] = {}
+
+    def _condition(self, project_id: str) -> asyncio.Condition:
+        condition = self._conditions.get(project_id)
+        if condition is None:
+            condition = asyncio.Condition()
+            self._conditions[project_id] = condition
+        return condition
+
+    async def publish(self, project_id: str, event: Dict) -> int:
+        seq = self._sequences.get(project_id, 0) + 1
+        self._sequences[project_id] = seq
+        event = dict(event, seq=seq)
+
+        history = self._history.get(project_id)
+        if history is None:
+            history = deque(maxlen=self.history_size)
+            self._history[project_id] = history
+        history.append(event)
+
+        condition = self._condition(project_id)
+        async with condition:
+            condition.notify_all()
+        return seq
+
+    async def last_sequence(self, project_id: str) -> int:
+        return self._sequences.get(project_id, 0)
+
+    def known_sequence(self, project_id: str) -> Optional[int]:
+        return self._sequences.get(project_id, 0)
+
+    def has_history(self, project_id: str) -> bool:
+        return project_id in self._history
+
+    async def last_event(self, project_id: str) -> Optional[Dict]:
+        history = self._history.get(project_id)
+        return history[-1] if history else None
+
+    async def subscribe(self, project_id: str, after_seq: Optional[int] = None) -> AsyncIterator[Dict]:
+        cursor = self._sequences.get(project_id, 0) if after_seq is None else after_seq
+        condition = self._condition(project_id)
+        while True:
+            pending = [e for e in self._history.get(project_id, ()) if e["seq"] > cursor]
+            if not pending:
+                async with condition:
+                    # Re-vérifier sous le verrou pour ne pas rater un notify
+                    if self._sequences.get(project_id, 0) <= cursor:
+                        await condition.wait()
+                continue
+            for event in pending:
+                cursor = event["seq"]
+                yield event
+
+    def forget(self, project_id: str):
+        # Une génération suivante repart de seq 1: un Last-Event-ID plus grand
+        # que la séquence courante est traité comme inconnu par _pump
+        self._history.pop(project_id, None)
+        self._sequences.pop(project_id, None)
+        self._conditions.pop(project_id, None)
+
+
+class MongoBackplane(StreamBackplane):
+    """
+    Backend MongoDB: événements dans une collection plafonnée lue par curseur
+    tailable (fonctionne sans replica set, contrairement aux change streams)
+    """
+
+    name = "mongo"
+
+    def __init__(
+        self,
+        db,
+        collection_name: str = "stream_events",
+        capped_bytes: int = STREAM_EVENTS_CAPPED_MB * 1024 * 1024,
+        poll_interval: float = 0.1
+    ):
+        self.db = db
+        self.collection_name = collection_name
+        self.capped_bytes = capped_bytes
+        self.poll_interval = poll_interval
+        self._publish_locks = ProjectLocks()
+
+    @property
+    def events(self):
+        return self.db[self.collection_name]
+
+    async def start(self):
+        from pymongo.errors import CollectionInvalid
+
+        try:
+            await self.db.create_collection(self.collection_name, capped=True, size=self.capped_bytes)
+        except CollectionInvalid:
+            pass  # Déjà créée par un autre worker
+        await self.events.create_index([("project_id", 1), ("seq", 1)])
+
+    async def publish(self, project_id: str, event: Dict) -> int:
+        from pymongo import ReturnDocument
+
+        # Compteur et insertion sous le même verrou: sinon seq N+1 peut être
+        # inséré avant N, et le curseur tailable (ordre d'insertion) perdrait N
+        async with self._publish_locks.hold(project_id):
+            counter = await self.db.stream_sequences.find_one_and_update(
+                {"_id": project_id},
+                {"$inc": {"seq": 1}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+            seq = counter["seq"]
+            await self.events.insert_one({"project_id": project_id, "seq": seq, "event": dict(event, seq=seq)})
+        return seq
+
+    async def last_sequence(self, project_id: str) -> int:
+        counter = await self.db.stream_sequences.find_one({"_id": project_id})
+        return counter["seq"] if counter else 0
+
+    async def last_event(self, project_id: str) -> Optional[Dict]:
+        document = await self.events.find_one({"project_id": project_id}, sort=[("seq", -1)])
+        return document["event"] if document else None
+
+    async def subscribe(self, project_id: str, after_seq: Optional[int] = None) -> AsyncIterator[Dict]:
+        from pymongo import CursorType
+
+        cursor_seq = await self.last_sequence(project_id) if after_seq is None else after_seq
+        while True:
+            cursor = self.events.find(
+                {"project_id": project_id, "seq": {"$gt": cursor_seq}},
+                cursor_type=CursorType.TAILABLE_AWAIT
+            )
+            while cursor.alive:
+                async for document in cursor:
+                    event = document["event"]
+                    # Publications sérialisées par projet: un seq déjà dépassé
+                    # est un doublon (curseur rouvert), pas un événement en retard
+                    if event["seq"] <= cursor_seq:
+                        continue
+                    cursor_seq = event["seq"]
+                    yield event
+                await asyncio.sleep(self.poll_interval)
+            # Curseur mort (collection vide au départ): en rouvrir un
+            await asyncio.sleep(self.poll_interval)
+
+
+class RedisBackplane(StreamBackplane):
+    """
+    Backend Redis Streams: une clé de stream par projet (XADD MAXLEN ~),
+    séquence via INCR, lecture bloquante XREAD
+    """
+
+    name = "redis"
+
+    def __init__(
+        self,
+        url: str = None,
+        client=None,
+        prefix: str = "vectort:stream",
+        history_size: int = STREAM_HISTORY_SIZE,
+        block_ms: int = 1000
+    ):
+        if client is None:
+            import redis.asyncio as redis_asyncio
+
+            client = redis_asyncio.from_url(url or os.environ.get("REDIS_URL", "redis://localhost:6379/0"))
+        self.client = client
+        self.prefix = prefix
+        self.history_size = history_size
+        self.block_ms = block_ms
+        self._publish_locks = ProjectLocks()
+
+    def _stream_key(self, project_id: str) -> str:
+        return f"{self.prefix}:{project_id}"
+
+    def _seq_key(self, project_id: str) -> str:
+        return f"{self.prefix}:{project_id}:seq"
+
+    async def close(self):
+        await self.client.close()
+
+    async def publish(self, project_id: str, event: Dict) -> int:
+        key = self._stream_key(project_id)
+        # Même contrainte que MongoBackplane: XREAD suit l'ordre des XADD
+        async with self._publish_locks.hold(project_id):
+            seq = int(await self.client.incr(self._seq_key(project_id)))
+            payload = json.dumps(dict(event, seq=seq))
+            await self.client.xadd(key, {"seq": seq, "event": payload}, maxlen=self.history_size, approximate=True)
+        # Après complete, l'historique ne sert plus qu'aux reprises tardives
+        ttl = STREAM_RESUME_GRACE_SECONDS if event.get("type") == "complete" else STREAM_REDIS_TTL_SECONDS
+        await self.client.expire(key, ttl)
+        await self.client.expire(self._seq_key(project_id), STREAM_REDIS_TTL_SECONDS)
+        return seq
+
+    async def last_sequence(self, project_id: str) -> int:
+        value = await self.client.get(self._seq_key(project_id))
+        return int(value) if value else 0
+
+    async def last_event(self, project_id: str) -> Optional[Dict]:
+        entries = await self.client.xrevrange(self._stream_key(project_id), count=1)
+        return self._decode(entries[0][1]) if entries else None
+
+    @staticmethod
+    def _decode(fields: Dict) -> Dict:
+        raw = fields.get(b"event", fields.get("event"))
+        return json.loads(raw)
+
+    async def subscribe(self, project_id: str, after_seq: Optional[int] = None) -> AsyncIterator[Dict]:
+        key = self._stream_key(project_id)
+        cursor_seq = after_seq
+        stream_id = "$"
+
+        if after_seq is not None:
+            # Rejouer l'historique encore présent dans le stream
+            for entry_id, fields in await self.client.xrange(key):
+                stream_id = entry_id
+                event = self._decode(fields)
+                if event["seq"] > cursor_seq:
+                    cursor_seq = event["seq"]
+                    yield event
+            if stream_id == "$":
+                stream_id = "0-0"
+        else:
+            # Partir du dernier élément existant (et non de "$") pour ne rien
+            # perdre entre cette lecture et le premier XREAD
+            entries = await self.client.xrevrange(key, count=1)
+            if entries:
+                stream_id = entries[0][0]
+                cursor_seq = self._decode(entries[0][1])["seq"]
+            else:
+                stream_id = "0-0"
+                cursor_seq = 0
+
+        while True:
+            response = await self.client.xread({key: stream_id}, block=self.block_ms, count=100)
+            for _key, entries in response or []:
+                for entry_id, fields in entries:
+                    stream_id = entry_id
+                    event = self._decode(fields)
+                    if event["seq"] <= cursor_seq:
+                        continue
+                    cursor_seq = event["seq"]
+                    yield event
+
+
+def create_backplane(kind: str = None, db=None, **kwargs) -> StreamBackplane:
+    """
+    Instancie le backend configuré (STREAM_BACKPLANE=memory|mongo|redis)
+    """
+    kind = (kind or STREAM_BACKPLANE).lower()
+    if kind == "mongo":
+        if db is None:
+            raise ValueError("Le backplane mongo nécessite une base de données")
+        return MongoBackplane(db, **kwargs)
+    if kind == "redis":
+        return RedisBackplane(**kwargs)
+    if kind != "memory":
+        logger.warning(f"⚠️ Backplane inconnu '{kind}', utilisation du backend mémoire")
+    return InProcessBackplane(**kwargs)
+
+
+__all__ = [
+    'StreamBackplane',
+    'InProcessBackplane',
+    'ProjectLocks',
+    'MongoBackplane',
+    'RedisBackplane',
+    'create_backplane',
+    'STREAM_BACKPLANE',
+    'STREAM_RESUME_GRACE_SECONDS',
+]
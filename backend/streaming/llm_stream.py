@@ -0,0 +1,224 @@
+"""
+Streaming incrémental des réponses LLM
+Parse les blocs FICHIER: path ```code``` au fil de l'eau pour pousser
+le contenu partiel des fichiers en messages SSE file_chunk
+"""
+
+import os
+import re
+import logging
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Les clés Emergent passent par leur proxy compatible OpenAI; sans URL de
+# proxy, OPENAI_API_KEY permet d'appeler OpenAI directement en streaming
+EMERGENT_KEY_PREFIX = "sk-emergent-"
+EMERGENT_LLM_PROXY_URL = os.environ.get("EMERGENT_LLM_PROXY_URL")
+LLM_STREAMING_ENABLED = os.environ.get("LLM_STREAMING_ENABLED", "true").lower() == "true"
+
+FENCE = "```"
+HEADER_MARKER = "FICHIER:"
+
+_HEADER_PATTERN = re.compile(r"FICHIER:\s*([^\n]+)\n")
+_FENCE_PATTERN = re.compile(r"\s*```(\w*)\n")
+
+
+@dataclass
+class FileChunk:
+    """Morceau de fichier extrait du flux LLM"""
+    file_path: str
+    text: str
+    offset: int  # Position du morceau dans le fichier (0 = début)
+    done: bool = False  # Bloc de code fermé
+
+
+class IncrementalFileParser:
+    """
+    Parser incrémental du format FICHIER: path suivi de ```code```
+
+    Même format que SpecializedAgent._parse_response, mais alimenté morceau
+    par morceau: les marqueurs coupés entre deux morceaux sont conservés
+    dans le tampon jusqu'à ce qu'ils soient complets.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._state = "header"  # header -> fence -> body -> header
+        self._file_path = None
+        self._offset = 0
+
+    def feed(self, chunk: str) -> List[FileChunk]:
+        """Ajoute un morceau de réponse, retourne les morceaux de fichiers prêts"""
+        self._buffer += chunk
+        events: List[FileChunk] = []
+
+        while True:
+            if self._state == "header":
+                match = _HEADER_PATTERN.search(self._buffer)
+                if not match:
+                    # Garder l'en-tête en cours ou un début de marqueur coupé
+                    marker = self._buffer.rfind(HEADER_MARKER)
+                    if marker >= 0:
+                        self._buffer = self._buffer[marker:]
+                    else:
+                        self._buffer = self._buffer[-(len(HEADER_MARKER) - 1):]
+                    break
+                self._file_path = match.group(1).strip()
+                self._offset = 0
+                self._buffer = self._buffer[match.end():]
+                self._state = "fence"
+
+            elif self._state == "fence":
+                match = _FENCE_PATTERN.match(self._buffer)
+                if match:
+                    self._buffer = self._buffer[match.end():]
+                    self._state = "body"
+                    continue
+                stripped = self._buffer.lstrip()
+                if stripped and (not FENCE.startswith(stripped[:len(FENCE)]) or "\n" in stripped):
+                    # Pas de bloc de code après l'en-tête: ignorer ce fichier
+                    self._state = "header"
+                    continue
+                break
+
+            else:  # body
+                end = self._buffer.find(FENCE)
+                if end >= 0:
+                    text = self._buffer[:end]
+                    events.append(FileChunk(self._file_path, text, self._offset, done=True))
+                    self._offset += len(text)
+                    self._buffer = self._buffer[end + len(FENCE):]
+                    self._state = "header"
+                    continue
+                # Retenir les derniers caractères: début possible de ```
+                safe = len(self._buffer) - (len(FENCE) - 1)
+                if safe > 0:
+                    text = self._buffer[:safe]
+                    events.append(FileChunk(self._file_path, text, self._offset))
+                    self._offset += len(text)
+                    self._buffer = self._buffer[safe:]
+                break
+
+        return events
+
+
+@dataclass
+class LLMStreamRequest:
+    """Appel LLM à streamer (mêmes paramètres que le LlmChat de l'agent)"""
+    api_key: Optional[str]
+    system_message: str
+    prompt: str
+    provider: str = "openai"
+    model: str = "gpt-4o"
+
+
+Completion = Callable[..., Awaitable[Any]]
+
+_logged_fallbacks = set()
+
+
+def stream_credentials(request: LLMStreamRequest) -> Optional[Dict[str, str]]:
+    """Paramètres d'authentification litellm, None si aucun ne permet de streamer"""
+    api_key = request.api_key
+    if api_key and api_key.startswith(EMERGENT_KEY_PREFIX):
+        if EMERGENT_LLM_PROXY_URL:
+            return {"api_key": api_key, "api_base": EMERGENT_LLM_PROXY_URL}
+        openai_key = os.environ.get("OPENAI_API_KEY")
+        if openai_key and request.provider == "openai":
+            return {"api_key": openai_key}
+        return None
+    if api_key:
+        return {"api_key": api_key}
+    return None
+
+
+def _load_completion() -> Optional[Completion]:
+    try:
+        from litellm import acompletion
+    except ImportError:
+        return None
+    return acompletion
+
+
+def _chunk_text(chunk: Any) -> str:
+    """Texte d'un morceau de réponse streamée (objet litellm/openai ou dict)"""
+    choices = chunk.get("choices") if isinstance(chunk, dict) else getattr(chunk, "choices", None)
+    if not choices:
+        return ""
+    choice = choices[0]
+    delta = choice.get("delta") if isinstance(choice, dict) else getattr(choice, "delta", None)
+    if delta is None:
+        return ""
+    content = delta.get("content") if isinstance(delta, dict) else getattr(delta, "content", None)
+    return content or ""
+
+
+def _log_fallback(reason: str):
+    # Une alerte par cause, puis en debug: dix agents par génération
+    if reason in _logged_fallbacks:
+        logger.debug(f"Streaming LLM indisponible ({reason}): réponse en un seul morceau")
+        return
+    _logged_fallbacks.add(reason)
+    logger.warning(f"⚠️ Streaming LLM indisponible ({reason}): réponse en un seul morceau")
+
+
+async def iter_llm_chunks(
+    request: LLMStreamRequest,
+    fallback: Optional[Callable[[], Awaitable[Any]]] = None,
+    completion: Optional[Completion] = None
+) -> AsyncIterator[str]:
+    """
+    Itère sur la réponse du LLM morceau par morceau
+
+    Streame via litellm.acompletion(stream=True). Si le streaming n'est pas
+    possible (désactivé, litellm absent, aucune clé utilisable, erreur à
+    l'ouverture du flux), appelle `fallback` (send_message du LlmChat) et
+    produit la réponse complète en un seul morceau, avec une alerte.
+
+    Args:
+        completion: Fonction compatible litellm.acompletion (tests)
+    """
+    reason = None
+    credentials = stream_credentials(request)
+    if not LLM_STREAMING_ENABLED and completion is None:
+        reason = "LLM_STREAMING_ENABLED=false"
+    elif credentials is None:
+        reason = "aucune clé de streaming (EMERGENT_LLM_PROXY_URL ou OPENAI_API_KEY)"
+    else:
+        completion = completion or _load_completion()
+        if completion is None:
+            reason = "litellm non installé"
+
+    if reason is None:
+        try:
+            stream = await completion(
+                model=f"{request.provider}/{request.model}",
+                messages=[
+                    {"role": "system", "content": request.system_message},
+                    {"role": "user", "content": request.prompt},
+                ],
+                stream=True,
+                **credentials
+            )
+        except Exception as e:
+            if fallback is None:
+                raise
+            reason = f"{type(e).__name__}: {e}"
+        else:
+            # Une erreur en cours de flux remonte: du contenu a déjà été poussé
+            async for chunk in stream:
+                text = _chunk_text(chunk)
+                if text:
+                    yield text
+            return
+
+    if fallback is None:
+        raise RuntimeError(f"Streaming LLM indisponible: {reason}")
+    _log_fallback(reason)
+    response = await fallback()
+    yield response if isinstance(response, str) else getattr(response, "text", str(response))
+
+
+__all__ = ['FileChunk', 'IncrementalFileParser', 'LLMStreamRequest', 'iter_llm_chunks']
@@ -4,13 +4,20 @@ Affiche la progression en temps réel comme Emergent
 """
 
 import asyncio
+import copy
 import logging
-from typing import AsyncGenerator, Dict, List
+import os
+from typing import AsyncGenerator, Dict, List, Optional
 from datetime import datetime
 import json
 
+from .backplane import StreamBackplane, InProcessBackplane, STREAM_RESUME_GRACE_SECONDS
+
 logger = logging.getLogger(__name__)
 
+# Historique d'une génération sans nouvel événement ni lecteur: libéré après ce délai
+STREAM_IDLE_TTL_SECONDS = int(os.environ.get("STREAM_IDLE_TTL_SECONDS", "900"))
+
 
 class StreamingMessage:
     """Message de streaming avec type et contenu"""
@@ -22,15 +29,32 @@ class StreamingMessage:
         agent: str = None,
         file_path: str = None,
         progress: int = 0,
-        metadata: Dict = None
+        metadata: Dict = None,
+        sequence: int = None
     ):
-        self.message_type = message_type  # info, success, error, progress, file_created
+        self.message_type = message_type  # info, success, error, progress, file_created, file_chunk
         self.content = content
         self.agent = agent
         self.file_path = file_path
         self.progress = progress
         self.metadata = metadata or {}
         self.timestamp = datetime.utcnow().isoformat()
+        self.sequence = sequence  # Numéro d'ordre par projet, attribué par le backplane
+    
+    @classmethod
+    def from_dict(cls, data: Dict) -> "StreamingMessage":
+        """Reconstruit un message reçu du backplane"""
+        message = cls(
+            message_type=data.get("type"),
+            content=data.get("content"),
+            agent=data.get("agent"),
+            file_path=data.get("file_path"),
+            progress=data.get("progress", 0),
+            metadata=data.get("metadata"),
+            sequence=data.get("seq")
+        )
+        message.timestamp = data.get("timestamp", message.timestamp)
+        return message
     
     def to_dict(self) -> Dict:
         """Convertit en dict pour SSE"""
@@ -41,12 +65,16 @@ class StreamingMessage:
             "file_path": self.file_path,
             "progress": self.progress,
             "metadata": self.metadata,
-            "timestamp": self.timestamp
+            "timestamp": self.timestamp,
+            "seq": self.sequence
         }
     
     def to_sse_format(self) -> str:
         """Formate pour Server-Sent Events"""
         data = json.dumps(self.to_dict())
+        if self.sequence is not None:
+            # id: renvoyé par EventSource dans Last-Event-ID à la reconnexion
+            return f"id: {self.sequence}\ndata: {data}\n\n"
         return f"data: {data}\n\n"
 
 
@@ -75,30 +103,108 @@ class GenerationStreamer:
     """
     Streamer pour la génération multi-agents
     Affiche la progression en temps réel
+    
+    Les messages passent par un backplane (mémoire par défaut, Mongo ou Redis)
+    qui leur attribue un numéro de séquence: avec un backplane partagé, la
+    génération et la connexion SSE peuvent tourner sur des workers différents.
     """
     
-    def __init__(self):
+    def __init__(self, backplane: StreamBackplane = None):
         self.queues: Dict[str, StreamingQueue] = {}
         self.generation_states: Dict[str, Dict] = {}
+        self.backplane = backplane or InProcessBackplane()
+        self._pumps: Dict[str, asyncio.Task] = {}
+        self._expiry_handles: Dict[str, asyncio.TimerHandle] = {}
     
-    def create_stream(self, project_id: str) -> StreamingQueue:
-        """Crée un nouveau stream pour un projet"""
-        queue = StreamingQueue()
-        self.queues[project_id] = queue
-        self.generation_states[project_id] = {
+    def set_backplane(self, backplane: StreamBackplane):
+        """Change de backend pub/sub (au démarrage, avant toute génération)"""
+        self.backplane = backplane
+        logger.info(f"📡 Backplane de streaming: {backplane.name}")
+    
+    @staticmethod
+    def _new_state() -> Dict:
+        return {
             "phase": "init",
             "progress": 0,
             "agents_completed": [],
-            "files_created": []
+            "files_created": [],
+            "agent_timings": {}
         }
+    
+    def create_stream(self, project_id: str, last_event_id: Optional[int] = None) -> StreamingQueue:
+        """
+        Crée un nouveau stream pour un projet
+        
+        Args:
+            last_event_id: Dernier seq reçu par le client (en-tête Last-Event-ID);
+                les événements suivants encore en mémoire sont rejoués
+        """
+        # Une reconnexion remplace le stream précédent du projet
+        self.close_stream(project_id)
+        
+        queue = StreamingQueue()
+        self.queues[project_id] = queue
+        
+        state = self.generation_states.get(project_id)
+        if state is None or (last_event_id is None and state.get("progress") == 100):
+            # Nouvelle génération (une reprise garde l'état en cours)
+            self.generation_states[project_id] = self._new_state()
+        
+        # Relayer les événements du backplane vers la queue locale, à partir
+        # du dernier événement reçu ou de la séquence courante (connue sans I/O
+        # pour le backend mémoire)
+        after_seq = self.backplane.known_sequence(project_id)
+        if last_event_id is not None and (after_seq is None or last_event_id < after_seq):
+            after_seq = last_event_id
+        self._pumps[project_id] = asyncio.ensure_future(self._pump(project_id, queue, after_seq))
         
-        logger.info(f"📡 Stream créé pour projet: {project_id}")
+        if last_event_id is not None:
+            logger.info(f"📡 Stream repris pour projet: {project_id} (après l'événement {last_event_id})")
+        else:
+            logger.info(f"📡 Stream créé pour projet: {project_id}")
         return queue
     
     def get_stream(self, project_id: str) -> StreamingQueue:
         """Récupère un stream existant"""
         return self.queues.get(project_id)
     
+    def is_streaming(self, project_id: str) -> bool:
+        """
+        Indique si les messages de ce projet peuvent avoir un lecteur
+        
+        Avec un backplane partagé, le lecteur peut être sur un autre worker
+        """
+        return project_id in self.queues or self.backplane.has_history(project_id)
+    
+    async def _pump(self, project_id: str, queue: StreamingQueue, after_seq: Optional[int]):
+        """Copie les événements publiés sur le backplane dans la queue SSE locale"""
+        try:
+            current_seq = await self.backplane.last_sequence(project_id)
+            if after_seq is None or after_seq > current_seq:
+                # Id inconnu (ex: redémarrage du serveur): repartir du présent
+                after_seq = current_seq
+            expected_seq = after_seq + 1
+            async for event in self.backplane.subscribe(project_id, after_seq=after_seq):
+                if event["seq"] > expected_seq:
+                    # Événements déjà sortis de l'historique: renvoyer l'état courant
+                    await queue.send(StreamingMessage(
+                        "resync",
+                        "🔄 Reconnexion: une partie des événements n'est plus disponible",
+                        metadata={"state": self.generation_states.get(project_id, {}),
+                                  "missed_from": expected_seq, "missed_to": event["seq"] - 1}
+                    ))
+                expected_seq = event["seq"] + 1
+                message = StreamingMessage.from_dict(event)
+                state = message.metadata.get("state")
+                if state is not None:
+                    self.generation_states[project_id] = state
+                await queue.send(message)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"❌ Erreur backplane ({self.backplane.name}) pour {project_id}: {e}")
+            await queue.send(StreamingMessage("error", f"Erreur streaming: {str(e)}"))
+    
     async def send_message(
         self,
         project_id: str,
@@ -106,36 +212,93 @@ class GenerationStreamer:
         content: str,
         agent: str = None,
         file_path: str = None,
-        progress: int = None
+        progress: int = None,
+        metadata: Dict = None
     ):
-        """Envoie un message dans le stream"""
-        queue = self.queues.get(project_id)
-        if not queue:
+        """
+        Envoie un message dans le stream
+        
+        Dans une génération partagée (single-flight), les messages du projet
+        qui l'a lancée sont aussi envoyés aux projets des appelants rattachés
+        """
+        targets = [target for target in self._audience(project_id) if self.is_streaming(target)]
+        if not targets:
             return
         
-        # Mettre à jour l'état
-        state = self.generation_states.get(project_id, {})
+        # Mettre à jour l'état (côté worker qui génère)
+        state = self.generation_states.get(project_id)
+        if state is None:
+            state = self._new_state()
+            self.generation_states[project_id] = state
         if progress is not None:
             state["progress"] = progress
         if agent and message_type == "success":
             if agent not in state.get("agents_completed", []):
                 state["agents_completed"].append(agent)
-        if file_path:
+        if file_path and message_type == "file_created":
             if file_path not in state.get("files_created", []):
                 state["files_created"].append(file_path)
         
-        message = StreamingMessage(
-            message_type=message_type,
-            content=content,
-            agent=agent,
-            file_path=file_path,
-            progress=progress or state.get("progress", 0),
-            metadata={"state": state}
-        )
-        
-        await queue.send(message)
+        for target in targets:
+            if target != project_id:
+                # Appelant rattaché en cours de route: il reprend l'état complet
+                self.generation_states[target] = copy.deepcopy(state)
+            
+            message_metadata = dict(metadata or {})
+            if message_type != "file_chunk":
+                # Les morceaux de fichiers sont fréquents: pas d'état complet à chaque fois
+                message_metadata["state"] = self.generation_states[target]
+            
+            message = StreamingMessage(
+                message_type=message_type,
+                content=content,
+                agent=agent,
+                file_path=file_path,
+                progress=progress or state.get("progress", 0),
+                metadata=message_metadata
+            )
+            
+            message.sequence = await self.backplane.publish(target, message.to_dict())
+            
+            # Historique conservé pour les reprises: un délai de grâce après la fin,
+            # sinon tant que la génération émet des événements
+            self._schedule_expiry(
+                target,
+                STREAM_RESUME_GRACE_SECONDS if message_type == "complete" else STREAM_IDLE_TTL_SECONDS
+            )
         logger.debug(f"📤 Message envoyé: {content[:50]}")
     
+    @staticmethod
+    def _audience(project_id: str) -> List[str]:
+        """Projets destinataires d'un message (contexte LLM de la tâche courante)"""
+        try:
+            from utils.llm_governor import get_llm_context
+        except Exception:
+            return [project_id]
+        
+        context = get_llm_context()
+        if context.members and project_id == context.project_id:
+            return context.project_ids() or [project_id]
+        return [project_id]
+    
+    def _schedule_expiry(self, project_id: str, delay: float):
+        handle = self._expiry_handles.pop(project_id, None)
+        if handle is not None:
+            handle.cancel()
+        loop = asyncio.get_event_loop()
+        self._expiry_handles[project_id] = loop.call_later(delay, self._expire, project_id)
+    
+    def _expire(self, project_id: str):
+        """Libère l'historique et l'état d'un projet (délai de grâce écoulé)"""
+        self._expiry_handles.pop(project_id, None)
+        if project_id in self.queues:
+            # Un lecteur est encore connecté: repousser
+            self._schedule_expiry(project_id, STREAM_IDLE_TTL_SECONDS)
+            return
+        self.generation_states.pop(project_id, None)
+        self.backplane.forget(project_id)
+        logger.info(f"🧹 Historique de stream libéré pour projet: {project_id}")
+    
     async def stream_phase(self, project_id: str, phase_name: str, phase_number: int):
         """Annonce une nouvelle phase"""
         await self.send_message(
@@ -172,6 +335,51 @@ class GenerationStreamer:
             file_path=file_path
         )
     
+    async def stream_file_chunk(
+        self,
+        project_id: str,
+        file_path: str,
+        chunk: str,
+        offset: int,
+        done: bool = False,
+        agent: str = None
+    ):
+        """Contenu partiel d'un fichier en cours de génération par le LLM"""
+        await self.send_message(
+            project_id,
+            "file_chunk",
+            chunk,
+            agent=agent,
+            file_path=file_path,
+            metadata={"offset": offset, "done": done}
+        )
+
+    async def stream_file_reset(self, project_id: str, agent: str, attempt: int):
+        """
+        Nouvelle tentative d'un agent: le client jette les fichiers partiels
+        reçus de cet agent (file_chunk d'une tentative abandonnée)
+        """
+        await self.send_message(
+            project_id,
+            "file_reset",
+            f"🔁 Agent {agent}: tentative {attempt}",
+            agent=agent,
+            metadata={"attempt": attempt}
+        )
+
+    async def record_agent_timing(self, project_id: str, agent_name: str, timing: Dict):
+        """Enregistre la durée d'un noeud du DAG d'agents dans l'état du stream"""
+        state = self.generation_states.get(project_id)
+        if state is None:
+            return
+        state.setdefault("agent_timings", {})[agent_name] = timing
+        await self.send_message(
+            project_id,
+            "timing",
+            f"⏱️ Agent {agent_name}: {timing.get('duration', 0):.1f}s ({timing.get('status')})",
+            agent=agent_name
+        )
+    
     async def stream_error(self, project_id: str, error_message: str, agent: str = None):
         """Erreur"""
         await self.send_message(
@@ -194,7 +402,8 @@ class GenerationStreamer:
         """
         Génère un stream SSE (Server-Sent Events)
         
-        Utilisé par l'endpoint FastAPI pour envoyer les messages en temps réel
+        Utilisé par l'endpoint FastAPI pour envoyer les messages en temps réel.
+        Chaque message porte un id: (seq) pour la reprise via Last-Event-ID.
         """
         queue = self.queues.get(project_id)
         if not queue:
@@ -231,23 +440,50 @@ class GenerationStreamer:
             yield error_msg.to_sse_format()
         
         finally:
-            # Nettoyer
-            self.close_stream(project_id)
+            # Nettoyer (sauf si une reconnexion a déjà remplacé ce stream)
+            if self.queues.get(project_id) is queue:
+                self.close_stream(project_id)
     
     def close_stream(self, project_id: str):
-        """Ferme et nettoie un stream"""
-        if project_id in self.queues:
-            self.queues[project_id].close()
-            del self.queues[project_id]
+        """
+        Ferme la connexion de lecture d'un stream
+        
+        L'historique et l'état restent disponibles pour une reprise jusqu'à
+        leur expiration (_expire)
+        """
+        pump = self._pumps.pop(project_id, None)
+        if pump is not None:
+            pump.cancel()
+        
+        queue = self.queues.pop(project_id, None)
+        if queue is None:
+            return
+        queue.close()
         
-        if project_id in self.generation_states:
-            del self.generation_states[project_id]
+        if project_id not in self._expiry_handles:
+            # Aucun événement publié: rien à conserver
+            self.generation_states.pop(project_id, None)
+            self.backplane.forget(project_id)
         
         logger.info(f"🔒 Stream fermé pour projet: {project_id}")
     
     def get_generation_state(self, project_id: str) -> Dict:
         """Récupère l'état actuel d'une génération"""
         return self.generation_states.get(project_id, {})
+    
+    async def fetch_generation_state(self, project_id: str) -> Dict:
+        """
+        État d'une génération, y compris si elle tourne sur un autre worker
+        (dernier état publié sur le backplane)
+        """
+        state = self.generation_states.get(project_id)
+        if state is not None or self.backplane.local:
+            return state or {}
+        
+        event = await self.backplane.last_event(project_id)
+        if not event:
+            return {}
+        return (event.get("metadata") or {}).get("state", {})
 
 
 # Instance globale
@@ -0,0 +1,445 @@
+"""
+Content-addressed file store for generated code
+File bodies are stored once in `file_blobs` keyed by their SHA-256;
+generated_apps documents only keep path -> hash manifests. Blobs no longer
+referenced by a project, a version or the generation cache are removed by a
+periodic mark-and-sweep (collect_garbage).
+"""
+
+import hashlib
+import logging
+import os
+import zlib
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from bson.binary import Binary
+
+try:
+    import zstandard
+except ImportError:  # Compression zstd optionnelle
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# Champs texte de GeneratedApp déplacés dans le store
+CODE_FIELDS = (
+    "html_code", "css_code", "js_code", "react_code", "backend_code",
+    "package_json", "requirements_txt", "dockerfile", "readme",
+)
+
+# zlib (défaut), zstd (nécessite le paquet zstandard, non installé par défaut), none
+BLOB_COMPRESSION = os.environ.get("BLOB_COMPRESSION", "zlib").lower()
+BLOB_COMPRESSION_MIN_BYTES = int(os.environ.get("BLOB_COMPRESSION_MIN_BYTES", "512"))
+BLOB_L1_MAX_BYTES = int(os.environ.get("BLOB_L1_MAX_MB", "32")) * 1024 * 1024
+# Un blob écrit ou réutilisé depuis moins longtemps n'est jamais supprimé:
+# son manifeste peut être en cours d'écriture
+BLOB_GC_GRACE_SECONDS = int(os.environ.get("BLOB_GC_GRACE_HOURS", "24")) * 3600
+BLOB_GC_BATCH_SIZE = 1000
+
+
+def content_hash(content: str) -> str:
+    """SHA-256 hexadécimal du contenu UTF-8"""
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def content_size(content: Optional[str]) -> int:
+    """Taille en octets du contenu UTF-8 (champ "size" des manifestes)"""
+    return len((content or "").encode("utf-8"))
+
+
+def _manifest_hashes(document: Dict[str, Any]) -> List[str]:
+    hashes = [entry.get("hash") for entry in document.get("file_manifest") or []]
+    hashes.extend((document.get("code_manifest") or {}).values())
+    return [blob_hash for blob_hash in hashes if blob_hash]
+
+
+def _encode(data: bytes, compression: str) -> Tuple[bytes, str]:
+    if len(data) < BLOB_COMPRESSION_MIN_BYTES or compression == "none":
+        return data, "identity"
+    if compression == "zstd" and zstandard is not None:
+        return zstandard.ZstdCompressor(level=6).compress(data), "zstd"
+    return zlib.compress(data, 6), "zlib"
+
+
+def _decode(data: bytes, encoding: str) -> bytes:
+    if encoding == "zstd":
+        if zstandard is None:
+            raise RuntimeError("Blob compressé en zstd mais le module zstandard n'est pas installé")
+        return zstandard.ZstdDecompressor().decompress(data)
+    if encoding == "zlib":
+        return zlib.decompress(data)
+    return data
+
+
+class BlobStore:
+    """
+    Stockage dédupliqué des contenus de fichiers
+
+    - put_many(): un aller-retour pour marquer les hash déjà présents comme
+      utilisés, un pour les lire, un insert_many pour les nouveaux uniquement
+    - get_many(): LRU en mémoire (contenus immuables), puis un seul find
+    - collect_garbage(): supprime les blobs que plus rien ne référence
+    """
+
+    def __init__(self, db, compression: str = BLOB_COMPRESSION, l1_max_bytes: int = BLOB_L1_MAX_BYTES):
+        self.db = db
+        self.compression = compression
+        if compression == "zstd" and zstandard is None:
+            logger.warning("⚠️ zstandard non installé, blobs compressés en zlib")
+        self.l1_max_bytes = l1_max_bytes
+        self._l1: "OrderedDict[str, str]" = OrderedDict()
+        self._l1_bytes = 0
+
+    @property
+    def blobs(self):
+        return self.db.file_blobs
+
+    async def put_many(self, contents: Iterable[str]) -> List[str]:
+        """Stocke des contenus, retourne leurs hash (dans le même ordre)"""
+        contents = list(contents)
+        hashes = [content_hash(content) for content in contents]
+        unique = dict(zip(hashes, contents))
+        if not unique:
+            return hashes
+
+        # Marqués avant d'être lus: un blob réutilisé ici n'est plus éligible
+        # à collect_garbage, un blob déjà supprimé sera simplement réinséré
+        now = datetime.utcnow()
+        await self.blobs.update_many({"_id": {"$in": list(unique)}}, {"$set": {"used_at": now}})
+        existing = await self.blobs.find(
+            {"_id": {"$in": list(unique)}}, {"_id": 1}
+        ).to_list(len(unique))
+        missing = set(unique) - {doc["_id"] for doc in existing}
+
+        if missing:
+            documents = []
+            for blob_hash in missing:
+                raw = unique[blob_hash].encode("utf-8")
+                data, encoding = _encode(raw, self.compression)
+                documents.append({
+                    "_id": blob_hash,
+                    "data": Binary(data),
+                    "encoding": encoding,
+                    "size": len(raw),
+                    "stored_size": len(data),
+                    "created_at": now,
+                    "used_at": now,
+                })
+            try:
+                await self.blobs.insert_many(documents, ordered=False)
+            except Exception as e:
+                # Doublons insérés en parallèle par une autre requête: sans effet
+                if "E11000" not in str(e) and "duplicate" not in str(e).lower():
+                    raise
+
+        for blob_hash, content in unique.items():
+            self._remember(blob_hash, content)
+        return hashes
+
+    async def get_many(self, hashes: Iterable[str]) -> Dict[str, str]:
+        """Contenus des hash demandés (les hash inconnus sont absents du résultat)"""
+        result: Dict[str, str] = {}
+        missing = []
+        for blob_hash in set(hashes):
+            content = self._l1.get(blob_hash)
+            if content is not None:
+                self._l1.move_to_end(blob_hash)
+                result[blob_hash] = content
+            else:
+                missing.append(blob_hash)
+
+        if missing:
+            async for doc in self.blobs.find({"_id": {"$in": missing}}):
+                content = _decode(bytes(doc["data"]), doc.get("encoding", "identity")).decode("utf-8")
+                result[doc["_id"]] = content
+                self._remember(doc["_id"], content)
+
+        return result
+
+    async def referenced_hashes(self) -> Set[str]:
+        """
+        Marquage: hash cités par generated_apps, project_versions (deltas et
+        checkpoints) et les payloads du cache de génération
+        """
+        referenced: Set[str] = set()
+        async for document in self.db.generated_apps.find({}, {"file_manifest.hash": 1, "code_manifest": 1}):
+            referenced.update(_manifest_hashes(document))
+        async for document in self.db.generation_cache.find(
+            {}, {"payload.file_manifest.hash": 1, "payload.code_manifest": 1}
+        ):
+            referenced.update(_manifest_hashes(document.get("payload") or {}))
+        async for document in self.db.project_versions.find({}, {"changes.hash": 1, "tree.hash": 1}):
+            for entry in (document.get("changes") or []) + (document.get("tree") or []):
+                if entry.get("hash"):
+                    referenced.add(entry["hash"])
+        return referenced
+
+    async def collect_garbage(self, grace_seconds: float = BLOB_GC_GRACE_SECONDS) -> int:
+        """
+        Mark-and-sweep des blobs orphelins (retours arrière, régénérations)
+
+        Seuls les blobs ni écrits ni réutilisés depuis grace_seconds sont
+        candidats; la condition est revérifiée à la suppression, donc un
+        put_many concurrent qui réutilise un candidat le protège.
+
+        Returns:
+            Nombre de blobs supprimés
+        """
+        cutoff = datetime.utcnow() - timedelta(seconds=grace_seconds)
+        stale = {"$or": [
+            {"used_at": {"$lt": cutoff}},
+            {"used_at": {"$exists": False}, "created_at": {"$lt": cutoff}},
+        ]}
+        candidates = [document["_id"] async for document in self.blobs.find(stale, {"_id": 1})]
+        if not candidates:
+            return 0
+
+        referenced = await self.referenced_hashes()
+        orphans = [blob_hash for blob_hash in candidates if blob_hash not in referenced]
+        deleted = 0
+        for start in range(0, len(orphans), BLOB_GC_BATCH_SIZE):
+            batch = orphans[start:start + BLOB_GC_BATCH_SIZE]
+            result = await self.blobs.delete_many({"_id": {"$in": batch}, **stale})
+            deleted += result.deleted_count
+            for blob_hash in batch:
+                content = self._l1.pop(blob_hash, None)
+                if content is not None:
+                    self._l1_bytes -= len(content)
+
+        logger.info(f"🧹 file_blobs: {deleted} blobs orphelins supprimés sur {len(candidates)} candidats")
+        return deleted
+
+    def _remember(self, blob_hash: str, content: str):
+        size = len(content)
+        if size > self.l1_max_bytes // 4 or blob_hash in self._l1:
+            return
+        self._l1[blob_hash] = content
+        self._l1_bytes += size
+        while self._l1_bytes > self.l1_max_bytes and self._l1:
+            _, evicted = self._l1.popitem(last=False)
+            self._l1_bytes -= len(evicted)
+
+
+async def dehydrate_app(store: BlobStore, app: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Remplace all_files et les champs de code d'un document generated_apps par
+    des manifestes:
+        file_manifest: [{"path", "hash", "size"}]  (liste: les chemins
+            contiennent des points, interdits dans les noms de champs;
+            size en octets UTF-8)
+        code_manifest: {champ: hash}
+    Les champs déjà sous forme de manifeste sont conservés tels quels.
+    """
+    document = dict(app)
+    all_files = document.pop("all_files", None) or {}
+    code_values = {field: document.pop(field) for field in CODE_FIELDS if document.get(field)}
+    for field in CODE_FIELDS:
+        document.pop(field, None)
+
+    paths = list(all_files)
+    fields = list(code_values)
+    hashes = await store.put_many([all_files[p] or "" for p in paths] + [code_values[f] for f in fields])
+
+    if paths:
+        document["file_manifest"] = [
+            {"path": path, "hash": blob_hash, "size": content_size(all_files[path])}
+            for path, blob_hash in zip(paths, hashes[:len(paths)])
+        ]
+    if fields:
+        code_manifest = dict(document.get("code_manifest") or {})
+        code_manifest.update(zip(fields, hashes[len(paths):]))
+        document["code_manifest"] = code_manifest
+    return document
+
+
+async def dehydrate_fields(store: BlobStore, values: Dict[str, str]) -> Dict[str, Any]:
+    """
+    $set partiel pour des champs de code (itérations): code_manifest.<champ>
+    """
+    fields = [field for field in CODE_FIELDS if values.get(field)]
+    hashes = await store.put_many([values[field] for field in fields])
+    return {f"code_manifest.{field}": blob_hash for field, blob_hash in zip(fields, hashes)}
+
+
+def manifest_tree(document: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """
+    Arbre d'un document dehydraté: chemin (ou champ de code) -> {"hash", "size"}
+    """
+    tree = {
+        entry["path"]: {"hash": entry["hash"], "size": entry.get("size")}
+        for entry in document.get("file_manifest") or []
+    }
+    for field, blob_hash in (document.get("code_manifest") or {}).items():
+        tree[field] = {"hash": blob_hash, "size": None}
+    return tree
+
+
+async def write_manifest_changes(
+    collection,
+    document: Dict[str, Any],
+    changes: Dict[str, Optional[Dict[str, Any]]]
+) -> bool:
+    """
+    Applique des changements de manifeste (aucun contenu lu ni écrit)
+
+    changes: chemin ou champ de code -> {"hash", "size"}, ou None pour supprimer.
+    Une seule mise à jour (pipeline), appliquée seulement si les entrées
+    touchées ont toujours le hash lu dans `document` (sinon False).
+    """
+    manifest = {entry["path"]: entry for entry in document.get("file_manifest") or []}
+    code_manifest = document.get("code_manifest") or {}
+    file_changes = {path: entry for path, entry in changes.items() if path not in CODE_FIELDS}
+    field_changes = {field: entry for field, entry in changes.items() if field in CODE_FIELDS}
+
+    conditions: Dict[str, Any] = {"project_id": document["project_id"]}
+    expected = [
+        {"$elemMatch": {"path": path, "hash": manifest[path]["hash"]}}
+        for path in file_changes if path in manifest
+    ]
+    if expected:
+        conditions["file_manifest"] = {"$all": expected}
+    for field in field_changes:
+        if field in code_manifest:
+            conditions[f"code_manifest.{field}"] = code_manifest[field]
+
+    def entry(path: str) -> Dict[str, Any]:
+        return {"path": path, "hash": file_changes[path]["hash"], "size": file_changes[path].get("size")}
+
+    updates: Dict[str, Any] = {"updated_at": {"$literal": datetime.utcnow()}}
+    if file_changes:
+        existing = {"$ifNull": ["$file_manifest", []]}
+        removed = [path for path, change in file_changes.items() if change is None and path in manifest]
+        if removed:
+            existing = {"$filter": {
+                "input": existing,
+                "as": "f",
+                "cond": {"$eq": [{"$in": ["$$f.path", {"$literal": removed}]}, False]},
+            }}
+        # Remplace les entrées existantes, ajoute les nouveaux fichiers
+        branches = [
+            {"case": {"$eq": ["$$f.path", {"$literal": path}]}, "then": {"$literal": entry(path)}}
+            for path, change in file_changes.items() if change is not None and path in manifest
+        ]
+        if branches:
+            existing = {"$map": {
+                "input": existing,
+                "as": "f",
+                "in": {"$switch": {"branches": branches, "default": "$$f"}},
+            }}
+        updates["file_manifest"] = {"$concatArrays": [
+            existing,
+            {"$literal": [
+                entry(path) for path, change in file_changes.items()
+                if change is not None and path not in manifest
+            ]},
+        ]}
+    for field, change in field_changes.items():
+        if change is not None:
+            updates[f"code_manifest.{field}"] = {"$literal": change["hash"]}
+
+    pipeline = [{"$set": updates}]
+    # Anciennes valeurs inline remplacées par le manifeste, champs supprimés
+    dropped = {field: 0 for field in field_changes}
+    dropped.update({
+        f"code_manifest.{field}": 0
+        for field, change in field_changes.items() if change is None and field in code_manifest
+    })
+    if dropped:
+        pipeline.append({"$project": dropped})
+
+    result = await collection.update_one(conditions, pipeline)
+    return result.matched_count > 0
+
+
+async def persist_file_changes(
+    store: BlobStore,
+    collection,
+    document: Dict[str, Any],
+    changes: Dict[str, str]
+) -> Optional[Dict[str, Dict[str, Any]]]:
+    """
+    Écrit uniquement les fichiers modifiés d'un document generated_apps
+
+    changes: chemin de all_files ou nom de champ de code -> nouveau contenu.
+    Appliqué seulement si les fichiers touchés n'ont pas changé depuis la
+    lecture de `document`. Un document ancien (all_files inline) est
+    converti en manifeste par la même occasion.
+
+    Returns:
+        Les entrées écrites (chemin -> {"hash", "size"}), ou None en cas
+        de modification concurrente
+    """
+    paths = list(changes)
+    hashes = await store.put_many([changes[path] for path in paths])
+    entries = {
+        path: {"hash": blob_hash, "size": content_size(changes[path])}
+        for path, blob_hash in zip(paths, hashes)
+    }
+
+    if not document.get("file_manifest") and document.get("all_files") and any(
+        path not in CODE_FIELDS for path in changes
+    ):
+        # Ancien format: réécrit tout le document une fois, sous condition
+        legacy = {key: value for key, value in document.items() if key != "_id"}
+        legacy["all_files"] = {**legacy["all_files"], **{
+            path: content for path, content in changes.items() if path not in CODE_FIELDS
+        }}
+        legacy.update({field: content for field, content in changes.items() if field in CODE_FIELDS})
+        legacy["updated_at"] = datetime.utcnow()
+        stored = await dehydrate_app(store, legacy)
+        result = await collection.replace_one(
+            {"project_id": document["project_id"], "file_manifest": {"$exists": False}},
+            stored
+        )
+        return entries if result.matched_count else None
+
+    if not await write_manifest_changes(collection, document, entries):
+        return None
+    return entries
+
+
+async def hydrate_app(store: BlobStore, document: Optional[Dict[str, Any]], include_files: bool = True) -> Optional[Dict[str, Any]]:
+    """
+    Reconstitue all_files et les champs de code depuis les manifestes
+    (documents anciens avec contenu inline: retournés tels quels)
+
+    Args:
+        include_files: Charger aussi all_files (sinon seulement les champs de code)
+    """
+    if not document:
+        return document
+
+    file_manifest = document.get("file_manifest") or []
+    code_manifest = document.get("code_manifest") or {}
+    if not file_manifest and not code_manifest:
+        return document
+
+    wanted = list(code_manifest.values())
+    if include_files:
+        wanted += [entry["hash"] for entry in file_manifest]
+    contents = await store.get_many(wanted)
+
+    hydrated = dict(document)
+    for field, blob_hash in code_manifest.items():
+        hydrated[field] = contents.get(blob_hash)
+    if include_files and file_manifest:
+        hydrated["all_files"] = {
+            entry["path"]: contents.get(entry["hash"], "") for entry in file_manifest
+        }
+    return hydrated
+
+
+__all__ = [
+    'BlobStore',
+    'CODE_FIELDS',
+    'content_hash',
+    'content_size',
+    'dehydrate_app',
+    'dehydrate_fields',
+    'hydrate_app',
+    'manifest_tree',
+    'persist_file_changes',
+    'write_manifest_changes',
+]
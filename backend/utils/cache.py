@@ -1,12 +1,18 @@
 """
 Caching utilities for LLM responses
+Two-tier generation cache: in-process LRU (L1) + Mongo generation_cache (L2)
 """
 
 import hashlib
 import json
-from functools import lru_cache
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
 from typing import Optional, Dict, Any
 
+from utils.monitoring import track_cache, track_cache_eviction, track_cache_size
+
 def generate_cache_key(description: str, framework: str, project_type: str, advanced_mode: bool = False) -> str:
     """
     Generate a deterministic cache key for AI generation requests
@@ -34,14 +40,203 @@ def generate_cache_key(description: str, framework: str, project_type: str, adva
     return hashlib.sha256(cache_string.encode()).hexdigest()
 
 
-# In-memory LRU cache for recent generations (1000 items)
-@lru_cache(maxsize=1000)
-def get_cached_generation_key(cache_key: str) -> Optional[str]:
+# Champs de GeneratedApp conservés dans le cache (le reste est propre au projet)
+# Les documents récents n'ont que les manifestes (contenus dans file_blobs),
+# les anciens ont le code inline
+CACHED_APP_FIELDS = (
+    "html_code", "css_code", "js_code", "react_code", "backend_code",
+    "project_structure", "package_json", "requirements_txt", "dockerfile",
+    "readme", "deployment_config", "all_files",
+    "file_manifest", "code_manifest",
+)
+
+GENERATION_CACHE_TTL_SECONDS = int(os.environ.get("GENERATION_CACHE_TTL_HOURS", "168")) * 3600
+GENERATION_CACHE_L1_MAX_BYTES = int(os.environ.get("GENERATION_CACHE_L1_MAX_MB", "64")) * 1024 * 1024
+GENERATION_CACHE_L1_MAX_ENTRIES = int(os.environ.get("GENERATION_CACHE_L1_MAX_ENTRIES", "500"))
+# L1 lifetime cap: an invalidation on another worker only clears L2, so L1
+# entries are revalidated against L2 at least this often
+GENERATION_CACHE_L1_TTL_SECONDS = int(os.environ.get("GENERATION_CACHE_L1_TTL", "60"))
+
+
+def extract_cacheable_payload(generated_app: Dict[str, Any]) -> Dict[str, Any]:
+    """Extract the project-independent part of a generated_apps document"""
+    return {field: generated_app.get(field) for field in CACHED_APP_FIELDS}
+
+
+class _L1Entry:
+    """In-process cache entry"""
+    
+    __slots__ = ("payload", "framework", "size_bytes", "expires_at")
+    
+    def __init__(self, payload: Dict[str, Any], framework: str, size_bytes: int, expires_at: float):
+        self.payload = payload
+        self.framework = framework
+        self.size_bytes = size_bytes
+        self.expires_at = expires_at
+
+
+class GenerationCache:
     """
-    LRU cache decorator for cache keys
-    Returns the cache key if it exists in memory
+    Two-tier cache for generation payloads
+    
+    L1: in-process LRU bounded in bytes (decoded payloads, microsecond hits);
+        entries live at most l1_ttl_seconds, then are reloaded from L2, so an
+        invalidation made on another worker is seen within that delay
+    L2: dedicated Mongo `generation_cache` collection with TTL expiry,
+        shared by every worker and indexed on (cache_key, created_at)
     """
-    return cache_key
+    
+    def __init__(
+        self,
+        db=None,
+        ttl_seconds: int = GENERATION_CACHE_TTL_SECONDS,
+        max_bytes: int = GENERATION_CACHE_L1_MAX_BYTES,
+        max_entries: int = GENERATION_CACHE_L1_MAX_ENTRIES,
+        l1_ttl_seconds: float = GENERATION_CACHE_L1_TTL_SECONDS
+    ):
+        self.db = db
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.l1_ttl_seconds = l1_ttl_seconds
+        self._entries: "OrderedDict[str, _L1Entry]" = OrderedDict()
+        self._bytes = 0
+    
+    @property
+    def collection(self):
+        return self.db.generation_cache
+    
+    async def ensure_indexes(self):
+        """Create L2 indexes (called from the FastAPI startup hook)"""
+        await self.collection.create_index([("cache_key", 1), ("created_at", -1)])
+        await self.collection.create_index("framework")
+        await self.collection.create_index("expires_at", expireAfterSeconds=0)
+    
+    async def get(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        """
+        Return a cached payload or None
+        
+        L1 hits never touch Mongo; L2 hits are promoted to L1 for at most
+        l1_ttl_seconds
+        """
+        entry = self._entries.get(cache_key)
+        if entry is not None:
+            if entry.expires_at > time.time():
+                self._entries.move_to_end(cache_key)
+                track_cache(hit=True, cache_type="l1")
+                return dict(entry.payload)
+            self._remove(cache_key, reason="expired")
+        track_cache(hit=False, cache_type="l1")
+        
+        if self.db is None:
+            return None
+        
+        document = await self.collection.find_one(
+            {"cache_key": cache_key, "expires_at": {"$gt": datetime.utcnow()}},
+            sort=[("created_at", -1)]
+        )
+        if not document:
+            track_cache(hit=False, cache_type="l2")
+            return None
+        
+        track_cache(hit=True, cache_type="l2")
+        payload = document.get("payload") or {}
+        remaining = (document["expires_at"] - datetime.utcnow()).total_seconds()
+        self._store_l1(
+            cache_key, payload, document.get("framework", "react"), remaining, document.get("size_bytes")
+        )
+        return dict(payload)
+    
+    async def set(self, cache_key: str, payload: Dict[str, Any], framework: str = "react"):
+        """Store a payload in both tiers"""
+        payload = {field: payload.get(field) for field in CACHED_APP_FIELDS}
+        framework = (framework or "react").lower()
+        size_bytes = self._payload_size(payload)
+        self._store_l1(cache_key, payload, framework, self.ttl_seconds, size_bytes)
+        
+        if self.db is None:
+            return
+        
+        now = datetime.utcnow()
+        await self.collection.update_one(
+            {"cache_key": cache_key},
+            {
+                "$set": {
+                    "payload": payload,
+                    "framework": framework,
+                    "size_bytes": size_bytes,
+                    "created_at": now,
+                    "expires_at": now + timedelta(seconds=self.ttl_seconds)
+                }
+            },
+            upsert=True
+        )
+    
+    async def invalidate_framework(self, framework: str) -> int:
+        """Drop every cached generation for a framework, returns L2 deletions"""
+        framework = (framework or "react").lower()
+        for key in [k for k, e in self._entries.items() if e.framework == framework]:
+            self._remove(key, reason="invalidated")
+        
+        if self.db is None:
+            return 0
+        result = await self.collection.delete_many({"framework": framework})
+        return result.deleted_count
+    
+    async def invalidate(self, cache_key: str):
+        """Drop a single key from both tiers"""
+        if cache_key in self._entries:
+            self._remove(cache_key, reason="invalidated")
+        if self.db is not None:
+            await self.collection.delete_many({"cache_key": cache_key})
+    
+    def stats(self) -> Dict[str, Any]:
+        """L1 occupancy"""
+        return {
+            "l1_entries": len(self._entries),
+            "l1_bytes": self._bytes,
+            "l1_max_bytes": self.max_bytes,
+            "l1_ttl_seconds": self.l1_ttl_seconds,
+            "ttl_seconds": self.ttl_seconds
+        }
+    
+    @staticmethod
+    def _payload_size(payload: Dict[str, Any]) -> int:
+        return len(json.dumps(payload, default=str).encode("utf-8"))
+    
+    def _store_l1(
+        self,
+        cache_key: str,
+        payload: Dict[str, Any],
+        framework: str,
+        ttl_seconds: float,
+        size_bytes: Optional[int] = None
+    ):
+        if size_bytes is None:
+            size_bytes = self._payload_size(payload)
+        # Any older version of the key goes, even if the new one stays out of L1
+        if cache_key in self._entries:
+            self._remove(cache_key, reason="replaced")
+        if size_bytes > self.max_bytes:
+            # Trop gros pour L1, reste servi par L2
+            return
+        
+        expires_at = time.time() + min(ttl_seconds, self.l1_ttl_seconds)
+        self._entries[cache_key] = _L1Entry(payload, framework, size_bytes, expires_at)
+        self._bytes += size_bytes
+        
+        while self._entries and (self._bytes > self.max_bytes or len(self._entries) > self.max_entries):
+            oldest_key = next(iter(self._entries))
+            self._remove(oldest_key, reason="size")
+        
+        track_cache_size("l1", self._bytes, len(self._entries))
+    
+    def _remove(self, cache_key: str, reason: str):
+        entry = self._entries.pop(cache_key)
+        self._bytes -= entry.size_bytes
+        if reason != "replaced":
+            track_cache_eviction("l1", reason)
+        track_cache_size("l1", self._bytes, len(self._entries))
 
 
 def sanitize_prompt(prompt: str, max_length: int = 5000) -> str:
@@ -112,7 +307,9 @@ def estimate_llm_cost(model: str, tokens: int) -> float:
 
 __all__ = [
     'generate_cache_key',
-    'get_cached_generation_key',
+    'extract_cacheable_payload',
+    'GenerationCache',
+    'CACHED_APP_FIELDS',
     'sanitize_prompt',
     'estimate_llm_cost'
 ]
@@ -0,0 +1,322 @@
+"""
+Relevant-file context selection for iteration prompts
+Ranks project files against the user's instruction (path and identifier
+matches, spread along the import graph) and packs the best ones into a token
+budget; the remaining files are sent as signature-only summaries
+"""
+
+import math
+import posixpath
+import re
+import unicodedata
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Set
+
+# Estimation grossière: ~4 caractères par token pour du code
+CHARS_PER_TOKEN = 4
+
+# Vocabulaire des demandes (français) -> termes présents dans le code
+INSTRUCTION_SYNONYMS = {
+    "bouton": ["button", "btn"],
+    "titre": ["title", "heading", "header", "h1"],
+    "entete": ["header", "navbar"],
+    "pied": ["footer"],
+    "couleur": ["color", "theme", "css", "style"],
+    "fond": ["background", "bg"],
+    "police": ["font", "typography"],
+    "formulaire": ["form", "input"],
+    "champ": ["input", "field"],
+    "connexion": ["login", "auth", "signin"],
+    "inscription": ["register", "signup", "auth"],
+    "utilisateur": ["user", "profile", "account"],
+    "panier": ["cart", "basket"],
+    "produit": ["product", "item"],
+    "commande": ["order", "checkout"],
+    "paiement": ["payment", "checkout", "stripe"],
+    "accueil": ["home", "index", "landing", "hero"],
+    "menu": ["menu", "nav", "navbar", "sidebar"],
+    "navigation": ["nav", "navbar", "menu", "router"],
+    "recherche": ["search", "filter"],
+    "liste": ["list", "table", "grid"],
+    "carte": ["card", "map"],
+    "image": ["image", "img", "picture"],
+    "lien": ["link", "href", "route"],
+    "page": ["page", "route", "view"],
+    "api": ["api", "fetch", "axios", "route", "endpoint"],
+    "base": ["db", "database", "model", "schema"],
+    "style": ["css", "style", "styles", "theme"],
+    "responsive": ["css", "media", "mobile"],
+    "animation": ["animation", "transition", "keyframes", "css"],
+    "erreur": ["error", "exception"],
+    "test": ["test", "spec"],
+}
+
+STOPWORDS = {
+    "le", "la", "les", "un", "une", "des", "de", "du", "et", "ou", "en", "au", "aux",
+    "ce", "cet", "cette", "ces", "mon", "ma", "mes", "pour", "par", "sur", "dans",
+    "avec", "sans", "que", "qui", "plus", "est", "sont", "ajoute", "ajouter", "change",
+    "changer", "modifie", "modifier", "mets", "mettre", "fais", "faire", "rend", "rendre",
+    "the", "a", "an", "to", "of", "and", "or", "in", "on", "for", "with", "add", "make",
+    "please", "stp", "svp", "il", "elle", "je", "tu", "nous", "vous", "moi",
+}
+
+# Fichiers d'entrée: légère priorité (souvent touchés par une demande générale)
+ENTRY_FILES = {
+    "app", "index", "main", "server", "html_code", "css_code", "js_code",
+    "react_code", "backend_code",
+}
+
+JS_IMPORT = re.compile(
+    r"""(?:import\s+(?:[\w*{}\s,]+\s+from\s+)?|require\(\s*|import\(\s*)['"]([^'"]+)['"]"""
+)
+CSS_IMPORT = re.compile(r"""@import\s+(?:url\()?['"]?([^'")\s;]+)""")
+PY_IMPORT = re.compile(r"^\s*(?:from\s+([\w.]+)\s+import|import\s+([\w.]+))", re.MULTILINE)
+
+SIGNATURE = re.compile(
+    r"^\s*(?:"
+    r"(?:export\s+(?:default\s+)?)?(?:async\s+)?function\*?\s+\w+"
+    r"|(?:export\s+(?:default\s+)?)?class\s+\w+"
+    r"|(?:export\s+)?(?:const|let|var)\s+\w+\s*=\s*(?:async\s*)?(?:\([^)]*\)|\w+)\s*=>"
+    r"|(?:export\s+)?(?:const|let|var)\s+[A-Z]\w*\s*="
+    r"|export\s+(?:default\s+)?[\w{]"
+    r"|(?:async\s+)?def\s+\w+"
+    r"|class\s+\w+"
+    r"|@(?:app|router|api_router)\.\w+"
+    r"|[.#]?[\w-]+(?:\s*[,>+~]\s*[.#]?[\w-]+)*\s*\{"
+    r")"
+)
+DEFINED_NAME = re.compile(
+    r"(?:function\*?|class|def|const|let|var)\s+([A-Za-z_$][\w$]*)"
+)
+CAMEL_SPLIT = re.compile(r"(?<=[a-z0-9])(?=[A-Z])")
+WORD = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+
+RESOLVE_EXTENSIONS = ("", ".js", ".jsx", ".ts", ".tsx", ".css", ".scss", ".py", ".vue", ".json")
+RESOLVE_INDEX = ("/index.js", "/index.jsx", "/index.ts", "/index.tsx", "/__init__.py")
+
+
+def _fold(text: str) -> str:
+    """Minuscules sans accents"""
+    normalized = unicodedata.normalize("NFKD", text)
+    return "".join(char for char in normalized if not unicodedata.combining(char)).lower()
+
+
+def split_identifier(identifier: str) -> List[str]:
+    """camelCase, PascalCase, snake_case et kebab-case -> mots en minuscules"""
+    words = []
+    for part in re.split(r"[_\-./\s]+", identifier):
+        words.extend(word.lower() for word in CAMEL_SPLIT.split(part) if word)
+    return words
+
+
+def instruction_terms(instruction: str) -> Set[str]:
+    """Termes recherchés: mots de la demande + synonymes côté code"""
+    terms = set()
+    for word in re.findall(r"[\w'-]+", _fold(instruction)):
+        for token in re.split(r"['-]", word):
+            if len(token) < 3 or token in STOPWORDS:
+                continue
+            terms.add(token)
+            # Pluriels simples: boutons -> bouton
+            singular = token[:-1] if token.endswith("s") and len(token) > 3 else token
+            terms.add(singular)
+            for key in (token, singular):
+                terms.update(INSTRUCTION_SYNONYMS.get(key, []))
+    # Identifiants cités tels quels (ex: "Navbar", "handleSubmit")
+    for identifier in WORD.findall(instruction):
+        terms.update(word for word in split_identifier(identifier) if len(word) >= 3)
+    return terms - STOPWORDS
+
+
+def extract_imports(path: str, content: str) -> List[str]:
+    """Cibles d'import brutes (chemins relatifs, modules)"""
+    extension = posixpath.splitext(path)[1]
+    if extension == ".py" or path == "backend_code":
+        return [from_module or module for from_module, module in PY_IMPORT.findall(content)]
+    if extension in (".css", ".scss") or path == "css_code":
+        return CSS_IMPORT.findall(content)
+    return JS_IMPORT.findall(content)
+
+
+def extract_symbols(content: str) -> Set[str]:
+    """Noms définis dans le fichier (fonctions, classes, composants, constantes)"""
+    return set(DEFINED_NAME.findall(content))
+
+
+def resolve_import(path: str, target: str, files: Iterable[str]) -> Optional[str]:
+    """Chemin du fichier du projet visé par un import (None si externe)"""
+    if not isinstance(files, (set, frozenset)):
+        files = set(files)
+    if target.startswith("."):
+        if posixpath.splitext(path)[1] == ".py":
+            # from .module import x / from ..pkg.module import x
+            depth = len(target) - len(target.lstrip("."))
+            base = posixpath.dirname(path)
+            for _ in range(depth - 1):
+                base = posixpath.dirname(base)
+            candidate = posixpath.join(base, target.lstrip(".").replace(".", "/"))
+        else:
+            candidate = posixpath.normpath(posixpath.join(posixpath.dirname(path), target))
+    elif "/" not in target and "." in target and posixpath.splitext(path)[1] == ".py":
+        candidate = target.replace(".", "/")
+    elif target.startswith(("@/", "~/")):
+        candidate = posixpath.join("src", target[2:])
+    else:
+        candidate = target
+
+    for suffix in RESOLVE_EXTENSIONS + RESOLVE_INDEX:
+        if candidate + suffix in files:
+            return candidate + suffix
+    return None
+
+
+def build_import_graph(files: Dict[str, str]) -> Dict[str, Set[str]]:
+    """Graphe non orienté fichier <-> fichiers importés"""
+    graph: Dict[str, Set[str]] = {path: set() for path in files}
+    paths = set(files)
+    for path, content in files.items():
+        for target in extract_imports(path, content or ""):
+            resolved = resolve_import(path, target, paths)
+            if resolved and resolved != path:
+                graph[path].add(resolved)
+                graph[resolved].add(path)
+    return graph
+
+
+def summarize_file(path: str, content: str, max_lines: int = 40) -> str:
+    """Imports et signatures de haut niveau, sans les corps"""
+    lines = []
+    for line in (content or "").split("\n"):
+        stripped = line.strip()
+        if not stripped:
+            continue
+        if stripped.startswith(("import ", "from ", "@import", "require(")) or SIGNATURE.match(line):
+            lines.append(line.rstrip()[:160])
+        if len(lines) >= max_lines:
+            lines.append("...")
+            break
+    return "\n".join(lines)
+
+
+def score_files(files: Dict[str, str], instruction: str, graph: Dict[str, Set[str]]) -> Dict[str, float]:
+    """
+    Pertinence de chaque fichier pour la demande
+
+    - correspondance avec le chemin (poids fort)
+    - correspondance avec les noms définis dans le fichier
+    - occurrences dans le contenu (log)
+    - propagation à un saut dans le graphe d'imports
+    """
+    terms = instruction_terms(instruction)
+    direct: Dict[str, float] = {}
+
+    for path, content in files.items():
+        content = content or ""
+        path_words = set(split_identifier(posixpath.splitext(path)[0]))
+        symbol_words = {word for symbol in extract_symbols(content) for word in split_identifier(symbol)}
+        lowered = content.lower()
+
+        score = 0.0
+        for term in terms:
+            if term in path_words:
+                score += 4.0
+            elif any(term in word for word in path_words):
+                score += 2.0
+            if term in symbol_words:
+                score += 2.0
+            occurrences = lowered.count(term)
+            if occurrences:
+                score += min(math.log1p(occurrences), 3.0)
+
+        stem = posixpath.splitext(posixpath.basename(path))[0].lower()
+        if stem in ENTRY_FILES or path in ENTRY_FILES:
+            score += 0.5
+        direct[path] = score
+
+    scores = dict(direct)
+    for path, neighbours in graph.items():
+        for neighbour in neighbours:
+            scores[neighbour] += 0.35 * direct[path]
+    return scores
+
+
+@dataclass
+class ContextSelection:
+    full: Dict[str, str] = field(default_factory=dict)  # Contenu complet
+    summaries: Dict[str, str] = field(default_factory=dict)  # Signatures seulement
+    omitted: List[str] = field(default_factory=list)  # Chemin seulement
+    scores: Dict[str, float] = field(default_factory=dict)
+
+    def format(self) -> str:
+        """Section de prompt: fichiers complets, puis résumés, puis liste des autres"""
+        sections = [
+            f"FICHIER: {path}\n```\n{content}\n```"
+            for path, content in self.full.items()
+        ]
+        if self.summaries:
+            sections.append("**Autres fichiers (signatures uniquement, contenu non fourni):**")
+            sections.extend(
+                f"FICHIER: {path} (résumé)\n```\n{summary}\n```"
+                for path, summary in self.summaries.items()
+            )
+        if self.omitted:
+            sections.append("**Fichiers non détaillés:** " + ", ".join(self.omitted))
+        return "\n\n".join(sections)
+
+
+def select_context(
+    files: Dict[str, str],
+    instruction: str,
+    budget_tokens: int,
+    summary_share: float = 0.25
+) -> ContextSelection:
+    """
+    Choisit les fichiers à inclure dans le prompt
+
+    Les fichiers les plus pertinents sont inclus en entier tant que le budget
+    le permet; une part du budget (summary_share) est réservée aux résumés
+    des autres fichiers.
+    """
+    graph = build_import_graph(files)
+    scores = score_files(files, instruction, graph)
+    ranked = sorted(files, key=lambda path: (-scores[path], len(files[path] or ""), path))
+
+    budget_chars = budget_tokens * CHARS_PER_TOKEN
+    full_budget = int(budget_chars * (1 - summary_share))
+    selection = ContextSelection(scores=scores)
+    used = 0
+    # Petit projet: tout tient dans le budget, inutile de filtrer
+    fits_entirely = sum(len(content or "") + len(path) + 16 for path, content in files.items()) <= full_budget
+
+    for path in ranked:
+        size = len(files[path] or "") + len(path) + 16
+        if used + size <= full_budget and (scores[path] > 0 or fits_entirely or not selection.full):
+            selection.full[path] = files[path] or ""
+            used += size
+
+    for path in ranked:
+        if path in selection.full:
+            continue
+        summary = summarize_file(path, files[path])
+        size = len(summary) + len(path) + 24
+        if summary and used + size <= budget_chars:
+            selection.summaries[path] = summary
+            used += size
+        else:
+            selection.omitted.append(path)
+
+    return selection
+
+
+__all__ = [
+    'ContextSelection',
+    'select_context',
+    'score_files',
+    'build_import_graph',
+    'extract_imports',
+    'extract_symbols',
+    'resolve_import',
+    'summarize_file',
+    'instruction_terms',
+    'split_identifier',
+]
@@ -0,0 +1,278 @@
+"""
+Credit ledger engine
+Atomic credit deduction/refund in a single conditional update per user, with
+an outbox on the user document for the credit_transactions history
+"""
+
+import asyncio
+import logging
+import uuid
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from utils.request_scope import invalidate_user
+
+logger = logging.getLogger(__name__)
+
+# Champs de solde mis à jour par le ledger
+BALANCE_FIELDS = ("credits_free", "credits_monthly", "credits_topup", "credits_total")
+
+OUTBOX_FIELD = "credit_outbox"
+
+
+def _field(name: str) -> Dict:
+    return {"$ifNull": [f"${name}", 0]}
+
+
+def build_transaction(
+    user_id: str,
+    amount: float,
+    transaction_type: str,
+    description: str,
+    project_id: Optional[str] = None,
+    transaction_id: Optional[str] = None
+) -> Dict[str, Any]:
+    """Document credit_transactions (même forme que le modèle CreditTransaction)"""
+    return {
+        "id": transaction_id or str(uuid.uuid4()),
+        "user_id": user_id,
+        "amount": amount,
+        "type": transaction_type,
+        "description": description,
+        "project_id": project_id,
+        "created_at": datetime.utcnow(),
+    }
+
+
+def build_deduction_pipeline(amount: float, transaction: Dict[str, Any]) -> List[Dict]:
+    """
+    Pipeline de mise à jour: consomme d'abord les crédits gratuits, puis
+    mensuels, puis achetés, et ajoute la transaction à l'outbox
+
+    Exécuté côté serveur dans la même opération que la vérification du solde.
+    """
+    return [
+        {"$set": {
+            "_debit_free": {"$min": [{"$max": [_field("credits_free"), 0]}, amount]},
+        }},
+        {"$set": {
+            "_debit_monthly": {"$min": [
+                {"$max": [_field("credits_monthly"), 0]},
+                {"$subtract": [amount, "$_debit_free"]},
+            ]},
+        }},
+        {"$set": {
+            "credits_free": {"$subtract": [_field("credits_free"), "$_debit_free"]},
+            "credits_monthly": {"$subtract": [_field("credits_monthly"), "$_debit_monthly"]},
+            "credits_topup": {"$subtract": [
+                _field("credits_topup"),
+                {"$subtract": [amount, {"$add": ["$_debit_free", "$_debit_monthly"]}]},
+            ]},
+        }},
+        {"$set": {
+            "credits_total": {"$add": ["$credits_free", "$credits_monthly", "$credits_topup"]},
+            "updated_at": {"$literal": datetime.utcnow()},
+            OUTBOX_FIELD: {"$concatArrays": [
+                {"$ifNull": [f"${OUTBOX_FIELD}", []]},
+                {"$literal": [transaction]},
+            ]},
+        }},
+        {"$project": {"_debit_free": 0, "_debit_monthly": 0}},
+    ]
+
+
+def build_credit_update(amount: float, transaction: Dict[str, Any]) -> Dict:
+    """Crédit sur le solde acheté ($inc, commutatif donc sans course)"""
+    return {
+        "$inc": {"credits_topup": amount, "credits_total": amount},
+        "$set": {"updated_at": datetime.utcnow()},
+        "$push": {OUTBOX_FIELD: transaction},
+    }
+
+
+class CreditLedger:
+    """
+    Moteur de crédits
+
+    - deduct(): un seul find_one_and_update conditionnel
+      (credits_total >= amount) - deux générations concurrentes ne peuvent
+      plus passer toutes les deux la vérification puis écraser leurs soldes
+    - credit()/refund_many(): $inc (un bulk_write pour un lot de remboursements)
+    - la transaction est écrite dans le document utilisateur (outbox) par la
+      même opération, puis recopiée dans credit_transactions; flush_outbox()
+      rejoue les entrées restantes (crash entre les deux étapes)
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self._pending_flushes: set = set()
+
+    async def ensure_indexes(self):
+        await self.db.credit_transactions.create_index("id", unique=True)
+        await self.db.credit_transactions.create_index([("user_id", 1), ("created_at", -1)])
+
+    async def deduct(
+        self,
+        user_id: str,
+        amount: float,
+        description: str,
+        project_id: Optional[str] = None,
+        transaction_type: str = "usage"
+    ) -> Optional[Dict[str, float]]:
+        """
+        Déduit des crédits si le solde le permet
+
+        Returns:
+            Les nouveaux soldes, ou None si l'utilisateur n'existe pas ou
+            si son solde est insuffisant
+        """
+        if amount <= 0:
+            raise ValueError("Le montant à déduire doit être positif")
+
+        transaction = build_transaction(user_id, -amount, transaction_type, description, project_id)
+        user = await self.db.users.find_one_and_update(
+            {"id": user_id, "credits_total": {"$gte": amount}},
+            build_deduction_pipeline(amount, transaction),
+            projection={field: 1 for field in BALANCE_FIELDS},
+            return_document=ReturnDocument.AFTER
+        )
+        if user is None:
+            return None
+
+        invalidate_user(user_id)
+        self._flush_later(user_id, [transaction])
+        return {field: user.get(field, 0.0) for field in BALANCE_FIELDS}
+
+    async def credit(
+        self,
+        user_id: str,
+        amount: float,
+        transaction_type: str,
+        description: str,
+        project_id: Optional[str] = None
+    ) -> bool:
+        """Ajoute des crédits (achat, bonus, remboursement) au solde acheté"""
+        transaction = build_transaction(user_id, amount, transaction_type, description, project_id)
+        result = await self.db.users.update_one({"id": user_id}, build_credit_update(amount, transaction))
+        if result.matched_count == 0:
+            return False
+
+        invalidate_user(user_id)
+        self._flush_later(user_id, [transaction])
+        return True
+
+    async def refund_many(self, refunds: Iterable[Tuple[str, float, str, Optional[str]]]) -> int:
+        """
+        Rembourse un lot de (user_id, amount, description, project_id) en un
+        seul aller-retour
+
+        Returns:
+            Nombre de remboursements appliqués
+        """
+        operations = []
+        transactions_by_user: Dict[str, List[Dict]] = {}
+        for user_id, amount, description, project_id in refunds:
+            transaction = build_transaction(user_id, amount, "refund", description, project_id)
+            operations.append(UpdateOne({"id": user_id}, build_credit_update(amount, transaction)))
+            transactions_by_user.setdefault(user_id, []).append(transaction)
+
+        if not operations:
+            return 0
+
+        result = await self.db.users.bulk_write(operations, ordered=False)
+        for user_id, transactions in transactions_by_user.items():
+            invalidate_user(user_id)
+            self._flush_later(user_id, transactions)
+        return result.matched_count
+
+    async def refund(
+        self,
+        user_id: str,
+        amount: float,
+        description: str,
+        project_id: Optional[str] = None,
+        transaction_id: Optional[str] = None
+    ) -> bool:
+        """
+        Rembourse un seul utilisateur
+
+        Avec transaction_id, le remboursement est idempotent: rejoué après
+        un crash, il n'est pas appliqué une seconde fois
+        """
+        if transaction_id is None:
+            return await self.refund_many([(user_id, amount, description, project_id)]) > 0
+
+        if await self.db.credit_transactions.find_one({"id": transaction_id}, {"_id": 1}):
+            return True  # Déjà appliqué et recopié depuis l'outbox
+
+        transaction = build_transaction(user_id, amount, "refund", description, project_id, transaction_id)
+        result = await self.db.users.update_one(
+            {"id": user_id, f"{OUTBOX_FIELD}.id": {"$ne": transaction_id}},
+            build_credit_update(amount, transaction)
+        )
+        if result.matched_count == 0:
+            # Utilisateur inconnu, ou transaction encore dans son outbox
+            return await self.db.users.find_one({"id": user_id}, {"_id": 1}) is not None
+
+        invalidate_user(user_id)
+        self._flush_later(user_id, [transaction])
+        return True
+
+    def _flush_later(self, user_id: str, transactions: List[Dict]):
+        # L'historique n'est pas sur le chemin critique de la requête
+        task = asyncio.ensure_future(self._flush(user_id, transactions))
+        self._pending_flushes.add(task)
+        task.add_done_callback(self._pending_flushes.discard)
+
+    async def _flush(self, user_id: str, transactions: List[Dict]):
+        """Recopie les transactions de l'outbox dans credit_transactions (idempotent)"""
+        try:
+            for transaction in transactions:
+                try:
+                    await self.db.credit_transactions.insert_one(dict(transaction))
+                except DuplicateKeyError:
+                    pass  # Déjà recopiée (flush concurrent ou rejoué)
+            await self.db.users.update_one(
+                {"id": user_id},
+                {"$pull": {OUTBOX_FIELD: {"id": {"$in": [t["id"] for t in transactions]}}}}
+            )
+        except Exception as e:
+            # Reste dans l'outbox, rejoué par flush_outbox()
+            logger.error(f"❌ Outbox crédits non vidée pour {user_id}: {e}")
+
+    async def flush_outbox(self, limit: int = 1000) -> int:
+        """
+        Rejoue les transactions restées dans l'outbox des utilisateurs
+
+        Returns:
+            Nombre de transactions recopiées
+        """
+        flushed = 0
+        cursor = self.db.users.find(
+            {f"{OUTBOX_FIELD}.0": {"$exists": True}},
+            {"id": 1, OUTBOX_FIELD: 1}
+        ).limit(limit)
+        async for user in cursor:
+            transactions = user.get(OUTBOX_FIELD, [])
+            await self._flush(user["id"], transactions)
+            flushed += len(transactions)
+
+        if flushed:
+            logger.info(f"📒 Outbox crédits: {flushed} transactions rejouées")
+        return flushed
+
+    async def drain(self):
+        """Attend la fin des recopies en cours (arrêt du serveur)"""
+        if self._pending_flushes:
+            await asyncio.gather(*list(self._pending_flushes), return_exceptions=True)
+
+
+__all__ = [
+    'CreditLedger',
+    'build_deduction_pipeline',
+    'build_transaction',
+    'BALANCE_FIELDS',
+]
@@ -0,0 +1,192 @@
+"""
+Shared outbound HTTP clients
+One pooled httpx.AsyncClient per upstream host for the lifetime of the
+application (keep-alive, HTTP/2 when the h2 package is installed), with
+retry/backoff helpers and per-host timing metrics. Closed in the FastAPI
+shutdown hook.
+"""
+
+import asyncio
+import importlib.util
+import logging
+import os
+import random
+import time
+from typing import Dict, Optional
+
+import httpx
+
+from utils.monitoring import track_upstream_request, track_upstream_retry
+
+# HTTP/2 optionnel (pip install httpx[http2])
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+logger = logging.getLogger(__name__)
+
+HTTP_TIMEOUT_SECONDS = float(os.environ.get("HTTP_TIMEOUT_SECONDS", "30"))
+HTTP_MAX_CONNECTIONS_PER_HOST = int(os.environ.get("HTTP_MAX_CONNECTIONS_PER_HOST", "20"))
+HTTP_MAX_KEEPALIVE_PER_HOST = int(os.environ.get("HTTP_MAX_KEEPALIVE_PER_HOST", "10"))
+HTTP_MAX_RETRIES = int(os.environ.get("HTTP_MAX_RETRIES", "2"))
+HTTP_MAX_BACKOFF_SECONDS = float(os.environ.get("HTTP_MAX_BACKOFF_SECONDS", "20"))
+
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+RETRYABLE_STATUSES = frozenset({429, 502, 503, 504})
+
+
+def _status_class(status_code: int) -> str:
+    return f"{status_code // 100}xx"
+
+
+class _TimedTransport(httpx.AsyncBaseTransport):
+    """Mesure le temps jusqu'aux en-têtes de réponse, par hôte"""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport):
+        self._transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        started = time.perf_counter()
+        try:
+            response = await self._transport.handle_async_request(request)
+        except Exception:
+            track_upstream_request(request.url.host, request.method, "error", time.perf_counter() - started)
+            raise
+        track_upstream_request(request.url.host, request.method, _status_class(response.status_code), time.perf_counter() - started)
+        return response
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+
+def retry_after_seconds(response: httpx.Response) -> Optional[float]:
+    """Délai demandé par l'amont (Retry-After en secondes), None si absent"""
+    value = response.headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        return None
+
+
+def backoff_delay(attempt: int, base: float = 0.5) -> float:
+    """Backoff exponentiel avec jitter, borné par HTTP_MAX_BACKOFF_SECONDS"""
+    return min(base * (2 ** attempt) + random.uniform(0, base), HTTP_MAX_BACKOFF_SECONDS)
+
+
+class HTTPClientRegistry:
+    """
+    Clients httpx partagés, un par hôte amont (scheme://host[:port])
+
+    Un client par hôte donne des limites de connexions par hôte: un amont
+    lent ne monopolise pas le pool des autres.
+    """
+
+    def __init__(
+        self,
+        timeout: float = HTTP_TIMEOUT_SECONDS,
+        max_connections: int = HTTP_MAX_CONNECTIONS_PER_HOST,
+        max_keepalive: int = HTTP_MAX_KEEPALIVE_PER_HOST,
+        http2: bool = HTTP2_AVAILABLE
+    ):
+        self.timeout = timeout
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive)
+        self.http2 = http2
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+
+    @staticmethod
+    def _origin(url: str) -> str:
+        parsed = httpx.URL(url)
+        return f"{parsed.scheme}://{parsed.netloc.decode('ascii')}"
+
+    def client(self, url: str) -> httpx.AsyncClient:
+        """Client poolé de l'hôte de `url` (créé au premier appel)"""
+        origin = self._origin(url)
+        client = self._clients.get(origin)
+        if client is None or client.is_closed:
+            transport = httpx.AsyncHTTPTransport(limits=self.limits, http2=self.http2)
+            client = httpx.AsyncClient(
+                transport=_TimedTransport(transport),
+                timeout=self.timeout,
+            )
+            self._clients[origin] = client
+        return client
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        *,
+        retries: int = HTTP_MAX_RETRIES,
+        retry_non_idempotent: bool = False,
+        **kwargs
+    ) -> httpx.Response:
+        """
+        Requête avec retries
+
+        - 429 et erreurs de connexion (requête jamais envoyée): toujours
+          réessayés, en respectant Retry-After
+        - 502/503/504 et autres erreurs réseau: seulement pour les méthodes
+          idempotentes (ou retry_non_idempotent=True)
+
+        La dernière réponse est retournée telle quelle (pas de raise_for_status).
+        """
+        method = method.upper()
+        idempotent = method in IDEMPOTENT_METHODS or retry_non_idempotent
+        client = self.client(url)
+        host = httpx.URL(url).host
+
+        for attempt in range(retries + 1):
+            last_attempt = attempt == retries
+            try:
+                response = await client.request(method, url, **kwargs)
+            except (httpx.ConnectError, httpx.ConnectTimeout) as e:
+                if last_attempt:
+                    raise
+                reason, delay = "connect", backoff_delay(attempt)
+                logger.warning(f"{method} {host}: {e!r}, nouvel essai dans {delay:.1f}s")
+            except httpx.TransportError as e:
+                if last_attempt or not idempotent:
+                    raise
+                reason, delay = "transport", backoff_delay(attempt)
+                logger.warning(f"{method} {host}: {e!r}, nouvel essai dans {delay:.1f}s")
+            else:
+                retryable = response.status_code == 429 or (
+                    idempotent and response.status_code in RETRYABLE_STATUSES
+                )
+                if last_attempt or not retryable:
+                    return response
+                reason = str(response.status_code)
+                delay = retry_after_seconds(response)
+                delay = backoff_delay(attempt) if delay is None else min(delay, HTTP_MAX_BACKOFF_SECONDS)
+                await response.aclose()
+
+            track_upstream_retry(host, reason)
+            await asyncio.sleep(delay)
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+    async def aclose(self):
+        """Ferme tous les clients (hook shutdown de FastAPI)"""
+        clients, self._clients = list(self._clients.values()), {}
+        for client in clients:
+            try:
+                await client.aclose()
+            except Exception as e:
+                logger.warning(f"Fermeture client HTTP: {e}")
+
+
+# Registre de l'application
+http_clients = HTTPClientRegistry()
+
+
+__all__ = [
+    'HTTPClientRegistry',
+    'http_clients',
+    'backoff_delay',
+    'retry_after_seconds',
+    'HTTP2_AVAILABLE',
+]
@@ -7,6 +7,8 @@ from typing import List, Dict, Optional
 from pydantic import BaseModel
 from datetime import datetime
 
+from utils.context_builder import select_context
+
 
 class ChatMessage(BaseModel):
     """Single message in project chat"""
@@ -40,7 +42,8 @@ async def create_iteration_prompt(
     original_description: str,
     current_code: Dict[str, str],
     chat_history: List[ChatMessage],
-    new_instruction: str
+    new_instruction: str,
+    context_tokens: int = 15000
 ) -> str:
     """
     Create a prompt for iterating on existing code
@@ -50,6 +53,7 @@ async def create_iteration_prompt(
         current_code: Current code structure
         chat_history: Previous conversation
         new_instruction: New improvement request
+        context_tokens: Token budget for the code shown to the model
     
     Returns:
         Formatted prompt for LLM
@@ -74,6 +78,13 @@ async def create_iteration_prompt(
     
     code_info = "\n".join(code_summary)
     
+    # Code pertinent pour la demande (le modèle doit voir ce qu'il modifie)
+    context = select_context(
+        {field: content for field, content in current_code.items() if content},
+        new_instruction,
+        context_tokens
+    )
+    
     prompt = f"""Tu es un expert en développement qui améliore un projet existant.
 
 ## PROJET ACTUEL
@@ -84,6 +95,8 @@ async def create_iteration_prompt(
 **Code actuel:**
 {code_info}
 
+{context.format()}
+
 **Historique de conversation:**
 {history_context if history_context else "Aucune conversation précédente"}
 
@@ -124,6 +137,106 @@ Retourne le code dans ce format JSON:
     return prompt
 
 
+async def create_patch_iteration_prompt(
+    original_description: str,
+    current_files: Dict[str, str],
+    chat_history: List[ChatMessage],
+    new_instruction: str,
+    context_tokens: int = 15000
+) -> str:
+    """
+    Create a prompt asking for edit blocks instead of the complete code
+    
+    Args:
+        original_description: Original project description
+        current_files: path (or code field name) -> content
+        chat_history: Previous conversation
+        new_instruction: New improvement request
+        context_tokens: Token budget for file contents (most relevant files
+            in full, signatures only for the others)
+    
+    Returns:
+        Formatted prompt for LLM
+    """
+    history_context = "\n".join([
+        f"{msg.role.upper()}: {msg.content}"
+        for msg in chat_history[-5:]  # Last 5 messages
+    ])
+    
+    context = select_context(current_files, new_instruction, context_tokens)
+    
+    prompt = f"""Tu es un expert en développement qui améliore un projet existant.
+
+## PROJET ACTUEL
+
+**Description originale:**
+{original_description}
+
+**Fichiers actuels (les plus pertinents pour la demande):**
+{context.format()}
+
+**Historique de conversation:**
+{history_context if history_context else "Aucune conversation précédente"}
+
+## NOUVELLE DEMANDE
+
+{new_instruction}
+
+## INSTRUCTIONS
+
+Ne renvoie PAS le code complet. Renvoie uniquement les modifications.
+
+1. Commence par ce JSON (une seule fois):
+{{"changes_made": ["Ajout de la fonctionnalité X", "..."], "explanation": "Résumé des modifications..."}}
+
+2. Puis, pour chaque modification, un bloc:
+FICHIER: chemin/exact/du/fichier
+<<<<<<< SEARCH
+lignes actuelles à remplacer, copiées à l'identique
+=======
+nouvelles lignes
+>>>>>>> REPLACE
+
+**IMPORTANT:**
+- Le bloc SEARCH doit correspondre EXACTEMENT à une seule portion du fichier
+  (inclure assez de lignes pour qu'il soit unique, mais pas plus)
+- Plusieurs blocs par fichier sont possibles, dans l'ordre du fichier
+- Nouveau fichier: bloc SEARCH vide et contenu complet dans la partie REPLACE
+- Utilise les chemins exacts indiqués ci-dessus (y compris html_code, css_code...)
+- Pour un fichier dont seul le résumé est fourni, le bloc SEARCH doit
+  reprendre une ligne de signature visible
+- Pas de ``` autour des blocs
+"""
+    
+    return prompt
+
+
+async def create_file_regeneration_prompt(
+    path: str,
+    current_content: str,
+    new_instruction: str,
+    failure_reason: str
+) -> str:
+    """
+    Prompt used when the edit blocks for one file could not be applied:
+    asks for that file only, complete
+    """
+    return f"""Tu modifies un seul fichier d'un projet existant.
+
+**Demande:** {new_instruction}
+
+Les modifications proposées pour ce fichier n'ont pas pu être appliquées ({failure_reason}).
+
+FICHIER: {path}
+```
+{current_content}
+```
+
+Renvoie UNIQUEMENT le contenu COMPLET et modifié de ce fichier, sans explication,
+dans un seul bloc ```.
+"""
+
+
 def extract_changes_from_response(response: str) -> List[str]:
     """
     Extract list of changes from AI response
@@ -169,5 +282,7 @@ __all__ = [
     'IterationRequest',
     'RegenerateRequest',
     'create_iteration_prompt',
+    'create_patch_iteration_prompt',
+    'create_file_regeneration_prompt',
     'extract_changes_from_response'
 ]
@@ -0,0 +1,484 @@
+"""
+Durable job queue (MongoDB) + worker pool
+Jobs survive process restarts: a worker holds a lease renewed by heartbeats,
+an expired lease makes the job claimable again by any worker
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from pymongo import ASCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+JOB_LEASE_SECONDS = int(os.environ.get("JOB_LEASE_SECONDS", "60"))
+JOB_MAX_ATTEMPTS = int(os.environ.get("JOB_MAX_ATTEMPTS", "3"))
+JOB_RETRY_BACKOFF_SECONDS = float(os.environ.get("JOB_RETRY_BACKOFF_SECONDS", "5"))
+
+# États d'un job
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+TERMINAL_STATES = (JOB_SUCCEEDED, JOB_FAILED)
+
+# Traitement d'un échec définitif (remboursement...): pending jusqu'à ce que
+# le handler confirme, rejoué par le reaper si son worker meurt entre les deux
+FAILURE_PENDING = "pending"
+FAILURE_HANDLED = "done"
+
+
+class JobQueue:
+    """
+    File de jobs persistée dans une collection Mongo
+
+    Cycle de vie: queued -> running (lease) -> succeeded | failed
+    Un échec est réessayé (retour à queued avec backoff) tant que
+    attempts < max_attempts. Un job failed garde failure_state=pending
+    jusqu'à complete_failure(): claim_failure() le réserve pour un lease.
+    """
+
+    def __init__(
+        self,
+        db,
+        collection_name: str = "generation_jobs",
+        lease_seconds: int = JOB_LEASE_SECONDS,
+        max_attempts: int = JOB_MAX_ATTEMPTS
+    ):
+        self.db = db
+        self.collection_name = collection_name
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+
+    @property
+    def jobs(self):
+        return self.db[self.collection_name]
+
+    async def ensure_indexes(self):
+        await self.jobs.create_index("id", unique=True)
+        await self.jobs.create_index([("status", ASCENDING), ("run_after", ASCENDING)])
+        await self.jobs.create_index([("status", ASCENDING), ("lease_expires_at", ASCENDING)])
+        await self.jobs.create_index([("project_id", ASCENDING), ("created_at", ASCENDING)])
+        await self.jobs.create_index(
+            [("failure_state", ASCENDING), ("failure_claimed_at", ASCENDING)],
+            partialFilterExpression={"failure_state": FAILURE_PENDING}
+        )
+        # Idempotency-Key: une seule création par utilisateur et par clé
+        await self.jobs.create_index(
+            [("user_id", ASCENDING), ("idempotency_key", ASCENDING)],
+            unique=True,
+            partialFilterExpression={"idempotency_key": {"$type": "string"}}
+        )
+
+    async def enqueue(
+        self,
+        job_type: str,
+        payload: Dict[str, Any],
+        user_id: str,
+        project_id: Optional[str] = None,
+        idempotency_key: Optional[str] = None,
+        status: str = JOB_QUEUED,
+        result: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Crée un job (ou retourne celui déjà créé avec la même idempotency_key)
+
+        Returns:
+            Le document du job, avec "created": False s'il existait déjà
+        """
+        now = datetime.utcnow()
+        job = {
+            "id": str(uuid.uuid4()),
+            "type": job_type,
+            "status": status,
+            "user_id": user_id,
+            "project_id": project_id,
+            "payload": payload,
+            "attempts": 0,
+            "max_attempts": self.max_attempts,
+            "run_after": now,
+            "lease_owner": None,
+            "lease_expires_at": None,
+            "result": result,
+            "error": None,
+            "created_at": now,
+            "updated_at": now,
+            "finished_at": now if status in TERMINAL_STATES else None,
+        }
+        if idempotency_key:
+            job["idempotency_key"] = idempotency_key
+
+        try:
+            await self.jobs.insert_one(dict(job))
+        except DuplicateKeyError:
+            existing = await self.jobs.find_one({"user_id": user_id, "idempotency_key": idempotency_key})
+            if existing:
+                existing["created"] = False
+                return existing
+            raise
+
+        job["created"] = True
+        return job
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return await self.jobs.find_one({"id": job_id})
+
+    async def claim(self, worker_id: str, job_types=None) -> Optional[Dict[str, Any]]:
+        """
+        Prend le plus ancien job disponible: en file (run_after échu) ou en
+        cours avec un lease expiré (worker mort)
+        """
+        now = datetime.utcnow()
+        query = {
+            "$or": [
+                {"status": JOB_QUEUED, "run_after": {"$lte": now}},
+                {"status": JOB_RUNNING, "lease_expires_at": {"$lt": now}},
+            ],
+            "$expr": {"$lt": ["$attempts", "$max_attempts"]},
+        }
+        if job_types:
+            query["type"] = {"$in": list(job_types)}
+
+        return await self.jobs.find_one_and_update(
+            query,
+            {
+                "$set": {
+                    "status": JOB_RUNNING,
+                    "lease_owner": worker_id,
+                    "lease_expires_at": now + timedelta(seconds=self.lease_seconds),
+                    "started_at": now,
+                    "updated_at": now,
+                },
+                "$inc": {"attempts": 1},
+            },
+            sort=[("created_at", ASCENDING)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def heartbeat(self, job_id: str, worker_id: str) -> bool:
+        """Prolonge le lease; False si le job n'appartient plus à ce worker"""
+        now = datetime.utcnow()
+        result = await self.jobs.update_one(
+            {"id": job_id, "lease_owner": worker_id, "status": JOB_RUNNING},
+            {"$set": {
+                "lease_expires_at": now + timedelta(seconds=self.lease_seconds),
+                "heartbeat_at": now,
+                "updated_at": now,
+            }}
+        )
+        return result.matched_count > 0
+
+    async def complete(self, job_id: str, worker_id: str, result: Optional[Dict[str, Any]] = None) -> bool:
+        now = datetime.utcnow()
+        update = await self.jobs.update_one(
+            {"id": job_id, "lease_owner": worker_id, "status": JOB_RUNNING},
+            {"$set": {
+                "status": JOB_SUCCEEDED,
+                "result": result,
+                "error": None,
+                "lease_owner": None,
+                "lease_expires_at": None,
+                "finished_at": now,
+                "updated_at": now,
+            }}
+        )
+        return update.matched_count > 0
+
+    async def fail(self, job_id: str, worker_id: str, error: str, retry: bool = True) -> Optional[Dict[str, Any]]:
+        """
+        Enregistre un échec: le job repart en file avec un backoff exponentiel
+        s'il lui reste des tentatives, sinon il passe en failed
+
+        Returns:
+            Le job mis à jour, ou None si le lease avait été perdu
+        """
+        job = await self.jobs.find_one({"id": job_id, "lease_owner": worker_id, "status": JOB_RUNNING})
+        if not job:
+            return None
+
+        now = datetime.utcnow()
+        if retry and job["attempts"] < job["max_attempts"]:
+            delay = JOB_RETRY_BACKOFF_SECONDS * (2 ** (job["attempts"] - 1))
+            update = {
+                "status": JOB_QUEUED,
+                "run_after": now + timedelta(seconds=delay),
+                "error": error,
+            }
+        else:
+            update = {
+                "status": JOB_FAILED,
+                "error": error,
+                "finished_at": now,
+                "failure_state": FAILURE_PENDING,
+                "failure_claimed_at": None,
+            }
+        update.update({"lease_owner": None, "lease_expires_at": None, "updated_at": now})
+
+        return await self.jobs.find_one_and_update(
+            {"id": job_id, "lease_owner": worker_id},
+            {"$set": update},
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def release(self, job_id: str, worker_id: str):
+        """
+        Rend un job en cours sans compter la tentative (arrêt du worker):
+        un autre worker le reprend immédiatement
+        """
+        now = datetime.utcnow()
+        await self.jobs.update_one(
+            {"id": job_id, "lease_owner": worker_id, "status": JOB_RUNNING},
+            {
+                "$set": {
+                    "status": JOB_QUEUED,
+                    "run_after": now,
+                    "lease_owner": None,
+                    "lease_expires_at": None,
+                    "updated_at": now,
+                },
+                "$inc": {"attempts": -1},
+            }
+        )
+
+    async def reap_exhausted(self):
+        """
+        Jobs dont le dernier worker est mort sans tentative restante: les
+        passer en failed et les retourner (pour remboursement par exemple),
+        avec les jobs failed dont le traitement d'échec est resté en attente
+        """
+        now = datetime.utcnow()
+        reaped = []
+        while True:
+            job = await self.jobs.find_one_and_update(
+                {
+                    "status": JOB_RUNNING,
+                    "lease_expires_at": {"$lt": now},
+                    "$expr": {"$gte": ["$attempts", "$max_attempts"]},
+                },
+                {"$set": {
+                    "status": JOB_FAILED,
+                    "error": "Lease expiré (worker arrêté) - tentatives épuisées",
+                    "lease_owner": None,
+                    "lease_expires_at": None,
+                    "finished_at": now,
+                    "failure_state": FAILURE_PENDING,
+                    "failure_claimed_at": None,
+                    "updated_at": now,
+                }},
+                return_document=ReturnDocument.AFTER
+            )
+            if job is None:
+                break
+            reaped.append(job)
+
+        # Échecs dont le traitement n'a jamais été confirmé (worker mort
+        # entre fail() et complete_failure()): rendus pour être rejoués
+        stale = now - timedelta(seconds=self.lease_seconds)
+        reaped_ids = {job["id"] for job in reaped}
+        async for job in self.jobs.find({
+            "status": JOB_FAILED,
+            "failure_state": FAILURE_PENDING,
+            "$or": [
+                {"failure_claimed_at": {"$lt": stale}},
+                {"failure_claimed_at": None, "finished_at": {"$lt": stale}},
+            ],
+        }):
+            if job["id"] not in reaped_ids:
+                reaped.append(job)
+        return reaped
+
+    async def claim_failure(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Réserve le traitement de l'échec d'un job pour un lease
+
+        Returns:
+            Le job, ou None si l'échec est déjà traité ou en cours de
+            traitement par un autre worker
+        """
+        now = datetime.utcnow()
+        return await self.jobs.find_one_and_update(
+            {
+                "id": job_id,
+                "status": JOB_FAILED,
+                "failure_state": FAILURE_PENDING,
+                "$or": [
+                    {"failure_claimed_at": None},
+                    {"failure_claimed_at": {"$lt": now - timedelta(seconds=self.lease_seconds)}},
+                ],
+            },
+            {"$set": {"failure_claimed_at": now, "updated_at": now}},
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def complete_failure(self, job_id: str) -> bool:
+        """Confirme le traitement de l'échec: le reaper ne le rejoue plus"""
+        update = await self.jobs.update_one(
+            {"id": job_id, "failure_state": FAILURE_PENDING},
+            {"$set": {"failure_state": FAILURE_HANDLED, "updated_at": datetime.utcnow()}}
+        )
+        return update.matched_count > 0
+
+
+JobHandler = Callable[[Dict[str, Any]], Awaitable[Optional[Dict[str, Any]]]]
+FailureHandler = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+class WorkerPool:
+    """
+    Pool de workers asyncio qui consomment une JobQueue
+
+    Usage:
+        pool = WorkerPool(queue, {"generation": run_generation_job}, concurrency=4)
+        await pool.start()
+        ...
+        await pool.stop()  # les jobs en cours sont rendus à la file
+
+    Exécutable dans le processus de l'API ou seul (generation_worker.py).
+    """
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        handlers: Dict[str, JobHandler],
+        concurrency: int = 4,
+        on_failure: Optional[FailureHandler] = None,
+        poll_interval: float = 1.0,
+        worker_id: Optional[str] = None
+    ):
+        self.queue = queue
+        self.handlers = handlers
+        self.concurrency = concurrency
+        self.on_failure = on_failure
+        self.poll_interval = poll_interval
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self._loops = []
+        self._reaper_task = None
+        self._stopping = asyncio.Event()
+        self._wakeup = asyncio.Event()
+        self._running: Dict[str, asyncio.Task] = {}
+
+    @property
+    def active_jobs(self) -> int:
+        return len(self._running)
+
+    async def start(self):
+        self._stopping.clear()
+        self._loops = [asyncio.ensure_future(self._loop(index)) for index in range(self.concurrency)]
+        self._reaper_task = asyncio.ensure_future(self._reaper())
+        logger.info(f"👷 Worker pool {self.worker_id} démarré ({self.concurrency} workers)")
+
+    def notify(self):
+        """Réveille les workers (nouveau job en file sur ce processus)"""
+        self._wakeup.set()
+
+    async def stop(self, timeout: float = 10.0):
+        """Arrête les workers et rend les jobs en cours à la file"""
+        self._stopping.set()
+        self._wakeup.set()
+        if self._reaper_task is not None:
+            self._reaper_task.cancel()
+        for task in list(self._running.values()):
+            task.cancel()
+        if self._loops:
+            # Laisser chaque boucle rendre son job avant de sortir
+            _done, pending = await asyncio.wait(self._loops, timeout=timeout)
+            for loop_task in pending:
+                loop_task.cancel()
+        self._loops = []
+        logger.info(f"👷 Worker pool {self.worker_id} arrêté")
+
+    async def _loop(self, index: int):
+        while not self._stopping.is_set():
+            try:
+                job = await self.queue.claim(self.worker_id, self.handlers.keys())
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Worker {index}: lecture de la file impossible: {e}")
+                job = None
+
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            await self._run(job)
+
+    async def _run(self, job: Dict[str, Any]):
+        job_id = job["id"]
+        handler = self.handlers[job["type"]]
+        task = asyncio.ensure_future(handler(job))
+        self._running[job_id] = task
+        heartbeat = asyncio.ensure_future(self._heartbeat(job_id, task))
+
+        try:
+            result = await task
+        except asyncio.CancelledError:
+            if self._stopping.is_set():
+                await self.queue.release(job_id, self.worker_id)
+                logger.info(f"↩️ Job {job_id} rendu à la file (arrêt du worker)")
+                return
+            if heartbeat.done() and not heartbeat.cancelled():
+                logger.warning(f"⚠️ Job {job_id} abandonné: lease perdu")
+                return
+            raise
+        except Exception as e:
+            logger.error(f"❌ Job {job_id} échec (tentative {job['attempts']}/{job['max_attempts']}): {e}")
+            updated = await self.queue.fail(job_id, self.worker_id, str(e))
+            if updated and updated["status"] == JOB_FAILED and self.on_failure:
+                await self._notify_failure(updated)
+            return
+        finally:
+            heartbeat.cancel()
+            self._running.pop(job_id, None)
+
+        await self.queue.complete(job_id, self.worker_id, result)
+
+    async def _heartbeat(self, job_id: str, task: asyncio.Task):
+        interval = max(self.queue.lease_seconds / 3, 1)
+        while True:
+            await asyncio.sleep(interval)
+            if not await self.queue.heartbeat(job_id, self.worker_id):
+                # Un autre worker a repris le job: ne pas le terminer en double
+                task.cancel()
+                return
+
+    async def _reaper(self):
+        while not self._stopping.is_set():
+            try:
+                for job in await self.queue.reap_exhausted():
+                    if self.on_failure:
+                        await self._notify_failure(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Reaper jobs: {e}")
+            await asyncio.sleep(self.queue.lease_seconds)
+
+    async def _notify_failure(self, job: Dict[str, Any]):
+        try:
+            await self.on_failure(job)
+        except Exception as e:
+            logger.error(f"❌ Traitement de l'échec du job {job['id']}: {e}")
+
+
+__all__ = [
+    'JobQueue',
+    'WorkerPool',
+    'JOB_QUEUED',
+    'JOB_RUNNING',
+    'JOB_SUCCEEDED',
+    'JOB_FAILED',
+    'TERMINAL_STATES',
+    'FAILURE_PENDING',
+    'FAILURE_HANDLED',
+]
@@ -0,0 +1,298 @@
+"""
+LLM Concurrency Governor
+Process-wide admission control for LLM calls: global cap, per-plan cap per
+user, weighted fair queuing between users and priority for paid plans
+"""
+
+import asyncio
+import contextvars
+import itertools
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from utils.monitoring import track_llm_queue, track_llm_wait
+
+logger = logging.getLogger(__name__)
+
+LLM_MAX_CONCURRENCY = int(os.environ.get("LLM_MAX_CONCURRENCY", "16"))
+
+# Appels LLM simultanés autorisés par utilisateur selon son plan
+PLAN_MAX_INFLIGHT = {
+    "free": int(os.environ.get("LLM_MAX_PER_USER_FREE", "2")),
+    "standard": int(os.environ.get("LLM_MAX_PER_USER_STANDARD", "4")),
+    "pro": int(os.environ.get("LLM_MAX_PER_USER_PRO", "6")),
+    "enterprise": int(os.environ.get("LLM_MAX_PER_USER_ENTERPRISE", "10")),
+}
+
+# Poids WFQ: un utilisateur "pro" reçoit 4x la part d'un utilisateur "free"
+PLAN_WEIGHTS = {
+    "free": 1.0,
+    "standard": 2.0,
+    "pro": 4.0,
+    "enterprise": 8.0,
+}
+
+
+@dataclass
+class LLMRequestContext:
+    """
+    Identité de l'appelant, propagée via contextvars jusqu'aux agents
+
+    members: appelants d'une exécution partagée (single-flight). Chacun est
+    compté dans les slots et reçoit les événements de streaming; les autres
+    champs sont ceux du premier appelant.
+    """
+    user_id: str = "anonymous"
+    plan: str = "free"
+    project_id: Optional[str] = None
+    members: Optional[List["LLMRequestContext"]] = field(default=None, repr=False)
+
+    def participants(self) -> List["LLMRequestContext"]:
+        """Appelants servis par ce contexte"""
+        return list(self.members) if self.members else [self]
+
+    def project_ids(self) -> List[str]:
+        """Projets à notifier, sans doublons"""
+        project_ids: List[str] = []
+        for participant in self.participants():
+            if participant.project_id and participant.project_id not in project_ids:
+                project_ids.append(participant.project_id)
+        return project_ids
+
+
+_request_context: contextvars.ContextVar[Optional[LLMRequestContext]] = contextvars.ContextVar(
+    "llm_request_context", default=None
+)
+# Vrai quand la tâche courante détient déjà un slot (slots réentrants)
+_holding_slot: contextvars.ContextVar[bool] = contextvars.ContextVar("llm_holding_slot", default=False)
+
+
+def set_llm_context(user_id: str, plan: Optional[str] = None, project_id: Optional[str] = None):
+    """
+    Associe les appels LLM de la requête courante à un utilisateur
+
+    Les tâches créées ensuite (agents en parallèle) héritent du contexte
+    """
+    return _request_context.set(LLMRequestContext(
+        user_id=user_id,
+        plan=(plan or "free").lower(),
+        project_id=project_id
+    ))
+
+
+def use_llm_context(context: LLMRequestContext):
+    """Installe un contexte existant (ex: contexte partagé d'un single-flight)"""
+    return _request_context.set(context)
+
+
+def get_llm_context() -> LLMRequestContext:
+    return _request_context.get() or LLMRequestContext()
+
+
+class _Waiter:
+    """Requête en attente d'un slot"""
+
+    __slots__ = ("context", "finish_tag", "start_tag", "seq", "future", "enqueued_at", "notified_position", "charged")
+
+    def __init__(self, context: LLMRequestContext, start_tag: float, finish_tag: float, seq: int):
+        self.context = context
+        self.start_tag = start_tag
+        self.finish_tag = finish_tag
+        self.seq = seq
+        self.future = asyncio.get_event_loop().create_future()
+        self.enqueued_at = time.time()
+        self.notified_position = None
+        self.charged: List[str] = []
+
+
+class LLMGovernor:
+    """
+    Contrôleur d'admission partagé par tous les chemins de génération
+
+    Usage:
+        async with llm_governor.slot():
+            response = await chat.send_message(message)
+
+    - au plus max_concurrency appels en vol pour le processus
+    - au plus PLAN_MAX_INFLIGHT[plan] appels en vol par utilisateur
+    - file d'attente ordonnée par tag de fin WFQ (1 / poids du plan), donc
+      un utilisateur qui lance 10 agents ne bloque pas les autres
+    - la position en file est envoyée sur le stream SSE du projet
+    - une exécution partagée (contexte avec members) est admise si l'un de ses
+      appelants a de la place, avec la priorité du meilleur plan, et occupe un
+      slot de chacun des appelants qui ont de la place (jamais au-delà d'un
+      quota)
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        plan_limits: Dict[str, int] = None,
+        plan_weights: Dict[str, float] = None
+    ):
+        self.max_concurrency = max_concurrency
+        self.plan_limits = plan_limits or PLAN_MAX_INFLIGHT
+        self.plan_weights = plan_weights or PLAN_WEIGHTS
+        self._inflight = 0
+        self._inflight_by_user: Dict[str, int] = {}
+        self._waiting: List[_Waiter] = []
+        self._virtual_time = 0.0
+        self._last_finish: Dict[str, float] = {}
+        self._seq = itertools.count()
+
+    @asynccontextmanager
+    async def slot(self):
+        """Réserve un slot LLM pour la durée du bloc (réentrant)"""
+        if _holding_slot.get():
+            yield
+            return
+
+        context = get_llm_context()
+        charged = await self._acquire(context)
+        token = _holding_slot.set(True)
+        try:
+            yield
+        finally:
+            _holding_slot.reset(token)
+            self._release(charged)
+
+    def stats(self) -> Dict:
+        """État courant du contrôleur"""
+        return {
+            "inflight": self._inflight,
+            "queued": len(self._waiting),
+            "max_concurrency": self.max_concurrency,
+            "inflight_by_user": dict(self._inflight_by_user),
+        }
+
+    def _has_room(self, participant: LLMRequestContext) -> bool:
+        limit = self.plan_limits.get(participant.plan, self.plan_limits["free"])
+        return self._inflight_by_user.get(participant.user_id, 0) < limit
+
+    def _user_has_room(self, context: LLMRequestContext) -> bool:
+        return any(self._has_room(participant) for participant in context.participants())
+
+    def _plan(self, context: LLMRequestContext) -> str:
+        """Plan prioritaire parmi les appelants"""
+        return max(
+            (participant.plan for participant in context.participants()),
+            key=lambda plan: self.plan_weights.get(plan, 1.0)
+        )
+
+    def _start(self, context: LLMRequestContext) -> List[str]:
+        """
+        Occupe un slot, compté pour chaque appelant qui a de la place;
+        retourne les user_id comptés
+        """
+        charged = list(dict.fromkeys(
+            participant.user_id for participant in context.participants() if self._has_room(participant)
+        ))
+        self._inflight += 1
+        for user_id in charged:
+            self._inflight_by_user[user_id] = self._inflight_by_user.get(user_id, 0) + 1
+        track_llm_queue(len(self._waiting), self._inflight)
+        return charged
+
+    async def _acquire(self, context: LLMRequestContext) -> List[str]:
+        plan = self._plan(context)
+        if not self._waiting and self._inflight < self.max_concurrency and self._user_has_room(context):
+            charged = self._start(context)
+            track_llm_wait(plan, 0.0)
+            return charged
+
+        weight = self.plan_weights.get(plan, 1.0)
+        start_tag = max(self._virtual_time, self._last_finish.get(context.user_id, 0.0))
+        finish_tag = start_tag + 1.0 / weight
+        self._last_finish[context.user_id] = finish_tag
+
+        waiter = _Waiter(context, start_tag, finish_tag, next(self._seq))
+        self._waiting.append(waiter)
+        # Des slots peuvent être libres si les autres en attente sont à leur quota
+        self._dispatch()
+        track_llm_queue(len(self._waiting), self._inflight)
+        self._publish_positions()
+
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # Slot attribué juste avant l'annulation: le rendre
+                self._release(waiter.charged)
+            elif waiter in self._waiting:
+                self._waiting.remove(waiter)
+                track_llm_queue(len(self._waiting), self._inflight)
+                self._publish_positions()
+            raise
+
+        track_llm_wait(plan, time.time() - waiter.enqueued_at)
+        return waiter.charged
+
+    def _release(self, charged: List[str]):
+        self._inflight -= 1
+        for user_id in charged:
+            remaining = self._inflight_by_user.get(user_id, 1) - 1
+            if remaining > 0:
+                self._inflight_by_user[user_id] = remaining
+            else:
+                self._inflight_by_user.pop(user_id, None)
+        self._dispatch()
+        track_llm_queue(len(self._waiting), self._inflight)
+
+    def _dispatch(self):
+        dispatched = False
+        while self._waiting and self._inflight < self.max_concurrency:
+            eligible = [w for w in self._waiting if self._user_has_room(w.context)]
+            if not eligible:
+                break
+            waiter = min(eligible, key=lambda w: (w.finish_tag, w.seq))
+            self._waiting.remove(waiter)
+            self._virtual_time = max(self._virtual_time, waiter.start_tag)
+            waiter.charged = self._start(waiter.context)
+            waiter.future.set_result(True)
+            dispatched = True
+
+        if not self._waiting:
+            # File vide: réinitialiser l'horloge virtuelle
+            self._virtual_time = 0.0
+            self._last_finish.clear()
+        if dispatched:
+            self._publish_positions()
+
+    def _publish_positions(self):
+        """Envoie la position en file aux streams SSE concernés (si elle a changé)"""
+        try:
+            from streaming.streaming_system import streaming_manager
+        except Exception:
+            return
+
+        ordered = sorted(self._waiting, key=lambda w: (w.finish_tag, w.seq))
+        for position, waiter in enumerate(ordered, start=1):
+            if waiter.notified_position == position:
+                continue
+            waiter.notified_position = position
+            for project_id in waiter.context.project_ids():
+                # Contexte vide: l'envoi vise ce projet seul, sans la diffusion
+                # aux appelants d'une exécution partagée en cours (send_message)
+                contextvars.Context().run(asyncio.ensure_future, streaming_manager.send_message(
+                    project_id,
+                    "queued",
+                    f"⏳ En file d'attente LLM - position {position}/{len(ordered)}",
+                ))
+
+
+# Instance globale
+llm_governor = LLMGovernor()
+
+
+__all__ = [
+    'LLMGovernor',
+    'LLMRequestContext',
+    'llm_governor',
+    'set_llm_context',
+    'use_llm_context',
+    'get_llm_context',
+]
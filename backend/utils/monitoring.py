@@ -5,6 +5,7 @@ Includes: Sentry, Prometheus, Structured Logging
 
 import os
 import logging
+from typing import Dict
 import sentry_sdk
 from sentry_sdk.integrations.fastapi import FastApiIntegration
 from sentry_sdk.integrations.starlette import StarletteIntegration
@@ -117,7 +118,7 @@ llm_cost = Counter(
 cache_hits = Counter(
     'vectort_cache_hits_total',
     'Number of cache hits',
-    ['cache_type']
+    ['cache_type', 'match_type', 'score_bucket']
 )
 
 cache_misses = Counter(
@@ -126,6 +127,73 @@ cache_misses = Counter(
     ['cache_type']
 )
 
+cache_evictions = Counter(
+    'vectort_cache_evictions_total',
+    'Number of cache evictions',
+    ['cache_type', 'reason']
+)
+
+cache_size_bytes = Gauge(
+    'vectort_cache_size_bytes',
+    'Current cache size in bytes',
+    ['cache_type']
+)
+
+cache_entries = Gauge(
+    'vectort_cache_entries',
+    'Current number of cache entries',
+    ['cache_type']
+)
+
+llm_queue_depth = Gauge(
+    'vectort_llm_queue_depth',
+    'LLM calls waiting for an admission slot'
+)
+
+llm_inflight = Gauge(
+    'vectort_llm_inflight',
+    'LLM calls currently in flight'
+)
+
+llm_queue_wait = Histogram(
+    'vectort_llm_queue_wait_seconds',
+    'Time spent waiting for an LLM admission slot',
+    ['plan'],
+    buckets=[0, 0.1, 0.5, 1, 2, 5, 10, 20, 30, 60]
+)
+
+db_calls = Counter(
+    'vectort_db_calls_total',
+    'MongoDB commands issued while serving a request',
+    ['endpoint', 'collection']
+)
+
+db_calls_per_request = Histogram(
+    'vectort_db_calls_per_request',
+    'MongoDB commands per request',
+    ['endpoint'],
+    buckets=[0, 1, 2, 3, 4, 6, 8, 12, 16, 24, 32, 64]
+)
+
+request_cache_hits = Counter(
+    'vectort_request_cache_hits_total',
+    'Entity lookups served without a MongoDB read',
+    ['entity', 'tier']
+)
+
+upstream_request_duration = Histogram(
+    'vectort_upstream_request_duration_seconds',
+    'Outbound HTTP request time to response headers, per upstream host',
+    ['host', 'method', 'status_class'],
+    buckets=[0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 30, 60]
+)
+
+upstream_retries = Counter(
+    'vectort_upstream_retries_total',
+    'Outbound HTTP requests retried after a transient failure',
+    ['host', 'reason']
+)
+
 active_users = Gauge(
     'vectort_active_users',
     'Number of currently active users'
@@ -219,14 +287,63 @@ def track_generation(
         ).inc(cost)
 
 
-def track_cache(hit: bool, cache_type: str = "llm"):
-    """Track cache hit/miss"""
+def track_cache(hit: bool, cache_type: str = "llm", match_type: str = "exact", score: float = 1.0):
+    """Track cache hit/miss (match_type: exact | semantic, score bucketed to 0.05)"""
     if hit:
-        cache_hits.labels(cache_type=cache_type).inc()
+        score_bucket = f"{int(max(0.0, min(score, 1.0)) * 20) / 20:.2f}"
+        cache_hits.labels(
+            cache_type=cache_type,
+            match_type=match_type,
+            score_bucket=score_bucket
+        ).inc()
     else:
         cache_misses.labels(cache_type=cache_type).inc()
 
 
+def track_cache_eviction(cache_type: str, reason: str):
+    """Track cache eviction (size, expired, invalidated)"""
+    cache_evictions.labels(cache_type=cache_type, reason=reason).inc()
+
+
+def track_cache_size(cache_type: str, size_bytes: int, entries: int):
+    """Track cache occupancy"""
+    cache_size_bytes.labels(cache_type=cache_type).set(size_bytes)
+    cache_entries.labels(cache_type=cache_type).set(entries)
+
+
+def track_llm_queue(depth: int, inflight: int):
+    """Track LLM admission queue depth and in-flight calls"""
+    llm_queue_depth.set(depth)
+    llm_inflight.set(inflight)
+
+
+def track_llm_wait(plan: str, seconds: float):
+    """Track time spent queued before an LLM call"""
+    llm_queue_wait.labels(plan=plan).observe(seconds)
+
+
+def track_db_calls(endpoint: str, calls_by_collection: Dict[str, int]):
+    """Track MongoDB commands issued by one request"""
+    for collection, count in calls_by_collection.items():
+        db_calls.labels(endpoint=endpoint, collection=collection).inc(count)
+    db_calls_per_request.labels(endpoint=endpoint).observe(sum(calls_by_collection.values()))
+
+
+def track_request_cache_hit(entity: str, tier: str):
+    """Track an entity lookup served from the request scope or process cache"""
+    request_cache_hits.labels(entity=entity, tier=tier).inc()
+
+
+def track_upstream_request(host: str, method: str, status: str, seconds: float):
+    """Track one outbound HTTP request (status: 2xx, 4xx, 5xx or error)"""
+    upstream_request_duration.labels(host=host, method=method, status_class=status).observe(seconds)
+
+
+def track_upstream_retry(host: str, reason: str):
+    """Track a retried outbound HTTP request"""
+    upstream_retries.labels(host=host, reason=reason).inc()
+
+
 def track_deployment(platform: str, status: str):
     """Track deployment"""
     deployment_counter.labels(
@@ -341,6 +458,10 @@ __all__ = [
     'init_prometheus',
     'track_generation',
     'track_cache',
+    'track_cache_eviction',
+    'track_cache_size',
+    'track_llm_queue',
+    'track_llm_wait',
     'track_deployment',
     'track_oauth',
     'track_payment',
@@ -355,5 +476,11 @@ __all__ = [
     'llm_cost',
     'cache_hits',
     'cache_misses',
+    'cache_evictions',
+    'cache_size_bytes',
+    'cache_entries',
     'active_users',
+    'llm_queue_depth',
+    'llm_inflight',
+    'llm_queue_wait',
 ]
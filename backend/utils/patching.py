@@ -0,0 +1,314 @@
+"""
+Edit-block patching for project iterations
+Parses the search/replace blocks and unified diffs returned by the LLM and
+applies them to the current project files with conflict detection
+"""
+
+import json
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+FILE_HEADER = re.compile(r"^(?:FICHIER|FILE)\s*:\s*(.+?)\s*$")
+HUNK_HEADER = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+SEARCH_MARKER = re.compile(r"^<{5,9} ?SEARCH\s*$")
+DIVIDER_MARKER = re.compile(r"^={5,9}\s*$")
+REPLACE_MARKER = re.compile(r"^>{5,9} ?REPLACE\s*$")
+
+
+class PatchConflict(Exception):
+    """Bloc d'édition impossible à appliquer sans ambiguïté"""
+
+    def __init__(self, path: str, reason: str):
+        super().__init__(f"{path}: {reason}")
+        self.path = path
+        self.reason = reason
+
+
+@dataclass
+class Hunk:
+    old_start: int
+    old_lines: List[str]
+    new_lines: List[str]
+
+
+@dataclass
+class FileEdit:
+    """Une modification demandée sur un fichier"""
+    path: str
+    kind: str  # "replace" (search/replace) ou "diff" (diff unifié)
+    search: str = ""
+    replace: str = ""
+    hunks: List[Hunk] = field(default_factory=list)
+    new_file: bool = False
+
+
+@dataclass
+class PatchResult:
+    files: Dict[str, str]  # Nouveau contenu des fichiers modifiés ou créés
+    conflicts: Dict[str, str]  # path -> raison (fichier laissé intact)
+
+    @property
+    def changed_paths(self) -> List[str]:
+        return list(self.files)
+
+
+def _strip_diff_path(raw: str) -> Optional[str]:
+    path = raw.split("\t")[0].strip()
+    if path == "/dev/null":
+        return None
+    if path.startswith(("a/", "b/")):
+        path = path[2:]
+    return path
+
+
+def parse_edit_blocks(text: str) -> List[FileEdit]:
+    """
+    Extrait les éditions d'une réponse LLM
+
+    Formats acceptés (mélangeables):
+        FICHIER: src/App.js
+        <<<<<<< SEARCH
+        ancien code
+        =======
+        nouveau code
+        >>>>>>> REPLACE
+
+        --- a/src/App.js
+        +++ b/src/App.js
+        @@ -10,3 +10,4 @@
+         contexte
+        -supprimé
+        +ajouté
+    """
+    edits: List[FileEdit] = []
+    lines = text.split("\n")
+    current_path: Optional[str] = None
+    i = 0
+
+    while i < len(lines):
+        line = lines[i]
+
+        header = FILE_HEADER.match(line.strip())
+        if header:
+            current_path = header.group(1).strip("`*")
+            i += 1
+            continue
+
+        if SEARCH_MARKER.match(line.strip()):
+            search, replace = [], []
+            i += 1
+            while i < len(lines) and not DIVIDER_MARKER.match(lines[i].strip()):
+                search.append(lines[i])
+                i += 1
+            i += 1
+            while i < len(lines) and not REPLACE_MARKER.match(lines[i].strip()):
+                replace.append(lines[i])
+                i += 1
+            i += 1
+            if current_path:
+                edits.append(FileEdit(
+                    path=current_path,
+                    kind="replace",
+                    search="\n".join(search),
+                    replace="\n".join(replace),
+                ))
+            continue
+
+        if line.startswith("--- ") and i + 1 < len(lines) and lines[i + 1].startswith("+++ "):
+            old_path = _strip_diff_path(line[4:])
+            new_path = _strip_diff_path(lines[i + 1][4:])
+            path = new_path or old_path
+            edit = FileEdit(path=path, kind="diff", new_file=old_path is None)
+            i += 2
+            while i < len(lines):
+                match = HUNK_HEADER.match(lines[i])
+                if not match:
+                    break
+                hunk = Hunk(old_start=int(match.group(1)), old_lines=[], new_lines=[])
+                i += 1
+                while i < len(lines) and lines[i][:1] in (" ", "-", "+", "\\", ""):
+                    hunk_line = lines[i]
+                    if hunk_line.startswith(("--- ", "+++ ")) and i + 1 < len(lines) and lines[i + 1].startswith(("+++ ", "@@")):
+                        break
+                    if hunk_line == "" and (i + 1 >= len(lines) or not lines[i + 1][:1] in (" ", "-", "+", "\\")):
+                        break  # Ligne vide finale, hors du hunk
+                    if hunk_line.startswith("-"):
+                        hunk.old_lines.append(hunk_line[1:])
+                    elif hunk_line.startswith("+"):
+                        hunk.new_lines.append(hunk_line[1:])
+                    elif not hunk_line.startswith("\\"):
+                        context = hunk_line[1:]
+                        hunk.old_lines.append(context)
+                        hunk.new_lines.append(context)
+                    i += 1
+                edit.hunks.append(hunk)
+            if path and edit.hunks:
+                edits.append(edit)
+            continue
+
+        i += 1
+
+    return edits
+
+
+def parse_patch_response(text: str) -> Tuple[Dict, List[FileEdit]]:
+    """
+    Sépare l'en-tête JSON (changes_made, explanation) des blocs d'édition
+    """
+    first_edit = len(text)
+    for pattern in (r"^(?:FICHIER|FILE)\s*:", r"^--- "):
+        match = re.search(pattern, text, re.MULTILINE)
+        if match:
+            first_edit = min(first_edit, match.start())
+
+    header = text[:first_edit]
+    meta: Dict = {}
+    json_start = header.find("{")
+    json_end = header.rfind("}") + 1
+    if json_start >= 0 and json_end > json_start:
+        try:
+            meta = json.loads(header[json_start:json_end])
+        except ValueError:
+            meta = {}
+
+    return meta, parse_edit_blocks(text[first_edit:])
+
+
+def _find_block(haystack: List[str], needle: List[str], expected: int = 0) -> List[int]:
+    """Positions où needle apparaît (comparaison sans espaces de fin), triées par distance à expected"""
+    if not needle:
+        return []
+    normalized = [line.rstrip() for line in needle]
+    first = normalized[0]
+    positions = [
+        index for index in range(len(haystack) - len(needle) + 1)
+        if haystack[index].rstrip() == first
+        and [line.rstrip() for line in haystack[index:index + len(needle)]] == normalized
+    ]
+    return sorted(positions, key=lambda index: abs(index - expected))
+
+
+def _trim_blank_edges(lines: List[str]) -> List[str]:
+    start, end = 0, len(lines)
+    while start < end and not lines[start].strip():
+        start += 1
+    while end > start and not lines[end - 1].strip():
+        end -= 1
+    return lines[start:end]
+
+
+def apply_search_replace(path: str, content: Optional[str], search: str, replace: str) -> str:
+    """
+    Remplace l'unique occurrence de search
+
+    Raises:
+        PatchConflict: search absent ou présent plusieurs fois
+    """
+    if not search.strip():
+        if content and content.strip():
+            raise PatchConflict(path, "bloc SEARCH vide sur un fichier existant")
+        return replace
+
+    if content is None:
+        raise PatchConflict(path, "fichier inexistant")
+
+    occurrences = content.count(search)
+    if occurrences == 1:
+        return content.replace(search, replace, 1)
+    if occurrences > 1:
+        raise PatchConflict(path, f"bloc SEARCH ambigu ({occurrences} occurrences)")
+
+    # Tolérance: espaces de fin de ligne et lignes vides autour du bloc
+    lines = content.split("\n")
+    needle = _trim_blank_edges(search.split("\n"))
+    positions = _find_block(lines, needle)
+    if len(positions) != 1:
+        reason = "bloc SEARCH introuvable" if not positions else f"bloc SEARCH ambigu ({len(positions)} occurrences)"
+        raise PatchConflict(path, reason)
+
+    start = positions[0]
+    return "\n".join(lines[:start] + _trim_blank_edges(replace.split("\n")) + lines[start + len(needle):])
+
+
+def apply_unified_diff(path: str, content: Optional[str], hunks: List[Hunk], new_file: bool = False) -> str:
+    """
+    Applique les hunks d'un diff unifié, en tolérant un décalage des numéros
+    de ligne (le contexte doit correspondre)
+
+    Raises:
+        PatchConflict: contexte d'un hunk introuvable
+    """
+    if new_file or content is None:
+        if content and content.strip():
+            raise PatchConflict(path, "création d'un fichier qui existe déjà")
+        if content is None and not new_file:
+            raise PatchConflict(path, "fichier inexistant")
+        return "\n".join(line for hunk in hunks for line in hunk.new_lines)
+
+    lines = content.split("\n")
+    offset = 0
+    for hunk in hunks:
+        expected = max(hunk.old_start - 1 + offset, 0)
+        if not hunk.old_lines:
+            start = min(expected + (1 if hunk.old_start else 0), len(lines))
+        else:
+            positions = _find_block(lines, hunk.old_lines, expected)
+            if not positions:
+                raise PatchConflict(path, f"contexte du hunk @@ -{hunk.old_start} introuvable")
+            start = positions[0]
+        lines[start:start + len(hunk.old_lines)] = hunk.new_lines
+        offset += len(hunk.new_lines) - len(hunk.old_lines) + (start - expected)
+
+    return "\n".join(lines)
+
+
+def apply_edits(current: Dict[str, str], edits: List[FileEdit]) -> PatchResult:
+    """
+    Applique les éditions fichier par fichier
+
+    Un conflit invalide toutes les éditions du fichier concerné (le fichier
+    reste inchangé et est signalé dans conflicts), les autres fichiers sont
+    appliqués normalement.
+    """
+    files: Dict[str, str] = {}
+    conflicts: Dict[str, str] = {}
+
+    for edit in edits:
+        if edit.path in conflicts:
+            continue
+        content = files.get(edit.path, current.get(edit.path))
+        try:
+            if edit.kind == "diff":
+                updated = apply_unified_diff(edit.path, content, edit.hunks, edit.new_file)
+            else:
+                updated = apply_search_replace(edit.path, content, edit.search, edit.replace)
+        except PatchConflict as conflict:
+            conflicts[edit.path] = conflict.reason
+            files.pop(edit.path, None)
+            continue
+        files[edit.path] = updated
+
+    # Éditions sans effet réel: pas d'écriture
+    files = {path: content for path, content in files.items() if current.get(path) != content}
+    return PatchResult(files=files, conflicts=conflicts)
+
+
+def extract_code_block(text: str) -> str:
+    """Contenu du premier bloc ``` d'une réponse (ou la réponse entière)"""
+    match = re.search(r"```[\w.+-]*[ \t]*\n(.*?)\n?```", text, re.DOTALL)
+    return match.group(1) if match else text.strip()
+
+
+__all__ = [
+    'FileEdit',
+    'Hunk',
+    'PatchConflict',
+    'PatchResult',
+    'parse_edit_blocks',
+    'parse_patch_response',
+    'apply_search_replace',
+    'apply_unified_diff',
+    'apply_edits',
+    'extract_code_block',
+]
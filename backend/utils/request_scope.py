@@ -0,0 +1,231 @@
+"""
+Request-scoped unit of work
+Memoizes user and project documents for the duration of one HTTP request,
+backed by a short-TTL process-wide cache of JWT subjects and user documents,
+and counts the MongoDB commands issued by each endpoint
+"""
+
+import contextvars
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from pymongo import monitoring
+
+from utils.monitoring import track_db_calls, track_request_cache_hit
+
+# Durée de vie des utilisateurs en cache processus: borne la désynchronisation
+# entre processus (les écritures du processus courant invalident directement)
+USER_CACHE_TTL_SECONDS = float(os.environ.get("USER_CACHE_TTL_SECONDS", "5"))
+USER_CACHE_MAX_ENTRIES = int(os.environ.get("USER_CACHE_MAX_ENTRIES", "10000"))
+JWT_SUBJECT_CACHE_TTL_SECONDS = float(os.environ.get("JWT_SUBJECT_CACHE_TTL_SECONDS", "300"))
+
+
+class _TTLCache:
+    """LRU borné en entrées avec expiration par entrée"""
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            return
+        self._entries[key] = (value, time.monotonic() + ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def pop(self, key: Hashable):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+
+_users = _TTLCache(USER_CACHE_TTL_SECONDS, USER_CACHE_MAX_ENTRIES)
+_jwt_subjects = _TTLCache(JWT_SUBJECT_CACHE_TTL_SECONDS, USER_CACHE_MAX_ENTRIES)
+
+
+class RequestScope:
+    """
+    Unité de travail d'une requête HTTP
+
+    Les documents mémorisés sont partagés entre les appels de la requête:
+    les traiter en lecture seule.
+    """
+
+    __slots__ = ("endpoint", "users", "projects", "db_calls", "_lock")
+
+    def __init__(self, endpoint: str = "unknown"):
+        self.endpoint = endpoint
+        self.users: Dict[str, dict] = {}
+        self.projects: Dict[tuple, dict] = {}
+        self.db_calls: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def count_db_call(self, collection: str):
+        # Appelé depuis les threads de l'exécuteur Motor
+        with self._lock:
+            self.db_calls[collection] += 1
+
+    def report(self):
+        with self._lock:
+            calls = dict(self.db_calls)
+        track_db_calls(self.endpoint, calls)
+
+
+_current_scope: contextvars.ContextVar[Optional[RequestScope]] = contextvars.ContextVar(
+    "request_scope", default=None
+)
+
+
+def current_scope() -> Optional[RequestScope]:
+    return _current_scope.get()
+
+
+@contextmanager
+def request_scope(endpoint: str = "unknown"):
+    """
+    Ouvre l'unité de travail de la requête courante
+
+    Les tâches créées pendant la requête héritent du même scope (contextvars).
+    """
+    scope = RequestScope(endpoint)
+    token = _current_scope.set(scope)
+    try:
+        yield scope
+    finally:
+        _current_scope.reset(token)
+
+
+class DBCallListener(monitoring.CommandListener):
+    """
+    Compte les commandes MongoDB de la requête courante
+
+    Motor exécute pymongo dans un exécuteur avec une copie du contexte: le
+    scope de la requête y est visible.
+    """
+
+    def started(self, event):
+        scope = _current_scope.get()
+        if scope is None:
+            return
+        target = event.command.get(event.command_name)
+        if not isinstance(target, str):
+            # getMore: {"getMore": <cursor id>, "collection": ...}
+            target = event.command.get("collection", event.command_name)
+        scope.count_db_call(target)
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+def resolve_jwt_subject(token: str, decode: Callable[[str], dict]) -> Optional[str]:
+    """
+    Sujet (user id) d'un JWT, décodé une seule fois par jeton
+
+    Les jetons invalides ne sont pas mis en cache (decode lève à chaque fois);
+    une entrée n'est jamais conservée au-delà de l'expiration du jeton.
+    """
+    subject = _jwt_subjects.get(token)
+    if subject is not None:
+        return subject
+
+    payload = decode(token)
+    subject = payload.get("sub")
+    if subject is None:
+        return None
+
+    ttl = None
+    if payload.get("exp") is not None:
+        ttl = float(payload["exp"]) - time.time()
+    _jwt_subjects.set(token, subject, ttl)
+    return subject
+
+
+async def get_user_document(db, user_id: str) -> Optional[dict]:
+    """Document utilisateur: scope de la requête, puis cache processus, puis MongoDB"""
+    scope = _current_scope.get()
+    if scope is not None and user_id in scope.users:
+        track_request_cache_hit("user", "request")
+        return scope.users[user_id]
+
+    user = _users.get(user_id)
+    if user is not None:
+        track_request_cache_hit("user", "process")
+    else:
+        user = await db.users.find_one({"id": user_id})
+        if user is None:
+            return None
+        _users.set(user_id, user)
+
+    if scope is not None:
+        scope.users[user_id] = user
+    return user
+
+
+def invalidate_user(user_id: str):
+    """À appeler après toute écriture sur le document utilisateur"""
+    _users.pop(user_id)
+    scope = _current_scope.get()
+    if scope is not None:
+        scope.users.pop(user_id, None)
+
+
+async def get_owned_project(db, project_id: str, user_id: str, projection: Optional[dict] = None) -> Optional[dict]:
+    """
+    Projet appartenant à l'utilisateur, lu au plus une fois par requête
+
+    Pas de cache processus: le statut change pendant les générations.
+    """
+    scope = _current_scope.get()
+    key = (project_id, user_id, tuple(sorted(projection)) if projection else None)
+    if scope is not None and key in scope.projects:
+        track_request_cache_hit("project", "request")
+        return scope.projects[key]
+
+    project = await db.projects.find_one({"id": project_id, "user_id": user_id}, projection)
+    if project is not None and scope is not None:
+        scope.projects[key] = project
+    return project
+
+
+def invalidate_project(project_id: str):
+    """À appeler après une écriture sur le projet pendant la requête"""
+    scope = _current_scope.get()
+    if scope is not None:
+        for key in [key for key in scope.projects if key[0] == project_id]:
+            del scope.projects[key]
+
+
+__all__ = [
+    'RequestScope',
+    'DBCallListener',
+    'current_scope',
+    'request_scope',
+    'resolve_jwt_subject',
+    'get_user_document',
+    'invalidate_user',
+    'get_owned_project',
+    'invalidate_project',
+]
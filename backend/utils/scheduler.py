@@ -0,0 +1,258 @@
+"""
+In-process periodic task scheduler
+Tasks run on the API event loop, off the request path, with jittered
+intervals. A Mongo lease document per task elects a single leader across
+replicas: only the lease holder runs the task, and an expired lease (dead
+replica) is taken over at the next tick of any other replica.
+"""
+
+import asyncio
+import logging
+import os
+import random
+import socket
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+# Marge du lease au-delà de l'intervalle: couvre le jitter et les lenteurs Mongo
+SCHEDULER_LEASE_GRACE_SECONDS = float(os.environ.get("SCHEDULER_LEASE_GRACE_SECONDS", "60"))
+
+
+class LeaderLease:
+    """
+    Lease nommé dans la collection scheduler_leases ({_id, owner, expires_at})
+
+    acquire() prend le lease s'il est libre ou expiré, et le prolonge s'il
+    appartient déjà à ce processus.
+    """
+
+    def __init__(self, db, name: str, ttl_seconds: float, owner: str):
+        self.db = db
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.owner = owner
+
+    @property
+    def leases(self):
+        return self.db.scheduler_leases
+
+    async def acquire(self) -> bool:
+        now = datetime.utcnow()
+        try:
+            lease = await self.leases.find_one_and_update(
+                {"_id": self.name, "$or": [{"owner": self.owner}, {"expires_at": {"$lt": now}}]},
+                {"$set": {
+                    "owner": self.owner,
+                    "expires_at": now + timedelta(seconds=self.ttl_seconds),
+                    "renewed_at": now,
+                }},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            return False  # Lease valide détenu par un autre processus
+        return lease is not None and lease.get("owner") == self.owner
+
+    async def release(self):
+        """Expire le lease tout de suite (arrêt propre: un autre réplica reprend)"""
+        await self.leases.update_one(
+            {"_id": self.name, "owner": self.owner},
+            {"$set": {"expires_at": datetime.utcnow()}}
+        )
+
+
+TaskFunction = Callable[[], Awaitable[Any]]
+
+
+@dataclass
+class ScheduledTask:
+    """Tâche périodique et état de ses exécutions sur ce processus"""
+    name: str
+    func: TaskFunction
+    interval: float
+    jitter: float = 0.1
+    initial_delay: Optional[float] = None
+    timeout: Optional[float] = None
+    leader_only: bool = True
+    runs: int = 0
+    skipped: int = 0
+    failures: int = 0
+    last_run_at: Optional[datetime] = None
+    last_duration: Optional[float] = None
+    last_error: Optional[str] = None
+    lease: Optional[LeaderLease] = field(default=None, repr=False)
+
+    def next_delay(self) -> float:
+        return max(self.interval * (1.0 + random.uniform(-self.jitter, self.jitter)), 0.0)
+
+
+class PeriodicScheduler:
+    """
+    Planificateur de tâches périodiques
+
+    Usage:
+        scheduler = PeriodicScheduler(db)
+        scheduler.add("ml_insights", ai_system.refresh_insights, interval=3600, timeout=600)
+        await scheduler.start()   # hook startup
+        ...
+        await scheduler.stop()    # hook shutdown (leases rendus)
+
+    leader_only=False: la tâche tourne sur chaque réplica (caches locaux).
+    """
+
+    def __init__(
+        self,
+        db=None,
+        owner_id: Optional[str] = None,
+        lease_grace_seconds: float = SCHEDULER_LEASE_GRACE_SECONDS
+    ):
+        self.db = db
+        self.owner_id = owner_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self.lease_grace_seconds = lease_grace_seconds
+        self.tasks: Dict[str, ScheduledTask] = {}
+        self._loops: Dict[str, asyncio.Task] = {}
+        self._stopping = asyncio.Event()
+
+    def add(
+        self,
+        name: str,
+        func: TaskFunction,
+        interval: float,
+        jitter: float = 0.1,
+        initial_delay: Optional[float] = None,
+        timeout: Optional[float] = None,
+        leader_only: bool = True
+    ) -> ScheduledTask:
+        """
+        Args:
+            jitter: Variation relative de l'intervalle (0.1 = ±10%), évite
+                que les réplicas tentent tous le lease au même instant
+            initial_delay: Premier délai (défaut: aléatoire dans [0, jitter * interval])
+            timeout: Durée maximale d'une exécution
+        """
+        task = ScheduledTask(
+            name=name, func=func, interval=interval, jitter=jitter,
+            initial_delay=initial_delay, timeout=timeout, leader_only=leader_only
+        )
+        if leader_only and self.db is not None:
+            # Le leader renouvelle à chaque tick: le lease couvre un intervalle complet
+            ttl = interval * (1.0 + jitter) + (timeout or 0.0) + self.lease_grace_seconds
+            task.lease = LeaderLease(self.db, f"scheduler:{name}", ttl, self.owner_id)
+        self.tasks[name] = task
+        return task
+
+    async def start(self):
+        self._stopping.clear()
+        for name, task in self.tasks.items():
+            if name not in self._loops or self._loops[name].done():
+                self._loops[name] = asyncio.ensure_future(self._loop(task))
+        logger.info(f"⏱️ Scheduler {self.owner_id} démarré ({len(self.tasks)} tâches)")
+
+    async def stop(self, timeout: float = 10.0):
+        """Arrête les boucles (exécutions en cours annulées) et rend les leases"""
+        self._stopping.set()
+        loops = list(self._loops.values())
+        self._loops = {}
+        for loop_task in loops:
+            loop_task.cancel()
+        if loops:
+            await asyncio.wait(loops, timeout=timeout)
+        for task in self.tasks.values():
+            if task.lease is not None:
+                try:
+                    await task.lease.release()
+                except Exception as e:
+                    logger.warning(f"Lease {task.name} non rendu: {e}")
+        logger.info(f"⏱️ Scheduler {self.owner_id} arrêté")
+
+    async def run_now(self, name: str) -> bool:
+        """Exécute une tâche immédiatement (si ce processus obtient le lease)"""
+        return await self._tick(self.tasks[name])
+
+    async def _loop(self, task: ScheduledTask):
+        delay = task.initial_delay
+        if delay is None:
+            delay = random.uniform(0, task.interval * task.jitter)
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=delay)
+                return
+            except asyncio.TimeoutError:
+                pass
+            await self._tick(task)
+            delay = task.next_delay()
+
+    async def _tick(self, task: ScheduledTask) -> bool:
+        """Une exécution si ce processus est leader; False si ignorée"""
+        if task.lease is not None:
+            try:
+                leader = await task.lease.acquire()
+            except Exception as e:
+                logger.error(f"❌ Lease {task.name} indisponible: {e}")
+                leader = False
+            if not leader:
+                task.skipped += 1
+                return False
+
+        started = time.perf_counter()
+        task.last_run_at = datetime.utcnow()
+        heartbeat = asyncio.ensure_future(self._heartbeat(task)) if task.lease is not None else None
+        try:
+            if task.timeout:
+                await asyncio.wait_for(task.func(), timeout=task.timeout)
+            else:
+                await task.func()
+            task.last_error = None
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            task.failures += 1
+            task.last_error = f"{type(e).__name__}: {e}"
+            logger.error(f"❌ Tâche planifiée {task.name}: {task.last_error}")
+        finally:
+            if heartbeat is not None:
+                heartbeat.cancel()
+            task.runs += 1
+            task.last_duration = time.perf_counter() - started
+        return True
+
+    async def _heartbeat(self, task: ScheduledTask):
+        """Prolonge le lease pendant une exécution longue"""
+        interval = max(task.lease.ttl_seconds / 3, 1.0)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await task.lease.acquire()
+            except Exception as e:
+                logger.warning(f"Renouvellement du lease {task.name}: {e}")
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        """État des tâches sur ce processus (endpoint de supervision)"""
+        return {
+            name: {
+                "interval": task.interval,
+                "leader_only": task.leader_only,
+                "runs": task.runs,
+                "skipped": task.skipped,
+                "failures": task.failures,
+                "last_run_at": task.last_run_at,
+                "last_duration": task.last_duration,
+                "last_error": task.last_error,
+            }
+            for name, task in self.tasks.items()
+        }
+
+
+__all__ = [
+    'PeriodicScheduler',
+    'ScheduledTask',
+    'LeaderLease',
+]
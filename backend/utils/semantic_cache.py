@@ -0,0 +1,265 @@
+"""
+Semantic near-duplicate cache for AI generation requests
+MinHash signatures + LSH banding over normalized description shingles
+"""
+
+import hashlib
+import html
+import os
+import re
+import struct
+import unicodedata
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Set
+
+# MinHash / LSH parameters: 16 bands x 4 rows
+# P(candidate) ~ 0.99 for a Jaccard similarity of 0.75, ~0.05 for 0.3
+NUM_PERMUTATIONS = 64
+BAND_SIZE = 4
+MAX_CANDIDATES = 50
+
+# Mersenne prime used by the universal hash family
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+DEFAULT_SIMILARITY_THRESHOLD = float(os.environ.get("SEMANTIC_CACHE_THRESHOLD", "0.7"))
+SEMANTIC_CACHE_ENABLED = os.environ.get("SEMANTIC_CACHE_ENABLED", "true").lower() == "true"
+
+# Mots vides FR/EN ignorés lors de la normalisation
+STOPWORDS = {
+    # English
+    "a", "an", "the", "and", "or", "with", "without", "for", "to", "of", "in", "on",
+    "at", "by", "from", "that", "this", "is", "are", "be", "my", "me", "i", "we",
+    "our", "it", "its", "as", "some", "simple", "please", "create", "build", "make",
+    "generate", "want", "need", "using", "use",
+    # Français
+    "un", "une", "le", "la", "les", "des", "de", "du", "et", "ou", "avec", "sans",
+    "pour", "sur", "dans", "par", "en", "au", "aux", "qui", "que", "je", "nous",
+    "mon", "ma", "mes", "est", "sont", "cree", "creer", "genere", "generer", "veux",
+    "faire", "fais", "moi",
+}
+
+# Variantes courantes ramenées à une forme canonique
+SYNONYMS = {
+    "application": "app",
+    "applications": "app",
+    "webapp": "app",
+    "website": "site",
+    "todolist": "todo",
+    "todos": "todo",
+    "tache": "todo",
+    "taches": "todo",
+    "darkmode": "dark",
+    "sombre": "dark",
+    "ecommerce": "shop",
+    "boutique": "shop",
+    "store": "shop",
+    "tableau": "dashboard",
+}
+
+
+@dataclass
+class SemanticMatch:
+    """Résultat d'une recherche dans le cache sémantique"""
+    document: Dict[str, Any]
+    score: float
+
+
+def _hash_token(token: str) -> int:
+    """Hash 32 bits stable d'un shingle (indépendant de PYTHONHASHSEED)"""
+    digest = hashlib.blake2b(token.encode("utf-8"), digest_size=4).digest()
+    return struct.unpack("<I", digest)[0]
+
+
+def _build_permutations(count: int):
+    """Coefficients (a, b) déterministes pour la famille h(x) = (a*x + b) mod p"""
+    permutations = []
+    for i in range(count):
+        seed = hashlib.sha256(f"vectort-minhash-{i}".encode()).digest()
+        a = int.from_bytes(seed[:8], "little") % (_MERSENNE_PRIME - 1) + 1
+        b = int.from_bytes(seed[8:16], "little") % _MERSENNE_PRIME
+        permutations.append((a, b))
+    return permutations
+
+
+_PERMUTATIONS = _build_permutations(NUM_PERMUTATIONS)
+
+
+def normalize_description(description: str) -> List[str]:
+    """
+    Normalise une description en liste de tokens canoniques
+
+    - décode les entités HTML (les descriptions sont échappées à la validation)
+    - supprime les accents et passe en minuscules
+    - découpe sur tout caractère non alphanumérique ("dark-mode" -> dark, mode)
+    - retire les mots vides, applique les synonymes et un pluriel naïf
+    """
+    text = html.unescape(description or "")
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(c for c in text if not unicodedata.combining(c)).lower()
+
+    tokens = []
+    for raw in re.split(r"[^a-z0-9]+", text):
+        if not raw or raw in STOPWORDS:
+            continue
+        token = SYNONYMS.get(raw, raw)
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = SYNONYMS.get(token[:-1], token[:-1])
+        if token not in STOPWORDS:
+            tokens.append(token)
+    return tokens
+
+
+def build_shingles(tokens: List[str]) -> Set[str]:
+    """Unigrammes + bigrammes adjacents (l'ordre compte un peu, pas trop)"""
+    shingles = set(tokens)
+    for left, right in zip(tokens, tokens[1:]):
+        shingles.add(f"{left} {right}")
+    return shingles
+
+
+def minhash_signature(shingles: Set[str]) -> List[int]:
+    """Signature MinHash de NUM_PERMUTATIONS valeurs"""
+    if not shingles:
+        return [_MAX_HASH] * NUM_PERMUTATIONS
+
+    hashed = [_hash_token(s) for s in shingles]
+    signature = []
+    for a, b in _PERMUTATIONS:
+        signature.append(min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashed))
+    return signature
+
+
+def lsh_bands(signature: List[int]) -> List[str]:
+    """Clés de bandes LSH - deux signatures partageant une bande sont candidates"""
+    bands = []
+    for index in range(0, len(signature), BAND_SIZE):
+        chunk = signature[index:index + BAND_SIZE]
+        digest = hashlib.md5(",".join(str(v) for v in chunk).encode()).hexdigest()[:16]
+        bands.append(f"{index // BAND_SIZE}:{digest}")
+    return bands
+
+
+def estimate_similarity(signature_a: List[int], signature_b: List[int]) -> float:
+    """Estimation de la similarité de Jaccard à partir de deux signatures"""
+    if not signature_a or not signature_b or len(signature_a) != len(signature_b):
+        return 0.0
+    matches = sum(1 for x, y in zip(signature_a, signature_b) if x == y)
+    return matches / len(signature_a)
+
+
+def semantic_scope(framework: str, project_type: str, advanced_mode: bool) -> str:
+    """Seules les générations de même framework/type/mode sont interchangeables"""
+    framework = (framework or "react").lower()
+    return f"{framework}:{(project_type or 'web_app').lower()}:{'advanced' if advanced_mode else 'quick'}"
+
+
+def build_semantic_fields(
+    description: str,
+    framework: str,
+    project_type: str,
+    advanced_mode: bool = False
+) -> Dict[str, Any]:
+    """
+    Champs à stocker sur un document generated_apps pour le rendre
+    retrouvable par paraphrase
+    """
+    tokens = normalize_description(description)
+    if not tokens:
+        return {}
+
+    signature = minhash_signature(build_shingles(tokens))
+    return {
+        "semantic_scope": semantic_scope(framework, project_type, advanced_mode),
+        "semantic_signature": signature,
+        "semantic_bands": lsh_bands(signature),
+    }
+
+
+async def find_semantic_match(
+    db,
+    description: str,
+    framework: str,
+    project_type: str,
+    advanced_mode: bool = False,
+    threshold: Optional[float] = None
+) -> Optional[SemanticMatch]:
+    """
+    Cherche une génération existante dont la description est une paraphrase
+
+    Args:
+        db: Base Motor
+        description: Description (déjà nettoyée par sanitize_prompt)
+        framework: Framework demandé
+        project_type: Type de projet
+        advanced_mode: Mode avancé
+        threshold: Similarité minimale (SEMANTIC_CACHE_THRESHOLD par défaut)
+
+    Returns:
+        SemanticMatch avec le document complet et son score, ou None
+    """
+    if not SEMANTIC_CACHE_ENABLED:
+        return None
+
+    threshold = DEFAULT_SIMILARITY_THRESHOLD if threshold is None else threshold
+    fields = build_semantic_fields(description, framework, project_type, advanced_mode)
+    if not fields:
+        return None
+
+    # Seuls les candidats LSH sont chargés, et sans leur code
+    candidates = await db.generated_apps.find(
+        {
+            "semantic_scope": fields["semantic_scope"],
+            "semantic_bands": {"$in": fields["semantic_bands"]},
+        },
+        {"_id": 1, "semantic_signature": 1},
+    ).limit(MAX_CANDIDATES).to_list(MAX_CANDIDATES)
+
+    best_id = None
+    best_score = 0.0
+    for candidate in candidates:
+        score = estimate_similarity(fields["semantic_signature"], candidate.get("semantic_signature", []))
+        if score > best_score:
+            best_id, best_score = candidate["_id"], score
+
+    if best_id is None or best_score < threshold:
+        return None
+
+    document = await db.generated_apps.find_one({"_id": best_id})
+    if not document:
+        return None
+
+    return SemanticMatch(document=document, score=round(best_score, 4))
+
+
+
+async def invalidate_semantic_scope(db, framework: str) -> int:
+    """
+    Retire les champs de recherche par paraphrase des générations d'un
+    framework (tous types et modes): elles ne sont plus servies comme
+    correspondances, les projets gardent leur code
+
+    Returns:
+        Nombre de documents generated_apps modifiés
+    """
+    framework = (framework or "react").lower()
+    result = await db.generated_apps.update_many(
+        {"semantic_scope": {"$regex": f"^{re.escape(framework)}:"}},
+        {"$unset": {"semantic_scope": "", "semantic_signature": "", "semantic_bands": ""}}
+    )
+    return result.modified_count
+
+
+__all__ = [
+    'SemanticMatch',
+    'normalize_description',
+    'build_shingles',
+    'minhash_signature',
+    'lsh_bands',
+    'estimate_similarity',
+    'semantic_scope',
+    'build_semantic_fields',
+    'find_semantic_match',
+    'invalidate_semantic_scope',
+    'DEFAULT_SIMILARITY_THRESHOLD',
+]
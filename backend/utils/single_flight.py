@@ -0,0 +1,110 @@
+"""
+Single-flight request coalescing
+Concurrent identical generations share one in-flight LLM run
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+from utils.llm_governor import LLMRequestContext, get_llm_context, use_llm_context
+
+logger = logging.getLogger(__name__)
+
+
+class _Flight:
+    """Une exécution partagée et les contextes LLM des appelants qui l'attendent"""
+
+    __slots__ = ("task", "waiters", "members")
+
+    def __init__(self, members: List[LLMRequestContext]):
+        self.task: asyncio.Task = None
+        self.waiters = 0
+        self.members = members
+
+
+class SingleFlight:
+    """
+    Registre des exécutions en cours, indexé par clé (generate_cache_key)
+
+    - le premier appelant lance le travail dans une tâche indépendante
+    - les suivants attendent la même tâche au lieu d'en lancer une nouvelle
+    - si tous les appelants sont annulés, la tâche partagée est annulée
+    - l'entrée est retirée du registre dès que la tâche se termine,
+      qu'elle réussisse, échoue ou soit annulée
+    - factory() tourne dans un contexte LLM partagé dont les members sont les
+      contextes des appelants encore en attente: chaque appelant reçoit les
+      événements sur le stream de son projet et occupe les slots LLM
+      (llm_governor), pas seulement le premier
+    """
+
+    def __init__(self):
+        self._flights: Dict[str, _Flight] = {}
+
+    def in_flight(self, key: str) -> bool:
+        """Indique si une exécution est en cours pour cette clé"""
+        return key in self._flights
+
+    def __len__(self) -> int:
+        return len(self._flights)
+
+    async def do(self, key: str, factory: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        Exécute factory() une seule fois par clé pour tous les appelants concurrents
+
+        Returns:
+            (résultat, coalesced) - coalesced=True si le résultat vient
+            d'une exécution lancée par un autre appelant
+
+        Raises:
+            L'exception levée par factory(), propagée à chaque appelant
+        """
+        flight = self._flights.get(key)
+        coalesced = flight is not None
+        caller = get_llm_context()
+
+        if flight is None:
+            flight = _Flight([caller])
+            flight.task = asyncio.ensure_future(self._run(factory, caller, flight.members))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _t, k=key, f=flight: self._forget(k, f))
+        else:
+            flight.members.append(caller)
+            logger.info(f"🔗 Génération déjà en cours, requête rattachée: {key[:12]}")
+
+        flight.waiters += 1
+        try:
+            # shield: l'annulation d'un appelant ne doit pas tuer la tâche des autres
+            return await asyncio.shield(flight.task), coalesced
+        except asyncio.CancelledError:
+            if flight.waiters == 1 and not flight.task.done():
+                logger.info(f"🛑 Plus aucun appelant, génération partagée annulée: {key[:12]}")
+                flight.task.cancel()
+            raise
+        finally:
+            flight.waiters -= 1
+            # Appelant parti (annulé ou servi): plus d'événements ni de slots
+            flight.members[:] = [member for member in flight.members if member is not caller]
+
+    @staticmethod
+    async def _run(factory: Callable[[], Awaitable[Any]], first: LLMRequestContext, members: List[LLMRequestContext]):
+        # La tâche a sa propre copie des contextvars: le contexte partagé ne
+        # remonte pas chez l'appelant
+        use_llm_context(LLMRequestContext(
+            user_id=first.user_id,
+            plan=first.plan,
+            project_id=first.project_id,
+            members=members
+        ))
+        return await factory()
+
+    def _forget(self, key: str, flight: _Flight):
+        # Ne retirer que notre propre entrée (une nouvelle a pu la remplacer)
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        # Marquer l'exception comme consommée même si plus personne n'attend
+        if not flight.task.cancelled():
+            flight.task.exception()
+
+
+__all__ = ['SingleFlight']
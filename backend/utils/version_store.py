@@ -0,0 +1,190 @@
+"""
+Append-only project version store
+Each version records the file hashes it changed against its parent (like a
+git tree delta); a full tree checkpoint is stored every few versions so any
+version is rebuilt from a bounded number of documents. Rolling back is a
+manifest write on generated_apps - file contents are never copied.
+"""
+
+import logging
+import os
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from pymongo import DESCENDING
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+# Un arbre complet tous les N versions: reconstruction en <= N lectures
+VERSION_CHECKPOINT_INTERVAL = int(os.environ.get("VERSION_CHECKPOINT_INTERVAL", "20"))
+
+Tree = Dict[str, Dict[str, Any]]  # chemin -> {"hash", "size"}
+
+
+def _entries(tree: Dict[str, Optional[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    # Liste plutôt que sous-document: les chemins contiennent des points
+    return [
+        {"path": path, "hash": entry["hash"] if entry else None, "size": entry.get("size") if entry else None}
+        for path, entry in sorted(tree.items())
+    ]
+
+
+def _tree(entries: List[Dict[str, Any]]) -> Dict[str, Optional[Dict[str, Any]]]:
+    return {
+        entry["path"]: ({"hash": entry["hash"], "size": entry.get("size")} if entry["hash"] else None)
+        for entry in entries
+    }
+
+
+def diff_trees(old: Tree, new: Tree) -> Dict[str, Optional[Dict[str, Any]]]:
+    """Delta old -> new (None = fichier supprimé)"""
+    delta: Dict[str, Optional[Dict[str, Any]]] = {}
+    for path, entry in new.items():
+        if path not in old or old[path]["hash"] != entry["hash"]:
+            delta[path] = entry
+    for path in old:
+        if path not in new:
+            delta[path] = None
+    return delta
+
+
+class VersionStore:
+    """
+    Historique des versions d'un projet (collection project_versions)
+
+    Document: {project_id, version, parent, source, message, created_at,
+               changes: [{path, hash, size}]  (hash None = suppression),
+               tree: [...] sur les checkpoints}
+    """
+
+    def __init__(self, db, checkpoint_interval: int = VERSION_CHECKPOINT_INTERVAL):
+        self.db = db
+        self.checkpoint_interval = checkpoint_interval
+
+    @property
+    def versions(self):
+        return self.db.project_versions
+
+    async def ensure_indexes(self):
+        await self.versions.create_index([("project_id", 1), ("version", -1)], unique=True)
+
+    async def latest(self, project_id: str) -> Optional[Dict[str, Any]]:
+        return await self.versions.find_one(
+            {"project_id": project_id},
+            {"_id": 0, "tree": 0, "changes": 0},
+            sort=[("version", DESCENDING)]
+        )
+
+    async def record(
+        self,
+        project_id: str,
+        changes: Dict[str, Optional[Dict[str, Any]]],
+        source: str,
+        message: str = "",
+        tree: Optional[Tree] = None,
+        attempts: int = 5
+    ) -> int:
+        """
+        Ajoute une version
+
+        Args:
+            changes: Delta par rapport à la version précédente
+            tree: Arbre complet (génération, checkpoint explicite)
+
+        Returns:
+            Le numéro de la nouvelle version
+        """
+        for _ in range(attempts):
+            latest = await self.latest(project_id)
+            version = (latest["version"] + 1) if latest else 1
+
+            document = {
+                "project_id": project_id,
+                "version": version,
+                "parent": latest["version"] if latest else None,
+                "source": source,
+                "message": message[:500],
+                "created_at": datetime.utcnow(),
+                "changes": _entries(changes),
+                "files_changed": len(changes),
+            }
+            checkpoint = tree
+            if checkpoint is None and version % self.checkpoint_interval == 0:
+                merged = {**(await self.tree_at(project_id, version - 1) or {}), **changes}
+                checkpoint = {path: entry for path, entry in merged.items() if entry is not None}
+            if checkpoint is None and version == 1:
+                checkpoint = {path: entry for path, entry in changes.items() if entry is not None}
+            if checkpoint is not None:
+                document["tree"] = _entries(checkpoint)
+
+            try:
+                await self.versions.insert_one(document)
+                return version
+            except DuplicateKeyError:
+                continue  # Version prise par une écriture concurrente (fichiers disjoints)
+
+        raise RuntimeError(f"Impossible d'enregistrer une version pour {project_id}")
+
+    async def ensure_base(self, project_id: str, tree: Tree, source: str = "import") -> int:
+        """Version initiale pour un projet sans historique (généré avant le versioning)"""
+        latest = await self.latest(project_id)
+        if latest:
+            return latest["version"]
+        try:
+            return await self.record(project_id, tree, source, "État initial", tree=tree, attempts=1)
+        except RuntimeError:
+            return (await self.latest(project_id))["version"]
+
+    async def list_versions(self, project_id: str, limit: int = 50, before: Optional[int] = None) -> List[Dict[str, Any]]:
+        query: Dict[str, Any] = {"project_id": project_id}
+        if before is not None:
+            query["version"] = {"$lt": before}
+        return await self.versions.find(
+            query, {"_id": 0, "tree": 0, "changes": 0}
+        ).sort("version", DESCENDING).limit(limit).to_list(limit)
+
+    async def get(self, project_id: str, version: int) -> Optional[Dict[str, Any]]:
+        return await self.versions.find_one({"project_id": project_id, "version": version}, {"_id": 0})
+
+    async def tree_at(self, project_id: str, version: int) -> Optional[Tree]:
+        """
+        Arbre complet d'une version: dernier checkpoint <= version, puis les
+        deltas suivants (au plus checkpoint_interval documents)
+
+        Returns:
+            L'arbre (vide si tous les fichiers ont été supprimés), ou None si
+            la version n'existe pas
+        """
+        if not await self.versions.find_one({"project_id": project_id, "version": version}, {"_id": 1}):
+            return None
+
+        checkpoint = await self.versions.find_one(
+            {"project_id": project_id, "version": {"$lte": version}, "tree": {"$exists": True}},
+            {"_id": 0, "version": 1, "tree": 1},
+            sort=[("version", DESCENDING)]
+        )
+        if checkpoint is None:
+            return {}
+
+        tree: Dict[str, Optional[Dict[str, Any]]] = _tree(checkpoint["tree"])
+        cursor = self.versions.find(
+            {"project_id": project_id, "version": {"$gt": checkpoint["version"], "$lte": version}},
+            {"_id": 0, "changes": 1}
+        ).sort("version", 1)
+        async for delta in cursor:
+            tree.update(_tree(delta["changes"]))
+        return {path: entry for path, entry in tree.items() if entry is not None}
+
+    async def diff(self, project_id: str, from_version: int, to_version: int) -> Dict[str, Optional[Dict[str, Any]]]:
+        """Delta entre deux versions quelconques"""
+        old = await self.tree_at(project_id, from_version)
+        new = await self.tree_at(project_id, to_version)
+        return diff_trees(old or {}, new or {})
+
+
+__all__ = [
+    'VersionStore',
+    'diff_trees',
+    'VERSION_CHECKPOINT_INTERVAL',
+]
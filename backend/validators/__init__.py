@@ -3,5 +3,6 @@ VECTORT.IO - VALIDATORS MODULE
 """
 
 from validators.code_validator import CodeValidator, ValidationResult
+from validators.engine import ValidationEngine, validation_engine
 
-__all__ = ['CodeValidator', 'ValidationResult']
+__all__ = ['CodeValidator', 'ValidationResult', 'ValidationEngine', 'validation_engine']
@@ -3,11 +3,12 @@ VECTORT.IO - CODE VALIDATOR
 Système de validation et tests automatiques du code généré
 """
 
-import re
-import json
+import ast
 from typing import Dict, List, Tuple
 from dataclasses import dataclass
 
+from validators.syntax import check_css, check_html, check_javascript, check_json, check_python
+
 
 @dataclass
 class ValidationResult:
@@ -35,20 +36,20 @@ class CodeValidator:
         }
     
     def validate_project(self, all_files: Dict[str, str]) -> Dict[str, ValidationResult]:
-        """Valide tous les fichiers d'un projet"""
-        
-        results = {}
-        
-        for file_path, content in all_files.items():
-            # Déterminer le type de fichier
-            extension = self._get_extension(file_path)
-            
-            validator = self.validators.get(extension, self._validate_generic)
-            result = validator(file_path, content)
-            
-            results[file_path] = result
-        
-        return results
+        """
+        Valide tous les fichiers d'un projet (séquentiel; voir
+        validators.engine pour la version parallèle et incrémentale)
+        """
+        return {
+            file_path: self.validate_file(file_path, content)
+            for file_path, content in all_files.items()
+        }
+    
+    def validate_file(self, file_path: str, content: str) -> ValidationResult:
+        """Valide un fichier selon son extension"""
+        extension = self._get_extension(file_path)
+        validator = self.validators.get(extension, self._validate_generic)
+        return validator(file_path, content or "")
     
     def get_project_score(self, results: Dict[str, ValidationResult]) -> float:
         """Calcule le score global du projet"""
@@ -84,15 +85,8 @@ class CodeValidator:
         if 'export default' not in content:
             errors.append("Pas d'export default")
         
-        # Syntaxe JSX de base
-        if '<' in content and '>' in content:
-            # Vérifier les balises fermées
-            open_tags = len(re.findall(r'<\w+[^/>]*>', content))
-            self_closing = len(re.findall(r'<\w+[^>]*/>', content))
-            close_tags = len(re.findall(r'</\w+>', content))
-            
-            if open_tags - self_closing != close_tags:
-                warnings.append("Possible déséquilibre de balises JSX")
+        # Syntaxe: délimiteurs, chaînes, balises JSX appariées
+        errors.extend(str(issue) for issue in check_javascript(content, jsx=True))
         
         # PropTypes ou TypeScript
         if 'PropTypes' not in content and '.tsx' not in file_path:
@@ -130,12 +124,9 @@ class CodeValidator:
             errors.append("Fichier vide")
             return ValidationResult(file_path, False, errors, warnings, 0.0)
         
-        # Syntaxe de base
-        if content.count('{') != content.count('}'):
-            errors.append("Déséquilibre d'accolades")
-        
-        if content.count('(') != content.count(')'):
-            errors.append("Déséquilibre de parenthèses")
+        # Syntaxe: délimiteurs, chaînes, templates, regex (JSX toléré dans les .js)
+        jsx = not file_path.endswith(('.ts', '.mjs', '.cjs'))
+        errors.extend(str(issue) for issue in check_javascript(content, jsx=jsx))
         
         # Exports
         if 'export' not in content and file_path.endswith('.js'):
@@ -187,27 +178,35 @@ class CodeValidator:
             errors.append("Fichier vide")
             return ValidationResult(file_path, False, errors, warnings, 0.0)
         
-        # Indentation (vérification basique)
-        lines = content.split('\n')
-        for i, line in enumerate(lines, 1):
-            if line.strip() and not line.startswith((' ', '\t', '#')):
-                # Ligne de code non indentée (peut être OK pour top-level)
-                pass
+        tree, issues = check_python(content)
+        if tree is None:
+            errors.extend(str(issue) for issue in issues)
+            return ValidationResult(file_path, False, errors, warnings, 0.0)
+        
+        nodes = list(ast.walk(tree))
         
         # Imports
-        if 'import' not in content:
+        if not any(isinstance(node, (ast.Import, ast.ImportFrom)) for node in nodes):
             warnings.append("Pas d'imports (inhabituel)")
         
         # Fonctions ou classes
-        if 'def ' not in content and 'class ' not in content:
+        definitions = [
+            node for node in nodes
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef))
+        ]
+        if not definitions:
             warnings.append("Pas de fonctions ou classes définies")
         
         # Print statements (debug)
-        if 'print(' in content and file_path != 'main.py':
+        has_print = any(
+            isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == 'print'
+            for node in nodes
+        )
+        if has_print and file_path != 'main.py':
             warnings.append("Print statements détectés (debug?)")
         
         # Docstrings
-        if '"""' not in content and "'''" not in content:
+        if ast.get_docstring(tree) is None and not any(ast.get_docstring(node) for node in definitions):
             warnings.append("Pas de docstrings")
         
         score = 100.0
@@ -228,10 +227,7 @@ class CodeValidator:
             return ValidationResult(file_path, False, errors, warnings, 0.0)
         
         # Tenter de parser le JSON
-        try:
-            json.loads(content)
-        except json.JSONDecodeError as e:
-            errors.append(f"JSON invalide: {str(e)}")
+        errors.extend(str(issue) for issue in check_json(content))
         
         score = 100.0 if len(errors) == 0 else 0.0
         
@@ -247,28 +243,33 @@ class CodeValidator:
             errors.append("Fichier HTML vide")
             return ValidationResult(file_path, False, errors, warnings, 0.0)
         
+        issues, tags, has_doctype = check_html(content)
+        
         # DOCTYPE
-        if '<!DOCTYPE' not in content and '<!doctype' not in content:
+        if not has_doctype:
             warnings.append("Pas de DOCTYPE déclaré")
         
         # Balises essentielles
-        if '<html' not in content.lower():
+        if 'html' not in tags:
             errors.append("Pas de balise <html>")
         
-        if '<head' not in content.lower():
+        if 'head' not in tags:
             warnings.append("Pas de balise <head>")
         
-        if '<body' not in content.lower():
+        if 'body' not in tags:
             warnings.append("Pas de balise <body>")
         
         # Meta tags
-        if '<meta' not in content.lower():
+        if 'meta' not in tags:
             warnings.append("Pas de meta tags")
         
         # Title
-        if '<title' not in content.lower():
+        if 'title' not in tags:
             warnings.append("Pas de <title>")
         
+        # Balises non fermées ou mal imbriquées (tolérées par les navigateurs)
+        warnings.extend(str(issue) for issue in issues)
+        
         score = 100.0
         score -= len(errors) * 20
         score -= len(warnings) * 5
@@ -286,17 +287,10 @@ class CodeValidator:
             warnings.append("Fichier CSS vide")
             return ValidationResult(file_path, True, errors, warnings, 80.0)
         
-        # Vérifier les accolades
-        if content.count('{') != content.count('}'):
-            errors.append("Déséquilibre d'accolades CSS")
-        
-        # Vérifier les point-virgules
-        lines = content.split('\n')
-        for line in lines:
-            if ':' in line and '{' not in line and '}' not in line:
-                if not line.strip().endswith((';', '{')):
-                    warnings.append("Possible point-virgule manquant")
-                    break
+        # Accolades, chaînes, commentaires; point-virgules entre déclarations
+        css_errors, css_warnings = check_css(content)
+        errors.extend(str(issue) for issue in css_errors)
+        warnings.extend(str(issue) for issue in css_warnings)
         
         score = 100.0
         score -= len(errors) * 20
@@ -0,0 +1,174 @@
+"""
+VECTORT.IO - VALIDATION ENGINE
+Validation parallèle et incrémentale des projets: les fichiers déjà validés
+(même chemin, même contenu) sont resservis depuis un cache par hash, les
+autres sont répartis sur un pool de processus sans bloquer la boucle asyncio
+"""
+
+import asyncio
+import hashlib
+import logging
+import multiprocessing
+import os
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from validators.code_validator import CodeValidator, ValidationResult
+
+logger = logging.getLogger(__name__)
+
+VALIDATION_WORKERS = int(os.environ.get("VALIDATION_WORKERS", str(min(4, os.cpu_count() or 1))))
+# En dessous, un thread suffit: l'aller-retour vers le pool coûterait plus
+VALIDATION_INLINE_MAX_BYTES = int(os.environ.get("VALIDATION_INLINE_MAX_KB", "64")) * 1024
+VALIDATION_CACHE_MAX_ENTRIES = int(os.environ.get("VALIDATION_CACHE_MAX_ENTRIES", "20000"))
+
+# À incrémenter quand les règles changent: invalide les résultats mémorisés
+VALIDATION_RULES_VERSION = 1
+
+_validator = CodeValidator()
+
+
+def _validate_batch(files: List[Tuple[str, str]]) -> List[ValidationResult]:
+    """Exécuté dans un processus du pool (ou un thread pour les petits lots)"""
+    return [_validator.validate_file(path, content) for path, content in files]
+
+
+def _noop() -> int:
+    return os.getpid()
+
+
+def _split_by_size(files: List[Tuple[str, str]], parts: int) -> List[List[Tuple[str, str]]]:
+    """Lots de tailles proches (plus gros fichiers d'abord, lot le moins chargé)"""
+    batches: List[List[Tuple[str, str]]] = [[] for _ in range(parts)]
+    loads = [0] * parts
+    for path, content in sorted(files, key=lambda item: len(item[1]), reverse=True):
+        target = loads.index(min(loads))
+        batches[target].append((path, content))
+        loads[target] += len(content)
+    return [batch for batch in batches if batch]
+
+
+class ValidationEngine:
+    """
+    Valide des projets entiers
+
+    Les résultats sont mémorisés par (chemin, sha256 du contenu): après une
+    itération, seuls les fichiers modifiés sont revalidés.
+    """
+
+    def __init__(
+        self,
+        workers: int = VALIDATION_WORKERS,
+        inline_max_bytes: int = VALIDATION_INLINE_MAX_BYTES,
+        cache_max_entries: int = VALIDATION_CACHE_MAX_ENTRIES
+    ):
+        self.workers = workers
+        self.inline_max_bytes = inline_max_bytes
+        self.cache_max_entries = cache_max_entries
+        self._cache: "OrderedDict[Tuple[str, str], ValidationResult]" = OrderedDict()
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn: pas de fork d'un processus qui a des threads (Motor, exécuteurs)
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._pool
+
+    async def warm_up(self):
+        """Démarre les processus du pool (appelé au démarrage de l'application)"""
+        if self.workers <= 1:
+            return
+        loop = asyncio.get_running_loop()
+        try:
+            pool = self._get_pool()
+            await asyncio.gather(*(loop.run_in_executor(pool, _noop) for _ in range(self.workers)))
+        except Exception as e:
+            logger.warning(f"⚠️ Pool de validation non démarré ({e}), démarrage au premier usage")
+            self.shutdown()
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    @staticmethod
+    def _key(path: str, content: str, content_hash: Optional[str] = None) -> Tuple[str, str]:
+        digest = content_hash or hashlib.sha256(content.encode("utf-8")).hexdigest()
+        return path, f"{VALIDATION_RULES_VERSION}:{digest}"
+
+    def _remember(self, key: Tuple[str, str], result: ValidationResult):
+        self._cache[key] = result
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_max_entries:
+            self._cache.popitem(last=False)
+
+    async def validate_project(
+        self,
+        all_files: Dict[str, str],
+        hashes: Optional[Dict[str, str]] = None
+    ) -> Dict[str, ValidationResult]:
+        """
+        Valide tous les fichiers d'un projet
+
+        Args:
+            hashes: Hash SHA-256 déjà connus (manifeste du blob store), évite
+                de rehacher les contenus
+        """
+        hashes = hashes or {}
+        results: Dict[str, ValidationResult] = {}
+        pending: List[Tuple[str, str]] = []
+        keys: Dict[str, Tuple[str, str]] = {}
+
+        for path, content in all_files.items():
+            content = content or ""
+            key = self._key(path, content, hashes.get(path))
+            keys[path] = key
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                results[path] = cached
+            else:
+                pending.append((path, content))
+
+        if pending:
+            for result in await self._run(pending):
+                results[result.file_path] = result
+                self._remember(keys[result.file_path], result)
+
+        # Ordre d'origine des fichiers
+        return {path: results[path] for path in all_files}
+
+    async def _run(self, files: List[Tuple[str, str]]) -> List[ValidationResult]:
+        total_bytes = sum(len(content) for _, content in files)
+        # Un seul worker: le pool n'apporte que le coût de sérialisation
+        if self.workers <= 1 or total_bytes <= self.inline_max_bytes or len(files) == 1:
+            return await asyncio.to_thread(_validate_batch, files)
+
+        loop = asyncio.get_running_loop()
+        try:
+            pool = self._get_pool()
+            batches = _split_by_size(files, self.workers)
+            outputs = await asyncio.gather(*(
+                loop.run_in_executor(pool, _validate_batch, batch) for batch in batches
+            ))
+        except Exception as e:
+            # Pool cassé (processus tué): recréé au prochain appel
+            logger.warning(f"⚠️ Pool de validation indisponible ({e}), validation dans un thread")
+            self.shutdown()
+            return await asyncio.to_thread(_validate_batch, files)
+        return [result for output in outputs for result in output]
+
+
+# Moteur de l'application (cache partagé entre les requêtes)
+validation_engine = ValidationEngine()
+
+
+__all__ = [
+    'ValidationEngine',
+    'validation_engine',
+    'VALIDATION_RULES_VERSION',
+]
@@ -0,0 +1,396 @@
+"""
+VECTORT.IO - SYNTAX CHECKERS
+Analyseurs purs Python pour la validation du code généré: ast pour Python,
+json pour JSON, scanners dédiés pour JS/JSX/TS, CSS et HTML
+"""
+
+import ast
+import json
+import re
+from dataclasses import dataclass
+from html.parser import HTMLParser
+from typing import List, Optional, Tuple
+
+
+@dataclass
+class SyntaxIssue:
+    """Problème localisé dans un fichier"""
+    line: int
+    message: str
+
+    def __str__(self) -> str:
+        return f"Ligne {self.line}: {self.message}"
+
+
+class _Abort(Exception):
+    """Première erreur structurelle: les suivantes en découlent"""
+
+    def __init__(self, issue: SyntaxIssue):
+        self.issue = issue
+
+
+def _line_of(source: str, pos: int) -> int:
+    return source.count("\n", 0, pos) + 1
+
+
+# ============================================
+# PYTHON / JSON
+# ============================================
+
+def check_python(source: str) -> Tuple[Optional[ast.Module], List[SyntaxIssue]]:
+    """Parse un module Python (None et l'erreur si la syntaxe est invalide)"""
+    try:
+        return ast.parse(source), []
+    except SyntaxError as e:
+        return None, [SyntaxIssue(e.lineno or 1, f"Erreur de syntaxe Python: {e.msg}")]
+    except ValueError as e:  # Octets nuls
+        return None, [SyntaxIssue(1, f"Source Python invalide: {e}")]
+
+
+def check_json(source: str) -> List[SyntaxIssue]:
+    try:
+        json.loads(source)
+    except json.JSONDecodeError as e:
+        return [SyntaxIssue(e.lineno, f"JSON invalide: {e.msg} (colonne {e.colno})")]
+    return []
+
+
+# ============================================
+# JAVASCRIPT / JSX / TYPESCRIPT
+# ============================================
+
+_JS_TOKEN = re.compile(r"""
+      (?P<space>\s+)
+    | (?P<comment>//[^\n]*|/\*.*?\*/)
+    | (?P<name>[A-Za-z_$\#][\w$]*)
+    | (?P<number>\.?\d[\w.]*)
+    | (?P<string>'(?:[^'\\\n]|\\.)*'|"(?:[^"\\\n]|\\.)*")
+    | (?P<punct>[^\s\w$\#{}()\[\]'"`/<]+)
+""", re.S | re.X)
+
+_REGEX_LITERAL = re.compile(r"/(?:[^/\\\[\n]|\\.|\[(?:[^\]\\\n]|\\.)*\])+/[a-z]*")
+_TEMPLATE_CHUNK = re.compile(r"(?:[^`\\$]|\\.|\$(?!\{))*", re.S)
+_JSX_NAME = re.compile(r"[A-Za-z_$][\w$.:-]*")
+_JSX_ATTRIBUTE = re.compile(r"[A-Za-z_$][\w$:.-]*")
+_JSX_SPACE = re.compile(r"(?:\s+|/\*.*?\*/|//[^\n]*)*", re.S)
+_JSX_TEXT = re.compile(r"[^<{]*")
+_JSX_CLOSING = re.compile(r"</\s*([A-Za-z_$][\w$.:-]*)?\s*>")
+_JSX_STRING = re.compile(r"\"[^\"]*\"|'[^']*'")
+_TS_GENERIC = re.compile(r"<[A-Za-z_$][\w$]*\s*(?:,|extends\b)")
+
+# Après ces mots-clés, une expression commence (regex ou JSX possibles)
+_EXPRESSION_KEYWORDS = frozenset({
+    "return", "typeof", "instanceof", "in", "of", "new", "delete", "void",
+    "throw", "case", "do", "else", "yield", "await", "default", "export",
+})
+
+_CLOSERS = {"{": "}", "(": ")", "[": "]"}
+
+
+class _JSScanner:
+    """
+    Vérifie la structure d'un fichier JS/TS: chaînes, templates, regex,
+    commentaires, appariement des délimiteurs et, si jsx=True, des balises
+    JSX (noms de balises ouvrantes/fermantes comparés)
+    """
+
+    def __init__(self, source: str, jsx: bool):
+        self.source = source
+        self.jsx = jsx
+
+    def fail(self, pos: int, message: str):
+        raise _Abort(SyntaxIssue(_line_of(self.source, pos), message))
+
+    def check(self) -> List[SyntaxIssue]:
+        try:
+            self.scan_code(0, None, 0)
+        except _Abort as abort:
+            return [abort.issue]
+        except RecursionError:
+            return [SyntaxIssue(1, "Imbrication trop profonde pour être analysée")]
+        return []
+
+    def scan_code(self, pos: int, opener: Optional[str], opener_pos: int) -> int:
+        """Jusqu'au délimiteur fermant `opener` (ou la fin du fichier si None)"""
+        source = self.source
+        length = len(source)
+        closer = _CLOSERS.get(opener)
+        expression_start = True
+
+        while pos < length:
+            char = source[pos]
+
+            if char in "{([":
+                pos = self.scan_code(pos + 1, char, pos)
+                expression_start = char == "{"
+                continue
+            if char in "})]":
+                if char != closer:
+                    if opener is None:
+                        self.fail(pos, f"'{char}' fermant sans ouvrant correspondant")
+                    self.fail(pos, f"'{char}' inattendu: '{opener}' ouvert ligne {_line_of(source, opener_pos)} attend '{closer}'")
+                return pos + 1
+            if char == "`":
+                pos = self.scan_template(pos + 1, pos)
+                expression_start = False
+                continue
+            if char == "/":
+                if source.startswith("/*", pos) and source.find("*/", pos + 2) < 0:
+                    self.fail(pos, "Commentaire /* non terminé")
+                if not source.startswith(("//", "/*"), pos):
+                    if expression_start:
+                        match = _REGEX_LITERAL.match(source, pos)
+                        if match:
+                            pos = match.end()
+                            expression_start = False
+                            continue
+                    pos += 1
+                    expression_start = True
+                    continue
+            if char == "<":
+                if (
+                    self.jsx and expression_start
+                    and (source.startswith("<>", pos) or _JSX_NAME.match(source, pos + 1))
+                    and not _TS_GENERIC.match(source, pos)
+                ):
+                    pos = self.scan_jsx(pos)
+                    expression_start = False
+                    continue
+                pos += 1
+                expression_start = True
+                continue
+            if char in "'\"":
+                match = _JS_TOKEN.match(source, pos)
+                if not match or match.lastgroup != "string":
+                    self.fail(pos, f"Chaîne {char}...{char} non terminée")
+
+            match = _JS_TOKEN.match(source, pos)
+            if not match:
+                pos += 1
+                continue
+            kind = match.lastgroup
+            if kind == "name":
+                expression_start = match.group() in _EXPRESSION_KEYWORDS
+            elif kind in ("number", "string"):
+                expression_start = False
+            elif kind == "punct":
+                token = match.group()
+                # x++ / x-- terminent une expression
+                expression_start = not token.endswith(("++", "--"))
+            pos = match.end()
+
+        if opener is not None:
+            self.fail(opener_pos, f"'{opener}' jamais fermé")
+        return pos
+
+    def scan_template(self, pos: int, start: int) -> int:
+        source = self.source
+        while True:
+            pos = _TEMPLATE_CHUNK.match(source, pos).end()
+            if pos >= len(source):
+                self.fail(start, "Template literal `...` non terminé")
+            if source[pos] == "`":
+                return pos + 1
+            # ${ expression }
+            pos = self.scan_code(pos + 2, "{", pos + 1)
+
+    def skip_space(self, pos: int) -> int:
+        return _JSX_SPACE.match(self.source, pos).end()
+
+    def scan_jsx(self, start: int) -> int:
+        """Élément JSX complet à partir de '<', retourne la position après"""
+        source = self.source
+        length = len(source)
+        pos = start + 1
+
+        if source[pos] == ">":
+            name = ""
+            pos += 1
+        else:
+            name = _JSX_NAME.match(source, pos).group()
+            pos += len(name)
+            while True:
+                pos = self.skip_space(pos)
+                if pos >= length:
+                    self.fail(start, f"Balise <{name}> non terminée")
+                if source.startswith("/>", pos):
+                    return pos + 2
+                char = source[pos]
+                if char == ">":
+                    pos += 1
+                    break
+                if char == "{":
+                    pos = self.scan_code(pos + 1, "{", pos)
+                    continue
+                attribute = _JSX_ATTRIBUTE.match(source, pos)
+                if not attribute:
+                    self.fail(pos, f"Caractère '{char}' inattendu dans la balise <{name}>")
+                pos = self.skip_space(attribute.end())
+                if pos < length and source[pos] == "=":
+                    pos = self.skip_space(pos + 1)
+                    value = _JSX_STRING.match(source, pos)
+                    if value:
+                        pos = value.end()
+                    elif pos < length and source[pos] == "{":
+                        pos = self.scan_code(pos + 1, "{", pos)
+                    elif pos < length and source[pos] == "<":
+                        pos = self.scan_jsx(pos)
+                    else:
+                        self.fail(pos, f"Valeur invalide pour l'attribut {attribute.group()} de <{name}>")
+
+        label = f"<{name}>" if name else "le fragment <>"
+        while True:
+            pos = _JSX_TEXT.match(source, pos).end()
+            if pos >= length:
+                self.fail(start, f"{label} jamais fermé")
+            if source[pos] == "{":
+                pos = self.scan_code(pos + 1, "{", pos)
+                continue
+            if source.startswith("</", pos):
+                closing = _JSX_CLOSING.match(source, pos)
+                if not closing:
+                    self.fail(pos, "Balise fermante malformée")
+                closing_name = closing.group(1) or ""
+                if closing_name != name:
+                    self.fail(pos, f"</{closing_name}> ne ferme pas {label} (ligne {_line_of(source, start)})")
+                return closing.end()
+            if source.startswith("<>", pos) or _JSX_NAME.match(source, pos + 1):
+                pos = self.scan_jsx(pos)
+            else:
+                pos += 1  # '<' littéral (invalide en JSX, toléré)
+
+
+def check_javascript(source: str, jsx: bool = True) -> List[SyntaxIssue]:
+    """Structure d'un fichier JS/JSX/TS/TSX (jsx=False pour .ts)"""
+    return _JSScanner(source, jsx).check()
+
+
+# ============================================
+# CSS
+# ============================================
+
+_CSS_TOKEN = re.compile(r"""
+      (?P<comment>/\*.*?\*/)
+    | (?P<string>"(?:[^"\\\n]|\\.)*"|'(?:[^'\\\n]|\\.)*')
+    | (?P<brace>[{}])
+    | (?P<semicolon>;)
+    | (?P<text>[^{};"'/]+|/)
+""", re.S | re.X)
+_CSS_DECLARATION_START = re.compile(r"^\s*-{0,2}[A-Za-z][\w-]*\s*:(?!:)", re.M)
+
+
+def check_css(source: str) -> Tuple[List[SyntaxIssue], List[SyntaxIssue]]:
+    """
+    (erreurs, avertissements): accolades appariées, chaînes et commentaires
+    terminés; déclarations consécutives sans point-virgule
+    """
+    errors: List[SyntaxIssue] = []
+    warnings: List[SyntaxIssue] = []
+    stack: List[int] = []
+    segment: List[str] = []
+    segment_start = 0
+    pos = 0
+
+    while pos < len(source):
+        if source.startswith("/*", pos) and source.find("*/", pos + 2) < 0:
+            errors.append(SyntaxIssue(_line_of(source, pos), "Commentaire /* non terminé"))
+            break
+        match = _CSS_TOKEN.match(source, pos)
+        if not match:
+            errors.append(SyntaxIssue(_line_of(source, pos), f"Chaîne {source[pos]} non terminée"))
+            break
+        kind = match.lastgroup
+        if kind == "brace" and match.group() == "{":
+            stack.append(pos)
+            segment, segment_start = [], match.end()
+        elif kind in ("brace", "semicolon"):
+            if kind == "brace":
+                if not stack:
+                    errors.append(SyntaxIssue(_line_of(source, pos), "'}' sans '{' correspondante"))
+                    break
+                stack.pop()
+            text = "".join(segment)
+            declarations = list(_CSS_DECLARATION_START.finditer(text))
+            if len(declarations) > 1:
+                line = _line_of(source, segment_start + declarations[1].start()) - 1
+                warnings.append(SyntaxIssue(max(line, 1), "Point-virgule manquant"))
+            segment, segment_start = [], match.end()
+        elif kind in ("text", "string"):
+            segment.append(match.group() if kind == "text" else '""')
+        pos = match.end()
+
+    if stack and not errors:
+        errors.append(SyntaxIssue(_line_of(source, stack[-1]), "'{' jamais fermée"))
+    return errors, warnings
+
+
+# ============================================
+# HTML
+# ============================================
+
+VOID_ELEMENTS = frozenset({
+    "area", "base", "br", "col", "embed", "hr", "img", "input", "link",
+    "meta", "param", "source", "track", "wbr", "!doctype",
+})
+# Fermeture implicite autorisée par la spécification
+OPTIONAL_END_ELEMENTS = frozenset({
+    "html", "head", "body", "li", "p", "dt", "dd", "option", "optgroup",
+    "tr", "td", "th", "thead", "tbody", "tfoot", "colgroup", "rb", "rt", "rp",
+})
+
+
+class _HTMLStructure(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.stack: List[Tuple[str, int]] = []
+        self.seen = set()
+        self.issues: List[SyntaxIssue] = []
+        self.doctype = False
+
+    def handle_decl(self, decl):
+        if decl.lower().startswith("doctype"):
+            self.doctype = True
+
+    def handle_starttag(self, tag, attrs):
+        self.seen.add(tag)
+        if tag not in VOID_ELEMENTS:
+            self.stack.append((tag, self.getpos()[0]))
+
+    def handle_startendtag(self, tag, attrs):
+        self.seen.add(tag)
+
+    def handle_endtag(self, tag):
+        line = self.getpos()[0]
+        if tag in VOID_ELEMENTS:
+            return
+        if not any(open_tag == tag for open_tag, _ in self.stack):
+            self.issues.append(SyntaxIssue(line, f"</{tag}> sans balise ouvrante"))
+            return
+        while self.stack:
+            open_tag, open_line = self.stack.pop()
+            if open_tag == tag:
+                return
+            if open_tag not in OPTIONAL_END_ELEMENTS:
+                self.issues.append(SyntaxIssue(open_line, f"<{open_tag}> non fermée avant </{tag}>"))
+
+
+def check_html(source: str) -> Tuple[List[SyntaxIssue], set, bool]:
+    """(problèmes de structure, balises rencontrées, DOCTYPE présent)"""
+    parser = _HTMLStructure()
+    parser.feed(source)
+    parser.close()
+    issues = list(parser.issues)
+    for tag, line in parser.stack:
+        if tag not in OPTIONAL_END_ELEMENTS:
+            issues.append(SyntaxIssue(line, f"<{tag}> jamais fermée"))
+    return issues, parser.seen, parser.doctype
+
+
+__all__ = [
+    'SyntaxIssue',
+    'check_python',
+    'check_json',
+    'check_javascript',
+    'check_css',
+    'check_html',
+]
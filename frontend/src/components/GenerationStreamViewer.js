@@ -134,6 +134,7 @@ const GenerationStreamViewer = ({ projectId, onComplete }) => {
       'phase': '🔄',
       'success': '✅',
       'file_created': '📄',
+      'file_reset': '🔁',
       'error': '❌',
       'complete': '🎉'
     };
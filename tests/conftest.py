@@ -0,0 +1,16 @@
+"""
+Configuration pytest: les modules du backend s'importent depuis backend/
+(comme dans server.py et generation_worker.py)
+"""
+
+import os
+import sys
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend")
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+# Variables lues à l'import de certains modules (server.py, utils)
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "vectort_test")
+os.environ.setdefault("JWT_SECRET", "test-secret")
@@ -0,0 +1,245 @@
+"""
+Backplanes SSE: reprise via Last-Event-ID, resync, séquences
+"""
+
+import asyncio
+
+import pytest
+
+from streaming.backplane import InProcessBackplane, MongoBackplane, RedisBackplane
+from streaming.streaming_system import GenerationStreamer
+
+TIMEOUT = 3.0
+
+
+def _memory_backplane():
+    return InProcessBackplane()
+
+
+def _redis_backplane():
+    fakeredis = pytest.importorskip("fakeredis")
+    return RedisBackplane(client=fakeredis.FakeAsyncRedis(), block_ms=50)
+
+
+def _mongo_backplane():
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    db = mongomock_motor.AsyncMongoMockClient().vectort_test
+    # mongomock ne gère pas les collections plafonnées: start() n'est pas
+    # appelé, le curseur tailable est émulé par une requête relancée
+    return MongoBackplane(db, poll_interval=0.01)
+
+
+BACKPLANES = {
+    "memory": _memory_backplane,
+    "redis": _redis_backplane,
+    "mongo": _mongo_backplane,
+}
+
+
+async def _take(iterator, count):
+    events = []
+
+    async def consume():
+        async for event in iterator:
+            events.append(event)
+            if len(events) == count:
+                return
+
+    await asyncio.wait_for(consume(), TIMEOUT)
+    return events
+
+
+async def _receive(queue, count):
+    return [await asyncio.wait_for(queue.receive(), TIMEOUT) for _ in range(count)]
+
+
+@pytest.mark.parametrize("kind", sorted(BACKPLANES))
+def test_backplane_replays_after_sequence_then_follows_live(kind):
+    backplane = BACKPLANES[kind]()
+
+    async def run():
+        seqs = [await backplane.publish("project-1", {"type": "info", "content": str(i)}) for i in range(5)]
+        await backplane.publish("project-2", {"type": "info", "content": "autre projet"})
+
+        resumed = await _take(backplane.subscribe("project-1", after_seq=2), 3)
+
+        live = backplane.subscribe("project-1")
+        first = asyncio.ensure_future(_take(live, 1))
+        await asyncio.sleep(0.1)
+        await backplane.publish("project-1", {"type": "complete", "content": "fin"})
+        return seqs, resumed, await first, await backplane.last_sequence("project-1"), await backplane.last_event("project-1")
+
+    seqs, resumed, live, last_seq, last_event = asyncio.run(run())
+
+    assert seqs == [1, 2, 3, 4, 5]
+    assert [event["seq"] for event in resumed] == [3, 4, 5]
+    assert [event["content"] for event in resumed] == ["2", "3", "4"]
+    assert [(event["seq"], event["type"]) for event in live] == [(6, "complete")]
+    assert last_seq == 6
+    assert last_event["type"] == "complete"
+
+
+@pytest.mark.parametrize("kind", sorted(BACKPLANES))
+def test_reconnect_with_last_event_id_resumes_without_duplicates(kind):
+    backplane = BACKPLANES[kind]()
+    streamer = GenerationStreamer(backplane)
+
+    async def run():
+        queue = streamer.create_stream("project-1")
+        await asyncio.sleep(0.05)
+        for i in range(5):
+            await streamer.send_message("project-1", "info", f"étape {i}")
+        received = await _receive(queue, 2)
+        streamer.close_stream("project-1")  # Connexion coupée après seq 2
+
+        resumed_queue = streamer.create_stream("project-1", last_event_id=received[-1].sequence)
+        resumed = await _receive(resumed_queue, 3)
+        await streamer.send_message("project-1", "complete", "fin", progress=100)
+        resumed += await _receive(resumed_queue, 1)
+        streamer.close_stream("project-1")
+        return received, resumed
+
+    received, resumed = asyncio.run(run())
+
+    assert [message.sequence for message in received] == [1, 2]
+    assert [message.sequence for message in resumed] == [3, 4, 5, 6]
+    assert [message.content for message in resumed[:3]] == ["étape 2", "étape 3", "étape 4"]
+    assert resumed[-1].to_sse_format().startswith("id: 6\n")
+
+
+def test_reconnect_on_other_worker_through_shared_backplane():
+    fakeredis = pytest.importorskip("fakeredis")
+    client = fakeredis.FakeAsyncRedis()
+    generating = GenerationStreamer(RedisBackplane(client=client, block_ms=50))
+    serving = GenerationStreamer(RedisBackplane(client=client, block_ms=50))
+
+    async def run():
+        for i in range(4):
+            await generating.send_message("project-1", "info", f"étape {i}", progress=10 * (i + 1))
+        queue = serving.create_stream("project-1", last_event_id=2)
+        messages = await _receive(queue, 2)
+        state = await serving.fetch_generation_state("project-1")
+        serving.close_stream("project-1")
+        return messages, state
+
+    messages, state = asyncio.run(run())
+
+    assert [message.sequence for message in messages] == [3, 4]
+    assert state["progress"] == 40
+
+
+def test_resync_when_events_left_history():
+    streamer = GenerationStreamer(InProcessBackplane(history_size=3))
+
+    async def run():
+        streamer.create_stream("project-1")
+        for i in range(8):
+            await streamer.send_message("project-1", "info", f"étape {i}", progress=i * 10)
+        streamer.close_stream("project-1")
+
+        queue = streamer.create_stream("project-1", last_event_id=2)
+        messages = await _receive(queue, 4)
+        streamer.close_stream("project-1")
+        return messages
+
+    messages = asyncio.run(run())
+
+    resync = messages[0]
+    assert resync.message_type == "resync"
+    assert (resync.metadata["missed_from"], resync.metadata["missed_to"]) == (3, 5)
+    assert resync.metadata["state"]["progress"] == 70
+    assert [message.sequence for message in messages[1:]] == [6, 7, 8]
+
+
+def test_unknown_last_event_id_starts_from_present():
+    streamer = GenerationStreamer(InProcessBackplane())
+
+    async def run():
+        streamer.create_stream("project-1")
+        await streamer.send_message("project-1", "info", "avant")
+        streamer.close_stream("project-1")
+
+        # Id d'une génération précédente (ou d'avant un redémarrage)
+        queue = streamer.create_stream("project-1", last_event_id=99)
+        await asyncio.sleep(0.05)
+        await streamer.send_message("project-1", "info", "après")
+        messages = await _receive(queue, 1)
+        streamer.close_stream("project-1")
+        return messages
+
+    messages = asyncio.run(run())
+
+    assert [(message.message_type, message.sequence) for message in messages] == [("info", 2)]
+
+
+def test_expire_releases_sequences():
+    backplane = InProcessBackplane()
+    streamer = GenerationStreamer(backplane)
+
+    async def run():
+        streamer.create_stream("project-1")
+        await streamer.send_message("project-1", "complete", "fin", progress=100)
+        streamer.close_stream("project-1")
+        streamer._expire("project-1")
+
+    asyncio.run(run())
+
+    assert "project-1" not in backplane._sequences
+    assert "project-1" not in backplane._history
+    assert "project-1" not in backplane._conditions
+    assert "project-1" not in streamer.generation_states
+
+
+class SlowCollection:
+    """Collection dont chaque écriture rend la main (latence réseau simulée)"""
+
+    def __init__(self, collection, delays):
+        self._collection = collection
+        self._delays = delays
+
+    def __getattr__(self, name):
+        return getattr(self._collection, name)
+
+    async def find_one_and_update(self, *args, **kwargs):
+        result = await self._collection.find_one_and_update(*args, **kwargs)
+        await asyncio.sleep(0)
+        return result
+
+    async def insert_one(self, document, *args, **kwargs):
+        # Latence décroissante: sans verrou, seq N+1 serait inséré avant N
+        await asyncio.sleep(self._delays.pop(0))
+        return await self._collection.insert_one(document, *args, **kwargs)
+
+
+class SlowDb:
+    def __init__(self, db, delays):
+        self._db = db
+        self._delays = delays
+
+    def __getattr__(self, name):
+        return getattr(self._db, name)
+
+    def __getitem__(self, name):
+        return SlowCollection(self._db[name], self._delays)
+
+
+def test_mongo_concurrent_publishers_keep_insertion_order():
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    db = mongomock_motor.AsyncMongoMockClient().vectort_test
+    count = 20
+    backplane = MongoBackplane(SlowDb(db, [0.001 * (count - i) for i in range(count)]), poll_interval=0.01)
+
+    async def run():
+        subscriber = asyncio.ensure_future(_take(backplane.subscribe("project-1", after_seq=0), count))
+        await asyncio.gather(*(
+            backplane.publish("project-1", {"type": "file_chunk", "content": str(i)}) for i in range(count)
+        ))
+        received = await subscriber
+        inserted = [document["seq"] async for document in db.stream_events.find({"project_id": "project-1"})]
+        return received, inserted
+
+    received, inserted = asyncio.run(run())
+
+    assert inserted == list(range(1, count + 1))
+    assert [event["seq"] for event in received] == list(range(1, count + 1))
+    assert len(backplane._publish_locks) == 0
@@ -0,0 +1,92 @@
+"""
+Blob store: compression par défaut, tailles en octets et mark-and-sweep
+des blobs orphelins
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from utils.blob_store import BlobStore, content_hash, dehydrate_app, hydrate_app
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+LONG_CONTENT = "export const data = '" + "é" * 2000 + "';\n"
+
+
+def _store():
+    return BlobStore(mongomock_motor.AsyncMongoMockClient().vectort_test)
+
+
+async def _age(store, hashes, hours=48):
+    """Recule used_at/created_at comme si les blobs dataient de `hours`"""
+    past = datetime.utcnow() - timedelta(hours=hours)
+    await store.blobs.update_many({"_id": {"$in": list(hashes)}}, {"$set": {"used_at": past, "created_at": past}})
+
+
+def test_default_compression_round_trips_and_sizes_are_bytes():
+    store = _store()
+
+    async def run():
+        document = await dehydrate_app(store, {"project_id": "p1", "all_files": {"src/data.js": LONG_CONTENT}})
+        blob = await store.blobs.find_one({"_id": content_hash(LONG_CONTENT)})
+        store._l1.clear()
+        return document, blob, await hydrate_app(store, document)
+
+    document, blob, hydrated = asyncio.run(run())
+
+    assert blob["encoding"] == "zlib"
+    assert blob["stored_size"] < blob["size"]
+    assert document["file_manifest"][0]["size"] == len(LONG_CONTENT.encode("utf-8"))
+    assert hydrated["all_files"] == {"src/data.js": LONG_CONTENT}
+
+
+def test_collect_garbage_deletes_only_old_unreferenced_blobs():
+    store = _store()
+    db = store.db
+
+    async def run():
+        project = await dehydrate_app(store, {"project_id": "p1", "all_files": {"a.js": "current"}, "react_code": "app"})
+        await db.generated_apps.insert_one(project)
+        versioned, cached, orphan, recent = await store.put_many(["v1", "cached", "orphan", "recent"])
+        await db.project_versions.insert_one({
+            "project_id": "p1", "version": 1, "changes": [{"path": "a.js", "hash": versioned, "size": 2}],
+        })
+        await db.project_versions.insert_one({
+            "project_id": "p1", "version": 2, "changes": [{"path": "a.js", "hash": None, "size": None}],
+        })
+        await db.generation_cache.insert_one({
+            "cache_key": "k", "payload": {"file_manifest": [{"path": "b.js", "hash": cached}], "code_manifest": None},
+        })
+        everything = [entry["hash"] for entry in project["file_manifest"]]
+        everything += list(project["code_manifest"].values()) + [versioned, cached, orphan]
+        await _age(store, everything)
+
+        deleted = await store.collect_garbage()
+        remaining = {document["_id"] async for document in store.blobs.find({}, {"_id": 1})}
+        return deleted, remaining, set(everything) - {orphan}, orphan, recent
+
+    deleted, remaining, kept, orphan, recent = asyncio.run(run())
+
+    assert deleted == 1
+    assert orphan not in remaining
+    assert remaining == kept | {recent}  # Orphelin récent: manifeste peut-être en cours d'écriture
+
+
+def test_reused_blob_is_protected_from_collection():
+    store = _store()
+
+    async def run():
+        (blob_hash,) = await store.put_many(["rollback target"])
+        await _age(store, [blob_hash])
+        # Un retour arrière réutilise le contenu avant que son manifeste soit écrit
+        await store.put_many(["rollback target"])
+        deleted = await store.collect_garbage()
+        store._l1.clear()
+        return deleted, await store.get_many([blob_hash])
+
+    deleted, contents = asyncio.run(run())
+
+    assert deleted == 0
+    assert list(contents.values()) == ["rollback target"]
@@ -0,0 +1,185 @@
+"""
+Ledger de crédits: déductions concurrentes, ordre de consommation, outbox
+"""
+
+import asyncio
+import math
+
+import pytest
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+from utils.credit_ledger import CreditLedger, OUTBOX_FIELD, build_deduction_pipeline, build_transaction
+
+
+def _db():
+    return mongomock_motor.AsyncMongoMockClient().vectort_test
+
+
+async def _user(db, free=0.0, monthly=0.0, topup=0.0):
+    await db.users.insert_one({
+        "id": "user-1",
+        "credits_free": free,
+        "credits_monthly": monthly,
+        "credits_topup": topup,
+        "credits_total": free + monthly + topup,
+    })
+
+
+def test_concurrent_deductions_never_overdraw():
+    db = _db()
+    ledger = CreditLedger(db)
+    balance, amount, callers = 12.5, 1.0, 50
+
+    async def run():
+        await ledger.ensure_indexes()
+        await _user(db, free=3.0, monthly=4.0, topup=5.5)
+        results = await asyncio.gather(*[
+            ledger.deduct("user-1", amount, f"génération {i}") for i in range(callers)
+        ])
+        await ledger.drain()
+        user = await db.users.find_one({"id": "user-1"})
+        history = await db.credit_transactions.count_documents({"user_id": "user-1"})
+        return results, user, history
+
+    results, user, history = asyncio.run(run())
+    successes = [result for result in results if result is not None]
+
+    assert len(successes) == math.floor(balance / amount)
+    assert all(result["credits_total"] >= 0 for result in successes)
+    assert sorted(result["credits_total"] for result in successes) == [balance - amount * n for n in range(len(successes), 0, -1)]
+    assert user["credits_total"] == pytest.approx(balance - amount * len(successes))
+    assert user["credits_total"] >= 0
+    assert min(user["credits_free"], user["credits_monthly"], user["credits_topup"]) >= 0
+    assert history == len(successes)
+    assert not user.get(OUTBOX_FIELD)
+
+
+@pytest.mark.parametrize("amount, expected", [
+    (2.0, (1.0, 4.0, 5.0)),   # Gratuits seulement
+    (3.0, (0.0, 4.0, 5.0)),   # Gratuits épuisés exactement
+    (5.0, (0.0, 2.0, 5.0)),   # Gratuits puis mensuels
+    (9.0, (0.0, 0.0, 3.0)),   # Gratuits, mensuels puis achetés
+    (12.0, (0.0, 0.0, 0.0)),  # Tout le solde
+])
+def test_deduction_order_free_monthly_topup(amount, expected):
+    db = _db()
+
+    async def run():
+        await _user(db, free=3.0, monthly=4.0, topup=5.0)
+        transaction = build_transaction("user-1", -amount, "usage", "test")
+        await db.users.update_one({"id": "user-1"}, build_deduction_pipeline(amount, transaction))
+        return await db.users.find_one({"id": "user-1"})
+
+    user = asyncio.run(run())
+
+    assert (user["credits_free"], user["credits_monthly"], user["credits_topup"]) == expected
+    assert user["credits_total"] == sum(expected)
+    assert "_debit_free" not in user and "_debit_monthly" not in user
+    assert [entry["amount"] for entry in user[OUTBOX_FIELD]] == [-amount]
+
+
+def test_insufficient_balance_leaves_user_untouched():
+    db = _db()
+    ledger = CreditLedger(db)
+
+    async def run():
+        await _user(db, free=1.0, monthly=1.0)
+        result = await ledger.deduct("user-1", 3.0, "trop cher")
+        return result, await db.users.find_one({"id": "user-1"})
+
+    result, user = asyncio.run(run())
+
+    assert result is None
+    assert user["credits_total"] == 2.0
+    assert not user.get(OUTBOX_FIELD)
+
+
+class FlakyTransactions:
+    """
+    credit_transactions en panne: les `written` premières insertions sont
+    appliquées mais la réponse est perdue, les suivantes échouent
+    """
+
+    def __init__(self, collection, written):
+        self._collection = collection
+        self.written = written
+        self.failing = True
+
+    def __getattr__(self, name):
+        return getattr(self._collection, name)
+
+    async def insert_one(self, document, *args, **kwargs):
+        if not self.failing:
+            return await self._collection.insert_one(document, *args, **kwargs)
+        if self.written > 0:
+            self.written -= 1
+            await self._collection.insert_one(document, *args, **kwargs)
+        raise ConnectionError("mongo indisponible")
+
+
+class FlakyDb:
+    def __init__(self, db, transactions):
+        self._db = db
+        self.credit_transactions = transactions
+
+    def __getattr__(self, name):
+        return getattr(self._db, name)
+
+
+def test_flush_outbox_replays_failed_flush_without_duplicates():
+    db = _db()
+    # La première recopie est écrite sans accusé de réception, les autres échouent
+    transactions = FlakyTransactions(db.credit_transactions, written=1)
+    ledger = CreditLedger(FlakyDb(db, transactions))
+
+    async def run():
+        await ledger.ensure_indexes()
+        await _user(db, topup=10.0)
+        for i in range(3):
+            await ledger.deduct("user-1", 1.0, f"génération {i}")
+        await ledger.drain()
+        stuck = (await db.users.find_one({"id": "user-1"}))[OUTBOX_FIELD]
+        copied_before_replay = await db.credit_transactions.count_documents({})
+
+        transactions.failing = False
+        replayed = await ledger.flush_outbox()
+        replayed_again = await ledger.flush_outbox()
+        ids = [t["id"] async for t in db.credit_transactions.find({"user_id": "user-1"})]
+        user = await db.users.find_one({"id": "user-1"})
+        return stuck, copied_before_replay, replayed, replayed_again, ids, user
+
+    stuck, copied_before_replay, replayed, replayed_again, ids, user = asyncio.run(run())
+
+    assert len(stuck) == 3  # Aucun flush complet: tout reste dans l'outbox
+    assert copied_before_replay == 1  # Dont une transaction déjà recopiée
+    assert replayed == 3
+    assert replayed_again == 0
+    assert sorted(ids) == sorted(t["id"] for t in stuck)  # Une seule copie par transaction
+    assert not user.get(OUTBOX_FIELD)
+    assert user["credits_total"] == 7.0
+
+
+def test_refund_with_transaction_id_is_applied_once():
+    db = _db()
+    ledger = CreditLedger(db)
+
+    async def run():
+        await ledger.ensure_indexes()
+        await _user(db, topup=1.0)
+        # Rejoué avant puis après la recopie de l'outbox
+        first = await ledger.refund("user-1", 5.0, "échec", "p1", transaction_id="job-refund-1")
+        before_flush = await ledger.refund("user-1", 5.0, "échec", "p1", transaction_id="job-refund-1")
+        await ledger.drain()
+        after_flush = await ledger.refund("user-1", 5.0, "échec", "p1", transaction_id="job-refund-1")
+        await ledger.drain()
+        user = await db.users.find_one({"id": "user-1"})
+        history = await db.credit_transactions.count_documents({"id": "job-refund-1"})
+        return (first, before_flush, after_flush), user, history
+
+    results, user, history = asyncio.run(run())
+
+    assert results == (True, True, True)
+    assert user["credits_total"] == 6.0
+    assert history == 1
+    assert not user.get(OUTBOX_FIELD)
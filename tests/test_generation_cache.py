@@ -0,0 +1,112 @@
+"""
+Cache de génération à deux niveaux: éviction L1 (octets, entrées), durée de
+vie L1 et invalidation vue par les autres workers
+"""
+
+import asyncio
+
+import pytest
+
+from utils import cache as cache_module
+from utils.cache import GenerationCache
+
+
+def _payload(size):
+    return {"react_code": "x" * size}
+
+
+class Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache_module.time, "time", clock)
+    return clock
+
+
+def _size(cache, payload):
+    return cache._payload_size({field: payload.get(field) for field in cache_module.CACHED_APP_FIELDS})
+
+
+def test_l1_evicts_least_recently_used_by_bytes():
+    entry_size = _size(GenerationCache(), _payload(1000))
+    cache = GenerationCache(max_bytes=entry_size * 2, max_entries=10)
+
+    async def run():
+        await cache.set("a", _payload(1000))
+        await cache.set("b", _payload(1000))
+        await cache.get("a")  # "b" devient le plus ancien
+        await cache.set("c", _payload(1000))
+        return [await cache.get(key) is not None for key in ("a", "b", "c")]
+
+    assert asyncio.run(run()) == [True, False, True]
+    assert cache.stats()["l1_bytes"] == entry_size * 2
+
+
+def test_l1_evicts_by_entry_count():
+    cache = GenerationCache(max_entries=2)
+
+    async def run():
+        for key in ("a", "b", "c"):
+            await cache.set(key, _payload(10))
+        return [await cache.get(key) is not None for key in ("a", "b", "c")]
+
+    assert asyncio.run(run()) == [False, True, True]
+    assert cache.stats()["l1_entries"] == 2
+
+
+def test_oversize_payload_drops_previous_l1_entry():
+    small = _size(GenerationCache(), _payload(10))
+    cache = GenerationCache(max_bytes=small * 2)
+
+    async def run():
+        await cache.set("a", _payload(10))
+        await cache.set("a", _payload(small * 4))
+        return await cache.get("a")
+
+    # Sans L2, la nouvelle version trop grosse n'est servie nulle part,
+    # mais l'ancienne ne l'est plus non plus
+    assert asyncio.run(run()) is None
+    assert cache.stats()["l1_entries"] == 0
+    assert cache.stats()["l1_bytes"] == 0
+
+
+def test_l1_entry_lifetime_is_capped(clock):
+    cache = GenerationCache(ttl_seconds=3600, l1_ttl_seconds=60)
+
+    async def run():
+        await cache.set("a", _payload(10))
+        clock.now += 59
+        fresh = await cache.get("a")
+        clock.now += 2
+        return fresh, await cache.get("a")
+
+    fresh, expired = asyncio.run(run())
+    assert fresh is not None
+    assert expired is None
+    assert cache.stats()["l1_entries"] == 0
+
+
+def test_invalidation_on_other_worker_is_seen_after_l1_ttl(clock):
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    db = mongomock_motor.AsyncMongoMockClient().vectort_test
+    worker_a = GenerationCache(db, l1_ttl_seconds=60)
+    worker_b = GenerationCache(db, l1_ttl_seconds=60)
+
+    async def run():
+        await worker_a.set("key", _payload(10), framework="react")
+        cached_before = await worker_a.get("key")
+        deleted = await worker_b.invalidate_framework("react")
+        clock.now += 61
+        return cached_before, deleted, await worker_a.get("key")
+
+    cached_before, deleted, after = asyncio.run(run())
+    assert cached_before is not None
+    assert deleted == 1
+    assert after is None
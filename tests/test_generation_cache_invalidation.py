@@ -0,0 +1,61 @@
+"""
+Invalidation du cache de génération: correspondances par paraphrase et
+accès réservé aux administrateurs
+"""
+
+import asyncio
+
+import pytest
+
+from utils.semantic_cache import build_semantic_fields, find_semantic_match, invalidate_semantic_scope
+
+DESCRIPTION = "Application de gestion de tâches avec tableau kanban, étiquettes et rappels par email"
+PARAPHRASE = "Application de gestion des tâches avec un tableau kanban, des étiquettes et des rappels email"
+
+
+def test_invalidation_clears_paraphrase_matches_of_framework_only():
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    db = mongomock_motor.AsyncMongoMockClient().vectort_test
+
+    async def run():
+        for project_id, framework, project_type in [
+            ("p-react", "react", "web_app"),
+            ("p-react-advanced", "react", "saas"),
+            ("p-vue", "vue", "web_app"),
+        ]:
+            await db.generated_apps.insert_one({
+                "project_id": project_id,
+                "react_code": "code",
+                **build_semantic_fields(DESCRIPTION, framework, project_type),
+            })
+
+        before = await find_semantic_match(db, PARAPHRASE, "react", "web_app")
+        cleared = await invalidate_semantic_scope(db, "React")
+        after_react = await find_semantic_match(db, PARAPHRASE, "react", "web_app")
+        after_saas = await find_semantic_match(db, PARAPHRASE, "react", "saas")
+        after_vue = await find_semantic_match(db, PARAPHRASE, "vue", "web_app")
+        kept = await db.generated_apps.count_documents({"react_code": "code"})
+        return before, cleared, after_react, after_saas, after_vue, kept
+
+    before, cleared, after_react, after_saas, after_vue, kept = asyncio.run(run())
+
+    assert before is not None and before.document["project_id"] == "p-react"
+    assert cleared == 2
+    assert after_react is None and after_saas is None
+    assert after_vue is not None and after_vue.document["project_id"] == "p-vue"
+    assert kept == 3  # Les projets gardent leur code
+
+
+def test_cache_invalidation_requires_admin(monkeypatch):
+    pytest.importorskip("emergentintegrations")
+    from fastapi import HTTPException
+    import server
+
+    monkeypatch.setattr(server, "ADMIN_EMAILS", {"admin@vectort.io"})
+    user = server.User(email="user@example.com", full_name="Utilisateur")
+    admin = server.User(email="Admin@Vectort.io", full_name="Admin")
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(server.get_current_admin(user))
+    assert error.value.status_code == 403
+    assert asyncio.run(server.get_current_admin(admin)) is admin
@@ -0,0 +1,161 @@
+"""
+Push GitHub en un commit (Git Data API) contre un transport httpx simulé:
+séquence blob -> tree -> commit -> ref, retries sur limites de débit et
+repli fichier par fichier quand la branche n'existe pas
+"""
+
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from exporters import github_exporter
+from exporters.github_exporter import GitHubAPIError, GitHubExporter
+
+BASE_URL = "https://github.test"
+REPO = "/repos/octo/app"
+PARENT_SHA = "parent-sha"
+
+
+class FakeGitHub:
+    """Dépôt GitHub minimal; `failures` force des réponses par (méthode, chemin)"""
+
+    def __init__(self, branch_exists=True):
+        self.branch_exists = branch_exists
+        self.calls = []
+        self.blobs = {}
+        self.failures = {}
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        method, path = request.method, request.url.path
+        self.calls.append((method, path))
+        body = json.loads(request.content) if request.content else None
+
+        pending = self.failures.get((method, path))
+        if pending:
+            return pending.pop(0)
+
+        if method == "GET" and path == f"{REPO}/git/ref/heads/main":
+            if not self.branch_exists:
+                return httpx.Response(404, json={"message": "Not Found"})
+            return httpx.Response(200, json={"object": {"sha": PARENT_SHA}})
+        if method == "GET" and path == f"{REPO}/git/commits/{PARENT_SHA}":
+            return httpx.Response(200, json={"sha": PARENT_SHA, "tree": {"sha": "base-tree"}})
+        if method == "POST" and path == f"{REPO}/git/blobs":
+            sha = f"blob-{len(self.blobs)}"
+            self.blobs[sha] = body["content"]
+            return httpx.Response(201, json={"sha": sha})
+        if method == "POST" and path == f"{REPO}/git/trees":
+            self.tree = body
+            return httpx.Response(201, json={"sha": "tree-sha"})
+        if method == "POST" and path == f"{REPO}/git/commits":
+            self.commit = body
+            return httpx.Response(201, json={"sha": "commit-sha"})
+        if method == "PATCH" and path == f"{REPO}/git/refs/heads/main":
+            self.ref = body
+            return httpx.Response(200, json={"object": {"sha": body["sha"]}})
+        if method == "GET" and path.startswith(f"{REPO}/contents/"):
+            return httpx.Response(404, json={"message": "Not Found"})
+        if method == "PUT" and path.startswith(f"{REPO}/contents/"):
+            return httpx.Response(201, json={"content": {"path": path}})
+        return httpx.Response(500, json={"message": f"route inattendue {method} {path}"})
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Attentes de retry enregistrées au lieu d'être effectuées"""
+    delays = []
+
+    async def fake_sleep(delay):
+        delays.append(delay)
+
+    monkeypatch.setattr(github_exporter.asyncio, "sleep", fake_sleep)
+    return delays
+
+
+def _push(github, files):
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(github.handler)) as client:
+            exporter = GitHubExporter("token", base_url=BASE_URL, client=client, blob_concurrency=2)
+            return await exporter.push_files_batch("octo", "app", files)
+
+    return asyncio.run(scenario())
+
+
+def _rate_limited(status_code, **headers):
+    return httpx.Response(status_code, headers=headers, json={"message": "API rate limit exceeded"})
+
+
+def test_push_creates_blobs_tree_commit_then_moves_ref():
+    github = FakeGitHub()
+    files = {"src/App.jsx": "const App = () => null;", "README.md": "# App"}
+
+    result = _push(github, files)
+
+    assert result == {"success": list(files), "failed": [], "total": 2, "commit_sha": "commit-sha"}
+    steps = [(method, path.replace(REPO, "")) for method, path in github.calls]
+    assert steps[:2] == [("GET", "/git/ref/heads/main"), ("GET", f"/git/commits/{PARENT_SHA}")]
+    assert sorted(steps[2:4]) == [("POST", "/git/blobs")] * 2
+    assert steps[4:] == [
+        ("POST", "/git/trees"),
+        ("POST", "/git/commits"),
+        ("PATCH", "/git/refs/heads/main"),
+    ]
+
+    assert github.tree["base_tree"] == "base-tree"
+    assert {entry["path"]: github.blobs[entry["sha"]] for entry in github.tree["tree"]} == files
+    assert github.commit["tree"] == "tree-sha"
+    assert github.commit["parents"] == [PARENT_SHA]
+    assert github.ref == {"sha": "commit-sha", "force": False}
+
+
+@pytest.mark.parametrize("limited", [
+    _rate_limited(429, **{"retry-after": "7"}),
+    _rate_limited(403, **{"retry-after": "3"}),
+    _rate_limited(403, **{"x-ratelimit-remaining": "0"}),
+], ids=["429-retry-after", "403-retry-after", "403-primary-limit"])
+def test_rate_limited_request_is_retried(sleeps, limited):
+    github = FakeGitHub()
+    github.failures[("POST", f"{REPO}/git/trees")] = [limited]
+
+    result = _push(github, {"index.html": "<html></html>"})
+
+    assert result["commit_sha"] == "commit-sha"
+    assert github.calls.count(("POST", f"{REPO}/git/trees")) == 2
+    assert len(sleeps) == 1
+    retry_after = limited.headers.get("retry-after")
+    if retry_after:
+        assert sleeps == [float(retry_after)]
+
+
+def test_authorization_403_is_not_retried(sleeps):
+    github = FakeGitHub()
+    github.failures[("POST", f"{REPO}/git/blobs")] = [
+        httpx.Response(403, json={"message": "Resource not accessible by integration"})
+    ]
+
+    with pytest.raises(GitHubAPIError) as error:
+        _push(github, {"index.html": "<html></html>"})
+
+    assert error.value.status_code == 403
+    assert sleeps == []
+    assert github.calls.count(("POST", f"{REPO}/git/blobs")) == 1
+    assert ("POST", f"{REPO}/git/trees") not in github.calls
+
+
+@pytest.mark.parametrize("status_code", [404, 409])
+def test_missing_branch_falls_back_to_contents_api(status_code):
+    github = FakeGitHub()
+    github.failures[("GET", f"{REPO}/git/ref/heads/main")] = [
+        httpx.Response(status_code, json={"message": "Git Repository is empty."})
+    ]
+    files = {"index.html": "<html></html>", "README.md": "# App"}
+
+    result = _push(github, files)
+
+    assert result == {"success": list(files), "failed": [], "total": 2}
+    assert [call for call in github.calls if call[0] == "PUT"] == [
+        ("PUT", f"{REPO}/contents/{path}") for path in files
+    ]
+    assert not any("/git/blobs" in path for _, path in github.calls)
@@ -0,0 +1,86 @@
+"""
+File de jobs: le traitement d'un échec définitif (remboursement) reste en
+attente jusqu'à confirmation et le reaper le rejoue si le worker meurt
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+from utils.job_queue import FAILURE_HANDLED, FAILURE_PENDING, JOB_FAILED, JobQueue  # noqa: E402
+
+
+def _queue():
+    return JobQueue(mongomock_motor.AsyncMongoMockClient().vectort_test, lease_seconds=30, max_attempts=1)
+
+
+async def _failed_job(queue):
+    await queue.enqueue("generation", {"request": {}}, user_id="user-1", project_id="p1")
+    claimed = await queue.claim("worker-1")
+    return await queue.fail(claimed["id"], "worker-1", "boom")
+
+
+async def _backdate(queue, job_id, seconds=60):
+    past = datetime.utcnow() - timedelta(seconds=seconds)
+    await queue.jobs.update_one(
+        {"id": job_id, "failure_claimed_at": {"$ne": None}},
+        {"$set": {"failure_claimed_at": past}}
+    )
+    await queue.jobs.update_one({"id": job_id}, {"$set": {"finished_at": past}})
+
+
+def test_final_failure_is_pending_until_handled():
+    queue = _queue()
+
+    async def run():
+        job = await _failed_job(queue)
+        first = await queue.claim_failure(job["id"])
+        concurrent = await queue.claim_failure(job["id"])
+        await queue.complete_failure(job["id"])
+        await _backdate(queue, job["id"])
+        return job, first, concurrent, await queue.reap_exhausted(), await queue.get(job["id"])
+
+    job, first, concurrent, reaped, stored = asyncio.run(run())
+
+    assert job["status"] == JOB_FAILED
+    assert job["failure_state"] == FAILURE_PENDING
+    assert first is not None
+    assert concurrent is None  # Déjà réservé par un autre worker
+    assert reaped == []
+    assert stored["failure_state"] == FAILURE_HANDLED
+
+
+def test_reaper_replays_failure_whose_handler_died():
+    queue = _queue()
+
+    async def run():
+        job = await _failed_job(queue)
+        # Le worker réserve l'échec puis meurt avant complete_failure()
+        await queue.claim_failure(job["id"])
+        too_early = await queue.reap_exhausted()
+        await _backdate(queue, job["id"])
+        reaped = await queue.reap_exhausted()
+        replayed = await queue.claim_failure(job["id"])
+        return too_early, reaped, replayed
+
+    too_early, reaped, replayed = asyncio.run(run())
+
+    assert too_early == []
+    assert [job["id"] for job in reaped] == [replayed["id"]]
+
+
+def test_reaper_replays_failure_never_handled():
+    queue = _queue()
+
+    async def run():
+        # Worker mort entre fail() et l'appel du handler
+        job = await _failed_job(queue)
+        await _backdate(queue, job["id"])
+        return job, await queue.reap_exhausted()
+
+    job, reaped = asyncio.run(run())
+
+    assert [reaped_job["id"] for reaped_job in reaped] == [job["id"]]
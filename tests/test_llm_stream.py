@@ -0,0 +1,167 @@
+"""
+Streaming des réponses LLM: les fichiers sortent avant la fin du flux
+"""
+
+import asyncio
+
+import pytest
+
+from streaming.llm_stream import IncrementalFileParser, LLMStreamRequest, iter_llm_chunks
+
+
+RESPONSE_PARTS = [
+    "Voici les fichiers.\nFICH", "IER: src/App.jsx\n``", "`jsx\nconst App = () => ",
+    "<div/>;\n``", "`\n\nFICHIER: src/index.css\n```css\nbody {",
+    " margin: 0; }\n", "```\n",
+]
+
+
+class FakeChunkSource:
+    """Remplace litellm.acompletion: morceaux au format OpenAI (delta.content)"""
+
+    def __init__(self, parts):
+        self.parts = parts
+        self.finished = False
+        self.calls = []
+
+    async def __call__(self, **kwargs):
+        self.calls.append(kwargs)
+        return self._stream()
+
+    async def _stream(self):
+        for part in self.parts:
+            await asyncio.sleep(0)
+            yield {"choices": [{"delta": {"content": part}}]}
+        yield {"choices": [{"delta": {}}]}  # Dernier morceau sans contenu
+        self.finished = True
+
+
+def _request():
+    return LLMStreamRequest(api_key="sk-test", system_message="system", prompt="prompt")
+
+
+def test_files_are_emitted_before_stream_ends():
+    source = FakeChunkSource(RESPONSE_PARTS)
+    parser = IncrementalFileParser()
+    events = []
+
+    async def consume():
+        parts = []
+        async for chunk in iter_llm_chunks(_request(), completion=source):
+            parts.append(chunk)
+            for file_chunk in parser.feed(chunk):
+                events.append((file_chunk, source.finished))
+        return "".join(parts)
+
+    response = asyncio.run(consume())
+
+    assert response == "".join(RESPONSE_PARTS)
+    assert len(events) > 2  # Plusieurs morceaux, pas une réponse en bloc
+    assert all(not finished for _, finished in events)
+
+    app_chunks = [chunk for chunk, _ in events if chunk.file_path == "src/App.jsx"]
+    assert "".join(chunk.text for chunk in app_chunks) == "const App = () => <div/>;\n"
+    assert not app_chunks[0].done and app_chunks[-1].done  # Contenu partiel puis fermeture
+    assert [chunk.file_path for chunk, _ in events if chunk.done] == ["src/App.jsx", "src/index.css"]
+
+    call = source.calls[0]
+    assert call["stream"] is True
+    assert call["model"] == "openai/gpt-4o"
+    assert call["api_key"] == "sk-test"
+
+
+def test_fallback_is_single_chunk_and_logged(caplog):
+    async def failing_completion(**kwargs):
+        raise ConnectionError("proxy down")
+
+    async def send_message():
+        return "FICHIER: a.js\n```js\nx\n```\n"
+
+    async def consume():
+        return [chunk async for chunk in iter_llm_chunks(_request(), send_message, completion=failing_completion)]
+
+    with caplog.at_level("WARNING", logger="streaming.llm_stream"):
+        chunks = asyncio.run(consume())
+
+    assert chunks == ["FICHIER: a.js\n```js\nx\n```\n"]
+    assert "Streaming LLM indisponible" in caplog.text
+
+
+def test_no_fallback_raises_when_streaming_impossible():
+    async def consume():
+        request = LLMStreamRequest(api_key=None, system_message="s", prompt="p")
+        return [chunk async for chunk in iter_llm_chunks(request)]
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(consume())
+
+
+def test_agent_pushes_file_chunks_during_stream():
+    pytest.importorskip("emergentintegrations")
+    from ai_generators.multi_agent_orchestrator import SpecializedAgent
+    from streaming.streaming_system import streaming_manager
+    from utils.llm_governor import set_llm_context
+
+    source = FakeChunkSource(RESPONSE_PARTS)
+    pushed = []
+
+    async def record(project_id, file_path, text, offset, done=False, agent=None):
+        pushed.append((file_path, done, source.finished))
+
+    async def run():
+        set_llm_context("user-1", project_id="project-1")
+        original = (streaming_manager.is_streaming, streaming_manager.stream_file_chunk)
+        streaming_manager.is_streaming = lambda project_id: project_id == "project-1"
+        streaming_manager.stream_file_chunk = record
+        try:
+            agent = SpecializedAgent("frontend", "sk-test")
+            return await agent._stream_response(_request(), completion=source)
+        finally:
+            streaming_manager.is_streaming, streaming_manager.stream_file_chunk = original
+
+    response = asyncio.run(run())
+
+    assert response == "".join(RESPONSE_PARTS)
+    assert ("src/App.jsx", True, False) in pushed
+    assert all(not finished for _, _, finished in pushed)
+
+
+def test_retries_and_fallback_reset_partial_files():
+    pytest.importorskip("emergentintegrations")
+    from ai_generators.multi_agent_orchestrator import AgentRole, MultiAgentOrchestrator
+
+    orchestrator = MultiAgentOrchestrator("sk-test")
+    agent = orchestrator.agents[AgentRole.FRONTEND]
+    events = []
+
+    class RecordingStream:
+        async def stream_agent_start(self, project_id, agent_name):
+            events.append(("start", agent_name))
+
+        async def stream_file_reset(self, project_id, agent_name, attempt):
+            events.append(("reset", agent_name, attempt))
+
+    async def timed_out(description, framework, context=None):
+        events.append(("attempt", agent.role))
+        raise asyncio.TimeoutError()
+
+    async def fallback(agent_name, description, framework):
+        events.append(("fallback", agent_name))
+        return {"src/App.jsx": "fallback"}
+
+    agent.generate = timed_out
+    orchestrator._generate_fallback_files = fallback
+
+    result = asyncio.run(orchestrator._generate_with_retry_and_streaming(
+        AgentRole.FRONTEND, "Une todo list", "react", {}, "project-1", RecordingStream(), max_retries=2
+    ))
+
+    assert result == {"src/App.jsx": "fallback"}
+    assert events == [
+        ("start", AgentRole.FRONTEND),
+        ("attempt", AgentRole.FRONTEND),
+        ("reset", AgentRole.FRONTEND, 2),
+        ("attempt", AgentRole.FRONTEND),
+        ("reset", AgentRole.FRONTEND, 3),
+        ("fallback", AgentRole.FRONTEND),
+    ]
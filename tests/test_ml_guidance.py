@@ -0,0 +1,85 @@
+"""
+Insights ML calculés par le planificateur: relus par generation_guidance et
+ajoutés aux prompts des agents de génération
+"""
+
+import asyncio
+
+import pytest
+
+pytest.importorskip("emergentintegrations")
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+from ai_generators.multi_agent_orchestrator import AgentRole, MultiAgentOrchestrator  # noqa: E402
+from ml.ai_system import VectortAISystem  # noqa: E402
+
+INSIGHTS = {
+    "system_score": 62.0,
+    "failure_patterns": {
+        "errors": {
+            "common_errors": {
+                "SyntaxError: Unexpected token '<' in src/ClientAcme.jsx": 12,
+                "ReferenceError: useState is not defined": 4,
+                "ReferenceError: acmeSecret is not defined": 3,
+                "Projet acme-interne: build échoué": 9,
+            },
+            "problematic_keywords": {"blockchain": 3},
+            "compilation_failures": 5,
+        },
+        "recommendations": [],
+        "failure_count": 16,
+    },
+}
+
+
+def _system():
+    return VectortAISystem(mongomock_motor.AsyncMongoMockClient().vectort_test, "sk-test")
+
+
+def test_guidance_is_empty_until_insights_are_computed():
+    assert asyncio.run(_system().generation_guidance()) == ""
+
+
+def test_guidance_reads_scheduled_insights():
+    system = _system()
+
+    async def run():
+        await system._store_insights("latest", INSIGHTS)
+        return await system.generation_guidance()
+
+    guidance = asyncio.run(run())
+
+    lines = guidance.strip().splitlines()
+    assert lines[0] == "LEÇONS DES GÉNÉRATIONS PRÉCÉDENTES:"
+    # Classes d'erreur seulement, par fréquence: aucun texte d'un autre utilisateur
+    assert lines[1].startswith("- Éviter les SyntaxError:")
+    assert lines[2].startswith("- Éviter les ReferenceError:")
+    assert "syntaxe" in lines[3]
+    assert "acme" not in guidance.lower()
+    assert "useState" not in guidance
+
+
+def test_ml_insights_endpoint_requires_admin():
+    import inspect
+
+    import server
+
+    dependency = inspect.signature(server.get_ml_insights).parameters["current_user"].default
+    assert dependency.dependency is server.get_current_admin
+
+
+def test_guidance_is_appended_to_every_agent_prompt(monkeypatch):
+    orchestrator = MultiAgentOrchestrator("sk-test", guidance="\n\nLEÇONS: éviter X")
+    prompts = []
+
+    async def fake_stream(request, fallback=None, completion=None):
+        prompts.append(request.prompt)
+        return ""
+
+    agent = orchestrator.agents[AgentRole.FRONTEND]
+    monkeypatch.setattr(agent, "_stream_response", fake_stream)
+    asyncio.run(agent.generate("Une todo list", "react"))
+
+    assert prompts and prompts[0].endswith("LEÇONS: éviter X")
+    assert all(agent.guidance == "\n\nLEÇONS: éviter X" for agent in orchestrator.agents.values())
+    assert orchestrator.js_optimizer.guidance == "\n\nLEÇONS: éviter X"
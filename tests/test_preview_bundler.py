@@ -0,0 +1,95 @@
+"""
+Bundler d'aperçu: imports nommés en liaisons vivantes (cycles résolus à
+l'usage, comme en ESM)
+"""
+
+import json
+import shutil
+import subprocess
+
+import pytest
+
+from preview.bundler import _live_bindings, bundle_project
+
+# Globales du navigateur utilisées par le runtime du bundle
+NODE_PRELUDE = """
+globalThis.window = globalThis;
+globalThis.location = { href: 'about:blank' };
+globalThis.addEventListener = function () {};
+globalThis.document = { getElementById: function () { return null; } };
+console.error = function (error) {
+    process.stderr.write(String(error && error.stack || error));
+    process.exit(1);
+};
+"""
+
+CYCLE = {
+    "src/a.js": (
+        'import { helperB } from "./b";\n'
+        "export const CONFIG = { n: 42 };\n"
+        "export const value = helperB();\n"
+    ),
+    "src/b.js": (
+        'import { CONFIG } from "./a";\n'
+        "export function helperB() { return CONFIG.n; }\n"
+    ),
+}
+
+
+def _run(bundle, expression):
+    if shutil.which("node") is None:
+        pytest.skip("node non disponible")
+    script = f"{NODE_PRELUDE}\n{bundle.script}\nconsole.log(JSON.stringify({expression}));"
+    result = subprocess.run(["node", "-e", script], capture_output=True, text=True, timeout=30)
+    assert result.returncode == 0, result.stderr
+    return json.loads(result.stdout)
+
+
+def test_named_import_cycle_resolves_at_use():
+    bundle = bundle_project(CYCLE, entry="src/a.js")
+
+    assert bundle.modules == ["src/b.js", "src/a.js"]
+    assert _run(bundle, '__vectort.require("src/a.js").value') == 42
+
+
+def test_default_import_cycle_resolves_at_use():
+    files = {
+        "src/a.js": (
+            'import describe from "./b";\n'
+            "export default { name: 'a' };\n"
+            "export const value = describe();\n"
+        ),
+        "src/b.js": (
+            'import a from "./a";\n'
+            "export default function describe() { return a.name; }\n"
+        ),
+    }
+    bundle = bundle_project(files, entry="src/a.js")
+
+    assert _run(bundle, '__vectort.require("src/a.js").value') == "a"
+
+
+def test_reexported_import_stays_live():
+    files = dict(CYCLE)
+    files["src/index.js"] = 'import { CONFIG } from "./a";\nexport { CONFIG };\n'
+    bundle = bundle_project(files, entry="src/index.js")
+
+    assert _run(bundle, '__vectort.require("src/index.js").CONFIG') == {"n": 42}
+
+
+def test_live_bindings_rewrite_only_references():
+    code = (
+        "const label = `n=${CONFIG.n}`;\n"
+        "const copy = { CONFIG, other: CONFIG, CONFIG: 1, ...CONFIG };\n"
+        "const text = 'CONFIG' + settings.CONFIG + settings?.CONFIG; // CONFIG\n"
+        "const pattern = /CONFIG/g;\n"
+    )
+
+    rewritten = _live_bindings(code, {"CONFIG": "__import1.CONFIG"})
+
+    assert rewritten == (
+        "const label = `n=${__import1.CONFIG.n}`;\n"
+        "const copy = { CONFIG: __import1.CONFIG, other: __import1.CONFIG, CONFIG: 1, ...__import1.CONFIG };\n"
+        "const text = 'CONFIG' + settings.CONFIG + settings?.CONFIG; // CONFIG\n"
+        "const pattern = /CONFIG/g;\n"
+    )
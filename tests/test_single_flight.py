@@ -0,0 +1,160 @@
+"""
+Single-flight: les appelants rattachés reçoivent le résultat, leurs propres
+événements de progression et sont comptés dans le contrôleur LLM
+"""
+
+import asyncio
+
+import pytest
+
+from streaming.streaming_system import GenerationStreamer
+from utils.llm_governor import LLMGovernor, LLMRequestContext, get_llm_context, set_llm_context, use_llm_context
+from utils.single_flight import SingleFlight
+
+TIMEOUT = 3.0
+
+
+async def _drain(queue):
+    messages = []
+    while not queue.queue.empty():
+        messages.append(queue.queue.get_nowait())
+    return messages
+
+
+def _generation(streamer, governor, gate, calls, charges):
+    """Génération factice: une phase, un appel LLM, un fichier"""
+
+    async def factory():
+        calls.append(get_llm_context().project_id)
+        project_id = get_llm_context().project_id
+        await gate.wait()
+        await streamer.send_message(project_id, "phase", "Phase 1", progress=10)
+        async with governor.slot():
+            charges.append(dict(governor.stats()["inflight_by_user"]))
+        await streamer.send_message(project_id, "file_created", "App.jsx", file_path="src/App.jsx", progress=90)
+        return {"react": "const App = () => null;"}
+
+    return factory
+
+
+def test_coalesced_callers_get_result_and_own_events():
+    flights = SingleFlight()
+    streamer = GenerationStreamer()
+    governor = LLMGovernor(max_concurrency=4)
+    calls, charges = [], []
+
+    async def caller(user_id, plan, project_id, factory):
+        set_llm_context(user_id, plan, project_id)
+        return await flights.do("cache-key", factory)
+
+    async def run():
+        gate = asyncio.Event()
+        factory = _generation(streamer, governor, gate, calls, charges)
+        queues = {project_id: streamer.create_stream(project_id) for project_id in ("project-a", "project-b")}
+        first = asyncio.ensure_future(caller("user-a", "free", "project-a", factory))
+        await asyncio.sleep(0)
+        second = asyncio.ensure_future(caller("user-b", "pro", "project-b", factory))
+        await asyncio.sleep(0)
+        gate.set()
+        results = await asyncio.wait_for(asyncio.gather(first, second), TIMEOUT)
+        await asyncio.sleep(0.05)  # Relais backplane -> queues
+        events = {project_id: await _drain(queue) for project_id, queue in queues.items()}
+        for project_id in queues:
+            streamer.close_stream(project_id)
+        return results, events, dict(governor.stats()["inflight_by_user"])
+
+    results, events, inflight_after = asyncio.run(run())
+
+    assert calls == ["project-a"]  # Une seule exécution
+    assert results[0] == ({"react": "const App = () => null;"}, False)
+    assert results[1] == ({"react": "const App = () => null;"}, True)
+
+    for project_id in ("project-a", "project-b"):
+        messages = events[project_id]
+        assert [message.message_type for message in messages] == ["phase", "file_created"]
+        assert [message.sequence for message in messages] == [1, 2]  # Séquence propre au projet
+        assert messages[-1].metadata["state"]["files_created"] == ["src/App.jsx"]
+        assert messages[-1].progress == 90
+
+    assert charges == [{"user-a": 1, "user-b": 1}]  # Slot compté pour chaque appelant
+    assert inflight_after == {}
+
+
+def test_cancelled_caller_stops_receiving_events():
+    flights = SingleFlight()
+    streamer = GenerationStreamer()
+    governor = LLMGovernor(max_concurrency=4)
+    calls, charges = [], []
+
+    async def caller(user_id, project_id, factory):
+        set_llm_context(user_id, "free", project_id)
+        return await flights.do("cache-key", factory)
+
+    async def run():
+        gate = asyncio.Event()
+        factory = _generation(streamer, governor, gate, calls, charges)
+        queues = {project_id: streamer.create_stream(project_id) for project_id in ("project-a", "project-b")}
+        first = asyncio.ensure_future(caller("user-a", "project-a", factory))
+        await asyncio.sleep(0)
+        second = asyncio.ensure_future(caller("user-b", "project-b", factory))
+        await asyncio.sleep(0)
+        second.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await second
+        gate.set()
+        result = await asyncio.wait_for(first, TIMEOUT)
+        await asyncio.sleep(0.05)
+        events = {project_id: await _drain(queue) for project_id, queue in queues.items()}
+        for project_id in queues:
+            streamer.close_stream(project_id)
+        return result, events
+
+    result, events = asyncio.run(run())
+
+    assert result[1] is False
+    assert len(events["project-a"]) == 2
+    assert events["project-b"] == []
+    assert charges == [{"user-a": 1}]
+
+
+def test_shared_call_only_charges_callers_with_room():
+    governor = LLMGovernor(max_concurrency=4, plan_limits={"free": 1})
+    user_a = LLMRequestContext(user_id="user-a", project_id="p-a")
+    user_b = LLMRequestContext(user_id="user-b", project_id="p-b")
+    shared = LLMRequestContext(user_id="user-a", project_id="p-a", members=[user_a, user_b])
+    stats = {}
+
+    async def hold(context, entered, release):
+        use_llm_context(context)
+        async with governor.slot():
+            entered.set()
+            await release.wait()
+
+    async def run():
+        b_entered, b_release = asyncio.Event(), asyncio.Event()
+        own_call = asyncio.ensure_future(hold(user_b, b_entered, b_release))
+        await asyncio.wait_for(b_entered.wait(), TIMEOUT)
+
+        shared_entered, shared_release = asyncio.Event(), asyncio.Event()
+        shared_call = asyncio.ensure_future(hold(shared, shared_entered, shared_release))
+        await asyncio.wait_for(shared_entered.wait(), TIMEOUT)
+        stats["during"] = dict(governor.stats()["inflight_by_user"])
+
+        # user-b libère son appel: le suivant passe pendant l'exécution partagée
+        b_release.set()
+        await own_call
+        next_entered, next_release = asyncio.Event(), asyncio.Event()
+        next_call = asyncio.ensure_future(hold(user_b, next_entered, next_release))
+        await asyncio.wait_for(next_entered.wait(), TIMEOUT)
+        stats["next"] = dict(governor.stats()["inflight_by_user"])
+
+        next_release.set()
+        shared_release.set()
+        await asyncio.gather(next_call, shared_call)
+        stats["after"] = dict(governor.stats()["inflight_by_user"])
+
+    asyncio.run(run())
+
+    assert stats["during"] == {"user-a": 1, "user-b": 1}  # user-b à son quota: non compté
+    assert stats["next"] == {"user-a": 1, "user-b": 1}
+    assert stats["after"] == {}
@@ -0,0 +1,111 @@
+"""
+Historique des versions: reconstruction checkpoint + deltas, suppressions,
+retour arrière et versions inexistantes
+"""
+
+import asyncio
+
+import pytest
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+from utils.version_store import VersionStore, diff_trees  # noqa: E402
+
+
+def _store(checkpoint_interval=3):
+    return VersionStore(mongomock_motor.AsyncMongoMockClient().vectort_test, checkpoint_interval=checkpoint_interval)
+
+
+def _entry(blob_hash):
+    return {"hash": blob_hash, "size": len(blob_hash)}
+
+
+async def _history(store):
+    """v1 {a, b} -> v2 a modifié -> v3 (checkpoint) c ajouté -> v4 b supprimé -> v5 a modifié"""
+    await store.record("p1", {"a.js": _entry("a1"), "b.js": _entry("b1")}, "generation")
+    await store.record("p1", {"a.js": _entry("a2")}, "iteration")
+    await store.record("p1", {"c.js": _entry("c1")}, "iteration")
+    await store.record("p1", {"b.js": None}, "iteration")
+    await store.record("p1", {"a.js": _entry("a3")}, "iteration")
+
+
+def _hashes(tree):
+    return {path: entry["hash"] for path, entry in tree.items()}
+
+
+def test_tree_is_rebuilt_across_checkpoint_boundary():
+    store = _store()
+
+    async def run():
+        await _history(store)
+        checkpoints = [v["version"] async for v in store.versions.find({"tree": {"$exists": True}})]
+        trees = [await store.tree_at("p1", version) for version in range(1, 6)]
+        return checkpoints, trees
+
+    checkpoints, trees = asyncio.run(run())
+
+    assert sorted(checkpoints) == [1, 3]
+    assert [_hashes(tree) for tree in trees] == [
+        {"a.js": "a1", "b.js": "b1"},
+        {"a.js": "a2", "b.js": "b1"},
+        {"a.js": "a2", "b.js": "b1", "c.js": "c1"},
+        {"a.js": "a2", "c.js": "c1"},  # Suppression après le checkpoint
+        {"a.js": "a3", "c.js": "c1"},
+    ]
+
+
+def test_checkpoint_omits_deleted_files():
+    store = _store(checkpoint_interval=2)
+
+    async def run():
+        await store.record("p1", {"a.js": _entry("a1"), "b.js": _entry("b1")}, "generation")
+        await store.record("p1", {"b.js": None}, "iteration")  # v2: checkpoint
+        await store.record("p1", {"c.js": _entry("c1")}, "iteration")
+        return await store.get("p1", 2), await store.tree_at("p1", 3)
+
+    checkpoint, tree = asyncio.run(run())
+
+    assert [entry["path"] for entry in checkpoint["tree"]] == ["a.js"]
+    assert _hashes(tree) == {"a.js": "a1", "c.js": "c1"}
+
+
+def test_deleting_every_file_is_an_empty_tree_not_a_missing_version():
+    store = _store()
+
+    async def run():
+        await store.record("p1", {"a.js": _entry("a1")}, "generation")
+        await store.record("p1", {"a.js": None}, "iteration")
+        return await store.tree_at("p1", 2)
+
+    assert asyncio.run(run()) == {}
+
+
+def test_missing_versions_have_no_tree():
+    store = _store()
+
+    async def run():
+        await _history(store)
+        return [await store.tree_at(project, version) for project, version in [("p1", 6), ("p1", 0), ("p2", 1)]]
+
+    # Une version au-delà de la dernière ne doit pas retomber sur l'arbre courant
+    assert asyncio.run(run()) == [None, None, None]
+
+
+def test_rollback_restores_old_tree_as_new_version():
+    store = _store()
+
+    async def run():
+        await _history(store)
+        current = await store.tree_at("p1", 5)
+        target = await store.tree_at("p1", 2)
+        changes = diff_trees(current, target)
+        version = await store.record("p1", changes, "rollback", "Retour à la version 2")
+        return changes, version, await store.tree_at("p1", version), await store.tree_at("p1", 5)
+
+    changes, version, restored, previous = asyncio.run(run())
+
+    assert _hashes({path: entry for path, entry in changes.items() if entry}) == {"a.js": "a2", "b.js": "b1"}
+    assert changes["c.js"] is None
+    assert version == 6  # Checkpoint (6 % 3 == 0) construit depuis les deltas
+    assert _hashes(restored) == {"a.js": "a2", "b.js": "b1"}
+    assert _hashes(previous) == {"a.js": "a3", "c.js": "c1"}  # Historique inchangé
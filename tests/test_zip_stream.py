@@ -0,0 +1,103 @@
+"""
+ZIP en streaming: archives lisibles par zipfile (entrées stockées et
+compressées, noms UTF-8) et revalidation de l'export par ETag
+"""
+
+import asyncio
+import io
+import zipfile
+
+import pytest
+
+from exporters.zip_stream import ZIP_DEFLATED, ZIP_STORED, ZipStreamWriter
+
+ENTRIES = [
+    ("src/App.jsx", "export default function App() { return <div>Bonjour</div>; }\n" * 50),
+    ("public/logo.png", bytes(range(256)) * 4),
+    ("src/données/été.json", '[' + ', '.join(['{"saison": "été", "ville": "Zürich"}'] * 20) + ']'),
+    ("README.md", ""),
+]
+
+
+def _archive(entries=ENTRIES, **options):
+    async def run():
+        return b"".join([chunk async for chunk in ZipStreamWriter(**options).stream(entries)])
+
+    return zipfile.ZipFile(io.BytesIO(asyncio.run(run())))
+
+
+def _expected(content):
+    return content.encode("utf-8") if isinstance(content, str) else content
+
+
+def test_archive_is_valid_with_stored_and_deflated_entries():
+    archive = _archive()
+
+    assert archive.testzip() is None
+    methods = {info.filename: info.compress_type for info in archive.infolist()}
+    assert methods == {
+        "src/App.jsx": ZIP_DEFLATED,
+        "public/logo.png": ZIP_STORED,  # Format déjà compressé
+        "src/données/été.json": ZIP_DEFLATED,
+        "README.md": ZIP_STORED,  # Vide: rien à compresser
+    }
+    for path, content in ENTRIES:
+        assert archive.read(path) == _expected(content)
+
+
+def test_utf8_names_are_flagged():
+    archive = _archive()
+    info = archive.getinfo("src/données/été.json")
+
+    assert info.flag_bits & 0x0800
+    assert [info.filename for info in archive.infolist()] == [path for path, _ in ENTRIES]
+
+
+@pytest.mark.parametrize("compression, method", [("store", ZIP_STORED), ("deflate", ZIP_DEFLATED)])
+def test_forced_compression_round_trips(compression, method):
+    archive = _archive(compression=compression, max_pending=1)
+
+    assert archive.testzip() is None
+    assert archive.getinfo("src/App.jsx").compress_type == method
+    assert archive.read("public/logo.png") == _expected(ENTRIES[1][1])
+
+
+def test_export_answers_304_when_etag_matches(monkeypatch):
+    pytest.importorskip("emergentintegrations")
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    from starlette.requests import Request
+
+    import server
+
+    db = mongomock_motor.AsyncMongoMockClient().vectort_test
+    user = server.User.model_construct(id="user-1")
+    cached = _archive([("src/App.jsx", "x")]).fp.getvalue()
+
+    async def run():
+        await db.projects.insert_one({"id": "p1", "user_id": "user-1", "title": "Démo", "framework": "react"})
+        await db.generated_apps.insert_one({
+            "project_id": "p1",
+            "file_manifest": [{"path": "src/App.jsx", "hash": "h1", "size": 10}],
+        })
+        async def cached_archive(key):
+            return cached
+
+        monkeypatch.setattr(server, "db", db)
+        monkeypatch.setattr(server.zip_archive_cache, "get", cached_archive)
+
+        def request(etag=None):
+            headers = [(b"if-none-match", etag.encode())] if etag else []
+            return Request({"type": "http", "method": "GET", "path": "/", "headers": headers})
+
+        first = await server.export_project_zip("p1", request(), user)
+        etag = first.headers["etag"]
+        revalidated = await server.export_project_zip("p1", request(etag), user)
+        stale = await server.export_project_zip("p1", request('"autre"'), user)
+        return first, revalidated, stale
+
+    first, revalidated, stale = asyncio.run(run())
+
+    assert first.status_code == 200
+    assert revalidated.status_code == 304
+    assert revalidated.headers["etag"] == first.headers["etag"]
+    assert stale.status_code == 200